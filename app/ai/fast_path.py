@@ -0,0 +1,221 @@
+"""
+Deterministic fast-path intent classifier.
+
+Short, formulaic messages ("ok", "list my reminders", "delete 1 and 2",
+"stop calling me", "snooze 15 min") make up most traffic and don't need
+GPT. Each rule is an anchored regex over the whole normalized message with
+a fixed confidence; anything that doesn't match a rule exactly, or matches
+with low confidence, is left to the LLM.
+"""
+
+import re
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Callable, Dict, List, Optional, Pattern, Tuple
+
+from app.domain.reminder import ParsedIntent
+from app.infrastructure.metrics import INTENTS_TOTAL
+from app.utils.time import get_current_time_pkt
+
+
+@dataclass
+class FastPathResult:
+    """A locally classified intent and how sure the rule is about it."""
+    intent: ParsedIntent
+    confidence: float
+    rule: str
+
+
+# Confidence of rules that depend on a quoted message the LLM can read better
+QUOTED_CONFIDENCE = 0.5
+
+_NUMBER_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+    "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10,
+}
+
+_UNIT_MINUTES = {"m": 1, "min": 1, "mins": 1, "minute": 1, "minutes": 1,
+                 "h": 60, "hr": 60, "hrs": 60, "hour": 60, "hours": 60}
+
+_AMOUNT = r"\d+|an?|one|two|three|four|five|ten"
+_UNIT = r"m|mins?|minutes?|h|hrs?|hours?"
+
+_ACKNOWLEDGE_RE = re.compile(
+    r"(ok(ay)?|kk?|done|did it|thanks?( you)?|thx|ty|got it|noted|alright|cool|"
+    r"great|perfect|nice|roger|will do|on it|ok done|done thanks|ok thanks|"
+    r"👍|✅|👌|🙏)"
+)
+
+_LIST_RE = re.compile(
+    r"((please )?(list|show|view|see|display|check)( me)?( all)?( of)?( my)?( the)?( current| active| upcoming)?|"
+    r"(what are|what's|whats)( all)?( my)?)? ?(reminders|reminder list|my reminders)"
+)
+
+_INDICES = r"(?P<indices>\d+(\s*(,|&|and|\+)\s*\d+)*)"
+_BATCH_DELETE_RE = re.compile(
+    r"(delete|remove|cancel|clear)\s+(reminders?\s+)?(numbers?\s+|no\.?\s*|#\s*)?" + _INDICES
+)
+
+_OPT_OUT_RE = re.compile(
+    r"(please )?(stop|don'?t|do not|never|no more)\s+(call|calling)( me)?"
+    r"( anymore| again| for reminders| if i don'?t (respond|reply|answer))?|"
+    r"(disable|turn off|no) (phone )?calls"
+)
+
+_OPT_IN_RE = re.compile(
+    r"(you can|please|ok)?\s*(start calling me|call me again|call me if i don'?t (respond|reply|answer))|"
+    r"(enable|turn on|allow) (phone )?calls"
+)
+
+_SNOOZE_RE = re.compile(
+    r"snooze|later|remind me (again )?later|"
+    r"(snooze|remind me( again)?)( in| for| by)? (?P<amount>" + _AMOUNT + r")\s*(?P<unit>" + _UNIT + r")( later)?|"
+    r"snooze (no\.?\s*|#\s*)?(?P<index>\d+)"
+    r"( (for|by) (?P<index_amount>" + _AMOUNT + r")\s*(?P<index_unit>" + _UNIT + r"))?"
+)
+
+
+def _normalize(message: str) -> str:
+    """Lowercase, collapse whitespace and strip trailing punctuation."""
+    text = " ".join(message.lower().split())
+    return text.strip(" .!?,")
+
+
+def _parse_indices(text: str) -> List[int]:
+    return [int(n) for n in re.findall(r"\d+", text)]
+
+
+def _duration_minutes(amount: Optional[str], unit: Optional[str]) -> Optional[int]:
+    if not amount or not unit:
+        return None
+    if amount.isdigit():
+        count = int(amount)
+    elif amount in ("a", "an"):
+        count = 1
+    else:
+        count = _NUMBER_WORDS[amount]
+    return count * _UNIT_MINUTES[unit]
+
+
+def _acknowledge(match: re.Match, quoted: bool) -> Tuple[ParsedIntent, float]:
+    return ParsedIntent(intent="acknowledge"), 0.95
+
+
+def _list(match: re.Match, quoted: bool) -> Tuple[ParsedIntent, float]:
+    return ParsedIntent(intent="list_reminders"), 0.95
+
+
+def _batch_delete(match: re.Match, quoted: bool) -> Tuple[ParsedIntent, float]:
+    indices = _parse_indices(match.group("indices"))
+    return ParsedIntent(intent="delete_reminders", target_indices=indices), 0.95
+
+
+def _opt_out(match: re.Match, quoted: bool) -> Tuple[ParsedIntent, float]:
+    return ParsedIntent(intent="opt_out_calls"), 0.95
+
+
+def _opt_in(match: re.Match, quoted: bool) -> Tuple[ParsedIntent, float]:
+    return ParsedIntent(intent="opt_in_calls"), 0.9
+
+
+def _snooze(match: re.Match, quoted: bool) -> Tuple[ParsedIntent, float]:
+    groups = match.groupdict()
+    minutes = (
+        _duration_minutes(groups.get("amount"), groups.get("unit"))
+        or _duration_minutes(groups.get("index_amount"), groups.get("index_unit"))
+    )
+    scheduled_time = get_current_time_pkt() + timedelta(minutes=minutes) if minutes else None
+    indices = [int(groups["index"])] if groups.get("index") else None
+    intent = ParsedIntent(intent="snooze_reminder", scheduled_time=scheduled_time, target_indices=indices)
+    # A quoted reminder identifies the target better than "most recently notified"
+    return intent, QUOTED_CONFIDENCE if quoted and not indices else 0.9
+
+
+# Checked in order; the first full match wins
+RULES: List[Tuple[str, Pattern, Callable[[re.Match, bool], Tuple[ParsedIntent, float]]]] = [
+    ("acknowledge", _ACKNOWLEDGE_RE, _acknowledge),
+    ("list", _LIST_RE, _list),
+    ("batch_delete", _BATCH_DELETE_RE, _batch_delete),
+    ("opt_out", _OPT_OUT_RE, _opt_out),
+    ("opt_in", _OPT_IN_RE, _opt_in),
+    ("snooze", _SNOOZE_RE, _snooze),
+]
+
+
+def classify_locally(message: str, quoted_message: Optional[str] = None) -> Optional[FastPathResult]:
+    """
+    Classify a message with the local rules.
+    
+    Args:
+        message: The user's message text
+        quoted_message: Quoted/replied-to message, if any
+    
+    Returns:
+        FastPathResult if a rule matched the whole message, otherwise None
+    """
+    text = _normalize(message)
+    if not text or len(text) > 80:
+        return None
+    
+    for name, pattern, build in RULES:
+        match = pattern.fullmatch(text)
+        if match:
+            intent, confidence = build(match, bool(quoted_message))
+            return FastPathResult(intent=intent, confidence=confidence, rule=name)
+    
+    return None
+
+
+class RouteStats:
+    """Per-intent counts and latency for one route (local or llm)."""
+    
+    def __init__(self):
+        self.counts: Dict[str, int] = {}
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+    
+    def observe(self, intent: str, seconds: float) -> None:
+        self.counts[intent] = self.counts.get(intent, 0) + 1
+        self.total_seconds += seconds
+        if seconds > self.max_seconds:
+            self.max_seconds = seconds
+    
+    def as_dict(self) -> dict:
+        total = sum(self.counts.values())
+        return {
+            "count": total,
+            "by_intent": dict(self.counts),
+            "avg_ms": round(self.total_seconds / total * 1000, 2) if total else 0.0,
+            "max_ms": round(self.max_seconds * 1000, 2),
+        }
+
+
+# Routing statistics, keyed by route
+_routes: Dict[str, RouteStats] = {"local": RouteStats(), "llm": RouteStats()}
+
+
+def record_route(route: str, intent: str, seconds: float) -> None:
+    """
+    Record how a message was classified.
+    
+    Args:
+        route: "local" or "llm"
+        intent: Resulting intent name
+        seconds: Time spent classifying
+    """
+    _routes[route].observe(intent, seconds)
+    INTENTS_TOTAL.inc(route, intent)
+
+
+def get_routing_stats() -> dict:
+    """Per-route, per-intent counts, latency and the local hit ratio."""
+    stats = {route: route_stats.as_dict() for route, route_stats in _routes.items()}
+    total = stats["local"]["count"] + stats["llm"]["count"]
+    stats["local_ratio"] = round(stats["local"]["count"] / total, 4) if total else 0.0
+    return stats
+
+
+def reset_routing_stats() -> None:
+    """Clear routing statistics."""
+    for route in _routes:
+        _routes[route] = RouteStats()
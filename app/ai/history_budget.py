@@ -0,0 +1,245 @@
+"""
+Token budget for the conversation history sent with each GPT parse.
+
+Every exchange used to go into the prompt verbatim, and bot responses can
+be long (a reminder list runs to hundreds of tokens), so one "list my
+reminders" inflated every later prompt. The history is now fitted to
+llm_history_max_tokens:
+
+- each message is clipped to llm_history_message_max_tokens;
+- exchanges are kept newest first while they fit;
+- exchanges older than the last llm_history_turns are folded into a
+  per-user rolling summary (conversation_summaries), which leads the
+  history as one short system message.
+
+The summary is built locally, one line per exchange from the user's words
+and the start of the reply, and trimmed from its oldest line to
+llm_history_summary_max_tokens. It is refreshed after the message's
+commit, once SUMMARY_BATCH_TURNS exchanges have piled up, so the hot path
+only ever reads it.
+
+Tokens are counted with tiktoken when it is installed (pip install
+".[tokens]"), otherwise estimated at CHARS_PER_TOKEN characters per token.
+"""
+
+import logging
+from functools import lru_cache
+from typing import List, Optional, Sequence, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config.settings import get_settings
+from app.domain.conversation_history import (
+    get_conversation_history,
+    get_conversation_summary,
+    get_messages_to_summarize,
+    save_conversation_summary,
+)
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Encoding of gpt-4o-mini
+TIKTOKEN_ENCODING = "o200k_base"
+
+# Estimate when tiktoken is not installed
+CHARS_PER_TOKEN = 4
+
+# Role and separators around each chat message
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Exchanges read beyond llm_history_turns before they are summarized
+SUMMARY_BATCH_TURNS = 5
+
+# Characters of the user's message and of the reply kept per summary line
+SUMMARY_USER_CHARS = 100
+SUMMARY_REPLY_CHARS = 100
+
+SUMMARY_PREFIX = "Summary of earlier conversation (oldest first):\n"
+
+ELLIPSIS = "…"
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    """The tiktoken encoding, or None when tiktoken is unavailable."""
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(TIKTOKEN_ENCODING)
+    except Exception as e:
+        # Not installed, or the encoding file could not be fetched
+        logger.info(f"Estimating history tokens from characters (tiktoken unavailable: {e})")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Tokens in a piece of text."""
+    encoding = _encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def message_tokens(message: dict) -> int:
+    """Tokens a chat message adds to the prompt."""
+    return count_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+
+
+def clip(text: str, max_tokens: int) -> str:
+    """Cut text down to at most max_tokens, marking the cut with an ellipsis."""
+    encoding = _encoding()
+    if encoding is not None:
+        tokens = encoding.encode(text)
+        if len(tokens) <= max_tokens:
+            return text
+        return encoding.decode(tokens[:max_tokens - 1]) + ELLIPSIS
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars - 1] + ELLIPSIS
+
+
+def _shorten(text: str, max_chars: int) -> str:
+    """One line of at most max_chars characters."""
+    text = " ".join(text.split())
+    return text if len(text) <= max_chars else text[:max_chars - 1] + ELLIPSIS
+
+
+def fit_history(
+    history: Sequence[dict],
+    summary: Optional[str] = None,
+    max_tokens: Optional[int] = None,
+    message_max_tokens: Optional[int] = None
+) -> List[dict]:
+    """
+    Fit conversation history into the token budget.
+    
+    Args:
+        history: Messages oldest first, as from get_conversation_history
+        summary: Rolling summary of the exchanges before `history`
+        max_tokens: Budget (defaults to llm_history_max_tokens)
+        message_max_tokens: Per-message cap (defaults to
+            llm_history_message_max_tokens)
+    
+    Returns:
+        Summary message (if any and it fits) followed by the most recent
+        exchanges that fit, oldest first
+    """
+    budget = max_tokens if max_tokens is not None else settings.llm_history_max_tokens
+    message_max_tokens = message_max_tokens or settings.llm_history_message_max_tokens
+    
+    summary_message = None
+    if summary:
+        summary_message = {"role": "system", "content": SUMMARY_PREFIX + summary}
+        if message_tokens(summary_message) <= budget:
+            budget -= message_tokens(summary_message)
+        else:
+            summary_message = None
+    
+    # An exchange is a user message and the replies that follow it
+    exchanges: List[List[dict]] = []
+    for message in history:
+        if message["role"] == "user" or not exchanges:
+            exchanges.append([])
+        exchanges[-1].append({**message, "content": clip(message["content"], message_max_tokens)})
+    
+    kept: List[List[dict]] = []
+    for exchange in reversed(exchanges):
+        cost = sum(message_tokens(message) for message in exchange)
+        if cost > budget:
+            break
+        kept.append(exchange)
+        budget -= cost
+    
+    fitted = [summary_message] if summary_message else []
+    for exchange in reversed(kept):
+        fitted.extend(exchange)
+    return fitted
+
+
+def summarize_exchange(user_message: str, bot_response: str) -> str:
+    """One summary line for an exchange: what the user said and how we replied."""
+    reply_lines = [line.strip() for line in bot_response.splitlines() if line.strip()]
+    reply = " ".join(reply_lines[:2])
+    return f'- User: "{_shorten(user_message, SUMMARY_USER_CHARS)}" -> {_shorten(reply, SUMMARY_REPLY_CHARS)}'
+
+
+def roll_summary(summary: str, exchanges: Sequence[Tuple[str, str]], max_tokens: int) -> str:
+    """
+    Append exchanges to a rolling summary, dropping its oldest lines to
+    stay within max_tokens.
+    
+    Args:
+        summary: Current summary ("" for none)
+        exchanges: (user message, bot response) pairs, oldest first
+        max_tokens: Summary budget
+    
+    Returns:
+        New summary text
+    """
+    lines = [line for line in summary.splitlines() if line]
+    lines.extend(summarize_exchange(user_message, bot_response) for user_message, bot_response in exchanges)
+    
+    costs = [count_tokens(line) + 1 for line in lines]
+    total = sum(costs)
+    start = 0
+    while total > max_tokens and start < len(lines) - 1:
+        total -= costs[start]
+        start += 1
+    return "\n".join(lines[start:])
+
+
+async def load_prompt_history(session: AsyncSession, user_id: str) -> Tuple[List[dict], bool]:
+    """
+    A user's conversation history for the GPT prompt, within the budget.
+    
+    Args:
+        session: Database session (the read pool is fine)
+        user_id: User whose history to read
+    
+    Returns:
+        Fitted messages, and whether enough exchanges have aged out for
+        refresh_summary() to fold them into the summary
+    """
+    summary = await get_conversation_summary(session, user_id)
+    window = settings.llm_history_turns + SUMMARY_BATCH_TURNS
+    history = await get_conversation_history(
+        session, user_id, limit=window, after_id=summary.covered_until_id if summary else 0
+    )
+    
+    fitted = fit_history(history, summary.summary if summary else None)
+    # Two messages per exchange: a full window means exchanges are waiting
+    return fitted, len(history) >= 2 * window
+
+
+async def refresh_summary(user_id: str) -> None:
+    """
+    Fold a user's exchanges older than the last llm_history_turns into
+    their rolling summary. Runs after the message's commit.
+    
+    Args:
+        user_id: User whose summary to refresh
+    """
+    from app.infrastructure.database import DatabaseSession
+    
+    async with DatabaseSession() as session:
+        current = await get_conversation_summary(session, user_id)
+        covered_until_id = current.covered_until_id if current else 0
+        older = await get_messages_to_summarize(session, user_id, covered_until_id, keep=settings.llm_history_turns)
+        if not older:
+            return
+        
+        summary = roll_summary(
+            current.summary if current else "",
+            [(message.user_message, message.bot_response) for message in older],
+            settings.llm_history_summary_max_tokens
+        )
+        stored = await save_conversation_summary(
+            session, user_id, summary, older[-1].id, covered_until_id if current else None
+        )
+        await session.commit()
+    
+    if stored:
+        logger.info(f"Summarized {len(older)} older exchanges for {user_id}")
+    else:
+        logger.info(f"Summary for {user_id} was refreshed by another worker")
@@ -5,6 +5,7 @@ Supports conversation history for context-aware responses.
 
 import json
 import logging
+import time
 from datetime import datetime
 from typing import Optional, List
 
@@ -13,7 +14,11 @@ from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_excep
 
 from app.config.settings import get_settings
 from app.domain.reminder import ParsedIntent
-from app.utils.time import get_current_time_pkt, parse_natural_time
+from app.domain.recurrence import Recurrence, RecurrenceFrequency
+from app.utils.time import get_current_time_pkt, parse_natural_time, parse_recurrence
+from app.ai.fast_path import classify_locally, record_route
+from app.infrastructure.response_cache import get_response_cache, is_cacheable
+from app.infrastructure.metrics import track_stage
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -53,6 +58,11 @@ IMPORTANT RULES:
 5. Use conversation history to understand context and follow-up questions
 6. When user refers to "it", "that", "the reminder", look at recent context
 
+RECURRING REMINDERS:
+- "every day", "daily", "every weekday", "every Monday and Thursday", "every month on the 5th", "every 3 hours" ask for a repeating reminder
+- Fill recurrence and set scheduled_time to the FIRST occurrence; create ONE reminder, never one per occurrence
+- A single named day ("on Monday", "next Friday") is NOT recurring: recurrence is null
+
 NUMBERED REFERENCES:
 - When user says "delete 1 and 2" or "delete 1 & 2" after listing reminders, they mean reminders by list position
 - Use target_indices array for numbered references: [1, 2] means first and second reminder
@@ -81,6 +91,7 @@ Output JSON schema:
   "scheduled_time": "string or null (ISO 8601 datetime)",
   "follow_up_minutes": "integer or null (minutes to wait before follow-up)",
   "call_if_no_response": "boolean or null (whether to call if no response)",
+  "recurrence": "object or null: {{\"frequency\": \"hourly|daily|weekdays|weekly|monthly\", \"interval\": hours between occurrences (hourly only), \"weekdays\": [0-6, Monday=0] (weekly only), \"month_day\": 1-31 (monthly only)}}",
   "target_reminder": "string or null (title/keyword to identify existing reminder for update/delete)",
   "target_indices": "array of integers or null (for numbered references like 'delete 1 & 2')",
   "response_message": "string (friendly message to send back to user)"
@@ -90,6 +101,8 @@ Examples:
 - "Remind me to pay electricity bill tomorrow at 9am" → create_reminder
 - "Monday 5pm call mom" (on Sunday) → create_reminder for TOMORROW (upcoming Monday)
 - "Remind me to call Mark before 7pm. If I don't respond, call me." → create_reminder with call_if_no_response=true
+- "Remind me every Monday and Thursday at 6pm to go to the gym" → create_reminder with recurrence={{"frequency": "weekly", "weekdays": [0, 3]}}
+- "Take medicine every 8 hours" → create_reminder with recurrence={{"frequency": "hourly", "interval": 8}}
 - "Pause my wifi reminder" → pause_reminder with target_reminder="wifi"
 - "Delete Mark reminder" → delete_reminder with target_reminder="mark"
 - "Delete 1 and 2" or "delete 1 & 2" → delete_reminders with target_indices=[1,2]
@@ -125,16 +138,79 @@ async def _call_openai_chat(messages: list, response_format: dict) -> str:
     Returns:
         Response content string
     """
-    response = await openai_client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=messages,
-        response_format=response_format,
-        temperature=0.1,
-        max_tokens=500
-    )
+    with track_stage("gpt"):
+        response = await openai_client.chat.completions.create(
+            model="gpt-4o-mini",
+            messages=messages,
+            response_format=response_format,
+            temperature=0.1,
+            max_tokens=500
+        )
     return response.choices[0].message.content
 
 
+def _gpt_time(result_text: str) -> bool:
+    """True if a GPT result carries a scheduled_time (or cannot be read)."""
+    try:
+        return bool(json.loads(result_text).get("scheduled_time"))
+    except (ValueError, AttributeError):
+        return True
+
+
+async def _cached_openai_chat(
+    messages: list,
+    message: str,
+    quoted_message: Optional[str],
+    current_time: datetime,
+    time_is_local: bool
+) -> str:
+    """
+    Call GPT for an intent parse, going through the response cache.
+    
+    A cached result must never decide scheduled_time: an absolute time
+    GPT computed for a relative phrasing goes stale as soon as the clock
+    moves. So results are only cached, and only replayed, when the time
+    is recomputed from the message by parse_natural_time (time_is_local)
+    or when GPT found no time at all. Messages that depend on conversation
+    history ("delete it") bypass the cache.
+    
+    Args:
+        messages: Chat messages
+        message: The user's message text
+        quoted_message: Quoted/replied-to message, if any
+        current_time: Current PKT time (selects the cache bucket)
+        time_is_local: parse_natural_time read a time from the message
+    
+    Returns:
+        Response content string
+    """
+    if not settings.llm_cache_enabled:
+        return await _call_openai_chat(messages=messages, response_format={"type": "json_object"})
+    
+    cache = get_response_cache()
+    if not is_cacheable(message):
+        cache.skip()
+        return await _call_openai_chat(messages=messages, response_format={"type": "json_object"})
+    
+    key = cache.make_key(message, quoted_message, current_time)
+    cached = await cache.get(key)
+    if cached is not None and (time_is_local or not _gpt_time(cached)):
+        logger.info("Using cached intent parse")
+        return cached
+    
+    result_text = await _call_openai_chat(messages=messages, response_format={"type": "json_object"})
+    
+    # Only cache well-formed, understood results whose time is not GPT's
+    try:
+        understood = json.loads(result_text).get("intent", "unknown") != "unknown"
+    except (ValueError, AttributeError):
+        understood = False
+    if understood and (time_is_local or not _gpt_time(result_text)):
+        await cache.set(key, result_text)
+    
+    return result_text
+
+
 async def parse_user_message(
     message: str,
     conversation_history: Optional[List[dict]] = None,
@@ -143,6 +219,38 @@ async def parse_user_message(
     """
     Parse a user message to extract intent and entities.
     
+    Args:
+        message: The user's message text
+        conversation_history: Optional list of previous messages for context
+        quoted_message: Optional quoted/replied-to message for context
+    
+    Returns:
+        ParsedIntent object with extracted information
+    """
+    start = time.perf_counter()
+    
+    # Formulaic messages ("ok", "list my reminders", "delete 1 and 2") are
+    # classified locally; anything else, or a low-confidence match, goes to GPT
+    if settings.nlp_fast_path_enabled:
+        local = classify_locally(message, quoted_message)
+        if local and local.confidence >= settings.nlp_fast_path_min_confidence:
+            record_route("local", local.intent.intent, time.perf_counter() - start)
+            logger.info(f"Parsed intent locally: {local.intent.intent} (rule: {local.rule})")
+            return local.intent
+    
+    intent = await _parse_with_llm(message, conversation_history, quoted_message)
+    record_route("llm", intent.intent, time.perf_counter() - start)
+    return intent
+
+
+async def _parse_with_llm(
+    message: str,
+    conversation_history: Optional[List[dict]] = None,
+    quoted_message: Optional[str] = None
+) -> ParsedIntent:
+    """
+    Parse a user message with GPT.
+    
     Args:
         message: The user's message text
         conversation_history: Optional list of previous messages for context
@@ -187,9 +295,9 @@ async def parse_user_message(
         )
     })
     
-    # Add conversation history for context (last 10 exchanges)
+    # Add conversation history for context (already fitted to llm_history_max_tokens)
     if conversation_history:
-        messages.extend(conversation_history[-20:])  # 10 exchanges = 20 messages
+        messages.extend(conversation_history)
     
     # Current user message
     messages.append({
@@ -197,10 +305,13 @@ async def parse_user_message(
         "content": message
     })
     
+    # Read the time from the ORIGINAL user message first: this is more
+    # reliable than GPT's date calculation for day names
+    python_parsed = parse_natural_time(message, current_time)
+    
     try:
-        result_text = await _call_openai_chat(
-            messages=messages,
-            response_format={"type": "json_object"}
+        result_text = await _cached_openai_chat(
+            messages, message, quoted_message, current_time, time_is_local=python_parsed is not None
         )
         
         # Parse the JSON response
@@ -212,10 +323,6 @@ async def parse_user_message(
         # Convert scheduled_time - PREFER Python parsing over GPT's calculation
         scheduled_time = None
         
-        # First, try to parse the time from the ORIGINAL user message using Python
-        # This is more reliable than GPT's date calculation for day names
-        python_parsed = parse_natural_time(message)
-        
         if python_parsed:
             scheduled_time = python_parsed
             logger.info(f"Using Python-parsed time: {scheduled_time}")
@@ -228,6 +335,12 @@ async def parse_user_message(
                 # Try natural language parsing as last resort
                 scheduled_time = parse_natural_time(result["scheduled_time"])
         
+        # Recurrence: the local rules first, like the time, then GPT's
+        recurrence = parse_recurrence(message) or _recurrence_from_result(result.get("recurrence"))
+        if recurrence and recurrence.frequency == RecurrenceFrequency.HOURLY:
+            # "every 3 hours" starts one interval from now
+            scheduled_time = current_time.replace(second=0, microsecond=0) + timedelta(hours=recurrence.interval)
+        
         # Parse target_indices
         target_indices = result.get("target_indices")
         if target_indices and not isinstance(target_indices, list):
@@ -240,6 +353,7 @@ async def parse_user_message(
             scheduled_time=scheduled_time,
             follow_up_minutes=result.get("follow_up_minutes"),
             call_if_no_response=result.get("call_if_no_response"),
+            recurrence=recurrence,
             target_reminder=result.get("target_reminder"),
             target_indices=target_indices,
             response_message=result.get("response_message", "I understood your message.")
@@ -265,6 +379,17 @@ async def parse_user_message(
         )
 
 
+def _recurrence_from_result(value) -> Optional[Recurrence]:
+    """Validate the recurrence object GPT returned, dropping anything malformed."""
+    if not isinstance(value, dict):
+        return None
+    try:
+        return Recurrence(**value)
+    except ValueError as e:
+        logger.warning(f"Ignoring invalid recurrence from GPT {value}: {e}")
+        return None
+
+
 @retry(
     stop=stop_after_attempt(3),
     wait=wait_exponential(multiplier=1, min=2, max=10),
@@ -3,12 +3,15 @@ OpenAI Speech-to-Text integration for voice message transcription.
 """
 
 import logging
+from io import BytesIO
 from pathlib import Path
-from typing import Optional
+from tempfile import SpooledTemporaryFile
+from typing import BinaryIO, Optional
 
 from openai import AsyncOpenAI
 
 from app.config.settings import get_settings
+from app.infrastructure.metrics import record_error
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -65,20 +68,44 @@ async def transcribe_audio_bytes(audio_bytes: bytes, filename: str = "audio.ogg"
         audio_bytes: Raw audio bytes
         filename: Filename with extension for format detection
     
+    Returns:
+        Transcribed text, or None if transcription fails
+    """
+    # BytesIO shares the bytes object's buffer until written to
+    return await transcribe_audio_file(BytesIO(audio_bytes), filename)
+
+
+def _upload_stream(audio_file: BinaryIO) -> BinaryIO:
+    """
+    File object to hand to the upload.
+    
+    httpx sizes a multipart file with fileno() when it has one, and
+    SpooledTemporaryFile.fileno() rolls an in-memory spool over to disk,
+    so an unrolled spool is uploaded from its in-memory buffer instead.
+    """
+    if isinstance(audio_file, SpooledTemporaryFile) and not audio_file._rolled:
+        return audio_file._file
+    return audio_file
+
+
+async def transcribe_audio_file(audio_file: BinaryIO, filename: str = "audio.ogg") -> Optional[str]:
+    """
+    Transcribe an open audio file using OpenAI Whisper.
+    
+    The file is streamed into the upload from its current position in
+    chunks, so it is never copied into one buffer.
+    
+    Args:
+        audio_file: Binary file object (e.g. a spooled download) at the start of the audio
+        filename: Filename with extension for format detection
+    
     Returns:
         Transcribed text, or None if transcription fails
     """
     try:
-        logger.info(f"Transcribing audio bytes ({len(audio_bytes)} bytes)")
-        
-        # Create a file-like object from bytes
-        from io import BytesIO
-        audio_buffer = BytesIO(audio_bytes)
-        audio_buffer.name = filename
-        
         response = await openai_client.audio.transcriptions.create(
             model="whisper-1",
-            file=audio_buffer,
+            file=(filename, _upload_stream(audio_file)),
             language="en",
             response_format="text"
         )
@@ -89,5 +116,6 @@ async def transcribe_audio_bytes(audio_bytes: bytes, filename: str = "audio.ogg"
         return transcribed_text
         
     except Exception as e:
-        logger.exception(f"Error transcribing audio bytes: {e}")
+        record_error("whisper", e)
+        logger.exception(f"Error transcribing audio: {e}")
         return None
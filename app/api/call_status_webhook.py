@@ -0,0 +1,36 @@
+"""
+Twilio voice call status callback endpoint.
+Feeds call progress events into the call dispatcher for ring latency reporting.
+"""
+
+import logging
+from fastapi import APIRouter, Request, Form, HTTPException
+from fastapi.responses import Response
+
+from app.api.whatsapp_webhook import validate_twilio_signature
+from app.infrastructure.twilio_calls import get_call_dispatcher
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+
+@router.post("/webhook/call-status")
+async def call_status_webhook(
+    request: Request,
+    CallSid: str = Form(...),
+    CallStatus: str = Form(...),
+):
+    """
+    Handle Twilio call status callbacks (initiated, ringing, answered, completed).
+    """
+    if not validate_twilio_signature(request, None):
+        logger.warning(f"Invalid Twilio signature for call status {CallSid}")
+        raise HTTPException(status_code=403, detail="Invalid signature")
+    
+    record = get_call_dispatcher().record_status(CallSid, CallStatus)
+    if record is None:
+        logger.info(f"Status '{CallStatus}' for unknown call {CallSid}")
+    else:
+        logger.info(f"Call {CallSid} status: {CallStatus}")
+    
+    return Response(content="", media_type="text/xml")
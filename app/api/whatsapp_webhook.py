@@ -1,65 +1,59 @@
 """
 WhatsApp webhook endpoint for receiving messages from Twilio.
-Supports conversation history and quoted message context.
+Messages are persisted and handed to the ingest queue so Twilio is acked quickly.
 """
 
 import logging
+import time
 from datetime import datetime, timedelta
-from typing import Optional, List
+from typing import Optional
 from fastapi import APIRouter, Request, Form, HTTPException
 from fastapi.responses import Response
 from twilio.request_validator import RequestValidator
-from sqlalchemy import select, delete
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config.settings import get_settings
-from app.infrastructure.database import DatabaseSession, async_session_factory
-from app.infrastructure.twilio_whatsapp import send_whatsapp_message, send_error_message
-from app.infrastructure.audio_handler import download_and_transcribe_audio
-from app.ai.nlp_parser import parse_user_message
-from app.usecases.reminder_service import ReminderService
+from app.infrastructure.database import async_session_factory, UnitOfWork
+from app.infrastructure.dialects import dialect_insert
+from app.infrastructure.ingest_queue import get_ingest_queue
+from app.infrastructure.metrics import observe_stage
+from app.infrastructure.dedupe_cache import get_dedupe_cache
 from app.domain.processed_message import ProcessedMessage
-from app.domain.conversation_history import (
-    ConversationMessage,
-    save_conversation,
-    get_conversation_history
-)
+from app.domain.inbound_message import InboundMessage, InboundMessageStatus
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 settings = get_settings()
 
 
-async def is_message_processed(message_sid: str) -> bool:
+async def mark_message_processed(message_sid: str, session: Optional[AsyncSession] = None) -> bool:
     """
-    Check if a message has already been processed using SQLite.
+    Atomically mark a message as processed in SQLite (insert-or-ignore).
+    
+    Checking and marking in one statement closes the race where two
+    deliveries of the same SID both pass a separate existence check.
     
     Args:
         message_sid: Twilio message SID
+        session: Session of an enclosing unit of work (left uncommitted);
+            if omitted, a new session is opened and committed
     
     Returns:
-        True if message was already processed
-    """
-    async with async_session_factory() as session:
-        result = await session.execute(
-            select(ProcessedMessage).where(ProcessedMessage.message_sid == message_sid)
-        )
-        return result.scalar_one_or_none() is not None
-
-
-async def mark_message_processed(message_sid: str) -> None:
-    """
-    Mark a message as processed in SQLite.
-    
-    Args:
-        message_sid: Twilio message SID
+        True if the SID was newly marked, False if it was already processed
     """
-    async with async_session_factory() as session:
-        processed_msg = ProcessedMessage(
-            message_sid=message_sid,
-            processed_at=datetime.utcnow()
-        )
-        session.add(processed_msg)
-        await session.commit()
+    if session is None:
+        async with async_session_factory() as session:
+            marked = await mark_message_processed(message_sid, session)
+            await session.commit()
+            return marked
+    
+    result = await session.execute(
+        dialect_insert(session, ProcessedMessage)
+        .values(message_sid=message_sid, processed_at=datetime.utcnow())
+        .on_conflict_do_nothing(index_elements=["message_sid"])
+    )
+    return result.rowcount == 1
 
 
 async def cleanup_old_processed_messages(days: int = 7) -> None:
@@ -78,6 +72,56 @@ async def cleanup_old_processed_messages(days: int = 7) -> None:
         await session.commit()
 
 
+async def persist_inbound_message(
+    message_sid: str,
+    from_number: str,
+    body: str,
+    num_media: int = 0,
+    media_url: Optional[str] = None,
+    media_content_type: Optional[str] = None,
+    quoted_body: Optional[str] = None,
+    session: Optional[AsyncSession] = None
+) -> None:
+    """
+    Store an inbound message for the ingest workers.
+    
+    Args:
+        message_sid: Twilio message SID
+        from_number: Sender's WhatsApp number
+        body: Message text
+        num_media: Number of attached media items
+        media_url: URL of the first media item
+        media_content_type: MIME type of the first media item
+        quoted_body: Text of the message being replied to
+        session: Session of an enclosing unit of work (left uncommitted);
+            if omitted, a new session is opened and committed
+    """
+    message = InboundMessage(
+        message_sid=message_sid,
+        from_number=from_number,
+        body=body or "",
+        num_media=num_media,
+        media_url=media_url,
+        media_content_type=media_content_type,
+        quoted_body=quoted_body,
+        status=InboundMessageStatus.PENDING,
+        received_at=datetime.utcnow()
+    )
+    
+    if session is None:
+        async with async_session_factory() as session:
+            session.add(message)
+            await session.commit()
+    else:
+        session.add(message)
+
+
+async def _remember_and_enqueue(queue, message_sid: str) -> None:
+    """Cache a committed SID and hand the message to the ingest workers."""
+    get_dedupe_cache().add(message_sid)
+    queue.enqueue(message_sid)
+
+
 def validate_twilio_signature(request: Request, body: Optional[bytes]) -> bool:
     """
     Validate the Twilio webhook signature.
@@ -130,9 +174,9 @@ async def whatsapp_webhook(
     """
     Handle incoming WhatsApp messages from Twilio.
     
-    This endpoint processes both text and audio messages.
-    Audio messages are transcribed using OpenAI before processing.
-    Supports conversation history and quoted message context.
+    The message is persisted and queued for the ingest workers, and Twilio
+    is acked immediately. Transcription, intent parsing and the reply all
+    happen in the background (see app.usecases.message_processor).
     """
     # Note: Cannot read request.body() here as Form() already consumed the stream
     # Signature validation is skipped when VALIDATE_TWILIO_SIGNATURE=false
@@ -142,77 +186,52 @@ async def whatsapp_webhook(
         logger.warning(f"Invalid Twilio signature for message {MessageSid}")
         raise HTTPException(status_code=403, detail="Invalid signature")
     
-    # Idempotency check - prevent duplicate processing (persisted in SQLite)
-    if await is_message_processed(MessageSid):
-        logger.info(f"Message {MessageSid} already processed, skipping")
-        return Response(content="", media_type="text/xml")
-    
-    # Mark message as processed immediately to prevent race conditions
-    await mark_message_processed(MessageSid)
+    start = time.perf_counter()
+    queue = get_ingest_queue()
     
-    logger.info(f"Received message from {From}, SID: {MessageSid}")
+    # Backpressure - let Twilio retry later instead of accepting unbounded work
+    if queue.is_full():
+        logger.warning(f"Ingest queue full ({queue.depth()}), rejecting {MessageSid}")
+        return Response(content="", media_type="text/xml", status_code=503)
     
     try:
-        message_text = Body.strip()
-        
-        # Check if this is an audio message
         num_media = int(NumMedia)
-        if num_media > 0 and MediaContentType0 and "audio" in MediaContentType0.lower():
-            logger.info(f"Processing audio message: {MediaContentType0}")
-            # Download and transcribe audio
-            message_text = await download_and_transcribe_audio(
-                media_url=MediaUrl0,
-                content_type=MediaContentType0
-            )
-            
-            if not message_text:
-                await send_error_message(
-                    "I couldn't understand your voice message. Please try again or send a text message."
-                )
-                return Response(content="", media_type="text/xml")
-            
-            logger.info(f"Transcribed audio: {message_text}")
-        
-        # Skip empty messages
-        if not message_text:
-            logger.info("Empty message received, skipping")
+    except ValueError:
+        num_media = 0
+    
+    # Fast path: Twilio retries usually arrive within seconds
+    dedupe_started = time.perf_counter()
+    dedupe_cache = get_dedupe_cache()
+    if dedupe_cache.contains(MessageSid):
+        observe_stage("dedupe", time.perf_counter() - dedupe_started)
+        logger.info(f"Message {MessageSid} already processed, skipping")
+        return Response(content="", media_type="text/xml")
+    
+    # Durable dedupe marker and inbound row share one commit
+    async with UnitOfWork(async_session_factory) as uow:
+        marked = await mark_message_processed(MessageSid, uow.session)
+        observe_stage("dedupe", time.perf_counter() - dedupe_started)
+        if not marked:
+            dedupe_cache.add(MessageSid)
+            logger.info(f"Message {MessageSid} already processed, skipping")
             return Response(content="", media_type="text/xml")
         
-        # Get conversation history for context (last 10 exchanges)
-        conversation_history: List[dict] = []
-        async with async_session_factory() as session:
-            conversation_history = await get_conversation_history(session, limit=10)
+        logger.info(f"Received message from {From}, SID: {MessageSid}")
         
-        # Log quoted message if present (for debugging)
-        if QuotedBody:
-            logger.info(f"User replied to message: {QuotedBody[:100]}...")
-        
-        # Parse the message using NLP with context
-        parsed_intent = await parse_user_message(
-            message=message_text,
-            conversation_history=conversation_history,
-            quoted_message=QuotedBody
+        await persist_inbound_message(
+            message_sid=MessageSid,
+            from_number=From,
+            body=Body,
+            num_media=num_media,
+            media_url=MediaUrl0,
+            media_content_type=MediaContentType0,
+            quoted_body=QuotedBody,
+            session=uow.session
         )
-        
-        # Process the intent
-        async with DatabaseSession() as session:
-            service = ReminderService(session)
-            response = await service.handle_intent(parsed_intent)
-        
-        # Save conversation to history for future context
-        async with async_session_factory() as session:
-            await save_conversation(
-                session=session,
-                user_message=message_text,
-                bot_response=response
-            )
-        
-        # Send response back to user
-        await send_whatsapp_message(response)
-        
-    except Exception as e:
-        logger.exception(f"Error processing message: {e}")
-        await send_error_message(str(e))
+        uow.after_commit(_remember_and_enqueue, queue, MessageSid)
+        await uow.commit()
+    
+    observe_stage("webhook", time.perf_counter() - start)
     
     # Return empty TwiML response (we're sending messages via API)
     return Response(content="", media_type="text/xml")
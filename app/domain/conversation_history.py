@@ -1,16 +1,19 @@
 """
 Conversation history model for context memory.
-Stores recent messages to provide context for follow-up questions.
+Stores recent messages to provide context for follow-up questions, and a
+rolling summary per user of the exchanges that have aged out of the
+prompt (see app.ai.history_budget).
 """
 
 from datetime import datetime, timedelta
 from typing import List, Optional
 
-from sqlalchemy import Column, Integer, String, DateTime, desc, delete
+from sqlalchemy import Column, Integer, String, Text, Index, desc, delete, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
-from app.domain.reminder import Base
+from app.domain.reminder import Base, NaiveDateTime
+from app.infrastructure.dialects import dialect_insert
 
 
 class ConversationMessage(Base):
@@ -19,52 +22,85 @@ class ConversationMessage(Base):
     __tablename__ = "conversation_history"
     
     id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(String(64), nullable=False)  # Owning users.id
     user_message = Column(String(1000), nullable=False)
     bot_response = Column(String(2000), nullable=False)
-    timestamp = Column(DateTime, default=datetime.utcnow)
+    timestamp = Column(NaiveDateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        # Recent history for one user
+        Index("ix_conversation_history_user_timestamp", "user_id", "timestamp"),
+    )
     
     def __repr__(self) -> str:
         return f"<ConversationMessage(id={self.id}, timestamp={self.timestamp})>"
 
 
+class ConversationSummary(Base):
+    """Rolling summary of a user's older exchanges, one row per user."""
+    
+    __tablename__ = "conversation_summaries"
+    
+    user_id = Column(String(64), primary_key=True)  # Owning users.id
+    summary = Column(Text, nullable=False, default="")
+    covered_until_id = Column(Integer, nullable=False, default=0)  # Last conversation_history.id folded in
+    updated_at = Column(NaiveDateTime, default=datetime.utcnow)
+    
+    def __repr__(self) -> str:
+        return f"<ConversationSummary(user_id={self.user_id}, covered_until_id={self.covered_until_id})>"
+
+
 async def save_conversation(
     session: AsyncSession,
+    user_id: str,
     user_message: str,
-    bot_response: str
+    bot_response: str,
+    commit: bool = True
 ) -> None:
     """
     Save a conversation exchange to history.
     
     Args:
         session: Database session
+        user_id: Owning user's id
         user_message: User's message
         bot_response: Bot's response
+        commit: Commit immediately; pass False inside a unit of work
     """
     msg = ConversationMessage(
+        user_id=user_id,
         user_message=user_message[:1000],  # Truncate if too long
         bot_response=bot_response[:2000],
         timestamp=datetime.utcnow()
     )
     session.add(msg)
-    await session.commit()
+    if commit:
+        await session.commit()
 
 
 async def get_conversation_history(
     session: AsyncSession,
-    limit: int = 10
+    user_id: str,
+    limit: int = 10,
+    after_id: int = 0
 ) -> List[dict]:
     """
-    Get recent conversation history.
+    Get a user's recent conversation history.
     
     Args:
         session: Database session
+        user_id: User whose history to read
         limit: Number of recent messages to retrieve
+        after_id: Only messages with a higher id (not yet summarized)
     
     Returns:
         List of message dicts with 'user' and 'assistant' keys
     """
+    query = select(ConversationMessage).where(ConversationMessage.user_id == user_id)
+    if after_id:
+        query = query.where(ConversationMessage.id > after_id)
     result = await session.execute(
-        select(ConversationMessage)
+        query
         .order_by(desc(ConversationMessage.timestamp))
         .limit(limit)
     )
@@ -81,6 +117,87 @@ async def get_conversation_history(
     return history
 
 
+async def get_conversation_summary(session: AsyncSession, user_id: str) -> Optional[ConversationSummary]:
+    """
+    Get a user's rolling summary of older exchanges.
+    
+    Args:
+        session: Database session
+        user_id: User whose summary to read
+    
+    Returns:
+        ConversationSummary, or None before anything was summarized
+    """
+    return await session.get(ConversationSummary, user_id)
+
+
+async def get_messages_to_summarize(
+    session: AsyncSession,
+    user_id: str,
+    after_id: int,
+    keep: int
+) -> List[ConversationMessage]:
+    """
+    A user's unsummarized exchanges, except the `keep` most recent ones.
+    
+    Args:
+        session: Database session
+        user_id: User whose history to read
+        after_id: Last message id already in the summary
+        keep: Recent exchanges left out (they stay in the prompt verbatim)
+    
+    Returns:
+        Messages oldest first
+    """
+    result = await session.execute(
+        select(ConversationMessage)
+        .where(ConversationMessage.user_id == user_id, ConversationMessage.id > after_id)
+        .order_by(desc(ConversationMessage.id))
+        .offset(keep)
+    )
+    return list(reversed(result.scalars().all()))
+
+
+async def save_conversation_summary(
+    session: AsyncSession,
+    user_id: str,
+    summary: str,
+    covered_until_id: int,
+    previous_until_id: Optional[int]
+) -> bool:
+    """
+    Store a user's new rolling summary, unless another worker moved it on.
+    
+    Args:
+        session: Database session, committed by the caller
+        user_id: Owning user
+        summary: New summary text
+        covered_until_id: Last message id folded into it
+        previous_until_id: covered_until_id the summary was built from
+            (None when the user had no summary)
+    
+    Returns:
+        True if the summary was stored
+    """
+    if previous_until_id is None:
+        result = await session.execute(
+            dialect_insert(session, ConversationSummary)
+            .values(user_id=user_id, summary=summary, covered_until_id=covered_until_id, updated_at=datetime.utcnow())
+            .on_conflict_do_nothing(index_elements=["user_id"])
+        )
+        return result.rowcount == 1
+    result = await session.execute(
+        update(ConversationSummary)
+        .where(
+            ConversationSummary.user_id == user_id,
+            ConversationSummary.covered_until_id == previous_until_id
+        )
+        .values(summary=summary, covered_until_id=covered_until_id, updated_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+
 async def cleanup_old_conversations(
     session: AsyncSession,
     days: int = 7
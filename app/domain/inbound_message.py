@@ -0,0 +1,40 @@
+"""
+Inbound message model for the durable ingest queue.
+Stores webhook payloads so they can be processed after Twilio has been acked.
+"""
+
+from datetime import datetime
+from enum import Enum
+
+from sqlalchemy import Column, String, Integer, Enum as SQLEnum
+
+from app.domain.reminder import Base, NaiveDateTime
+
+
+class InboundMessageStatus(str, Enum):
+    """Processing status of an inbound message."""
+    PENDING = "pending"
+    DONE = "done"
+    FAILED = "failed"
+
+
+class InboundMessage(Base):
+    """SQLAlchemy model for WhatsApp messages waiting to be processed."""
+    
+    __tablename__ = "inbound_messages"
+    
+    message_sid = Column(String(64), primary_key=True)
+    from_number = Column(String(64), nullable=False)
+    body = Column(String(4096), nullable=False, default="")
+    num_media = Column(Integer, default=0)
+    media_url = Column(String(1024), nullable=True)
+    media_content_type = Column(String(128), nullable=True)
+    quoted_body = Column(String(4096), nullable=True)
+    status = Column(SQLEnum(InboundMessageStatus), default=InboundMessageStatus.PENDING, index=True)
+    attempts = Column(Integer, default=0)
+    received_at = Column(NaiveDateTime, default=datetime.utcnow)
+    completed_at = Column(NaiveDateTime, nullable=True)
+    error = Column(String(500), nullable=True)
+    
+    def __repr__(self) -> str:
+        return f"<InboundMessage(sid={self.message_sid}, status={self.status})>"
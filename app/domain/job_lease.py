@@ -0,0 +1,25 @@
+"""
+Job lease model for scheduling across processes.
+A lease records which process fired one occurrence of a scheduled job.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import Column, String
+
+from app.domain.reminder import Base, NaiveDateTime
+
+
+class JobLease(Base):
+    """SQLAlchemy model for a claimed job firing."""
+    
+    __tablename__ = "job_leases"
+    
+    job_key = Column(String(128), primary_key=True)  # e.g. reminder:<id>:<scheduled time>
+    owner = Column(String(128), nullable=False)  # Worker id of the claiming process
+    leased_until = Column(NaiveDateTime, nullable=False)  # Claimable again after this if not completed
+    completed_at = Column(NaiveDateTime, nullable=True)
+    created_at = Column(NaiveDateTime, default=datetime.utcnow)
+    
+    def __repr__(self) -> str:
+        return f"<JobLease(key={self.job_key}, owner={self.owner}, completed_at={self.completed_at})>"
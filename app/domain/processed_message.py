@@ -5,9 +5,9 @@ Tracks message SIDs to prevent duplicate processing.
 
 from datetime import datetime
 
-from sqlalchemy import Column, String, DateTime
+from sqlalchemy import Column, String
 
-from app.domain.reminder import Base
+from app.domain.reminder import Base, NaiveDateTime
 
 
 class ProcessedMessage(Base):
@@ -16,7 +16,7 @@ class ProcessedMessage(Base):
     __tablename__ = "processed_messages"
     
     message_sid = Column(String(64), primary_key=True)
-    processed_at = Column(DateTime, default=datetime.utcnow)
+    processed_at = Column(NaiveDateTime, default=datetime.utcnow)
     
     def __repr__(self) -> str:
         return f"<ProcessedMessage(sid={self.message_sid}, at={self.processed_at})>"
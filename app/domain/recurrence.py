@@ -0,0 +1,156 @@
+"""
+Recurrence rules for repeating reminders.
+
+A recurring reminder is one row: scheduled_time holds its current
+occurrence and `recurrence` a compact rule ("daily", "weekdays",
+"weekly:0,2", "monthly:31", "hourly:3"). When an occurrence fires, the
+dispatcher computes the next one from the rule and writes it over the
+current one, so no future occurrences are ever stored.
+"""
+
+import calendar
+from datetime import datetime, timedelta
+from enum import Enum
+from typing import List, Optional
+
+from pydantic import BaseModel, Field, ValidationInfo, field_validator
+
+# Monday=0 ... Sunday=6, as datetime.weekday()
+DAY_NAMES = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+
+class RecurrenceFrequency(str, Enum):
+    """How often a reminder repeats."""
+    HOURLY = "hourly"
+    DAILY = "daily"
+    WEEKDAYS = "weekdays"
+    WEEKLY = "weekly"
+    MONTHLY = "monthly"
+
+
+class Recurrence(BaseModel):
+    """Schema for a recurrence rule."""
+    frequency: RecurrenceFrequency
+    interval: int = Field(1, ge=1, le=168)  # Hours between occurrences (hourly only)
+    weekdays: Optional[List[int]] = None  # Days of week, Monday=0 (weekly only)
+    month_day: Optional[int] = Field(None, ge=1, le=31)  # Day of month (monthly only)
+    
+    @field_validator("weekdays")
+    @classmethod
+    def validate_weekdays(cls, weekdays: Optional[List[int]], info: ValidationInfo) -> Optional[List[int]]:
+        """Days must be 0-6; a weekly rule given days needs at least one (None means its first day)."""
+        if weekdays is None:
+            return None
+        if any(day < 0 or day > 6 for day in weekdays):
+            raise ValueError(f"weekdays must be 0 (Monday) to 6 (Sunday), got {weekdays}")
+        if not weekdays and info.data.get("frequency") == RecurrenceFrequency.WEEKLY:
+            raise ValueError("a weekly rule needs at least one weekday")
+        return weekdays
+    
+    def anchored(self, first: datetime) -> "Recurrence":
+        """Fill in the days a weekly or monthly rule repeats on from its first occurrence."""
+        if self.frequency == RecurrenceFrequency.WEEKLY and not self.weekdays:
+            return self.model_copy(update={"weekdays": [first.weekday()]})
+        if self.frequency == RecurrenceFrequency.MONTHLY and not self.month_day:
+            return self.model_copy(update={"month_day": first.day})
+        return self
+    
+    def to_rule(self) -> str:
+        """Encode for the reminders.recurrence column."""
+        if self.frequency == RecurrenceFrequency.HOURLY:
+            return f"hourly:{self.interval}"
+        if self.frequency == RecurrenceFrequency.WEEKLY:
+            return "weekly:" + ",".join(str(day) for day in sorted(set(self.weekdays or [])))
+        if self.frequency == RecurrenceFrequency.MONTHLY:
+            return f"monthly:{self.month_day}"
+        return self.frequency.value
+    
+    @classmethod
+    def from_rule(cls, rule: str) -> "Recurrence":
+        """
+        Decode a reminders.recurrence value.
+        
+        Raises:
+            ValueError: If the rule is malformed
+        """
+        name, _, argument = rule.partition(":")
+        frequency = RecurrenceFrequency(name)
+        if frequency == RecurrenceFrequency.HOURLY:
+            return cls(frequency=frequency, interval=int(argument or 1))
+        if frequency == RecurrenceFrequency.WEEKLY:
+            return cls(frequency=frequency, weekdays=[int(day) for day in argument.split(",") if day])
+        if frequency == RecurrenceFrequency.MONTHLY:
+            return cls(frequency=frequency, month_day=int(argument))
+        return cls(frequency=frequency)
+    
+    def describe(self) -> str:
+        """Human-readable rule, e.g. "every Monday and Thursday"."""
+        if self.frequency == RecurrenceFrequency.HOURLY:
+            return "every hour" if self.interval == 1 else f"every {self.interval} hours"
+        if self.frequency == RecurrenceFrequency.DAILY:
+            return "every day"
+        if self.frequency == RecurrenceFrequency.WEEKDAYS:
+            return "every weekday"
+        if self.frequency == RecurrenceFrequency.WEEKLY:
+            names = [DAY_NAMES[day] for day in sorted(set(self.weekdays or []))]
+            if len(names) > 1:
+                return f"every {', '.join(names[:-1])} and {names[-1]}"
+            return f"every {names[0]}" if names else "every week"
+        return f"monthly on day {self.month_day}"
+    
+    def _days(self) -> List[int]:
+        if self.frequency == RecurrenceFrequency.WEEKDAYS:
+            return [0, 1, 2, 3, 4]
+        return sorted(set(self.weekdays or []))
+    
+    def matches(self, moment: datetime) -> bool:
+        """Whether a moment falls on a day this rule repeats on."""
+        if self.frequency in (RecurrenceFrequency.WEEKLY, RecurrenceFrequency.WEEKDAYS):
+            return moment.weekday() in self._days()
+        if self.frequency == RecurrenceFrequency.MONTHLY:
+            last_day = calendar.monthrange(moment.year, moment.month)[1]
+            return moment.day == min(self.month_day, last_day)
+        return True
+    
+    def next_occurrence(self, anchor: datetime, after: datetime) -> datetime:
+        """
+        The first occurrence at or after `anchor` that is later than `after`.
+        
+        Occurrences keep the anchor's time of day (hourly rules step from the
+        anchor itself). The result is computed directly rather than by
+        stepping through missed occurrences, so a reminder that was down for
+        months costs the same as one that fired on time.
+        
+        Args:
+            anchor: Current occurrence (naive PKT)
+            after: Time the next occurrence must follow (naive PKT)
+        
+        Returns:
+            Next occurrence (naive PKT)
+        """
+        if anchor > after and self.matches(anchor):
+            return anchor
+        after = max(after, anchor)
+        
+        if self.frequency == RecurrenceFrequency.HOURLY:
+            step = timedelta(hours=self.interval)
+            return anchor + step * ((after - anchor) // step + 1)
+        
+        time_of_day = anchor.time()
+        if self.frequency == RecurrenceFrequency.MONTHLY:
+            year, month = after.year, after.month
+            while True:
+                last_day = calendar.monthrange(year, month)[1]
+                candidate = datetime.combine(
+                    datetime(year, month, min(self.month_day, last_day)).date(), time_of_day
+                )
+                if candidate > after:
+                    return candidate
+                year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        
+        # Daily and weekly rules: the next matching day is at most a week out
+        for offset in range(8):
+            candidate = datetime.combine(after.date() + timedelta(days=offset), time_of_day)
+            if candidate > after and self.matches(candidate):
+                return candidate
+        raise ValueError(f"Recurrence {self.to_rule()} has no days")
@@ -7,13 +7,32 @@ from datetime import datetime
 from enum import Enum
 from typing import Optional
 
-from sqlalchemy import Column, String, DateTime, Integer, Boolean, Enum as SQLEnum
+from sqlalchemy import Column, String, DateTime, Integer, Boolean, Enum as SQLEnum, Index, func
 from sqlalchemy.orm import declarative_base
+from sqlalchemy.types import TypeDecorator
 from pydantic import BaseModel, Field
 
+from app.domain.recurrence import Recurrence
+
 Base = declarative_base()
 
 
+class NaiveDateTime(TypeDecorator):
+    """
+    DateTime column holding naive wall-clock times (PKT or UTC, per column).
+    
+    Timezone-aware values are stored with their tzinfo dropped, as SQLite
+    always did; asyncpg rejects aware values for TIMESTAMP WITHOUT TIME ZONE.
+    """
+    impl = DateTime
+    cache_ok = True
+    
+    def process_bind_param(self, value, dialect):
+        if value is not None and value.tzinfo is not None:
+            return value.replace(tzinfo=None)
+        return value
+
+
 class ReminderStatus(str, Enum):
     """Reminder status enumeration."""
     ACTIVE = "active"
@@ -27,17 +46,37 @@ class Reminder(Base):
     __tablename__ = "reminders"
     
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = Column(String(64), nullable=False)  # Owning users.id
     title = Column(String(255), nullable=False)
     description = Column(String(1000), nullable=True)
-    scheduled_time = Column(DateTime, nullable=False)
+    scheduled_time = Column(NaiveDateTime, nullable=False)
     follow_up_minutes = Column(Integer, nullable=True)
     call_if_no_response = Column(Boolean, default=False)
     call_opt_out = Column(Boolean, default=True)  # Opt-out by default
     status = Column(SQLEnum(ReminderStatus), default=ReminderStatus.ACTIVE)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    last_notified_at = Column(DateTime, nullable=True)
+    created_at = Column(NaiveDateTime, default=datetime.utcnow)
+    updated_at = Column(NaiveDateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    last_notified_at = Column(NaiveDateTime, nullable=True)
     user_responded = Column(Boolean, default=False)
+    next_fire_at = Column(NaiveDateTime, nullable=True)  # UTC; notification due, None once fired or cancelled
+    follow_up_at = Column(NaiveDateTime, nullable=True)  # UTC; follow-up call check due
+    recurrence = Column(String(32), nullable=True)  # Rule, e.g. "weekly:0,3"; scheduled_time is the current occurrence
+    
+    # Existing databases get these via app.infrastructure.migrations.
+    # Per-user indexes lead on user_id so a user's queries never touch other users' rows.
+    __table_args__ = (
+        # List / batch delete / snooze-by-number: filter on status, order by time
+        Index("ix_reminders_user_status_scheduled_time", "user_id", "status", "scheduled_time"),
+        # Acknowledge / snooze: latest notified reminder awaiting a response
+        Index("ix_reminders_user_status_responded_notified",
+              "user_id", "status", "user_responded", "last_notified_at"),
+        # Duplicate check on create: same title (case-insensitive) near the same time
+        Index("ix_reminders_user_status_title_scheduled_time",
+              "user_id", "status", func.lower(title), "scheduled_time"),
+        # Scheduler: the next due notifications and follow-ups across all users
+        Index("ix_reminders_next_fire_at", "next_fire_at"),
+        Index("ix_reminders_follow_up_at", "follow_up_at"),
+    )
     
     def __repr__(self) -> str:
         return f"<Reminder(id={self.id}, title={self.title}, status={self.status})>"
@@ -53,6 +92,7 @@ class ReminderCreate(BaseModel):
     follow_up_minutes: Optional[int] = Field(None, ge=1, le=60)
     call_if_no_response: bool = False
     call_opt_out: bool = True
+    recurrence: Optional[Recurrence] = None
 
 
 class ReminderUpdate(BaseModel):
@@ -64,6 +104,7 @@ class ReminderUpdate(BaseModel):
     call_if_no_response: Optional[bool] = None
     call_opt_out: Optional[bool] = None
     status: Optional[ReminderStatus] = None
+    recurrence: Optional[Recurrence] = None
 
 
 class ReminderResponse(BaseModel):
@@ -76,6 +117,7 @@ class ReminderResponse(BaseModel):
     call_if_no_response: bool
     call_opt_out: bool
     status: ReminderStatus
+    recurrence: Optional[str]
     created_at: datetime
     updated_at: datetime
     
@@ -91,6 +133,7 @@ class ParsedIntent(BaseModel):
     scheduled_time: Optional[datetime] = None
     follow_up_minutes: Optional[int] = None
     call_if_no_response: Optional[bool] = None
+    recurrence: Optional[Recurrence] = None  # For repeating reminders ("every Monday at 9am")
     target_reminder: Optional[str] = None  # For update/delete operations
     target_indices: Optional[list] = None  # For numbered references like "delete 1 & 2"
     response_message: str = ""  # Message to send back to user
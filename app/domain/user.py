@@ -0,0 +1,135 @@
+"""
+User model for multi-user support.
+Every WhatsApp sender gets a row; reminders and conversation history are
+partitioned by users.id, and calls go to the owning user's phone number.
+"""
+
+from datetime import datetime
+from typing import Dict, Optional, Sequence
+
+from sqlalchemy import Column, String, Boolean, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config.settings import get_settings
+from app.domain.reminder import Base, NaiveDateTime, Reminder
+from app.infrastructure.dialects import dialect_insert
+
+settings = get_settings()
+
+WHATSAPP_PREFIX = "whatsapp:"
+
+
+class User(Base):
+    """SQLAlchemy model for a WhatsApp user."""
+    
+    __tablename__ = "users"
+    
+    id = Column(String(64), primary_key=True)  # E.164 number, e.g. +923001234567
+    whatsapp_number = Column(String(64), nullable=False)  # Format: whatsapp:+923001234567
+    phone_number = Column(String(64), nullable=False)  # For reminder calls
+    call_opt_out = Column(Boolean, default=False)  # Overrides per-reminder call settings
+    created_at = Column(NaiveDateTime, default=datetime.utcnow)
+    
+    def __repr__(self) -> str:
+        return f"<User(id={self.id}, call_opt_out={self.call_opt_out})>"
+
+
+def user_id_from_number(number: str) -> str:
+    """
+    Derive a user id from a WhatsApp or phone number.
+    
+    Args:
+        number: Twilio `From` value (whatsapp:+923001234567) or a bare number
+    
+    Returns:
+        The number without the whatsapp: prefix
+    """
+    number = (number or "").strip()
+    if number.startswith(WHATSAPP_PREFIX):
+        number = number[len(WHATSAPP_PREFIX):]
+    return number
+
+
+def get_default_user_id() -> Optional[str]:
+    """
+    Owner of reminders created before multi-user support.
+    
+    Returns:
+        User id for the configured USER_WHATSAPP_NUMBER, or None
+    """
+    if not settings.user_whatsapp_number:
+        return None
+    return user_id_from_number(settings.user_whatsapp_number)
+
+
+async def get_or_create_user(session: AsyncSession, from_number: str) -> User:
+    """
+    Load the user for a sender, creating the row on first contact.
+    
+    Concurrent workers may see the same new sender; the insert is a no-op
+    for whichever loses the race.
+    
+    Args:
+        session: Database session (left uncommitted)
+        from_number: Sender's WhatsApp number
+    
+    Returns:
+        The sender's User row
+    """
+    user_id = user_id_from_number(from_number)
+    user = await session.get(User, user_id)
+    if user is not None:
+        return user
+    
+    await session.execute(
+        dialect_insert(session, User)
+        .values(
+            id=user_id,
+            whatsapp_number=f"{WHATSAPP_PREFIX}{user_id}",
+            phone_number=user_id,
+            call_opt_out=False,
+            created_at=datetime.utcnow()
+        )
+        .on_conflict_do_nothing(index_elements=["id"])
+    )
+    return await session.get(User, user_id)
+
+
+async def get_reminder_owner(session: AsyncSession, reminder_id: str) -> Optional[User]:
+    """
+    Load the user a reminder belongs to.
+    
+    Args:
+        session: Database session
+        reminder_id: The reminder's ID
+    
+    Returns:
+        Owning User, or None if the reminder or user no longer exists
+    """
+    result = await session.execute(
+        select(User)
+        .join(Reminder, Reminder.user_id == User.id)
+        .where(Reminder.id == reminder_id)
+    )
+    return result.scalar_one_or_none()
+
+
+async def get_reminder_owners(session: AsyncSession, reminder_ids: Sequence[str]) -> Dict[str, User]:
+    """
+    Load the owners of several reminders in one query.
+    
+    Args:
+        session: Database session
+        reminder_ids: Reminder IDs
+    
+    Returns:
+        Owning User by reminder ID (reminders without an owner are omitted)
+    """
+    if not reminder_ids:
+        return {}
+    result = await session.execute(
+        select(Reminder.id, User)
+        .join(User, Reminder.user_id == User.id)
+        .where(Reminder.id.in_(reminder_ids))
+    )
+    return {reminder_id: user for reminder_id, user in result.all()}
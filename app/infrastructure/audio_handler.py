@@ -1,21 +1,60 @@
 """
 Audio handler for downloading and processing WhatsApp voice messages with retry logic.
+
+Voice notes are downloaded through one application-scoped httpx client, so
+consecutive downloads reuse keep-alive connections (and the TLS sessions)
+to api.twilio.com and the media CDN it redirects to instead of connecting
+and handshaking for every note. HTTP/2 is negotiated when the h2 package is
+installed. The client is closed on application shutdown.
+
+Downloads are streamed in chunks into a SpooledTemporaryFile that stays in
+memory up to MEDIA_SPOOL_MAX_MEMORY_BYTES and moves to a temp file above
+that, and the same file object is streamed into the Whisper upload. A
+note larger than MEDIA_MAX_BYTES is refused from its Content-Length before
+any of the body is read, or as soon as the streamed bytes pass the cap.
+
+Before upload, notes are shrunk with pydub in a process pool (decoding and
+re-encoding is CPU-bound and would stall the event loop): silence is
+trimmed from both ends, the audio is downmixed to mono, resampled to
+16 kHz and re-encoded as low-bitrate Opus. If ffmpeg is missing, the
+worker fails, or the result is not smaller, the original is uploaded.
 """
 
+import asyncio
 import logging
+import multiprocessing
+import shutil
 import tempfile
 import os
-from typing import Optional
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from typing import BinaryIO, Optional, Tuple, Union
 
 import httpx
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 
 from app.config.settings import get_settings
-from app.ai.speech_to_text import transcribe_audio, transcribe_audio_bytes
+from app.ai.speech_to_text import transcribe_audio, transcribe_audio_file
+from app.infrastructure.metrics import record_error, track_stage
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+# Preprocessing: quieter than this is silence; this much of it is kept at each end
+SILENCE_THRESHOLD_DBFS = -45.0
+SILENCE_PADDING_MS = 200
+PREPROCESSED_FRAME_RATE = 16000
+
+
+class MediaTooLargeError(Exception):
+    """Media is larger than the download cap."""
+    
+    def __init__(self, size: int, limit: int):
+        super().__init__(f"Media is {size} bytes, limit is {limit}")
+        self.size = size
+        self.limit = limit
+
 
 @retry(
     stop=stop_after_attempt(3),
@@ -23,25 +62,123 @@ settings = get_settings()
     retry=retry_if_exception_type((httpx.HTTPError, httpx.TimeoutException)),
     reraise=True
 )
-async def _download_media_with_retry(client: httpx.AsyncClient, media_url: str) -> bytes:
+async def _download_media_with_retry(
+    client: httpx.AsyncClient,
+    media_url: str,
+    max_bytes: int,
+    spool_bytes: int
+) -> BinaryIO:
     """
-    Download media with retry logic.
+    Stream media into a spooled file with retry logic.
     
     Args:
         client: HTTP client
         media_url: URL to download
+        max_bytes: Largest download accepted
+        spool_bytes: Size above which the download moves from memory to a temp file
     
     Returns:
-        Downloaded bytes
+        SpooledTemporaryFile positioned at the start (the caller closes it)
+    
+    Raises:
+        MediaTooLargeError: If the media is larger than max_bytes (not retried)
     """
-    response = await client.get(
+    async with client.stream(
+        "GET",
         media_url,
         auth=(settings.twilio_account_sid, settings.twilio_auth_token),
-        follow_redirects=True,
-        timeout=30.0
+        follow_redirects=True
+    ) as response:
+        response.raise_for_status()
+        
+        declared = response.headers.get("Content-Length", "")
+        if declared.isdigit() and int(declared) > max_bytes:
+            raise MediaTooLargeError(int(declared), max_bytes)
+        
+        spool = tempfile.SpooledTemporaryFile(max_size=spool_bytes)
+        try:
+            size = 0
+            async for chunk in response.aiter_bytes():
+                size += len(chunk)
+                if size > max_bytes:
+                    raise MediaTooLargeError(size, max_bytes)
+                spool.write(chunk)
+        except BaseException:
+            spool.close()
+            raise
+    
+    spool.seek(0)
+    return spool
+
+
+def http2_available() -> bool:
+    """Whether the h2 package httpx needs for HTTP/2 is installed."""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def create_media_client(
+    max_connections: int,
+    timeout: float,
+    http2: bool = True,
+    verify: Union[bool, str] = True,
+    transport: Optional[httpx.AsyncBaseTransport] = None
+) -> httpx.AsyncClient:
+    """
+    Build a pooled client for media downloads.
+    
+    Args:
+        max_connections: Connection cap across Twilio and the media CDN
+        timeout: Per-request timeout in seconds
+        http2: Negotiate HTTP/2 if h2 is installed (falls back to HTTP/1.1)
+        verify: TLS verification (CA bundle path for test servers)
+        transport: Custom transport (tests)
+    
+    Returns:
+        Client whose connections are kept alive between downloads
+    """
+    if http2 and not http2_available():
+        logger.warning("MEDIA_HTTP2 is enabled but h2 is not installed, using HTTP/1.1")
+        http2 = False
+    return httpx.AsyncClient(
+        http2=http2,
+        timeout=timeout,
+        verify=verify,
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+        ),
+        transport=transport,
     )
-    response.raise_for_status()
-    return response.content
+
+
+# Global media client instance
+media_client: Optional[httpx.AsyncClient] = None
+
+
+def get_media_client() -> httpx.AsyncClient:
+    """Get or create the shared media download client."""
+    global media_client
+    
+    if media_client is None:
+        media_client = create_media_client(
+            max_connections=settings.media_http_max_connections,
+            timeout=settings.media_http_timeout_seconds,
+            http2=settings.media_http2,
+        )
+    
+    return media_client
+
+
+async def close_media_client() -> None:
+    """Close the shared client (called on application shutdown)."""
+    global media_client
+    if media_client is not None:
+        await media_client.aclose()
+        media_client = None
 
 
 async def download_and_transcribe_audio(
@@ -60,9 +197,10 @@ async def download_and_transcribe_audio(
     """
     try:
         # Download the audio file from Twilio
-        audio_bytes = await download_twilio_media(media_url)
+        with track_stage("download"):
+            audio_file = await download_twilio_media(media_url)
         
-        if audio_bytes is None:
+        if audio_file is None:
             logger.error("Failed to download audio from Twilio")
             return None
         
@@ -70,8 +208,13 @@ async def download_and_transcribe_audio(
         extension = get_extension_from_content_type(content_type)
         filename = f"audio.{extension}"
         
-        # Transcribe using OpenAI Whisper
-        transcribed_text = await transcribe_audio_bytes(audio_bytes, filename)
+        # Shrink the upload (falls back to the original note)
+        with track_stage("preprocess"):
+            audio_file, filename = await preprocess_audio(audio_file, filename)
+        
+        # Transcribe using OpenAI Whisper, streaming the spooled download
+        with audio_file, track_stage("whisper"):
+            transcribed_text = await transcribe_audio_file(audio_file, filename)
         
         return transcribed_text
         
@@ -80,7 +223,7 @@ async def download_and_transcribe_audio(
         return None
 
 
-async def download_twilio_media(media_url: str) -> Optional[bytes]:
+async def download_twilio_media(media_url: str) -> Optional[BinaryIO]:
     """
     Download media from Twilio URL with authentication and retry logic.
     
@@ -88,22 +231,165 @@ async def download_twilio_media(media_url: str) -> Optional[bytes]:
         media_url: Twilio media URL
     
     Returns:
-        Audio bytes, or None if download failed
+        Spooled audio file positioned at the start (the caller closes it),
+        or None if the download failed or was over the size limit
     """
     try:
-        async with httpx.AsyncClient() as client:
-            content = await _download_media_with_retry(client, media_url)
-            logger.info(f"Downloaded audio: {len(content)} bytes")
-            return content
-                
+        audio_file = await _download_media_with_retry(
+            get_media_client(),
+            media_url,
+            max_bytes=settings.media_max_bytes,
+            spool_bytes=settings.media_spool_max_memory_bytes,
+        )
+        size = audio_file.seek(0, os.SEEK_END)
+        audio_file.seek(0)
+        logger.info(f"Downloaded audio: {size} bytes")
+        return audio_file
+    
+    except MediaTooLargeError as e:
+        record_error("download", e)
+        logger.warning(f"Refused audio download: {e}")
+        return None
     except (httpx.HTTPError, httpx.TimeoutException) as e:
+        record_error("download", e)
         logger.error(f"Failed to download audio after retries: {e}")
         return None
     except Exception as e:
+        record_error("download", e)
         logger.exception(f"Error downloading audio: {e}")
         return None
 
 
+@lru_cache()
+def ffmpeg_available() -> bool:
+    """Whether pydub can find ffmpeg and ffprobe to decode and encode audio."""
+    if shutil.which("ffmpeg") and shutil.which("ffprobe"):
+        return True
+    logger.warning("ffmpeg not found, voice notes are uploaded without preprocessing")
+    return False
+
+
+def shrink_segment(segment):
+    """
+    Downmix to mono, resample to 16 kHz and trim silence from both ends.
+    
+    Args:
+        segment: pydub AudioSegment
+    
+    Returns:
+        Shrunk AudioSegment (all-silent audio is only downmixed and resampled)
+    """
+    from pydub.silence import detect_leading_silence
+    
+    segment = segment.set_channels(1).set_frame_rate(PREPROCESSED_FRAME_RATE)
+    leading = detect_leading_silence(segment, SILENCE_THRESHOLD_DBFS)
+    if leading >= len(segment):
+        return segment
+    trailing = detect_leading_silence(segment.reverse(), SILENCE_THRESHOLD_DBFS)
+    start = max(leading - SILENCE_PADDING_MS, 0)
+    end = min(len(segment) - trailing + SILENCE_PADDING_MS, len(segment))
+    return segment[start:end]
+
+
+def _preprocess_file(source_path: str, output_path: str, bitrate: str) -> int:
+    """
+    Shrink one note (runs in the preprocessing pool).
+    
+    Args:
+        source_path: Downloaded audio, in any format ffmpeg reads
+        output_path: Where to write the Ogg/Opus result
+        bitrate: Opus bitrate, e.g. "24k"
+    
+    Returns:
+        Size of the result in bytes
+    """
+    from pydub import AudioSegment
+    
+    segment = shrink_segment(AudioSegment.from_file(source_path))
+    segment.export(output_path, format="ogg", codec="libopus", bitrate=bitrate, parameters=["-application", "voip"])
+    return os.path.getsize(output_path)
+
+
+# Global preprocessing pool
+audio_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_audio_pool() -> ProcessPoolExecutor:
+    """Get or create the preprocessing process pool."""
+    global audio_pool
+    
+    if audio_pool is None:
+        # Spawned rather than forked: the parent runs an event loop and threads
+        audio_pool = ProcessPoolExecutor(
+            max_workers=settings.audio_preprocess_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    
+    return audio_pool
+
+
+def close_audio_pool() -> None:
+    """Stop the preprocessing workers (called on application shutdown)."""
+    global audio_pool
+    if audio_pool is not None:
+        audio_pool.shutdown(wait=False, cancel_futures=True)
+        audio_pool = None
+
+
+async def preprocess_audio(audio_file: BinaryIO, filename: str) -> Tuple[BinaryIO, str]:
+    """
+    Shrink a voice note before it is uploaded to Whisper.
+    
+    The note is copied to a named temp file for the worker, which writes
+    the result to another one; nothing is decoded on the event loop.
+    
+    Args:
+        audio_file: Downloaded note positioned at the start
+        filename: Upload filename for the original
+    
+    Returns:
+        (file, filename) to upload: the preprocessed note, or the original
+        if preprocessing is off, failed or did not make it smaller. The
+        file not returned is closed.
+    """
+    original_size = audio_file.seek(0, os.SEEK_END)
+    audio_file.seek(0)
+    if (
+        not settings.audio_preprocess_enabled
+        or original_size < settings.audio_preprocess_min_bytes
+        or not ffmpeg_available()
+    ):
+        return audio_file, filename
+    
+    global audio_pool
+    output = tempfile.NamedTemporaryFile(suffix=".ogg")
+    try:
+        with tempfile.NamedTemporaryFile(suffix=os.path.splitext(filename)[1]) as source:
+            await asyncio.to_thread(shutil.copyfileobj, audio_file, source)
+            source.flush()
+            size = await asyncio.get_running_loop().run_in_executor(
+                get_audio_pool(), _preprocess_file, source.name, output.name, settings.audio_preprocess_bitrate
+            )
+    except Exception as e:
+        if isinstance(e, BrokenProcessPool):
+            # A worker died; start a fresh pool next time
+            audio_pool = None
+        logger.warning(f"Audio preprocessing failed, uploading the original: {e}")
+        output.close()
+        audio_file.seek(0)
+        return audio_file, filename
+    
+    if size >= original_size:
+        output.close()
+        audio_file.seek(0)
+        return audio_file, filename
+    
+    logger.info(f"Preprocessed audio: {original_size} -> {size} bytes")
+    audio_file.close()
+    output.seek(0)
+    return output, "audio.ogg"
+
+
 def get_extension_from_content_type(content_type: str) -> str:
     """
     Get file extension from MIME content type.
@@ -1,25 +1,152 @@
 """
 Database setup and session management.
+
+The backend comes from settings.database_url: SQLite under DATA_DIR by
+default, or Postgres (asyncpg) when DATABASE_URL points at one. The
+models, queries and migrations are shared; backend-specific SQL lives in
+app.infrastructure.dialects and in only_on() migration steps.
 """
 
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
-from sqlalchemy.pool import StaticPool
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession, async_sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, StaticPool
 
 from app.config.settings import get_settings
+from app.infrastructure.migrations import lock_schema, run_migrations
 from app.domain.reminder import Base
 from app.domain.processed_message import ProcessedMessage  # noqa: F401 - needed for table creation
 from app.domain.conversation_history import ConversationMessage  # noqa: F401 - needed for table creation
+from app.domain.inbound_message import InboundMessage  # noqa: F401 - needed for table creation
+from app.domain.user import User  # noqa: F401 - needed for table creation
+from app.domain.job_lease import JobLease  # noqa: F401 - needed for table creation
 
+logger = logging.getLogger(__name__)
 settings = get_settings()
 
-# Create async engine
-# Using StaticPool for SQLite to handle concurrent access
-engine = create_async_engine(
-    settings.database_url,
-    echo=settings.debug,
-    connect_args={"check_same_thread": False},
-    poolclass=StaticPool,
-)
+
+def is_sqlite_url(url: str) -> bool:
+    """True if the URL names a SQLite database."""
+    return make_url(url).get_backend_name() == "sqlite"
+
+
+def is_memory_database(url: str) -> bool:
+    """True for in-memory SQLite URLs, which cannot be shared by a connection pool."""
+    return url.endswith(":memory:") or url.endswith("://")
+
+
+def _set_sqlite_pragmas(dbapi_connection, read_only: bool) -> None:
+    """Tune a new SQLite connection (WAL journal, relaxed fsync, mmap, page cache)."""
+    cursor = dbapi_connection.cursor()
+    if not read_only:
+        # Persistent in the database file; readers then never block on the writer
+        cursor.execute("PRAGMA journal_mode=WAL")
+    # Durable at checkpoints rather than every commit; safe against corruption in WAL mode
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA mmap_size={int(settings.sqlite_mmap_bytes)}")
+    cursor.execute(f"PRAGMA cache_size=-{int(settings.sqlite_cache_kib)}")
+    if read_only:
+        cursor.execute("PRAGMA query_only=ON")
+    cursor.close()
+
+
+def create_sqlite_engine(url: str, read_only: bool = False, pool_size: int = 1) -> AsyncEngine:
+    """
+    Create an engine for the application's SQLite database.
+    
+    The writer engine has exactly one connection (SQLite allows one writer
+    at a time) in a pool of one: a session checks it out on its first
+    statement and returns it at commit, rollback or close, so concurrent
+    units of work queue for it and each keeps its own transaction. An
+    in-memory database only exists on its one connection, so there every
+    session shares it (tests only). Read-only engines hold a pool of
+    `pool_size` connections, each with its own aiosqlite thread, so reads
+    run next to the writer instead of queuing behind it.
+    
+    Args:
+        url: SQLAlchemy database URL
+        read_only: Build a pool of read-only connections
+        pool_size: Connections in a read-only pool
+    
+    Returns:
+        Engine whose connections have the WAL and cache pragmas applied
+    """
+    if is_memory_database(url):
+        pool_options = {"poolclass": StaticPool}
+    else:
+        pool_size = pool_size if read_only else 1
+        pool_options = {"poolclass": AsyncAdaptedQueuePool, "pool_size": pool_size, "max_overflow": 0}
+    
+    engine = create_async_engine(
+        url,
+        echo=settings.debug,
+        connect_args={"check_same_thread": False},
+        **pool_options,
+    )
+    
+    if not is_memory_database(url):
+        @event.listens_for(engine.sync_engine, "connect")
+        def on_connect(dbapi_connection, connection_record):
+            _set_sqlite_pragmas(dbapi_connection, read_only)
+    
+    return engine
+
+
+def create_postgres_engine(url: str) -> AsyncEngine:
+    """
+    Create an engine for a Postgres database (postgresql+asyncpg://).
+    
+    Connections are pooled per worker (database_pool_size plus
+    database_max_overflow under load) and checked before reuse, since
+    managed Postgres closes idle connections. asyncpg prepares every
+    statement; each connection keeps database_statement_cache_size of them
+    so repeated queries skip parsing and planning.
+    
+    Args:
+        url: SQLAlchemy database URL
+    
+    Returns:
+        Pooled engine
+    """
+    return create_async_engine(
+        url,
+        echo=settings.debug,
+        pool_size=settings.database_pool_size,
+        max_overflow=settings.database_max_overflow,
+        pool_pre_ping=True,
+        connect_args={"prepared_statement_cache_size": settings.database_statement_cache_size},
+    )
+
+
+def create_database_engines(url: str) -> Tuple[AsyncEngine, AsyncEngine]:
+    """
+    Create the writer and read engines for a database URL.
+    
+    SQLite gets its single writer connection plus the read-only pool (one
+    engine for in-memory databases). Postgres readers never wait for
+    writers, so one pool serves both.
+    
+    Returns:
+        (writer engine, read engine), possibly the same engine
+    """
+    if not is_sqlite_url(url):
+        engine = create_postgres_engine(url)
+        return engine, engine
+    
+    engine = create_sqlite_engine(url)
+    if is_memory_database(url):
+        return engine, engine
+    return engine, create_sqlite_engine(url, read_only=True, pool_size=settings.database_read_pool_size)
+
+
+# Writer engine and the engine for read-only sessions
+engine, read_engine = create_database_engines(settings.database_url)
 
 # Session factory
 async_session_factory = async_sessionmaker(
@@ -28,11 +155,48 @@ async_session_factory = async_sessionmaker(
     expire_on_commit=False,
 )
 
+# Read-only sessions for queries that don't need a unit of work's pending writes
+async_read_session_factory = async_sessionmaker(
+    read_engine,
+    class_=AsyncSession,
+    expire_on_commit=False,
+)
 
-async def init_database() -> None:
-    """Initialize database and create tables."""
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+
+async def init_database(attempts: int = 5) -> None:
+    """
+    Initialize database, create tables and apply pending migrations.
+    
+    Several Uvicorn workers start at once; a worker that finds the database
+    locked by another one's schema changes waits and tries again (on
+    Postgres they queue on an advisory lock instead).
+    
+    Args:
+        attempts: Tries before giving up
+    """
+    for attempt in range(1, attempts + 1):
+        try:
+            async with engine.begin() as conn:
+                await conn.run_sync(lock_schema)
+                await conn.run_sync(Base.metadata.create_all)
+            
+            applied = await run_migrations(engine)
+            break
+        except OperationalError as e:
+            if attempt == attempts:
+                raise
+            logger.warning(f"Database initialization failed (attempt {attempt}/{attempts}), retrying: {e}")
+            await asyncio.sleep(0.5 * attempt)
+    
+    if applied:
+        logger.info(f"Applied migrations: {applied}")
+
+
+async def close_database() -> None:
+    """Close the writer and read pool connections (at shutdown)."""
+    if read_engine is not engine:
+        await read_engine.dispose()
+    await engine.dispose()
 
 
 async def get_session() -> AsyncSession:
@@ -52,3 +216,80 @@ class DatabaseSession:
         if exc_type is not None:
             await self.session.rollback()
         await self.session.close()
+
+
+class UnitOfWork:
+    """
+    One session and one transaction shared by a whole request.
+    
+    Code running inside a unit of work flushes instead of committing, so
+    everything is written by a single commit at the end. Side effects that
+    must only happen once the data is durable (waking the dispatcher,
+    sending replies) are registered with after_commit() and run after that commit;
+    they are discarded on rollback.
+    
+    The session takes the writer connection on its first statement and
+    holds it until commit or rollback; on SQLite every other writer waits
+    meanwhile. Slow work that doesn't write (GPT calls, downloads) belongs
+    before the first use of `session`.
+    
+    Reads that don't depend on the transaction's own pending writes can
+    use read_session(), which runs them on the read-only pool so they
+    don't wait for the writer connection.
+    
+    Usage:
+        async with UnitOfWork() as uow:
+            service = ReminderService(uow.session, uow)
+            ...
+            await uow.commit()
+    """
+    
+    def __init__(
+        self,
+        session_factory: Optional[async_sessionmaker] = None,
+        read_session_factory: Optional[async_sessionmaker] = None
+    ):
+        self.session_factory = session_factory or async_session_factory
+        if read_session_factory is None:
+            # A unit of work over another database reads from that database too
+            read_session_factory = async_read_session_factory if session_factory is None else session_factory
+        self.read_session_factory = read_session_factory
+        self._callbacks: List[Tuple[Callable[..., Awaitable], tuple]] = []
+    
+    async def __aenter__(self) -> "UnitOfWork":
+        self.session = self.session_factory()
+        return self
+    
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        if exc_type is not None:
+            await self.rollback()
+        await self.session.close()
+    
+    @asynccontextmanager
+    async def read_session(self) -> AsyncIterator[AsyncSession]:
+        """
+        Session on the read pool, outside this unit of work's transaction.
+        
+        It sees committed data only, not what this unit of work has flushed.
+        """
+        async with self.read_session_factory() as session:
+            yield session
+    
+    def after_commit(self, callback: Callable[..., Awaitable], *args) -> None:
+        """Run `await callback(*args)` once the transaction has committed."""
+        self._callbacks.append((callback, args))
+    
+    async def commit(self) -> None:
+        """Commit the transaction, then run the after-commit callbacks in order."""
+        await self.session.commit()
+        callbacks, self._callbacks = self._callbacks, []
+        for callback, args in callbacks:
+            try:
+                await callback(*args)
+            except Exception as e:
+                logger.exception(f"After-commit callback {getattr(callback, '__name__', callback)} failed: {e}")
+    
+    async def rollback(self) -> None:
+        """Roll back the transaction and drop pending callbacks."""
+        self._callbacks = []
+        await self.session.rollback()
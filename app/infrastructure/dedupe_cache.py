@@ -0,0 +1,103 @@
+"""
+In-process idempotency filter for inbound message SIDs.
+
+Twilio retries a webhook within seconds, so recently seen SIDs are kept in
+a bounded LRU with a TTL and answered without touching SQLite. The
+processed_messages table stays the durable source of truth for anything
+the cache has forgotten (evicted, expired, or seen before a restart).
+"""
+
+import logging
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from app.config.settings import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+class DedupeCache:
+    """Bounded LRU set of message SIDs with per-entry expiry."""
+    
+    def __init__(self, max_size: int, ttl_seconds: float, clock: Callable[[], float] = time.monotonic):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self._entries: "OrderedDict[str, float]" = OrderedDict()  # sid -> expiry
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def contains(self, message_sid: str) -> bool:
+        """
+        Check whether a SID was seen recently, counting a hit or a miss.
+        
+        Args:
+            message_sid: Twilio message SID
+        
+        Returns:
+            True if the SID is cached and not expired
+        """
+        expires_at = self._entries.get(message_sid)
+        if expires_at is not None:
+            if expires_at > self.clock():
+                self._entries.move_to_end(message_sid)
+                self.hits += 1
+                return True
+            del self._entries[message_sid]
+        
+        self.misses += 1
+        return False
+    
+    def add(self, message_sid: str) -> None:
+        """
+        Remember a SID, evicting the least recently used entry when full.
+        
+        Args:
+            message_sid: Twilio message SID
+        """
+        self._entries[message_sid] = self.clock() + self.ttl_seconds
+        self._entries.move_to_end(message_sid)
+        
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+    
+    def clear(self) -> None:
+        """Forget all entries (counters are kept)."""
+        self._entries.clear()
+    
+    def stats(self) -> dict:
+        """Size and hit/miss counters."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+# Global cache instance
+dedupe_cache: Optional[DedupeCache] = None
+
+
+def get_dedupe_cache() -> DedupeCache:
+    """Get or create the message dedupe cache."""
+    global dedupe_cache
+    
+    if dedupe_cache is None:
+        dedupe_cache = DedupeCache(
+            max_size=settings.dedupe_cache_max_size,
+            ttl_seconds=settings.dedupe_cache_ttl_seconds
+        )
+    
+    return dedupe_cache
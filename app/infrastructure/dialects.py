@@ -0,0 +1,42 @@
+"""
+Backend-specific SQL shared by the SQLite and Postgres databases.
+
+Both backends support INSERT ... ON CONFLICT DO NOTHING, but SQLAlchemy
+builds it from each dialect's own insert() construct; dialect_insert()
+picks the one matching the session's engine.
+"""
+
+from typing import Any, Union
+
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+
+POSTGRESQL = "postgresql"
+SQLITE = "sqlite"
+
+
+def backend_name(bind: Union[AsyncSession, Connection]) -> str:
+    """
+    Name of the database backend behind a session or sync connection.
+    
+    Returns:
+        "sqlite" or "postgresql"
+    """
+    if isinstance(bind, Connection):
+        return bind.dialect.name
+    return bind.get_bind().dialect.name
+
+
+def dialect_insert(session: AsyncSession, table: Any):
+    """
+    INSERT for the session's backend, with on_conflict_do_nothing().
+    
+    Args:
+        session: Session the statement will run on
+        table: Model or table to insert into
+    """
+    if backend_name(session) == POSTGRESQL:
+        return postgresql_insert(table)
+    return sqlite_insert(table)
@@ -0,0 +1,282 @@
+"""
+Durable ingest queue for inbound WhatsApp messages.
+
+The webhook persists each message as an InboundMessage row and enqueues its
+SID; a pool of async workers drains the queue and runs the message pipeline.
+Each message is handled in one UnitOfWork whose single commit covers the
+pipeline's writes and the row's PENDING -> DONE transition. Rows left
+PENDING after a restart are re-queued on startup, and rows the webhook
+could not enqueue (the queue filled up after its check) are picked up by a
+periodic re-scan once they are ingest_rescan_seconds old.
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, List, Optional, Set
+
+from sqlalchemy import select, update
+
+from app.config.settings import get_settings
+from app.domain.inbound_message import InboundMessage, InboundMessageStatus
+from app.infrastructure.database import async_read_session_factory, async_session_factory, UnitOfWork
+from app.infrastructure.metrics import get_stage_stats, observe_stage, record_error, track_stage
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+MessageHandler = Callable[[InboundMessage, UnitOfWork], Awaitable[None]]
+
+
+class IngestQueue:
+    """Bounded queue of inbound message SIDs drained by async workers."""
+    
+    def __init__(self, handler: MessageHandler, max_depth: int, workers: int):
+        self.handler = handler
+        self.max_depth = max_depth
+        self.worker_count = workers
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_depth)
+        self.workers: List[asyncio.Task] = []
+        self.in_flight = 0
+        self.processed = 0
+        self.failed = 0
+        self.rejected = 0
+        self._queued: Set[str] = set()  # Queued or in flight
+        self._rescanner: Optional[asyncio.Task] = None
+    
+    @property
+    def running(self) -> bool:
+        return bool(self.workers)
+    
+    def depth(self) -> int:
+        """Number of messages waiting for a worker."""
+        return self.queue.qsize()
+    
+    def is_full(self) -> bool:
+        """True when the webhook should push back on Twilio."""
+        return self.queue.full()
+    
+    def enqueue(self, message_sid: str) -> bool:
+        """
+        Add a persisted message to the queue.
+        
+        Args:
+            message_sid: SID of a PENDING InboundMessage row
+        
+        Returns:
+            True if queued; False if the queue is full (the row stays
+            PENDING and is picked up by the next re-scan)
+        """
+        if message_sid in self._queued:
+            return True  # Already waiting for (or held by) a worker
+        
+        try:
+            self.queue.put_nowait(message_sid)
+            self._queued.add(message_sid)
+            return True
+        except asyncio.QueueFull:
+            self.rejected += 1
+            logger.warning(f"Ingest queue full, message {message_sid} left pending")
+            return False
+    
+    async def start(self) -> None:
+        """Spawn the worker pool, re-queue unfinished messages and start the re-scan."""
+        if self.running:
+            return
+        
+        recovered = await self.enqueue_pending()
+        
+        for i in range(self.worker_count):
+            self.workers.append(asyncio.create_task(self._worker(i), name=f"ingest-worker-{i}"))
+        self._rescanner = asyncio.create_task(self._rescan(), name="ingest-rescan")
+        
+        logger.info(f"Ingest queue started with {self.worker_count} workers ({recovered} recovered)")
+    
+    async def stop(self) -> None:
+        """Cancel the workers. Messages still queued stay PENDING in the database."""
+        tasks = self.workers + ([self._rescanner] if self._rescanner else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.workers = []
+        self._rescanner = None
+        logger.info("Ingest queue stopped")
+    
+    async def enqueue_pending(self, received_before: Optional[datetime] = None) -> int:
+        """
+        Enqueue PENDING rows that are not already queued, oldest first.
+        
+        Args:
+            received_before: Only rows received before this time; recent
+                rows are still on their way from the webhook to a queue
+        
+        Returns:
+            Number of rows enqueued
+        """
+        free = self.max_depth - self.queue.qsize()
+        if free <= 0:
+            return 0
+        
+        query = select(InboundMessage.message_sid).where(InboundMessage.status == InboundMessageStatus.PENDING)
+        if received_before is not None:
+            query = query.where(InboundMessage.received_at < received_before)
+        async with async_read_session_factory() as session:
+            result = await session.execute(
+                query.order_by(InboundMessage.received_at).limit(free + len(self._queued))
+            )
+            sids = [sid for sid in result.scalars().all() if sid not in self._queued]
+        
+        enqueued = 0
+        for sid in sids[:free]:
+            if not self.enqueue(sid):
+                break
+            enqueued += 1
+        return enqueued
+    
+    async def _rescan(self) -> None:
+        """Periodically enqueue PENDING rows nothing is working on."""
+        interval = settings.ingest_rescan_seconds
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                found = await self.enqueue_pending(datetime.utcnow() - timedelta(seconds=interval))
+                if found:
+                    logger.info(f"Re-scan queued {found} pending messages")
+            except Exception as e:
+                record_error("ingest", e)
+                logger.exception(f"Ingest re-scan failed: {e}")
+    
+    async def _load(self, message_sid: str) -> Optional[InboundMessage]:
+        """Load a message that still needs processing (read pool; _process re-checks on write)."""
+        async with async_read_session_factory() as session:
+            message = await session.get(InboundMessage, message_sid)
+        if message is None or message.status != InboundMessageStatus.PENDING:
+            return None  # Already handled
+        return message
+    
+    async def _finish(self, message_sid: str, status: InboundMessageStatus, error: Optional[str] = None) -> None:
+        """Record the final status of a message."""
+        async with async_session_factory() as session:
+            await session.execute(
+                update(InboundMessage)
+                .where(InboundMessage.message_sid == message_sid)
+                .values(
+                    status=status,
+                    completed_at=datetime.utcnow(),
+                    error=error,
+                    attempts=InboundMessage.attempts + 1
+                )
+            )
+            await session.commit()
+    
+    async def _process(self, message_sid: str) -> bool:
+        """
+        Run the handler for one message inside a single unit of work.
+        
+        The handler's writes and the PENDING -> DONE transition are committed
+        together, so a message costs one commit. The transition is
+        conditional: if the row was completed elsewhere in the meantime,
+        everything is rolled back (including the handler's deferred reply).
+        The message is read on the read pool, so the writer connection is
+        only taken once the handler starts writing.
+        
+        Returns:
+            True if the message was processed by this call
+        """
+        async with UnitOfWork(async_session_factory, async_read_session_factory) as uow:
+            message = await self._load(message_sid)
+            if message is None:
+                return False
+            
+            observe_stage("queue_wait", (datetime.utcnow() - message.received_at).total_seconds())
+            
+            with track_stage("total"):
+                await self.handler(message, uow)
+                
+                result = await uow.session.execute(
+                    update(InboundMessage)
+                    .where(
+                        InboundMessage.message_sid == message_sid,
+                        InboundMessage.status == InboundMessageStatus.PENDING
+                    )
+                    .values(
+                        status=InboundMessageStatus.DONE,
+                        completed_at=datetime.utcnow(),
+                        attempts=InboundMessage.attempts + 1
+                    )
+                )
+                if result.rowcount != 1:
+                    await uow.rollback()
+                    return False
+                
+                with track_stage("commit"):
+                    await uow.commit()
+            return True
+    
+    async def _worker(self, index: int) -> None:
+        """Drain the queue until cancelled."""
+        while True:
+            message_sid = await self.queue.get()
+            self.in_flight += 1
+            try:
+                if await self._process(message_sid):
+                    self.processed += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failed += 1
+                record_error("ingest", e)
+                logger.exception(f"Ingest worker {index} failed on {message_sid}: {e}")
+                try:
+                    await self._finish(message_sid, InboundMessageStatus.FAILED, str(e)[:500])
+                except Exception:
+                    logger.exception(f"Could not mark {message_sid} as failed")
+            finally:
+                self._queued.discard(message_sid)
+                self.in_flight -= 1
+                self.queue.task_done()
+    
+    def stats(self) -> dict:
+        """Queue depth, worker concurrency and per-stage latency."""
+        return {
+            "running": self.running,
+            "depth": self.depth(),
+            "max_depth": self.max_depth,
+            "workers": self.worker_count,
+            "in_flight": self.in_flight,
+            "processed": self.processed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "stages": get_stage_stats(),
+        }
+
+
+# Global ingest queue instance
+ingest_queue: Optional[IngestQueue] = None
+
+
+def get_ingest_queue() -> IngestQueue:
+    """Get or create the ingest queue instance."""
+    global ingest_queue
+    
+    if ingest_queue is None:
+        from app.usecases.message_processor import process_inbound_message
+        
+        ingest_queue = IngestQueue(
+            handler=process_inbound_message,
+            max_depth=settings.ingest_queue_max_depth,
+            workers=settings.ingest_workers
+        )
+    
+    return ingest_queue
+
+
+async def start_ingest_queue() -> None:
+    """Start the ingest workers."""
+    await get_ingest_queue().start()
+
+
+async def stop_ingest_queue() -> None:
+    """Stop the ingest workers."""
+    if ingest_queue is not None:
+        await ingest_queue.stop()
@@ -0,0 +1,158 @@
+"""
+Lease-based claiming of scheduled jobs across processes.
+
+Every Uvicorn worker runs its own scheduler over the shared job store, so
+more than one process can pick up the same due job. Before a job does
+anything visible it claims a lease on a key naming that one firing
+("reminder:<id>:<scheduled time>") in the main database: exactly one
+process wins the insert and the others skip. A lease that is never
+completed (its owner died mid-job) expires after scheduler_lease_seconds
+and can then be taken over.
+"""
+
+import logging
+import os
+import socket
+from datetime import datetime, timedelta
+from typing import Optional, Sequence, Set
+from uuid import uuid4
+
+from sqlalchemy import delete, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config.settings import get_settings
+from app.domain.job_lease import JobLease
+from app.infrastructure.dialects import dialect_insert
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Identifies this process in lease rows
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:8]}"
+
+
+def get_worker_id() -> str:
+    """Identifier of this process as a lease owner."""
+    return WORKER_ID
+
+
+async def claim_job(job_key: str, ttl_seconds: Optional[int] = None) -> bool:
+    """
+    Claim one firing of a job for this process.
+    
+    Args:
+        job_key: Key naming the firing, unique per occurrence
+        ttl_seconds: Lease length (defaults to scheduler_lease_seconds)
+    
+    Returns:
+        True if this process owns the firing and should run it
+    """
+    return job_key in await claim_jobs([job_key], ttl_seconds)
+
+
+async def claim_jobs(job_keys: Sequence[str], ttl_seconds: Optional[int] = None) -> Set[str]:
+    """
+    Claim a batch of firings in one transaction.
+    
+    Args:
+        job_keys: Keys naming the firings
+        ttl_seconds: Lease length (defaults to scheduler_lease_seconds)
+    
+    Returns:
+        The keys this process now owns
+    """
+    from app.infrastructure.database import DatabaseSession
+    
+    if not job_keys:
+        return set()
+    
+    now = datetime.utcnow()
+    leased_until = now + timedelta(seconds=ttl_seconds or settings.scheduler_lease_seconds)
+    
+    async with DatabaseSession() as session:
+        result = await session.execute(
+            dialect_insert(session, JobLease)
+            .values([
+                {"job_key": key, "owner": WORKER_ID, "leased_until": leased_until, "created_at": now}
+                for key in job_keys
+            ])
+            .on_conflict_do_nothing(index_elements=["job_key"])
+            .returning(JobLease.job_key)
+        )
+        claimed = set(result.scalars().all())
+        
+        contested = [key for key in job_keys if key not in claimed]
+        if contested:
+            # Take over leases whose owner never completed them
+            result = await session.execute(
+                update(JobLease)
+                .where(
+                    JobLease.job_key.in_(contested),
+                    JobLease.completed_at.is_(None),
+                    JobLease.leased_until < now
+                )
+                .values(owner=WORKER_ID, leased_until=leased_until)
+                .returning(JobLease.job_key)
+                .execution_options(synchronize_session=False)
+            )
+            taken_over = set(result.scalars().all())
+            for key in taken_over:
+                logger.warning(f"Took over expired lease {key}")
+            claimed |= taken_over
+        
+        await session.commit()
+    
+    return claimed
+
+
+async def complete_job(job_key: str) -> None:
+    """
+    Mark a claimed firing as done so it is never taken over.
+    
+    Args:
+        job_key: Key passed to claim_job
+    """
+    from app.infrastructure.database import DatabaseSession
+    
+    async with DatabaseSession() as session:
+        await complete_jobs(session, [job_key])
+        await session.commit()
+
+
+async def complete_jobs(session: AsyncSession, job_keys: Sequence[str]) -> None:
+    """
+    Mark claimed firings done in the caller's transaction.
+    
+    Args:
+        session: Database session, committed by the caller
+        job_keys: Keys passed to claim_jobs
+    """
+    if not job_keys:
+        return
+    await session.execute(
+        update(JobLease)
+        .where(JobLease.job_key.in_(job_keys), JobLease.owner == WORKER_ID)
+        .values(completed_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def purge_completed_leases(days: int = 7) -> int:
+    """
+    Remove completed leases older than the given number of days.
+    
+    Args:
+        days: Number of days to retain
+    
+    Returns:
+        Number of leases removed
+    """
+    from app.infrastructure.database import DatabaseSession
+    
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    async with DatabaseSession() as session:
+        result = await session.execute(
+            delete(JobLease).where(JobLease.completed_at.isnot(None), JobLease.completed_at < cutoff)
+        )
+        await session.commit()
+    return result.rowcount
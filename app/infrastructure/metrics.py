@@ -0,0 +1,425 @@
+"""
+Prometheus metrics for the message pipeline.
+
+Counters and fixed-bucket histograms live in process memory and are
+rendered in the Prometheus text format by /metrics. Every label value is
+registered up front, so recording one observation is a dict lookup, a
+bisect and two additions on the event loop: no locks and no allocation.
+Values outside the registered set are recorded under "other" so a bad
+caller can never grow the series count.
+
+Gauges (queue depths, dispatcher totals, limiter state) are not updated
+on the hot path; their owners are read through collectors when /metrics
+is scraped.
+
+Per-stage latency summaries for /ingest/status are kept here as well, so
+every stage recorded with observe_stage() also lands in the
+pipeline_stage_seconds histogram.
+"""
+
+import itertools
+import math
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+OTHER = "other"
+
+# Latency buckets in seconds, from a cache hit to a slow Whisper call
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Reminder lateness in seconds, from on time to a missed poll after downtime
+LATENESS_BUCKETS = (0.1, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+# Sends already queued on a number
+DEPTH_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250, 500)
+
+PIPELINE_STAGES = (
+    "webhook", "dedupe", "queue_wait", "transcribe", "download", "preprocess", "whisper", "history",
+    "parse", "gpt", "service", "save", "commit", "send", "twilio_request", "total",
+)
+INTENTS = (
+    "create_reminder", "update_reminder", "delete_reminder", "delete_reminders",
+    "pause_reminder", "resume_reminder", "list_reminders", "get_reminder_info",
+    "snooze_reminder", "opt_out_calls", "opt_in_calls", "acknowledge", "unknown",
+)
+ROUTES = ("local", "llm")
+SEND_PRIORITIES = ("reminder", "chat", "error")
+ERROR_STAGES = ("download", "whisper", "pipeline", "ingest", "send", "reminder")
+ERROR_TYPES = ("timeout", "http", "twilio", "openai", "database")
+
+# Exception module -> error type (checked after timeouts)
+_ERROR_MODULES = {
+    "httpx": "http",
+    "httpcore": "http",
+    "openai": "openai",
+    "sqlalchemy": "database",
+    "aiosqlite": "database",
+    "asyncpg": "database",
+    "sqlite3": "database",
+    "twilio": "twilio",
+}
+
+
+def error_type(error: BaseException) -> str:
+    """
+    Classify an exception for the errors_total counter.
+    
+    Args:
+        error: Caught exception
+    
+    Returns:
+        One of ERROR_TYPES, or "other"
+    """
+    cls = type(error)
+    if isinstance(error, TimeoutError) or "Timeout" in cls.__name__:
+        return "timeout"
+    if cls.__name__ == "TwilioApiError":
+        return "twilio"
+    return _ERROR_MODULES.get(cls.__module__.partition(".")[0], OTHER)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    """Shared label handling: one series per pre-registered label combination."""
+    
+    kind = ""
+    
+    def __init__(self, name: str, documentation: str, labels: Dict[str, Sequence[str]]):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._allowed = [frozenset(values) for values in labels.values()]
+        self._series: Dict[Tuple[str, ...], object] = {}
+        for key in itertools.product(*(tuple(values) + (OTHER,) for values in labels.values())):
+            self._series[key] = self._new_series()
+    
+    def _new_series(self):
+        raise NotImplementedError
+    
+    def _lookup(self, values: Tuple[str, ...]):
+        series = self._series.get(values)
+        if series is None:
+            key = tuple(value if value in allowed else OTHER for value, allowed in zip(values, self._allowed))
+            series = self._series[key]
+        return series
+    
+    def labels(self, *values: str):
+        """Get the series for a label combination (unknown values map to "other")."""
+        return self._lookup(values)
+    
+    def reset(self) -> None:
+        """Zero every series in place (children handed out by labels() stay valid)."""
+        for series in self._series.values():
+            series.clear()
+    
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class _CounterSeries:
+    __slots__ = ("value",)
+    
+    def __init__(self):
+        self.value = 0.0
+    
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+    
+    def clear(self) -> None:
+        self.value = 0.0
+
+
+class Counter(_Metric):
+    """Monotonic counter."""
+    
+    kind = "counter"
+    
+    def _new_series(self) -> _CounterSeries:
+        return _CounterSeries()
+    
+    def inc(self, *values: str, amount: float = 1.0) -> None:
+        """
+        Increment the series for a label combination.
+        
+        Args:
+            values: One value per label, in declaration order
+            amount: Increment
+        """
+        self._lookup(values).value += amount
+    
+    def value(self, *values: str) -> float:
+        """Current value of one series."""
+        return self._lookup(values).value
+    
+    def render(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.label_names, key)} {_format_value(series.value)}"
+            for key, series in self._series.items()
+        ]
+
+
+class _HistogramSeries:
+    __slots__ = ("bounds", "counts", "sum")
+    
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+    
+    def observe(self, value: float) -> None:
+        # bisect_left puts a value equal to a bound in that bound's bucket (le is inclusive)
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+    
+    def clear(self) -> None:
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+
+
+class Histogram(_Metric):
+    """Fixed-bucket histogram."""
+    
+    kind = "histogram"
+    
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Optional[Dict[str, Sequence[str]]] = None,
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        self.bounds = tuple(sorted(float(bound) for bound in buckets))
+        super().__init__(name, documentation, labels or {})
+    
+    def _new_series(self) -> _HistogramSeries:
+        return _HistogramSeries(self.bounds)
+    
+    def observe(self, value: float, *values: str) -> None:
+        """
+        Record one observation.
+        
+        Args:
+            value: Observed value
+            values: One value per label, in declaration order
+        """
+        self._lookup(values).observe(value)
+    
+    def count(self, *values: str) -> int:
+        """Number of observations in one series."""
+        return sum(self._lookup(values).counts)
+    
+    def render(self) -> List[str]:
+        lines = []
+        for key, series in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.bounds + (math.inf,), series.counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series.sum)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+# Reads a value from its owner at scrape time: a number, or a dict keyed by label value
+CollectorCallback = Callable[[], object]
+
+
+class _Collector:
+    """Gauge or counter whose value is read from its owner when scraped."""
+    
+    def __init__(self, name: str, kind: str, documentation: str, label: Optional[str], collect: CollectorCallback):
+        self.name = name
+        self.kind = kind
+        self.documentation = documentation
+        self.label = label
+        self.collect = collect
+    
+    def render(self) -> List[str]:
+        value = self.collect()
+        if self.label is None:
+            return [f"{self.name} {_format_value(value)}"]
+        return [
+            f"{self.name}{_format_labels((self.label,), (key,))} {_format_value(item)}"
+            for key, item in value.items()
+        ]
+
+
+_metrics: List[object] = []
+_collectors: Dict[str, _Collector] = {}
+
+
+def _register(metric):
+    _metrics.append(metric)
+    return metric
+
+
+def register_collector(
+    name: str,
+    kind: str,
+    documentation: str,
+    collect: CollectorCallback,
+    label: Optional[str] = None
+) -> None:
+    """
+    Export a value owned elsewhere, read when /metrics is scraped.
+    
+    Registering the same name again replaces the callback.
+    
+    Args:
+        name: Metric name
+        kind: "gauge" or "counter"
+        documentation: HELP text
+        collect: Returns a number, or a dict of label value -> number if `label` is set
+        label: Label name for dict results
+    """
+    _collectors[name] = _Collector(name, kind, documentation, label, collect)
+
+
+def render_metrics() -> str:
+    """Render every metric in the Prometheus text exposition format."""
+    lines: List[str] = []
+    for metric in itertools.chain(_metrics, _collectors.values()):
+        try:
+            samples = metric.render()
+        except Exception as e:
+            # A broken collector must not take the whole scrape down
+            lines.append(f"# {metric.name} unavailable: {type(e).__name__}")
+            continue
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(samples)
+    return "\n".join(lines) + "\n"
+
+
+def reset_metrics() -> None:
+    """Zero all counters, histograms and stage summaries."""
+    for metric in _metrics:
+        metric.reset()
+    _stage_stats.clear()
+
+
+MESSAGE_SECONDS = _register(Histogram(
+    "whatsapp_message_seconds",
+    "Time from webhook receipt of a message to its reply being sent.",
+))
+STAGE_SECONDS = _register(Histogram(
+    "pipeline_stage_seconds",
+    "Latency of each message pipeline stage.",
+    labels={"stage": PIPELINE_STAGES},
+))
+REMINDER_LATENESS = _register(Histogram(
+    "reminder_fire_lateness_seconds",
+    "Delay between a reminder's due time and its notification being sent.",
+    buckets=LATENESS_BUCKETS,
+))
+OUTBOUND_QUEUE_DEPTH = _register(Histogram(
+    "twilio_outbound_queue_depth",
+    "Sends already queued on the From number when a send asks for a token.",
+    labels={"priority": SEND_PRIORITIES},
+    buckets=DEPTH_BUCKETS,
+))
+INTENTS_TOTAL = _register(Counter(
+    "parsed_intents_total",
+    "Parsed messages by route and intent.",
+    labels={"route": ROUTES, "intent": INTENTS},
+))
+ERRORS_TOTAL = _register(Counter(
+    "errors_total",
+    "Handled errors by pipeline stage and error type.",
+    labels={"stage": ERROR_STAGES, "type": ERROR_TYPES},
+))
+
+
+def record_error(stage: str, error: BaseException) -> None:
+    """
+    Count a handled error.
+    
+    Args:
+        stage: Where it was caught (one of ERROR_STAGES)
+        error: The exception
+    """
+    ERRORS_TOTAL.inc(stage, error_type(error))
+
+
+class StageStats:
+    """Running latency statistics for one pipeline stage."""
+    
+    def __init__(self):
+        self.count = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.last_seconds = 0.0
+    
+    def observe(self, seconds: float) -> None:
+        """Record one observation."""
+        self.count += 1
+        self.total_seconds += seconds
+        self.last_seconds = seconds
+        if seconds > self.max_seconds:
+            self.max_seconds = seconds
+    
+    def as_dict(self) -> dict:
+        """Summary in milliseconds."""
+        avg = self.total_seconds / self.count if self.count else 0.0
+        return {
+            "count": self.count,
+            "avg_ms": round(avg * 1000, 2),
+            "max_ms": round(self.max_seconds * 1000, 2),
+            "last_ms": round(self.last_seconds * 1000, 2),
+        }
+
+
+# Per-stage latency, shared by the webhook and the workers
+_stage_stats: Dict[str, StageStats] = {}
+
+
+def observe_stage(stage: str, seconds: float) -> None:
+    """
+    Record the latency of a pipeline stage.
+    
+    Args:
+        stage: Stage name (e.g. "transcribe", "parse", "send")
+        seconds: Elapsed wall time
+    """
+    stats = _stage_stats.get(stage)
+    if stats is None:
+        stats = _stage_stats[stage] = StageStats()
+    stats.observe(seconds)
+    STAGE_SECONDS.observe(seconds, stage)
+
+
+@contextmanager
+def track_stage(stage: str):
+    """
+    Time the enclosed block as a pipeline stage.
+    
+    Usage:
+        with track_stage("parse"):
+            intent = await parse_user_message(...)
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - start)
+
+
+def get_stage_stats() -> Dict[str, dict]:
+    """Get latency summaries for all recorded stages."""
+    return {name: stats.as_dict() for name, stats in _stage_stats.items()}
@@ -0,0 +1,275 @@
+"""
+Schema migrations for existing databases.
+
+Base.metadata.create_all only creates missing tables, so changes to tables
+that already exist in a deployed reminders.db (new indexes, new columns)
+are applied here. Each migration runs once, in version order, inside the
+same transaction that records it in schema_migrations. Steps are written to
+be idempotent because a fresh database already has everything create_all
+produced from the current models.
+
+Steps that only make sense on one backend are wrapped in only_on(). A
+Postgres database starts out on the current schema (create_all), so the
+column additions and backfills for older SQLite files are no-ops there.
+"""
+
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, List, Union
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.config.settings import get_settings
+from app.infrastructure.dialects import POSTGRESQL, SQLITE
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# pg_advisory_xact_lock key held while a worker changes the schema
+SCHEMA_LOCK_KEY = 0x7768617473617070  # "whatsapp"
+
+# A step is raw SQL or a function that receives the sync connection
+MigrationStep = Union[str, Callable[[Connection], None]]
+
+
+@dataclass
+class Migration:
+    """One versioned schema change."""
+    version: int
+    name: str
+    steps: List[MigrationStep] = field(default_factory=list)
+
+
+def only_on(backend: str, *steps: MigrationStep) -> Callable[[Connection], None]:
+    """
+    Build a step that runs `steps` only on one database backend.
+    
+    Args:
+        backend: Dialect name, "sqlite" or "postgresql"
+        steps: Raw SQL or callables, as in Migration.steps
+    """
+    def step(connection: Connection) -> None:
+        if connection.dialect.name != backend:
+            return
+        for inner in steps:
+            if callable(inner):
+                inner(connection)
+            else:
+                connection.execute(text(inner))
+    return step
+
+
+def lock_schema(connection: Connection) -> None:
+    """
+    Serialize schema changes between workers starting at the same time.
+    
+    On Postgres, takes a transaction-level advisory lock; SQLite's own
+    write lock already does this (see init_database's retries).
+    """
+    if connection.dialect.name == POSTGRESQL:
+        connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": SCHEMA_LOCK_KEY})
+
+
+def add_column_if_missing(table: str, column: str, ddl: str) -> Callable[[Connection], None]:
+    """
+    Build a step that adds a column unless the table already has it.
+    
+    Args:
+        table: Table name
+        column: Column name
+        ddl: Column definition, e.g. "VARCHAR(64) NOT NULL DEFAULT ''"
+    """
+    def step(connection: Connection) -> None:
+        columns = {c["name"] for c in inspect(connection).get_columns(table)}
+        if column not in columns:
+            connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+    return step
+
+
+def _assign_default_owner(connection: Connection) -> None:
+    """
+    Give rows from the single-user era to the configured USER_WHATSAPP_NUMBER.
+    
+    Raises:
+        RuntimeError: There are such rows but USER_WHATSAPP_NUMBER is unset;
+            they would belong to nobody, so the migration is not applied
+    """
+    from app.domain.user import get_default_user_id
+    
+    user_id = get_default_user_id()
+    if not user_id:
+        orphans = {
+            table: connection.execute(text(f"SELECT COUNT(*) FROM {table} WHERE user_id = ''")).scalar()
+            for table in ("reminders", "conversation_history")
+        }
+        if any(orphans.values()):
+            raise RuntimeError(
+                f"USER_WHATSAPP_NUMBER must be set to assign existing rows to their owner ({orphans}); "
+                "set it and restart to apply the per-user migration"
+            )
+        return
+    
+    for table in ("reminders", "conversation_history"):
+        connection.execute(text(f"UPDATE {table} SET user_id = :user_id WHERE user_id = ''"), {"user_id": user_id})
+    
+    if inspect(connection).has_table("users"):
+        connection.execute(
+            text(
+                "INSERT INTO users (id, whatsapp_number, phone_number, call_opt_out, created_at) "
+                "VALUES (:id, :whatsapp_number, :phone_number, :call_opt_out, :created_at) "
+                "ON CONFLICT (id) DO NOTHING"
+            ),
+            {
+                "id": user_id,
+                "whatsapp_number": f"whatsapp:{user_id}",
+                "phone_number": settings.user_phone_number or user_id,
+                "call_opt_out": False,
+                "created_at": datetime.utcnow(),
+            }
+        )
+
+
+def _backfill_next_fire_at(connection: Connection) -> None:
+    """Queue future, not yet notified active reminders for the due-index dispatcher."""
+    from app.utils.time import from_pkt_to_utc
+    
+    # scheduled_time is naive PKT wall time; next_fire_at is naive UTC
+    now = datetime.utcnow()
+    offset = now - from_pkt_to_utc(now).replace(tzinfo=None)
+    connection.execute(
+        text(
+            "UPDATE reminders SET next_fire_at = strftime('%Y-%m-%d %H:%M:%f000', scheduled_time, :shift) "
+            "WHERE status = 'ACTIVE' AND last_notified_at IS NULL AND next_fire_at IS NULL "
+            "AND datetime(scheduled_time, :shift) > datetime(:now)"
+        ),
+        {"shift": f"{-int(offset.total_seconds())} seconds", "now": now}
+    )
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "reminder_query_indexes", [
+        "CREATE INDEX IF NOT EXISTS ix_reminders_status_scheduled_time "
+        "ON reminders (status, scheduled_time)",
+        "CREATE INDEX IF NOT EXISTS ix_reminders_status_responded_notified "
+        "ON reminders (status, user_responded, last_notified_at)",
+        "CREATE INDEX IF NOT EXISTS ix_reminders_status_title_scheduled_time "
+        "ON reminders (status, lower(title), scheduled_time)",
+        "ANALYZE reminders",
+    ]),
+    Migration(2, "reminder_title_search", [
+        # Trigram FTS over titles of active/paused reminders (rowid = reminders.rowid)
+        only_on(
+            SQLITE,
+            "CREATE VIRTUAL TABLE IF NOT EXISTS reminders_fts USING fts5(title, tokenize='trigram')",
+            "DELETE FROM reminders_fts",
+            "INSERT INTO reminders_fts (rowid, title) "
+            "SELECT rowid, title FROM reminders WHERE status IN ('ACTIVE', 'PAUSED')",
+            "CREATE TRIGGER IF NOT EXISTS reminders_fts_insert AFTER INSERT ON reminders "
+            "WHEN new.status IN ('ACTIVE', 'PAUSED') BEGIN "
+            "INSERT INTO reminders_fts (rowid, title) VALUES (new.rowid, new.title); END",
+            "CREATE TRIGGER IF NOT EXISTS reminders_fts_delete AFTER DELETE ON reminders BEGIN "
+            "DELETE FROM reminders_fts WHERE rowid = old.rowid; END",
+            "CREATE TRIGGER IF NOT EXISTS reminders_fts_update AFTER UPDATE OF title, status ON reminders BEGIN "
+            "DELETE FROM reminders_fts WHERE rowid = old.rowid; "
+            "INSERT INTO reminders_fts (rowid, title) SELECT new.rowid, new.title "
+            "WHERE new.status IN ('ACTIVE', 'PAUSED'); END",
+        ),
+        # Postgres: trigram GIN index serving LIKE '%keyword%' and similarity lookups
+        only_on(
+            POSTGRESQL,
+            "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+            "CREATE INDEX IF NOT EXISTS ix_reminders_title_trgm ON reminders "
+            "USING gin (lower(title) gin_trgm_ops) WHERE status IN ('ACTIVE', 'PAUSED')",
+        ),
+    ]),
+    Migration(3, "per_user_partitioning", [
+        add_column_if_missing("reminders", "user_id", "VARCHAR(64) NOT NULL DEFAULT ''"),
+        add_column_if_missing("conversation_history", "user_id", "VARCHAR(64) NOT NULL DEFAULT ''"),
+        _assign_default_owner,
+        # Indexes lead on user_id so per-user queries seek straight to the user's rows
+        "DROP INDEX IF EXISTS ix_reminders_status_scheduled_time",
+        "DROP INDEX IF EXISTS ix_reminders_status_responded_notified",
+        "DROP INDEX IF EXISTS ix_reminders_status_title_scheduled_time",
+        "CREATE INDEX IF NOT EXISTS ix_reminders_user_status_scheduled_time "
+        "ON reminders (user_id, status, scheduled_time)",
+        "CREATE INDEX IF NOT EXISTS ix_reminders_user_status_responded_notified "
+        "ON reminders (user_id, status, user_responded, last_notified_at)",
+        "CREATE INDEX IF NOT EXISTS ix_reminders_user_status_title_scheduled_time "
+        "ON reminders (user_id, status, lower(title), scheduled_time)",
+        "CREATE INDEX IF NOT EXISTS ix_conversation_history_user_timestamp "
+        "ON conversation_history (user_id, timestamp)",
+        "ANALYZE reminders",
+    ]),
+    Migration(4, "due_index_scheduler", [
+        add_column_if_missing("reminders", "next_fire_at", "DATETIME"),
+        add_column_if_missing("reminders", "follow_up_at", "DATETIME"),
+        "CREATE INDEX IF NOT EXISTS ix_reminders_next_fire_at ON reminders (next_fire_at)",
+        "CREATE INDEX IF NOT EXISTS ix_reminders_follow_up_at ON reminders (follow_up_at)",
+        only_on(SQLITE, _backfill_next_fire_at),
+    ]),
+    Migration(5, "recurring_reminders", [
+        add_column_if_missing("reminders", "recurrence", "VARCHAR(32)"),
+    ]),
+]
+
+
+def _ensure_migrations_table(connection: Connection) -> None:
+    connection.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        " version INTEGER PRIMARY KEY,"
+        " name VARCHAR(255) NOT NULL,"
+        " applied_at TIMESTAMP NOT NULL)"
+    ))
+
+
+def apply_migrations(connection: Connection, migrations: List[Migration] = MIGRATIONS) -> List[int]:
+    """
+    Apply pending migrations on a sync connection (use with run_sync).
+    
+    Args:
+        connection: Connection inside an open transaction
+        migrations: Migrations to consider, in any order
+    
+    Returns:
+        Versions that were applied
+    """
+    lock_schema(connection)
+    _ensure_migrations_table(connection)
+    applied = {row[0] for row in connection.execute(text("SELECT version FROM schema_migrations"))}
+    
+    newly_applied = []
+    for migration in sorted(migrations, key=lambda m: m.version):
+        if migration.version in applied:
+            continue
+        
+        logger.info(f"Applying migration {migration.version}: {migration.name}")
+        for step in migration.steps:
+            if callable(step):
+                step(connection)
+            else:
+                connection.execute(text(step))
+        
+        connection.execute(
+            text("INSERT INTO schema_migrations (version, name, applied_at) VALUES (:version, :name, :applied_at)"),
+            {"version": migration.version, "name": migration.name, "applied_at": datetime.utcnow()}
+        )
+        newly_applied.append(migration.version)
+    
+    return newly_applied
+
+
+async def run_migrations(engine: AsyncEngine) -> List[int]:
+    """
+    Apply pending migrations in one transaction.
+    
+    Args:
+        engine: Database engine
+    
+    Returns:
+        Versions that were applied
+    """
+    async with engine.begin() as conn:
+        return await conn.run_sync(apply_migrations)
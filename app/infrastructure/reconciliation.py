@@ -0,0 +1,276 @@
+"""
+Startup reconciliation of the reminder schedule.
+
+The schedule lives on the reminder rows (next_fire_at, follow_up_at), so
+there is no second store to drift from, but the rows themselves can still
+disagree with what should happen next: a reminder written by an older
+version or a failed scheduling write has no due time, a paused or
+completed reminder can keep one, and everything that came due while no
+worker was running is overdue at once.
+
+Before the dispatcher starts, reconcile_schedule() repairs this in bulk:
+
+- one UPDATE clears due times left on reminders that are not active;
+- active reminders are read in pages by id (keyset, never OFFSET) and
+  each page is compared with the due times it should have in one pass;
+  only rows that differ are written, with one bulk UPDATE per page. Rows with
+  a future due time and no overdue follow-up are already right, so the
+  page query leaves them to the database's scan and Python only sees
+  rows that may need a change;
+- notifications missed while down follow scheduler_catch_up_policy:
+  "fire" spaces them out from now at scheduler_catch_up_rate per second
+  instead of sending them as one burst, "skip" drops them
+  (a recurring reminder moves on to its next occurrence). Notifications
+  missed by more than scheduler_catch_up_max_age_seconds are skipped
+  under either policy, and so are follow-up calls that late.
+
+Only one worker reconciles per lease period: the others start their
+dispatchers straight away and share the repaired rows.
+"""
+
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+from sqlalchemy import or_, select, update
+
+from app.config.settings import get_settings
+from app.domain.recurrence import Recurrence
+from app.domain.reminder import Reminder, ReminderStatus
+from app.utils.time import from_pkt_to_utc, to_pkt
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Lease that lets a single worker reconcile
+RECONCILE_JOB_KEY = "schedule:reconcile"
+
+CATCH_UP_FIRE = "fire"
+CATCH_UP_SKIP = "skip"
+
+# Columns compared for each active reminder
+ROW_COLUMNS = (
+    Reminder.id,
+    Reminder.scheduled_time,
+    Reminder.recurrence,
+    Reminder.last_notified_at,
+    Reminder.next_fire_at,
+    Reminder.follow_up_at,
+)
+
+
+class ReconcileStats:
+    """What a reconciliation pass found and changed."""
+    
+    def __init__(self):
+        self.scanned = 0
+        self.pages = 0
+        self.cleared = 0
+        self.restored = 0
+        self.caught_up = 0
+        self.skipped = 0
+        self.follow_ups_dropped = 0
+        self.seconds = 0.0
+    
+    def as_dict(self) -> dict:
+        """Summary for the status endpoint."""
+        return {
+            "scanned": self.scanned,
+            "pages": self.pages,
+            "cleared": self.cleared,
+            "restored": self.restored,
+            "caught_up": self.caught_up,
+            "skipped": self.skipped,
+            "follow_ups_dropped": self.follow_ups_dropped,
+            "seconds": round(self.seconds, 2),
+        }
+
+
+class CatchUpPlan:
+    """
+    Decides the due times of one reminder at a time.
+    
+    Missed notifications kept under the "fire" policy get consecutive
+    slots 1 / rate seconds apart, starting at `now`.
+    """
+    
+    def __init__(self, now: datetime, policy: str, rate: float, max_age_seconds: int, grace_seconds: int):
+        if policy not in (CATCH_UP_FIRE, CATCH_UP_SKIP):
+            raise ValueError(f"Unknown catch-up policy: {policy!r}")
+        self.now = now
+        self.policy = policy
+        self.spacing = timedelta(seconds=1 / rate) if rate > 0 else timedelta(0)
+        self.max_age = timedelta(seconds=max_age_seconds)
+        self.overdue_after = now - timedelta(seconds=grace_seconds)
+        self.slots = 0
+    
+    def due_times(self, row, stats: ReconcileStats) -> Tuple[Optional[datetime], Optional[datetime], Optional[datetime]]:
+        """
+        Due times an active reminder should have.
+        
+        Args:
+            row: Active reminder row (ROW_COLUMNS)
+            stats: Counters updated with what was decided
+        
+        Returns:
+            (next_fire_at, follow_up_at, scheduled_time); scheduled_time is
+            only different for a recurring reminder moved past skipped
+            occurrences
+        """
+        scheduled_time = row.scheduled_time
+        lost = row.next_fire_at is None and self._lost(row)
+        fire_at = from_pkt_to_utc(scheduled_time).replace(tzinfo=None) if lost else row.next_fire_at
+        
+        if fire_at is not None and fire_at <= self.overdue_after:
+            if self.policy == CATCH_UP_FIRE and self.now - fire_at <= self.max_age:
+                fire_at = self.now + self.spacing * self.slots
+                self.slots += 1
+                stats.caught_up += 1
+            else:
+                next_time = self._next_occurrence(row)
+                fire_at = from_pkt_to_utc(next_time).replace(tzinfo=None) if next_time else None
+                scheduled_time = next_time or row.scheduled_time
+                if fire_at is not None or not lost:
+                    stats.skipped += 1
+        if lost and fire_at is not None:
+            stats.restored += 1
+        
+        follow_up_at = row.follow_up_at
+        if follow_up_at is not None and follow_up_at <= self.overdue_after:
+            if self.policy == CATCH_UP_SKIP or self.now - follow_up_at > self.max_age:
+                follow_up_at = None
+                stats.follow_ups_dropped += 1
+        
+        return fire_at, follow_up_at, scheduled_time
+    
+    def _lost(self, row) -> bool:
+        """An active reminder without a due time whose occurrence has not been sent."""
+        if row.recurrence:
+            # A fired recurring reminder always moves on to its next occurrence
+            return True
+        scheduled_utc = from_pkt_to_utc(row.scheduled_time).replace(tzinfo=None)
+        return row.last_notified_at is None or row.last_notified_at < scheduled_utc
+    
+    def _next_occurrence(self, row) -> Optional[datetime]:
+        """Next occurrence after now of a recurring reminder (naive PKT), None for one-offs."""
+        if not row.recurrence:
+            return None
+        try:
+            rule = Recurrence.from_rule(row.recurrence)
+        except ValueError as e:
+            logger.error(f"Invalid recurrence {row.recurrence!r} on reminder {row.id}: {e}")
+            return None
+        now_pkt = to_pkt(self.now.replace(tzinfo=timezone.utc)).replace(tzinfo=None)
+        return rule.next_occurrence(row.scheduled_time.replace(tzinfo=None), now_pkt)
+
+
+async def _clear_inactive(session) -> int:
+    """Drop due times left on paused and completed reminders."""
+    result = await session.execute(
+        update(Reminder)
+        .where(
+            Reminder.status != ReminderStatus.ACTIVE,
+            or_(Reminder.next_fire_at.isnot(None), Reminder.follow_up_at.isnot(None))
+        )
+        .values(next_fire_at=None, follow_up_at=None)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+async def _reconcile_page(session, after_id: Optional[str], page_size: int, plan: CatchUpPlan, stats: ReconcileStats) -> Optional[str]:
+    """
+    Compare one page of active reminders with their expected due times and
+    write the rows that differ with one executemany UPDATE.
+    
+    Returns:
+        Id of the page's last row, or None when there are no more rows
+    """
+    # Rows due in the future are already right; the database skips them during the scan
+    query = select(*ROW_COLUMNS).where(
+        Reminder.status == ReminderStatus.ACTIVE,
+        or_(
+            Reminder.next_fire_at.is_(None),
+            Reminder.next_fire_at <= plan.overdue_after,
+            Reminder.follow_up_at <= plan.overdue_after
+        )
+    )
+    if after_id is not None:
+        query = query.where(Reminder.id > after_id)
+    # Locked for the page's transaction on Postgres, so edits made meanwhile are not overwritten
+    rows = (await session.execute(query.order_by(Reminder.id).limit(page_size).with_for_update())).all()
+    if not rows:
+        return None
+    
+    changes: List[dict] = []
+    for row in rows:
+        fire_at, follow_up_at, scheduled_time = plan.due_times(row, stats)
+        if (fire_at, follow_up_at, scheduled_time) != (row.next_fire_at, row.follow_up_at, row.scheduled_time):
+            changes.append({
+                "id": row.id,
+                "next_fire_at": fire_at,
+                "follow_up_at": follow_up_at,
+                "scheduled_time": scheduled_time,
+            })
+    
+    if changes:
+        # Bulk UPDATE by primary key: one executemany for the page
+        await session.execute(update(Reminder), changes)
+    
+    stats.scanned += len(rows)
+    stats.pages += 1
+    return rows[-1].id
+
+
+async def reconcile_schedule(now: Optional[datetime] = None, claim: bool = True) -> Optional[ReconcileStats]:
+    """
+    Rebuild the due times of all reminders before the dispatcher starts.
+    
+    Every page is its own short transaction, so webhooks and the other
+    workers are never blocked for the whole pass.
+    
+    Args:
+        now: Current UTC time (defaults to now)
+        claim: Take the reconcile lease first; another worker holding it
+            means the schedule was just reconciled
+    
+    Returns:
+        What was changed, or None if another worker is reconciling
+    """
+    from app.infrastructure.database import DatabaseSession
+    from app.infrastructure.job_leases import claim_job
+    
+    if claim and not await claim_job(RECONCILE_JOB_KEY):
+        logger.info("Schedule reconciled by another worker, skipping")
+        return None
+    
+    started = time.perf_counter()
+    stats = ReconcileStats()
+    plan = CatchUpPlan(
+        now=now or datetime.utcnow(),
+        policy=settings.scheduler_catch_up_policy,
+        rate=settings.scheduler_catch_up_rate,
+        max_age_seconds=settings.scheduler_catch_up_max_age_seconds,
+        grace_seconds=settings.scheduler_catch_up_grace_seconds
+    )
+    
+    async with DatabaseSession() as session:
+        stats.cleared = await _clear_inactive(session)
+        await session.commit()
+    
+    after_id = None
+    while True:
+        async with DatabaseSession() as session:
+            after_id = await _reconcile_page(session, after_id, settings.scheduler_reconcile_page_size, plan, stats)
+            await session.commit()
+        if after_id is None:
+            break
+    
+    stats.seconds = time.perf_counter() - started
+    logger.info(
+        f"Reconciled {stats.scanned} active reminders in {stats.seconds:.2f}s: "
+        f"{stats.restored} restored, {stats.cleared} cleared, {stats.caught_up} caught up, "
+        f"{stats.skipped} skipped, {stats.follow_ups_dropped} follow-ups dropped"
+    )
+    return stats
@@ -0,0 +1,320 @@
+"""
+Cache for LLM intent-parsing results.
+
+Identical phrasings ("remind me to drink water in 1 hour") are common, so
+the structured JSON returned by GPT is cached under the normalized message,
+the quoted context and a coarse time bucket. The bucket keeps day-relative
+answers ("tomorrow", "tonight") from outliving the moment they were computed
+for; callers only use a cached result when scheduled_time is recomputed
+locally from the message or GPT returned none.
+
+Two backends are available: an in-process LRU and a SQLite file that
+survives restarts. Both evict by TTL and by a total size cap in bytes; the
+application sets the TTL to the bucket width, since a key stops matching
+once its bucket has passed.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Optional, Tuple
+
+from app.config.settings import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Messages that lean on conversation history resolve differently each time
+_CONTEXT_DEPENDENT_RE = re.compile(r"\b(it|that|this|these|those|them|same|again|above|previous|last one)\b")
+
+
+def normalize_message(text: Optional[str]) -> str:
+    """Lowercase, collapse whitespace and strip surrounding punctuation."""
+    if not text:
+        return ""
+    return " ".join(text.lower().split()).strip(" .!?,")
+
+
+def is_cacheable(message: str) -> bool:
+    """Whether a message's meaning is independent of conversation history."""
+    normalized = normalize_message(message)
+    return bool(normalized) and not _CONTEXT_DEPENDENT_RE.search(normalized)
+
+
+class MemoryCacheBackend:
+    """In-process LRU with per-entry expiry and a total byte cap."""
+    
+    def __init__(self, max_bytes: int, ttl_seconds: float, clock: Callable[[], float] = time.time):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()  # key -> (value, expiry)
+        self.size_bytes = 0
+        self.evictions = 0
+    
+    @staticmethod
+    def _entry_size(key: str, value: str) -> int:
+        return len(key.encode("utf-8")) + len(value.encode("utf-8"))
+    
+    def _remove(self, key: str) -> None:
+        value, _ = self._entries.pop(key)
+        self.size_bytes -= self._entry_size(key, value)
+    
+    async def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        
+        value, expires_at = entry
+        if expires_at <= self.clock():
+            self._remove(key)
+            return None
+        
+        self._entries.move_to_end(key)
+        return value
+    
+    async def set(self, key: str, value: str) -> None:
+        size = self._entry_size(key, value)
+        if size > self.max_bytes:
+            return  # Would evict everything else
+        
+        if key in self._entries:
+            self._remove(key)
+        
+        self._entries[key] = (value, self.clock() + self.ttl_seconds)
+        self.size_bytes += size
+        
+        while self.size_bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+    
+    async def close(self) -> None:
+        self._entries.clear()
+        self.size_bytes = 0
+    
+    def stats(self) -> dict:
+        return {
+            "backend": "memory",
+            "entries": len(self._entries),
+            "size_bytes": self.size_bytes,
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions,
+        }
+
+
+class SQLiteCacheBackend:
+    """
+    Cache table in its own SQLite file so entries survive restarts.
+    
+    The file is separate from the application database so cache writes never
+    share a connection (or a transaction) with request processing. Queries
+    run in a worker thread to keep the event loop free.
+    """
+    
+    def __init__(self, path: str, max_bytes: int, ttl_seconds: float, clock: Callable[[], float] = time.time):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self.evictions = 0
+        self._lock = asyncio.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_response_cache ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " expires_at REAL NOT NULL,"
+            " last_used_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS ix_llm_response_cache_last_used ON llm_response_cache (last_used_at)"
+        )
+    
+    def _get(self, key: str) -> Optional[str]:
+        now = self.clock()
+        row = self._conn.execute(
+            "SELECT value, expires_at FROM llm_response_cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        
+        value, expires_at = row
+        if expires_at <= now:
+            self._conn.execute("DELETE FROM llm_response_cache WHERE key = ?", (key,))
+            return None
+        
+        self._conn.execute("UPDATE llm_response_cache SET last_used_at = ? WHERE key = ?", (now, key))
+        return value
+    
+    def _set(self, key: str, value: str) -> None:
+        now = self.clock()
+        size = len(key.encode("utf-8")) + len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        
+        with self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_response_cache (key, value, size, expires_at, last_used_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, now + self.ttl_seconds, now)
+            )
+            self._conn.execute("DELETE FROM llm_response_cache WHERE expires_at <= ?", (now,))
+            
+            total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_response_cache").fetchone()[0]
+            if total > self.max_bytes:
+                # Walk least recently used entries until enough bytes are freed
+                excess = total - self.max_bytes
+                victims = []
+                for victim_key, victim_size in self._conn.execute(
+                    "SELECT key, size FROM llm_response_cache ORDER BY last_used_at"
+                ):
+                    if excess <= 0:
+                        break
+                    victims.append((victim_key,))
+                    excess -= victim_size
+                self._conn.executemany("DELETE FROM llm_response_cache WHERE key = ?", victims)
+                self.evictions += len(victims)
+    
+    def _stats(self) -> Tuple[int, int]:
+        return self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_response_cache"
+        ).fetchone()
+    
+    async def get(self, key: str) -> Optional[str]:
+        async with self._lock:
+            return await asyncio.to_thread(self._get, key)
+    
+    async def set(self, key: str, value: str) -> None:
+        async with self._lock:
+            await asyncio.to_thread(self._set, key, value)
+    
+    async def close(self) -> None:
+        self._conn.close()
+    
+    def stats(self) -> dict:
+        entries, size_bytes = self._stats()
+        return {
+            "backend": "sqlite",
+            "path": self.path,
+            "entries": entries,
+            "size_bytes": size_bytes,
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions,
+        }
+
+
+class ResponseCache:
+    """Keyed cache of LLM parse results with hit/miss accounting."""
+    
+    def __init__(self, backend, bucket_seconds: int):
+        self.backend = backend
+        self.bucket_seconds = bucket_seconds
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.skipped = 0
+    
+    def make_key(self, message: str, quoted_message: Optional[str], now: datetime) -> str:
+        """
+        Build the cache key for a message.
+        
+        Args:
+            message: The user's message text
+            quoted_message: Quoted/replied-to message, if any
+            now: Current time (selects the time bucket)
+        
+        Returns:
+            Hex digest identifying (message, quoted context, time bucket)
+        """
+        bucket = int(now.timestamp() // self.bucket_seconds)
+        material = json.dumps(
+            [normalize_message(message), normalize_message(quoted_message), bucket],
+            ensure_ascii=False
+        )
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+    
+    async def get(self, key: str) -> Optional[str]:
+        """Look up a cached JSON result, counting a hit or a miss."""
+        try:
+            value = await self.backend.get(key)
+        except Exception as e:
+            logger.warning(f"Response cache lookup failed: {e}")
+            value = None
+        
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+    
+    async def set(self, key: str, value: str) -> None:
+        """Store a JSON result (failures are logged, never raised)."""
+        try:
+            await self.backend.set(key, value)
+            self.stores += 1
+        except Exception as e:
+            logger.warning(f"Response cache store failed: {e}")
+    
+    def skip(self) -> None:
+        """Count a message that bypassed the cache."""
+        self.skipped += 1
+    
+    async def close(self) -> None:
+        await self.backend.close()
+    
+    def stats(self) -> dict:
+        """Hit rate plus backend size and evictions."""
+        lookups = self.hits + self.misses
+        stats = {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "skipped": self.skipped,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "bucket_seconds": self.bucket_seconds,
+        }
+        stats.update(self.backend.stats())
+        return stats
+
+
+# Global cache instance
+response_cache: Optional[ResponseCache] = None
+
+
+def get_response_cache() -> ResponseCache:
+    """Get or create the LLM response cache using the configured backend."""
+    global response_cache
+    
+    if response_cache is None:
+        # A key stops matching when its bucket ends, so entries live no longer
+        if settings.llm_cache_backend == "sqlite":
+            backend = SQLiteCacheBackend(
+                path=settings.llm_cache_path,
+                max_bytes=settings.llm_cache_max_bytes,
+                ttl_seconds=settings.llm_cache_bucket_seconds
+            )
+        else:
+            backend = MemoryCacheBackend(
+                max_bytes=settings.llm_cache_max_bytes,
+                ttl_seconds=settings.llm_cache_bucket_seconds
+            )
+        response_cache = ResponseCache(backend, bucket_seconds=settings.llm_cache_bucket_seconds)
+    
+    return response_cache
+
+
+async def close_response_cache() -> None:
+    """Close the cache backend (called on application shutdown)."""
+    global response_cache
+    if response_cache is not None:
+        await response_cache.close()
+        response_cache = None
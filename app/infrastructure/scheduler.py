@@ -1,212 +1,586 @@
 """
-APScheduler setup with persistent job store for reminder scheduling.
+Reminder scheduling through a due-index dispatcher.
+
+A reminder's next notification time is stored on its row (next_fire_at,
+UTC) and so is a pending follow-up check (follow_up_at). Each process runs
+a dispatcher that reads the earliest due rows through the indexes on those
+columns, fires them in batches and sleeps until the next one is due, so
+scheduling state costs nothing beyond the reminders table and the
+dispatcher only ever holds one batch in memory.
+
+A batch of notifications is delivered as a unit: one transaction claims
+its leases, one query loads the owners, the messages go out through a pool
+of scheduler_delivery_concurrency concurrent sends, and one UPDATE writes
+last_notified_at and follow-up times for the whole batch.
+
+Recurring reminders keep a single row: when an occurrence fires, the same
+UPDATE moves scheduled_time and next_fire_at to the next occurrence of the
+rule (see app.domain.recurrence).
+
+Every Uvicorn worker runs a dispatcher over the same table, so a due row
+can be picked up by more than one process. Job functions therefore claim a
+lease on the firing before doing anything (see app.infrastructure.job_leases):
+exactly one worker sends a reminder or places a call, the others skip it.
 """
 
+import asyncio
 import logging
-from datetime import datetime, timedelta
-from typing import Optional
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Deque, Dict, List, Mapping, Optional, Sequence, Set
 
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
-from apscheduler.triggers.date import DateTrigger
+from sqlalchemy import case, false, null, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config.settings import get_settings
-from app.utils.time import to_pkt, from_pkt_to_utc
+from app.domain.recurrence import Recurrence
+from app.domain.reminder import Reminder, ReminderStatus
+from app.infrastructure.metrics import REMINDER_LATENESS, record_error
+from app.utils.time import from_pkt_to_utc, to_pkt
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
-# Global scheduler instance
-scheduler: Optional[AsyncIOScheduler] = None
+# Wait before re-checking rows that are overdue but claimed by another worker
+OVERDUE_RECHECK_SECONDS = 1.0
 
+# Recent lateness samples kept for percentiles
+LATENESS_SAMPLES = 10000
 
-def get_scheduler() -> AsyncIOScheduler:
-    """Get or create the scheduler instance."""
-    global scheduler
+
+class DeliveryStats:
+    """Throughput and lateness of delivered reminder notifications."""
     
-    if scheduler is None:
-        # Use SQLite for persistent job storage
-        jobstores = {
-            'default': SQLAlchemyJobStore(url='sqlite:///jobs.db')
+    def __init__(self):
+        self.delivered = 0
+        self.failed = 0
+        self.batches = 0
+        self.busy_seconds = 0.0
+        self.last_batch_size = 0
+        self.last_batch_seconds = 0.0
+        self.lateness: Deque[float] = deque(maxlen=LATENESS_SAMPLES)
+    
+    def observe_batch(self, delivered: int, failed: int, seconds: float, lateness: Sequence[float]) -> None:
+        """Record one delivered batch."""
+        self.delivered += delivered
+        self.failed += failed
+        self.batches += 1
+        self.busy_seconds += seconds
+        self.last_batch_size = delivered + failed
+        self.last_batch_seconds = seconds
+        self.lateness.extend(lateness)
+    
+    def lateness_percentile(self, q: float) -> float:
+        """Lateness in seconds at quantile q (0-1) over recent deliveries."""
+        if not self.lateness:
+            return 0.0
+        ordered = sorted(self.lateness)
+        return ordered[min(int(len(ordered) * q), len(ordered) - 1)]
+    
+    def throughput(self) -> float:
+        """Reminders delivered per second of delivery time."""
+        return self.delivered / self.busy_seconds if self.busy_seconds else 0.0
+    
+    def as_dict(self) -> dict:
+        """Summary for the status endpoint."""
+        return {
+            "delivered": self.delivered,
+            "failed": self.failed,
+            "batches": self.batches,
+            "throughput_per_second": round(self.throughput(), 1),
+            "last_batch_size": self.last_batch_size,
+            "last_batch_ms": round(self.last_batch_seconds * 1000, 1),
+            "lateness_p50_ms": round(self.lateness_percentile(0.50) * 1000, 1),
+            "lateness_p99_ms": round(self.lateness_percentile(0.99) * 1000, 1),
         }
+
+
+class ReminderDispatcher:
+    """Fires due reminder notifications and follow-ups from the reminders table."""
+    
+    def __init__(self, batch_size: int, poll_seconds: float, concurrency: int):
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        self.concurrency = concurrency
+        self.task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self._outbound = asyncio.Semaphore(concurrency)
+        self.delivery = DeliveryStats()
+        self.follow_ups_fired = 0
+        self.reconciliation: Optional[dict] = None
+    
+    @property
+    def running(self) -> bool:
+        return self.task is not None and not self.task.done()
+    
+    def start(self) -> None:
+        """Start the dispatch loop on the running event loop."""
+        if self.running:
+            return
+        self.task = asyncio.create_task(self._run(), name="reminder-dispatcher")
+        logger.info(f"Reminder dispatcher started (batch size {self.batch_size}, concurrency {self.concurrency})")
+    
+    async def stop(self) -> None:
+        """Cancel the dispatch loop. Rows still due are fired after the next start."""
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+    
+    def wake(self) -> None:
+        """Re-check due times now (a reminder was scheduled in this process)."""
+        self._wakeup.set()
+    
+    async def _run(self) -> None:
+        """Fire due rows, then sleep until the next is due or wake() is called."""
+        while True:
+            self._wakeup.clear()
+            try:
+                delay = 0.0 if await self.dispatch_due() else await self._seconds_until_next_due()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception(f"Reminder dispatcher error: {e}")
+                delay = self.poll_seconds
+            
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+    
+    async def dispatch_due(self, now: Optional[datetime] = None) -> bool:
+        """
+        Fire one batch of due notifications and one batch of due follow-ups.
+        
+        Args:
+            now: Current UTC time (defaults to now)
+        
+        Returns:
+            True if a full batch made progress, i.e. more rows may be due
+        """
+        now = now or datetime.utcnow()
+        
+        notifications = await self._due(Reminder.next_fire_at, now)
+        delivered = await self._deliver_notifications(notifications, now)
+        
+        follow_ups = await self._due(Reminder.follow_up_at, now)
+        checked = await self._run_follow_ups(follow_ups, now)
+        
+        return (
+            (len(notifications) == self.batch_size and delivered > 0)
+            or (len(follow_ups) == self.batch_size and checked > 0)
+        )
+    
+    async def _due(self, column, now: datetime) -> List[Reminder]:
+        """The earliest rows due on a schedule column, at most one batch."""
+        from app.infrastructure.database import DatabaseSession
+        
+        async with DatabaseSession() as session:
+            result = await session.execute(
+                select(Reminder)
+                .where(column <= now)
+                .order_by(column)
+                .limit(self.batch_size)
+            )
+            return list(result.scalars().all())
+    
+    async def _deliver_notifications(self, batch: List[Reminder], now: datetime) -> int:
+        """
+        Deliver a batch of due notifications.
+        
+        Leases for the whole batch are claimed in one transaction, owners are
+        loaded in one query, messages go out through the bounded outbound
+        pool, and the results are written back with a single UPDATE that is
+        committed together with the lease completions (see _commit_batch).
+        
+        Returns:
+            Number of notifications this process claimed
+        """
+        from app.infrastructure.database import DatabaseSession
+        from app.infrastructure.job_leases import claim_jobs
+        from app.domain.user import get_reminder_owners
+        from app.infrastructure.twilio_whatsapp import send_reminder_notification as send_notification
+        
+        if not batch:
+            return 0
+        
+        started = time.perf_counter()
+        active = [r for r in batch if r.status == ReminderStatus.ACTIVE]
+        keys = {r.id: f"reminder:{r.id}:{r.next_fire_at.isoformat()}" for r in active}
+        try:
+            claimed_keys = await claim_jobs(list(keys.values()))
+        except Exception as e:
+            logger.exception(f"Error claiming reminder batch: {e}")
+            return 0
+        claimed = [r for r in active if keys[r.id] in claimed_keys]
+        
+        async with DatabaseSession() as session:
+            owners = await get_reminder_owners(session, [r.id for r in claimed])
+        
+        lateness: List[float] = []
         
-        scheduler = AsyncIOScheduler(
-            jobstores=jobstores,
-            timezone='Asia/Karachi'
+        async def deliver(reminder: Reminder) -> bool:
+            owner = owners.get(reminder.id)
+            async with self._outbound:
+                try:
+                    delivered = await send_notification(
+                        reminder_title=reminder.title,
+                        reminder_description=reminder.description,
+                        to_number=owner.whatsapp_number if owner else None
+                    )
+                except Exception as e:
+                    record_error("reminder", e)
+                    logger.exception(f"Error sending reminder notification {reminder.id}: {e}")
+                    return False
+            if not delivered:
+                # Twilio rejected it after retries (already logged and counted by the sender)
+                logger.error(f"Reminder notification {reminder.id} was not delivered")
+                return False
+            late = (datetime.utcnow() - reminder.next_fire_at).total_seconds()
+            lateness.append(late)
+            REMINDER_LATENESS.observe(late)
+            return True
+        
+        results = await asyncio.gather(*(deliver(r) for r in claimed))
+        sent = [r for r, ok in zip(claimed, results) if ok]
+        
+        # Inactive rows are cleared without being sent; recurring ones move on
+        # to their next occurrence whether or not this one was delivered
+        advanced = {}
+        for reminder in claimed:
+            next_time = next_occurrence(reminder, now)
+            if next_time is not None:
+                advanced[reminder.id] = next_time
+        fired = claimed + [r for r in batch if r.status != ReminderStatus.ACTIVE]
+        
+        async def record(session: AsyncSession, rows: Sequence[Reminder]) -> None:
+            ids = {r.id for r in rows}
+            await _record_deliveries(
+                session,
+                [r.id for r in rows],
+                [r for r in sent if r.id in ids],
+                now,
+                {reminder_id: t for reminder_id, t in advanced.items() if reminder_id in ids}
+            )
+        
+        if fired:
+            await _commit_batch(fired, keys, record, {r.id for r in sent}, "reminder")
+        
+        if claimed:
+            elapsed = time.perf_counter() - started
+            self.delivery.observe_batch(len(sent), len(claimed) - len(sent), elapsed, lateness)
+            logger.info(f"Delivered {len(sent)}/{len(claimed)} reminders in {elapsed:.2f}s")
+        return len(claimed)
+    
+    async def _run_follow_ups(self, batch: List[Reminder], now: datetime) -> int:
+        """
+        Run a batch of due follow-up checks through the outbound pool.
+        
+        Like notifications, the batch's leases are claimed in one
+        transaction, and clearing follow_up_at is committed together with
+        the lease completions, so a follow-up is either done or still due
+        with a lease that expires and lets it be retried. A follow-up is done
+        once its call has been placed, so a call dropped by the call
+        dispatcher (queue full, shutdown) leaves it due.
+        
+        Returns:
+            Number of follow-ups this process claimed
+        """
+        from app.infrastructure.job_leases import claim_jobs
+        from app.infrastructure.twilio_calls import CallDropped
+        
+        if not batch:
+            return 0
+        
+        keys = {r.id: f"followup:{r.id}:{r.follow_up_at.isoformat()}" for r in batch}
+        try:
+            claimed_keys = await claim_jobs(list(keys.values()))
+        except Exception as e:
+            logger.exception(f"Error claiming follow-up batch: {e}")
+            return 0
+        claimed = [r for r in batch if keys[r.id] in claimed_keys]
+        
+        async def run(reminder: Reminder) -> Optional[bool]:
+            async with self._outbound:
+                try:
+                    return await check_response_and_call(reminder.id, reminder.title)
+                except CallDropped as e:
+                    # Lease stays open and expires, so the follow-up is retried
+                    logger.warning(f"Follow-up call for {reminder.id} was not placed: {e}")
+                    return None
+        
+        results = await asyncio.gather(*(run(r) for r in claimed))
+        finished = [r for r, placed in zip(claimed, results) if placed is not None]
+        called = {r.id for r, placed in zip(claimed, results) if placed}
+        
+        async def clear(session: AsyncSession, rows: Sequence[Reminder]) -> None:
+            await session.execute(
+                update(Reminder)
+                .where(Reminder.id.in_([r.id for r in rows]))
+                .values(follow_up_at=case((Reminder.follow_up_at <= now, null()), else_=Reminder.follow_up_at))
+                .execution_options(synchronize_session=False)
+            )
+        
+        if finished:
+            await _commit_batch(finished, keys, clear, called, "follow-up")
+        self.follow_ups_fired += len(finished)
+        return len(claimed)
+    
+    async def _seconds_until_next_due(self) -> float:
+        """How long to sleep: until the earliest due row, at most poll_seconds."""
+        from app.infrastructure.database import DatabaseSession
+        
+        async with DatabaseSession() as session:
+            due_times = []
+            for column in (Reminder.next_fire_at, Reminder.follow_up_at):
+                result = await session.execute(
+                    select(column).where(column.isnot(None)).order_by(column).limit(1)
+                )
+                due_times.extend(result.scalars().all())
+        
+        if not due_times:
+            return self.poll_seconds
+        
+        delay = (min(due_times) - datetime.utcnow()).total_seconds()
+        if delay <= 0:
+            # Still due after our batch: another worker is firing it
+            return OVERDUE_RECHECK_SECONDS
+        return min(delay, self.poll_seconds)
+    
+    async def status(self) -> dict:
+        """Dispatcher counters, delivery metrics and the next due notifications."""
+        from app.infrastructure.database import DatabaseSession
+        
+        async with DatabaseSession() as session:
+            result = await session.execute(
+                select(Reminder.id, Reminder.title, Reminder.next_fire_at)
+                .where(Reminder.next_fire_at.isnot(None))
+                .order_by(Reminder.next_fire_at)
+                .limit(20)
+            )
+            upcoming = [
+                {"id": reminder_id, "name": title, "next_run": f"{next_fire_at.isoformat()}Z"}
+                for reminder_id, title, next_fire_at in result.all()
+            ]
+        
+        return {
+            "running": self.running,
+            "batch_size": self.batch_size,
+            "concurrency": self.concurrency,
+            "delivery": self.delivery.as_dict(),
+            "follow_ups_fired": self.follow_ups_fired,
+            "reconciliation": self.reconciliation,
+            "jobs_count": len(upcoming),
+            "jobs": upcoming,
+        }
+
+
+# Global dispatcher instance
+scheduler: Optional[ReminderDispatcher] = None
+
+
+def get_scheduler() -> ReminderDispatcher:
+    """Get or create the dispatcher instance."""
+    global scheduler
+    
+    if scheduler is None:
+        scheduler = ReminderDispatcher(
+            batch_size=settings.scheduler_batch_size,
+            poll_seconds=settings.scheduler_poll_seconds,
+            concurrency=settings.scheduler_delivery_concurrency
         )
     
     return scheduler
 
 
 async def start_scheduler() -> None:
-    """Start the scheduler."""
-    sched = get_scheduler()
-    if not sched.running:
-        sched.start()
-        logger.info("Scheduler started")
+    """Reconcile the schedule with the reminders table, then start the dispatcher."""
+    from app.infrastructure.job_leases import purge_completed_leases
+    from app.infrastructure.reconciliation import reconcile_schedule
+    
+    purged = await purge_completed_leases()
+    if purged:
+        logger.info(f"Purged {purged} completed job leases")
+    
+    dispatcher = get_scheduler()
+    try:
+        stats = await reconcile_schedule()
+        if stats is not None:
+            dispatcher.reconciliation = stats.as_dict()
+    except Exception as e:
+        # The dispatcher still fires whatever is due on the rows
+        logger.exception(f"Schedule reconciliation failed: {e}")
+    
+    dispatcher.start()
 
 
 async def stop_scheduler() -> None:
-    """Stop the scheduler gracefully."""
-    global scheduler
-    if scheduler and scheduler.running:
-        scheduler.shutdown(wait=True)
+    """Stop the dispatcher gracefully."""
+    if scheduler is not None and scheduler.running:
+        await scheduler.stop()
         logger.info("Scheduler stopped")
 
 
-async def schedule_reminder(reminder) -> None:
-    """
-    Schedule a reminder notification.
-    
-    Args:
-        reminder: Reminder model instance
+def next_occurrence(reminder: Reminder, now: datetime) -> Optional[datetime]:
     """
-    from app.domain.reminder import ReminderStatus
-    
-    if reminder.status != ReminderStatus.ACTIVE:
-        logger.info(f"Skipping scheduling for non-active reminder: {reminder.id}")
-        return
-    
-    sched = get_scheduler()
+    Next occurrence of a recurring reminder after `now`.
     
-    # Schedule the main reminder notification
-    job_id = f"reminder_{reminder.id}"
+    When a snoozed firing comes due while scheduled_time already holds a
+    later occurrence, that occurrence is kept.
     
-    # Convert to PKT-aware datetime
-    scheduled_time = to_pkt(reminder.scheduled_time)
+    Args:
+        reminder: Reminder whose scheduled_time has come due
+        now: Current time (naive UTC)
     
+    Returns:
+        Next scheduled_time (naive PKT), or None for one-off reminders and
+        invalid rules (the reminder then fires once, without holding up its batch)
+    """
+    if not reminder.recurrence:
+        return None
+    now_pkt = to_pkt(now.replace(tzinfo=timezone.utc)).replace(tzinfo=None)
     try:
-        sched.add_job(
-            send_reminder_notification,
-            trigger=DateTrigger(run_date=scheduled_time),
-            id=job_id,
-            replace_existing=True,
-            kwargs={
-                'reminder_id': reminder.id,
-                'title': reminder.title,
-                'description': reminder.description,
-                'follow_up_minutes': reminder.follow_up_minutes,
-                'call_if_no_response': reminder.call_if_no_response,
-                'call_opt_out': reminder.call_opt_out
-            }
-        )
-        logger.info(f"Scheduled reminder {job_id} for {scheduled_time}")
-    except Exception as e:
-        logger.exception(f"Failed to schedule reminder {reminder.id}: {e}")
+        rule = Recurrence.from_rule(reminder.recurrence)
+        return rule.next_occurrence(reminder.scheduled_time.replace(tzinfo=None), now_pkt)
+    except ValueError as e:
+        logger.error(f"Invalid recurrence {reminder.recurrence!r} on reminder {reminder.id}: {e}")
+        return None
 
 
-async def cancel_reminder_jobs(reminder_id: str) -> None:
+async def _record_deliveries(
+    session: AsyncSession,
+    reminder_ids: Sequence[str],
+    sent: Sequence[Reminder],
+    now: datetime,
+    advanced: Optional[Mapping[str, datetime]] = None
+) -> None:
     """
-    Cancel all jobs associated with a reminder.
+    Write a delivered batch back with one UPDATE.
+    
+    Clears next_fire_at on every fired row (unless it was rescheduled past
+    `now` meanwhile) or, for recurring rows, moves it and scheduled_time to
+    the next occurrence; marks the sent rows notified and sets their
+    follow-up due times.
     
     Args:
-        reminder_id: The reminder's ID
+        session: Database session, committed by the caller
+        reminder_ids: Rows fired in this batch
+        sent: Reminders whose notification went out
+        now: Time the batch was read
+        advanced: Next occurrence (naive PKT) of fired recurring reminders
     """
-    sched = get_scheduler()
+    notified_at = datetime.utcnow()
+    sent_ids = [r.id for r in sent]
+    follow_ups = {
+        r.id: notified_at + timedelta(minutes=r.follow_up_minutes)
+        for r in sent
+        if r.follow_up_minutes and r.call_if_no_response and not r.call_opt_out
+    }
     
-    job_ids = [
-        f"reminder_{reminder_id}",
-        f"followup_{reminder_id}",
-        f"call_{reminder_id}"
-    ]
+    values = {"next_fire_at": case((Reminder.next_fire_at <= now, null()), else_=Reminder.next_fire_at)}
+    if advanced:
+        fire_at: Dict[str, datetime] = {
+            reminder_id: from_pkt_to_utc(next_time).replace(tzinfo=None)
+            for reminder_id, next_time in advanced.items()
+        }
+        values["next_fire_at"] = case(
+            (Reminder.next_fire_at > now, Reminder.next_fire_at),
+            else_=case(fire_at, value=Reminder.id, else_=null())
+        )
+        values["scheduled_time"] = case(
+            (Reminder.next_fire_at > now, Reminder.scheduled_time),
+            else_=case(dict(advanced), value=Reminder.id, else_=Reminder.scheduled_time)
+        )
+    if sent_ids:
+        values["last_notified_at"] = case((Reminder.id.in_(sent_ids), notified_at), else_=Reminder.last_notified_at)
+        values["user_responded"] = case((Reminder.id.in_(sent_ids), false()), else_=Reminder.user_responded)
+    if follow_ups:
+        values["follow_up_at"] = case(follow_ups, value=Reminder.id, else_=Reminder.follow_up_at)
     
-    for job_id in job_ids:
-        try:
-            sched.remove_job(job_id)
-            logger.info(f"Cancelled job: {job_id}")
-        except Exception:
-            pass  # Job might not exist
-
-
-async def send_reminder_notification(
-    reminder_id: str,
-    title: str,
-    description: Optional[str],
-    follow_up_minutes: Optional[int],
-    call_if_no_response: bool,
-    call_opt_out: bool
-) -> None:
+    await session.execute(
+        update(Reminder)
+        .where(Reminder.id.in_(reminder_ids))
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def due_time(reminder, fire_time: Optional[datetime] = None) -> Optional[datetime]:
     """
-    Send a reminder notification to the user.
+    UTC due time of a reminder's next notification.
+    
+    Args:
+        reminder: Reminder model instance
+        fire_time: PKT time of the notification when it is not scheduled_time
+            (a snoozed occurrence of a recurring reminder)
     
-    This function is called by the scheduler at the scheduled time.
+    Returns:
+        Naive UTC time, or None for reminders that are not active
     """
-    from app.infrastructure.twilio_whatsapp import send_reminder_notification as send_notification
-    from app.infrastructure.database import DatabaseSession
-    from app.usecases.reminder_service import ReminderService
+    if reminder.status != ReminderStatus.ACTIVE:
+        return None
+    # scheduled_time is PKT; due times are naive UTC
+    return from_pkt_to_utc(fire_time or reminder.scheduled_time).replace(tzinfo=None)
+
+
+def set_due(reminder, fire_time: Optional[datetime] = None) -> None:
+    """
+    Schedule a reminder on its row, in the caller's transaction.
     
-    logger.info(f"Sending reminder notification: {reminder_id} - {title}")
+    The due time is written by the same flush as the rest of the change,
+    so a committed reminder always carries its schedule and a rolled back
+    one leaves none behind. Call wake_dispatcher() after the commit.
     
-    try:
-        # Send the WhatsApp notification
-        await send_notification(
-            reminder_title=title,
-            reminder_description=description
-        )
-        
-        # Mark as notified in database
-        async with DatabaseSession() as session:
-            service = ReminderService(session)
-            await service.mark_reminder_notified(reminder_id)
-        
-        # Schedule follow-up if needed
-        if follow_up_minutes and call_if_no_response and not call_opt_out:
-            await schedule_follow_up(
-                reminder_id=reminder_id,
-                title=title,
-                follow_up_minutes=follow_up_minutes
-            )
-    except Exception as e:
-        logger.exception(f"Error sending reminder notification: {e}")
+    Args:
+        reminder: Reminder model instance (attached to the caller's session)
+        fire_time: PKT time of the notification when it is not scheduled_time
+    """
+    reminder.next_fire_at = due_time(reminder, fire_time)
+    reminder.follow_up_at = None
 
 
-async def schedule_follow_up(
-    reminder_id: str,
-    title: str,
-    follow_up_minutes: int
-) -> None:
+def clear_due(reminder, follow_up_only: bool = False) -> None:
     """
-    Schedule a follow-up check after the specified minutes.
+    Cancel the pending follow-up and, unless follow_up_only, the pending
+    notification of a reminder, in the caller's transaction.
     
     Args:
-        reminder_id: The reminder's ID
-        title: Reminder title for call message
-        follow_up_minutes: Minutes to wait before follow-up
+        reminder: Reminder model instance (attached to the caller's session)
+        follow_up_only: Keep the next notification (an acknowledged
+            recurring reminder)
     """
-    from app.utils.time import get_current_time_pkt
-    
-    sched = get_scheduler()
-    
-    follow_up_time = get_current_time_pkt() + timedelta(minutes=follow_up_minutes)
-    job_id = f"followup_{reminder_id}"
-    
-    try:
-        sched.add_job(
-            check_response_and_call,
-            trigger=DateTrigger(run_date=follow_up_time),
-            id=job_id,
-            replace_existing=True,
-            kwargs={
-                'reminder_id': reminder_id,
-                'title': title
-            }
-        )
-        logger.info(f"Scheduled follow-up {job_id} for {follow_up_time}")
-    except Exception as e:
-        logger.exception(f"Failed to schedule follow-up: {e}")
+    if not follow_up_only:
+        reminder.next_fire_at = None
+    reminder.follow_up_at = None
+
 
+async def wake_dispatcher() -> None:
+    """Let this process's dispatcher see newly committed due times now."""
+    get_scheduler().wake()
 
-async def check_response_and_call(reminder_id: str, title: str) -> None:
+
+async def check_response_and_call(reminder_id: str, title: str) -> bool:
     """
     Check if user responded and trigger call if not.
     
+    The caller holds the follow-up's lease and records the outcome.
+    
     Args:
         reminder_id: The reminder's ID
         title: Reminder title for call message
+    
+    Returns:
+        True if a call was placed
+    
+    Raises:
+        CallDropped: The call was never attempted and should be retried
     """
     from app.infrastructure.database import DatabaseSession
+    from app.domain.user import get_reminder_owner
     from app.usecases.reminder_service import ReminderService
-    from app.infrastructure.twilio_calls import make_reminder_call
+    from app.infrastructure.twilio_calls import CallDropped, make_reminder_call
     
     logger.info(f"Checking response for reminder: {reminder_id}")
     
@@ -214,11 +588,71 @@ async def check_response_and_call(reminder_id: str, title: str) -> None:
         async with DatabaseSession() as session:
             service = ReminderService(session)
             responded = await service.check_user_responded(reminder_id)
+            owner = await get_reminder_owner(session, reminder_id)
         
-        if not responded:
-            logger.info(f"User did not respond to {reminder_id}, initiating call")
-            await make_reminder_call(title)
-        else:
+        if responded:
             logger.info(f"User already responded to {reminder_id}, skipping call")
+        elif owner is not None and owner.call_opt_out:
+            logger.info(f"User {owner.id} opted out of calls, skipping call for {reminder_id}")
+        else:
+            logger.info(f"User did not respond to {reminder_id}, initiating call")
+            return await make_reminder_call(title, to_number=owner.phone_number if owner else None)
+    except CallDropped:
+        raise
     except Exception as e:
         logger.exception(f"Error checking response: {e}")
+    
+    return False
+
+
+async def _commit_batch(
+    rows: Sequence[Reminder],
+    job_keys: Mapping[str, str],
+    write: Callable[[AsyncSession, Sequence[Reminder]], Awaitable[None]],
+    delivered_ids: Set[str],
+    label: str
+) -> None:
+    """
+    Write fired rows back and complete their leases in one transaction.
+    
+    If that transaction fails, each row is written in its own, so one bad
+    row does not hold back the rest. A row that still cannot be written
+    keeps its lease, which expires and lets the firing be retried - unless
+    its message or call already went out: then the lease is completed on
+    its own, so a bookkeeping failure never sends anything twice.
+    
+    Args:
+        rows: Fired rows
+        job_keys: Lease key by reminder id (rows fired without a lease have none)
+        write: Writes the given rows in a session, without committing
+        delivered_ids: Rows whose message or call went out
+        label: Kind of firing, for log messages
+    """
+    from app.infrastructure.database import DatabaseSession
+    from app.infrastructure.job_leases import complete_jobs
+    
+    async def commit(group: Sequence[Reminder], complete: bool = True) -> None:
+        async with DatabaseSession() as session:
+            if complete:
+                await write(session, group)
+            await complete_jobs(session, [job_keys[r.id] for r in group if r.id in job_keys])
+            await session.commit()
+    
+    try:
+        await commit(rows)
+        return
+    except Exception as e:
+        logger.exception(f"Error recording {label} batch, retrying row by row: {e}")
+    
+    for reminder in rows:
+        try:
+            await commit([reminder])
+            continue
+        except Exception as e:
+            logger.exception(f"Error recording {label} {reminder.id}: {e}")
+        if reminder.id in delivered_ids and reminder.id in job_keys:
+            try:
+                await commit([reminder], complete=False)
+                logger.error(f"Completed the lease of {label} {reminder.id} without its row so it is not sent again")
+            except Exception as e:
+                logger.exception(f"Error completing the lease of {label} {reminder.id}: {e}")
@@ -0,0 +1,195 @@
+"""
+Ranked title search over a user's active and paused reminders.
+
+Most users have a handful of reminders: their titles are read through the
+user_id-leading index and matched in memory, which never touches another
+user's rows. Users with more than SMALL_USER_LIMIT reminders are searched
+through the reminders_fts FTS5 table (trigram tokenizer), which triggers
+keep in sync with the reminders table (see migration 2 in
+app.infrastructure.migrations). There a lookup touches only the posting
+lists of the keyword's trigrams instead of every reminder, and candidates
+are ranked by BM25 so the closest titles come first.
+
+The user id is deliberately not part of the FTS match: phone numbers share
+most of their trigrams ("+92", "923", ...), so matching on them reads far
+more postings than the title does. Results are filtered on
+reminders.user_id instead.
+
+On Postgres the same lookups use a pg_trgm GIN index on lower(title)
+(migration 2): LIKE '%keyword%' for substrings and the similarity
+operator, ranked by similarity, for typos.
+"""
+
+from typing import List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.infrastructure.dialects import POSTGRESQL, backend_name
+
+# Trigram tokenizer cannot match terms shorter than this
+MIN_TERM_LENGTH = 3
+
+# Trigram-set similarity above which a title counts as a typo-tolerant match
+FUZZY_THRESHOLD = 0.4
+
+# Users with at most this many active/paused reminders are matched in memory
+SMALL_USER_LIMIT = 500
+
+SUBSTRING_SQL = text(
+    "SELECT reminders.id FROM reminders_fts "
+    "JOIN reminders ON reminders.rowid = reminders_fts.rowid "
+    "WHERE reminders_fts MATCH :query AND reminders.user_id = :user_id "
+    "ORDER BY reminders.created_at DESC LIMIT 1"
+)
+
+RANKED_SQL = text(
+    "SELECT reminders.id, reminders.title FROM reminders_fts "
+    "JOIN reminders ON reminders.rowid = reminders_fts.rowid "
+    "WHERE reminders_fts MATCH :query AND reminders.user_id = :user_id "
+    "ORDER BY reminders_fts.rank LIMIT :limit"
+)
+
+POSTGRES_SUBSTRING_SQL = text(
+    "SELECT id FROM reminders "
+    "WHERE lower(title) LIKE :pattern ESCAPE '\\' AND user_id = :user_id "
+    "AND status IN ('ACTIVE', 'PAUSED') "
+    "ORDER BY created_at DESC LIMIT 1"
+)
+
+# Candidates need only a few trigrams in common, like the FTS5 OR query
+POSTGRES_CANDIDATE_THRESHOLD = 0.1
+
+POSTGRES_THRESHOLD_SQL = text("SELECT set_config('pg_trgm.similarity_threshold', :threshold, true)")
+
+POSTGRES_RANKED_SQL = text(
+    "SELECT id, title FROM reminders "
+    "WHERE lower(title) % :keyword AND user_id = :user_id "
+    "AND status IN ('ACTIVE', 'PAUSED') "
+    "ORDER BY similarity(lower(title), :keyword) DESC LIMIT :limit"
+)
+
+
+def _quote(term: str) -> str:
+    """Quote a term as an FTS5 string (substring match with trigrams)."""
+    return '"' + term.replace('"', '""') + '"'
+
+
+def _like_pattern(term: str) -> str:
+    """LIKE pattern matching the lowercased term anywhere, with wildcards escaped."""
+    escaped = term.lower().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def trigrams(value: str) -> Set[str]:
+    """Lowercase character trigrams of a string."""
+    value = value.lower()
+    return {value[i:i + 3] for i in range(len(value) - 2)}
+
+
+def similarity(a: str, b: str) -> float:
+    """Jaccard similarity of two strings' trigram sets."""
+    ta, tb = trigrams(a), trigrams(b)
+    if not ta or not tb:
+        return 0.0
+    return len(ta & tb) / len(ta | tb)
+
+
+def words_match(keyword: str, title: str) -> bool:
+    """The original word rule: a title word contains, or is contained in, the keyword."""
+    keyword = keyword.lower()
+    return any(keyword in word or word in keyword for word in title.lower().split())
+
+
+def fuzzy_score(keyword: str, title: str) -> float:
+    """
+    How well a title matches a keyword that is not a substring of it.
+    
+    Returns:
+        1.0 for the word rule, else the best trigram similarity against the
+        whole title or one of its words; 0.0 below FUZZY_THRESHOLD
+    """
+    if words_match(keyword, title):
+        return 1.0
+    score = max(similarity(keyword, part) for part in [title] + title.split())
+    return score if score >= FUZZY_THRESHOLD else 0.0
+
+
+def best_match(keyword: str, candidates: Sequence[Tuple[str, str]]) -> Optional[str]:
+    """
+    Pick the best title in memory.
+    
+    Args:
+        keyword: Search keyword
+        candidates: (reminder id, title) pairs, newest first
+    
+    Returns:
+        Newest reminder whose title contains the keyword, else the best
+        fuzzy match, else None
+    """
+    keyword_lower = keyword.lower()
+    for reminder_id, title in candidates:
+        if keyword_lower in title.lower():
+            return reminder_id
+    
+    best_id, best_score = None, 0.0
+    for reminder_id, title in candidates:
+        score = fuzzy_score(keyword_lower, title)
+        if score > best_score:
+            best_id, best_score = reminder_id, score
+    return best_id
+
+
+async def find_by_substring(session: AsyncSession, user_id: str, keyword: str) -> Optional[str]:
+    """
+    Newest active/paused reminder of a user whose title contains the keyword.
+    
+    Args:
+        session: Database session
+        user_id: Owning user
+        keyword: Search keyword (at least MIN_TERM_LENGTH characters)
+    
+    Returns:
+        Reminder id, or None
+    """
+    if backend_name(session) == POSTGRESQL:
+        result = await session.execute(
+            POSTGRES_SUBSTRING_SQL, {"pattern": _like_pattern(keyword), "user_id": user_id}
+        )
+    else:
+        result = await session.execute(SUBSTRING_SQL, {"query": _quote(keyword), "user_id": user_id})
+    return result.scalar_one_or_none()
+
+
+async def find_ranked(session: AsyncSession, user_id: str, keyword: str, limit: int = 20) -> List[str]:
+    """
+    Fuzzy, ranked lookup for keywords that are not a substring of any title.
+    
+    Candidates share at least one trigram with the keyword and are ordered
+    by BM25 (on Postgres, by trigram similarity). A candidate is accepted
+    if it satisfies the original word rule or is similar enough to
+    tolerate a typo ("electrcity").
+    
+    Args:
+        session: Database session
+        user_id: Owning user
+        keyword: Search keyword
+        limit: Maximum candidates to consider
+    
+    Returns:
+        Matching reminder ids, best first
+    """
+    grams = sorted(trigrams(keyword.replace('"', "")))
+    if not grams:
+        return []
+    
+    if backend_name(session) == POSTGRESQL:
+        # The % operator's cutoff, for this transaction only
+        await session.execute(POSTGRES_THRESHOLD_SQL, {"threshold": str(POSTGRES_CANDIDATE_THRESHOLD)})
+        result = await session.execute(
+            POSTGRES_RANKED_SQL, {"keyword": keyword.lower(), "user_id": user_id, "limit": limit}
+        )
+    else:
+        query = " OR ".join(_quote(gram) for gram in grams)
+        result = await session.execute(RANKED_SQL, {"query": query, "user_id": user_id, "limit": limit})
+    return [reminder_id for reminder_id, title in result.all() if fuzzy_score(keyword, title) > 0]
@@ -1,85 +1,327 @@
 """
-Twilio Voice integration for phone call reminders with retry logic.
+Twilio Voice integration for phone call reminders.
+
+Calls are queued on a CallDispatcher and placed by a small pool of async
+workers over the shared Twilio transport, so a burst of follow-ups never
+blocks the event loop. Callers wait for their call to be placed; a call that
+is dropped instead (queue full, dispatcher stopped) raises CallDropped so the
+follow-up stays due and is retried. Dispatch latency (queued -> accepted by
+Twilio) and ring latency (accepted -> ringing, from status callbacks) are
+reported per call.
 """
 
+import asyncio
 import logging
-from typing import Optional
+import time
+from collections import OrderedDict
+from itertools import count
+from typing import List, Optional
 
-from twilio.rest import Client
-from twilio.base.exceptions import TwilioRestException
+import httpx
 from twilio.twiml.voice_response import VoiceResponse
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 
 from app.config.settings import get_settings
+from app.infrastructure.twilio_http import get_twilio_http_client, TwilioApiError
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
-# Initialize Twilio client
-twilio_client = Client(settings.twilio_account_sid, settings.twilio_auth_token)
+# Number of finished calls kept for status callbacks and /calls/status
+CALL_HISTORY_SIZE = 200
 
+_call_ids = count(1)
 
-@retry(
-    stop=stop_after_attempt(3),
-    wait=wait_exponential(multiplier=1, min=1, max=5),
-    retry=retry_if_exception_type(TwilioRestException),
-    reraise=True
-)
-def _make_call_sync(twiml: str, to_number: str, from_number: str, timeout: int):
-    """
-    Synchronous Twilio call with retry logic.
+
+class CallDropped(Exception):
+    """A queued call was never attempted (queue full or dispatcher stopped)."""
+
+
+class CallRecord:
+    """Lifecycle timestamps of one reminder call."""
     
-    Args:
-        twiml: TwiML content for the call
-        to_number: Recipient phone number
-        from_number: Caller phone number
-        timeout: Ring timeout in seconds
+    def __init__(self, reminder_title: str, to_number: str):
+        self.id = next(_call_ids)
+        self.reminder_title = reminder_title
+        self.to_number = to_number
+        self.call_sid: Optional[str] = None
+        self.status = "queued"
+        self.error: Optional[str] = None
+        self.queued_at = time.time()
+        self.dispatched_at: Optional[float] = None
+        self.ringing_at: Optional[float] = None
+        self.answered_at: Optional[float] = None
+        self.completed_at: Optional[float] = None
+        self.placed: Optional[bool] = None  # None until attempted, then whether Twilio accepted it
+        self.finished = asyncio.Event()
     
-    Returns:
-        Twilio call object
-    """
-    return twilio_client.calls.create(
-        twiml=twiml,
-        to=to_number,
-        from_=from_number,
-        timeout=timeout,
-    )
+    def finish(self, placed: Optional[bool]) -> None:
+        """Record the outcome and wake anyone waiting on the call."""
+        if not self.finished.is_set():
+            self.placed = placed
+            self.finished.set()
+    
+    @property
+    def dispatch_latency(self) -> Optional[float]:
+        """Seconds from queueing until Twilio accepted the call."""
+        if self.dispatched_at is None:
+            return None
+        return self.dispatched_at - self.queued_at
+    
+    @property
+    def ring_latency(self) -> Optional[float]:
+        """Seconds from Twilio accepting the call until the phone rang."""
+        if self.dispatched_at is None or self.ringing_at is None:
+            return None
+        return self.ringing_at - self.dispatched_at
+    
+    def as_dict(self) -> dict:
+        def ms(value: Optional[float]) -> Optional[float]:
+            return round(value * 1000, 1) if value is not None else None
+        
+        return {
+            "id": self.id,
+            "call_sid": self.call_sid,
+            "title": self.reminder_title,
+            "status": self.status,
+            "error": self.error,
+            "dispatch_latency_ms": ms(self.dispatch_latency),
+            "ring_latency_ms": ms(self.ring_latency),
+        }
+
+
+class CallDispatcher:
+    """Queue of pending reminder calls placed by a bounded pool of workers."""
+    
+    def __init__(self, concurrency: int, max_pending: int):
+        self.concurrency = concurrency
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+        self.workers: List[asyncio.Task] = []
+        self.calls: "OrderedDict[str, CallRecord]" = OrderedDict()
+        self.in_flight = 0
+        self.dispatched = 0
+        self.failed = 0
+        self.dispatch_latency_total = 0.0
+        self.ring_latency_total = 0.0
+        self.rang = 0
+    
+    @property
+    def running(self) -> bool:
+        return bool(self.workers)
+    
+    def start(self) -> None:
+        """Spawn the dispatch workers on the running event loop."""
+        if self.running:
+            return
+        for i in range(self.concurrency):
+            self.workers.append(asyncio.create_task(self._worker(i), name=f"call-dispatcher-{i}"))
+        logger.info(f"Call dispatcher started with {self.concurrency} workers")
+    
+    async def stop(self) -> None:
+        """
+        Cancel the workers.
+        
+        Calls still pending are dropped and their callers get CallDropped,
+        so the follow-ups that queued them are retried after a restart.
+        """
+        for task in self.workers:
+            task.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+        
+        dropped = 0
+        while not self.queue.empty():
+            self.queue.get_nowait().finish(None)
+            self.queue.task_done()
+            dropped += 1
+        if dropped:
+            logger.warning(f"Call dispatcher stopped with {dropped} pending calls")
+    
+    def dispatch(self, reminder_title: str, to_number: str) -> Optional[CallRecord]:
+        """
+        Queue a reminder call.
+        
+        Args:
+            reminder_title: Title of the reminder to speak
+            to_number: Phone number to call
+        
+        Returns:
+            The call's record, or None if the pending queue is full
+        """
+        if not self.running:
+            self.start()
+        
+        record = CallRecord(reminder_title, to_number)
+        try:
+            self.queue.put_nowait(record)
+        except asyncio.QueueFull:
+            logger.error(f"Call queue full, dropping call for '{reminder_title}'")
+            return None
+        return record
+    
+    async def _place_call(self, record: CallRecord) -> None:
+        """Place one call through the Twilio API."""
+        status_callback = None
+        if settings.public_base_url:
+            status_callback = f"{settings.public_base_url.rstrip('/')}/webhook/call-status"
+        
+        call = await get_twilio_http_client().create_call(
+            twiml=generate_reminder_twiml(record.reminder_title),
+            to=record.to_number,
+            from_=settings.twilio_phone_number,
+            timeout=settings.call_ring_timeout_seconds,
+            status_callback=status_callback
+        )
+        
+        record.dispatched_at = time.time()
+        record.call_sid = call.get("sid")
+        record.status = call.get("status", "queued")
+        self.dispatched += 1
+        self.dispatch_latency_total += record.dispatch_latency
+        
+        if record.call_sid:
+            self.calls[record.call_sid] = record
+            while len(self.calls) > CALL_HISTORY_SIZE:
+                self.calls.popitem(last=False)
+        
+        logger.info(
+            f"Initiated reminder call. SID: {record.call_sid}, "
+            f"dispatch latency: {record.dispatch_latency * 1000:.0f}ms"
+        )
+    
+    async def _worker(self, index: int) -> None:
+        """Place queued calls until cancelled."""
+        while True:
+            record = await self.queue.get()
+            self.in_flight += 1
+            placed = None
+            try:
+                await self._place_call(record)
+                placed = True
+            except asyncio.CancelledError:
+                raise
+            except (TwilioApiError, httpx.HTTPError) as e:
+                placed = False
+                self.failed += 1
+                record.status = "failed"
+                record.error = str(e)
+                logger.error(f"Failed to make reminder call after retries: {e}")
+            except Exception as e:
+                placed = False
+                self.failed += 1
+                record.status = "failed"
+                record.error = str(e)
+                logger.exception(f"Error making reminder call: {e}")
+            finally:
+                record.finish(placed)
+                self.in_flight -= 1
+                self.queue.task_done()
+    
+    def record_status(self, call_sid: str, status: str) -> Optional[CallRecord]:
+        """
+        Apply a Twilio call status callback.
+        
+        Args:
+            call_sid: Twilio call SID
+            status: CallStatus value (ringing, in-progress, completed, ...)
+        
+        Returns:
+            The updated record, or None for unknown calls
+        """
+        record = self.calls.get(call_sid)
+        if record is None:
+            return None
+        
+        now = time.time()
+        record.status = status
+        
+        if status == "ringing" and record.ringing_at is None:
+            record.ringing_at = now
+            if record.ring_latency is not None:
+                self.rang += 1
+                self.ring_latency_total += record.ring_latency
+                logger.info(f"Call {call_sid} ringing, ring latency: {record.ring_latency * 1000:.0f}ms")
+        elif status == "in-progress" and record.answered_at is None:
+            record.answered_at = now
+        elif status in ("completed", "busy", "no-answer", "failed", "canceled"):
+            record.completed_at = now
+        
+        return record
+    
+    def stats(self) -> dict:
+        """Pending calls, concurrency and average latencies."""
+        avg_dispatch = self.dispatch_latency_total / self.dispatched if self.dispatched else 0.0
+        avg_ring = self.ring_latency_total / self.rang if self.rang else 0.0
+        return {
+            "running": self.running,
+            "pending": self.queue.qsize(),
+            "in_flight": self.in_flight,
+            "concurrency": self.concurrency,
+            "dispatched": self.dispatched,
+            "failed": self.failed,
+            "avg_dispatch_latency_ms": round(avg_dispatch * 1000, 1),
+            "avg_ring_latency_ms": round(avg_ring * 1000, 1),
+            "recent_calls": [r.as_dict() for r in list(self.calls.values())[-20:]],
+        }
+
+
+# Global dispatcher instance
+call_dispatcher: Optional[CallDispatcher] = None
+
+
+def get_call_dispatcher() -> CallDispatcher:
+    """Get or create the call dispatcher instance."""
+    global call_dispatcher
+    
+    if call_dispatcher is None:
+        call_dispatcher = CallDispatcher(
+            concurrency=settings.call_dispatch_concurrency,
+            max_pending=settings.call_queue_max_pending
+        )
+    
+    return call_dispatcher
+
+
+async def start_call_dispatcher() -> None:
+    """Start the call dispatch workers."""
+    get_call_dispatcher().start()
+
+
+async def stop_call_dispatcher() -> None:
+    """Stop the call dispatch workers."""
+    if call_dispatcher is not None:
+        await call_dispatcher.stop()
 
 
 async def make_reminder_call(reminder_title: str, to_number: str = None) -> bool:
     """
-    Make a phone call to remind the user.
+    Queue a phone call to remind the user and wait until it is placed.
     
     Args:
         reminder_title: Title of the reminder to speak
         to_number: Phone number to call (defaults to configured user)
     
     Returns:
-        True if call initiated successfully
+        True if Twilio accepted the call; False if it rejected it or there is
+        no number to call
+    
+    Raises:
+        CallDropped: The call was never attempted (queue full or dispatcher
+            stopped), so the caller should retry it later
     """
     if to_number is None:
         to_number = settings.user_phone_number
-    
-    try:
-        # Generate TwiML for the call
-        twiml = generate_reminder_twiml(reminder_title)
-        
-        call = _make_call_sync(
-            twiml=twiml,
-            to_number=to_number,
-            from_number=settings.twilio_phone_number,
-            timeout=30
-        )
-        
-        logger.info(f"Initiated reminder call. SID: {call.sid}")
-        return True
-        
-    except TwilioRestException as e:
-        logger.error(f"Failed to make reminder call after retries: {e}")
-        return False
-    except Exception as e:
-        logger.exception(f"Error making reminder call: {e}")
+    if not to_number:
+        logger.warning(f"No phone number to call for '{reminder_title}' (USER_PHONE_NUMBER unset), not calling")
         return False
+    
+    record = get_call_dispatcher().dispatch(reminder_title, to_number)
+    if record is None:
+        raise CallDropped(f"Call queue full, call for '{reminder_title}' not queued")
+    
+    await record.finished.wait()
+    if record.placed is None:
+        raise CallDropped(f"Call dispatcher stopped before calling for '{reminder_title}'")
+    return record.placed
 
 
 def generate_reminder_twiml(reminder_title: str) -> str:
@@ -135,9 +377,8 @@ async def check_call_capability() -> bool:
     """
     try:
         # Try to fetch the phone number to verify it exists and can make calls
-        numbers = twilio_client.incoming_phone_numbers.list(
-            phone_number=settings.twilio_phone_number,
-            limit=1
+        numbers = await get_twilio_http_client().list_incoming_phone_numbers(
+            settings.twilio_phone_number
         )
         
         if numbers:
@@ -147,6 +388,6 @@ async def check_call_capability() -> bool:
             logger.warning("Configured phone number not found in Twilio account")
             return False
             
-    except TwilioRestException as e:
+    except (TwilioApiError, httpx.HTTPError) as e:
         logger.error(f"Error checking call capability: {e}")
         return False
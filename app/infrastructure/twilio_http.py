@@ -0,0 +1,241 @@
+"""
+Async Twilio REST transport with connection pooling and retry logic.
+
+A single httpx.AsyncClient (keep-alive pool) is shared by messaging and
+voice calls, so outbound requests never block the event loop and reuse
+TLS connections to api.twilio.com. Sends wait for a token from their
+From number's rate limiter first (see twilio_rate_limit).
+"""
+
+import logging
+from typing import Optional
+
+import httpx
+from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception
+
+from app.config.settings import get_settings
+from app.infrastructure.metrics import track_stage
+from app.infrastructure.twilio_rate_limit import RateLimiterRegistry, SendPriority, create_rate_limiter_registry
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+API_VERSION = "2010-04-01"
+
+
+class TwilioApiError(Exception):
+    """Error response from the Twilio REST API."""
+    
+    def __init__(self, status: int, message: str, code: Optional[int] = None, retry_after: Optional[float] = None):
+        super().__init__(f"HTTP {status}: {message}" + (f" (code {code})" if code else ""))
+        self.status = status
+        self.message = message
+        self.code = code
+        self.retry_after = retry_after
+    
+    @property
+    def retryable(self) -> bool:
+        """Rate limits and server errors are worth retrying; other 4xx are not."""
+        return self.status == 429 or self.status >= 500
+
+
+def _is_retryable(exc: BaseException) -> bool:
+    """Retry transport failures and retryable API errors."""
+    if isinstance(exc, TwilioApiError):
+        return exc.retryable
+    return isinstance(exc, httpx.TransportError)
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given in seconds."""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+class TwilioHttpClient:
+    """Pooled async client for the Twilio REST API."""
+    
+    def __init__(
+        self,
+        account_sid: str,
+        auth_token: str,
+        base_url: str = "https://api.twilio.com",
+        max_connections: int = 20,
+        timeout: float = 15.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        rate_limits: Optional[RateLimiterRegistry] = None
+    ):
+        self.account_sid = account_sid
+        self.rate_limits = rate_limits or create_rate_limiter_registry()
+        self.client = httpx.AsyncClient(
+            base_url=base_url.rstrip("/"),
+            auth=(account_sid, auth_token),
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+            transport=transport,
+        )
+    
+    def _account_path(self, resource: str) -> str:
+        return f"/{API_VERSION}/Accounts/{self.account_sid}/{resource}"
+    
+    @retry(
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(multiplier=1, min=1, max=5),
+        retry=retry_if_exception(_is_retryable),
+        reraise=True
+    )
+    async def request(
+        self,
+        method: str,
+        resource: str,
+        data: Optional[dict] = None,
+        params: Optional[dict] = None,
+        priority: Optional[SendPriority] = None
+    ) -> dict:
+        """
+        Make a Twilio API request with async retry logic.
+        
+        Args:
+            method: HTTP method
+            resource: Path under the account, e.g. "Messages.json"
+            data: Form fields for POST requests
+            params: Query parameters
+            priority: For sends, wait for a token from the From number's
+                rate limiter at this priority (every attempt, retries included)
+        
+        Returns:
+            Decoded JSON response
+        
+        Raises:
+            TwilioApiError: If Twilio returns an error status
+            httpx.TransportError: If the request could not be sent
+        """
+        limiter = None
+        if priority is not None and data and data.get("From"):
+            limiter = self.rate_limits.limiter_for(data["From"])
+            await limiter.acquire(priority)
+        
+        with track_stage("twilio_request"):
+            response = await self.client.request(method, self._account_path(resource), data=data, params=params)
+        
+        if response.status_code >= 400:
+            try:
+                payload = response.json()
+            except ValueError:
+                payload = {}
+            error = TwilioApiError(
+                status=response.status_code,
+                message=payload.get("message") or response.reason_phrase,
+                code=payload.get("code"),
+                retry_after=_parse_retry_after(response.headers.get("Retry-After")),
+            )
+            if limiter is not None and error.status == 429 and error.retry_after:
+                limiter.throttle(error.retry_after)
+            raise error
+        
+        return response.json()
+    
+    async def create_message(
+        self,
+        body: str,
+        from_: str,
+        to: str,
+        priority: SendPriority = SendPriority.CHAT
+    ) -> dict:
+        """
+        Send a message (WhatsApp or SMS).
+        
+        Args:
+            body: Message text
+            from_: Sender number
+            to: Recipient number
+            priority: Queue priority when the sender is rate limited
+        
+        Returns:
+            Twilio message resource
+        """
+        return await self.request(
+            "POST", "Messages.json", data={"Body": body, "From": from_, "To": to}, priority=priority
+        )
+    
+    async def create_call(
+        self,
+        twiml: str,
+        to: str,
+        from_: str,
+        timeout: int = 30,
+        status_callback: Optional[str] = None,
+        priority: SendPriority = SendPriority.REMINDER
+    ) -> dict:
+        """
+        Place an outbound voice call.
+        
+        Args:
+            twiml: TwiML to execute when the call connects
+            to: Recipient phone number
+            from_: Caller phone number
+            timeout: Ring timeout in seconds
+            status_callback: URL to receive call progress events
+            priority: Queue priority when the caller number is rate limited
+        
+        Returns:
+            Twilio call resource
+        """
+        data = {"Twiml": twiml, "To": to, "From": from_, "Timeout": str(timeout)}
+        if status_callback:
+            data["StatusCallback"] = status_callback
+            data["StatusCallbackEvent"] = ["initiated", "ringing", "answered", "completed"]
+        return await self.request("POST", "Calls.json", data=data, priority=priority)
+    
+    async def list_incoming_phone_numbers(self, phone_number: str) -> list:
+        """
+        Look up an incoming phone number on the account.
+        
+        Returns:
+            Matching phone number resources
+        """
+        result = await self.request(
+            "GET",
+            "IncomingPhoneNumbers.json",
+            params={"PhoneNumber": phone_number, "PageSize": 1}
+        )
+        return result.get("incoming_phone_numbers", [])
+    
+    async def aclose(self) -> None:
+        """Close pooled connections."""
+        await self.client.aclose()
+
+
+# Global client instance
+twilio_http_client: Optional[TwilioHttpClient] = None
+
+
+def get_twilio_http_client() -> TwilioHttpClient:
+    """Get or create the shared Twilio HTTP client."""
+    global twilio_http_client
+    
+    if twilio_http_client is None:
+        twilio_http_client = TwilioHttpClient(
+            account_sid=settings.twilio_account_sid,
+            auth_token=settings.twilio_auth_token,
+            base_url=settings.twilio_api_base_url,
+            max_connections=settings.twilio_http_max_connections,
+            timeout=settings.twilio_http_timeout_seconds,
+        )
+    
+    return twilio_http_client
+
+
+async def close_twilio_http_client() -> None:
+    """Close the shared client (called on application shutdown)."""
+    global twilio_http_client
+    if twilio_http_client is not None:
+        await twilio_http_client.aclose()
+        twilio_http_client = None
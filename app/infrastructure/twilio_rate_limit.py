@@ -0,0 +1,243 @@
+"""
+Outbound rate limiting for Twilio sends.
+
+Every message and call is sent from one of our Twilio numbers, and Twilio
+throttles each sender. Instead of letting 429s burn through retries, each
+From number gets a token bucket: a send takes a token, and when none is
+left the caller waits in a priority queue. Reminder notifications and
+reminder calls are served before chat replies, and chat replies before
+error messages, so a burst of replies never delays a reminder.
+
+When Twilio still answers 429 with a Retry-After header, the number's
+bucket is paused for that long so queued sends wait instead of retrying.
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from enum import IntEnum
+from typing import Dict, List, Optional, Tuple
+
+from app.config.settings import get_settings
+from app.infrastructure.metrics import OUTBOUND_QUEUE_DEPTH
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+class SendPriority(IntEnum):
+    """Order in which queued sends get tokens (lower goes first)."""
+    
+    REMINDER = 0
+    CHAT = 1
+    ERROR = 2
+
+
+# Metric label per priority, computed once rather than per send
+_PRIORITY_LABELS = {priority: priority.name.lower() for priority in SendPriority}
+
+
+class WaitStats:
+    """Running wait-time statistics for one priority."""
+    
+    def __init__(self):
+        self.count = 0
+        self.waited = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+    
+    def observe(self, seconds: float) -> None:
+        """Record the wait of one granted send."""
+        self.count += 1
+        self.total_seconds += seconds
+        if seconds > 0:
+            self.waited += 1
+        if seconds > self.max_seconds:
+            self.max_seconds = seconds
+    
+    def as_dict(self) -> dict:
+        """Summary in milliseconds."""
+        avg = self.total_seconds / self.count if self.count else 0.0
+        return {
+            "granted": self.count,
+            "waited": self.waited,
+            "avg_wait_ms": round(avg * 1000, 2),
+            "max_wait_ms": round(self.max_seconds * 1000, 2),
+        }
+
+
+class OutboundRateLimiter:
+    """Token bucket with a priority queue of waiting sends for one Twilio number."""
+    
+    def __init__(self, rate: float, burst: int):
+        """
+        Args:
+            rate: Sends per second, greater than 0
+            burst: Bucket size (sends allowed back to back)
+        
+        Raises:
+            ValueError: If rate is not positive
+        """
+        if rate <= 0:
+            raise ValueError(f"Send rate must be greater than 0, got {rate}")
+        self.rate = rate
+        self.burst = max(1, burst)
+        # A send needs a whole token, so the bucket holds at least one; below
+        # one send per second it starts with only what one second earns
+        self.tokens = float(self.burst) if rate >= 1 else rate
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.throttled = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._drainer: Optional[asyncio.Task] = None
+        self.wait_stats = {priority: WaitStats() for priority in SendPriority}
+    
+    def _refill(self) -> float:
+        """Add the tokens earned since the last refill and return the current time."""
+        now = time.monotonic()
+        if now > self.paused_until:
+            earned_from = max(self.updated, self.paused_until)
+            self.tokens = min(self.burst, self.tokens + (now - earned_from) * self.rate)
+        self.updated = now
+        return now
+    
+    async def acquire(self, priority: SendPriority = SendPriority.CHAT) -> float:
+        """
+        Wait for a send token.
+        
+        Args:
+            priority: Priority of the send
+        
+        Returns:
+            Seconds spent waiting
+        """
+        started = self._refill()
+        OUTBOUND_QUEUE_DEPTH.observe(len(self._waiters), _PRIORITY_LABELS[priority])
+        if not self._waiters and self.tokens >= 1:
+            self.tokens -= 1
+            self.wait_stats[priority].observe(0.0)
+            return 0.0
+        
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (int(priority), next(self._sequence), future))
+        if self._drainer is None or self._drainer.done():
+            self._drainer = asyncio.create_task(self._drain())
+        
+        await future
+        waited = time.monotonic() - started
+        self.wait_stats[priority].observe(waited)
+        return waited
+    
+    async def _drain(self) -> None:
+        """Hand out tokens to queued sends in priority order as they refill."""
+        while self._waiters:
+            now = self._refill()
+            if now < self.paused_until:
+                await asyncio.sleep(self.paused_until - now)
+                continue
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                continue
+            
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done():
+                # Caller was cancelled while queued
+                continue
+            self.tokens -= 1
+            future.set_result(None)
+    
+    def throttle(self, retry_after: float) -> None:
+        """
+        Pause sends after Twilio answered 429.
+        
+        Args:
+            retry_after: Seconds from the Retry-After header
+        """
+        logger.warning(f"Twilio rate limit hit, pausing sends for {retry_after:.1f}s")
+        self._refill()
+        self.throttled += 1
+        self.tokens = min(self.tokens, 0.0)
+        self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+    
+    def depth(self) -> Dict[str, int]:
+        """Queued sends per priority."""
+        depth = {priority.name.lower(): 0 for priority in SendPriority}
+        for priority, _, future in self._waiters:
+            if not future.done():
+                depth[SendPriority(priority).name.lower()] += 1
+        return depth
+    
+    def stats(self) -> dict:
+        """Configured limit, queue depth and wait times per priority."""
+        self._refill()
+        depth = self.depth()
+        return {
+            "rate_per_second": self.rate,
+            "burst": self.burst,
+            "tokens": round(max(self.tokens, 0.0), 2),
+            "paused_for_ms": round(max(self.paused_until - time.monotonic(), 0.0) * 1000, 1),
+            "throttled": self.throttled,
+            "queue_depth": sum(depth.values()),
+            "queue_depth_by_priority": depth,
+            "wait": {priority.name.lower(): stats.as_dict() for priority, stats in self.wait_stats.items()},
+        }
+
+
+def burst_for_rate(rate: float) -> int:
+    """
+    Bucket size for a rate given without one: one second's worth of sends.
+    
+    Rates below one send per second still get the one token a send needs;
+    their bucket starts partly filled, so they never send faster than `rate`.
+    """
+    return max(1, int(rate))
+
+
+class RateLimiterRegistry:
+    """One rate limiter per Twilio number, created on first use."""
+    
+    def __init__(self, default_rate: float, default_burst: int, overrides: Optional[Dict[str, float]] = None):
+        """
+        Args:
+            default_rate: Sends per second for numbers without an override
+            default_burst: Bucket size for numbers without an override
+            overrides: Sends per second by number; the burst is one second's worth
+                (see burst_for_rate)
+        """
+        self.default_rate = default_rate
+        self.default_burst = default_burst
+        self.overrides = dict(overrides or {})
+        self.limiters: Dict[str, OutboundRateLimiter] = {}
+    
+    def limiter_for(self, number: str) -> OutboundRateLimiter:
+        """
+        Get the limiter for a From number.
+        
+        WhatsApp senders ("whatsapp:+1...") and voice numbers ("+1...") are
+        throttled separately by Twilio, so they are separate keys here too.
+        """
+        limiter = self.limiters.get(number)
+        if limiter is None:
+            if number in self.overrides:
+                rate = self.overrides[number]
+                limiter = OutboundRateLimiter(rate, burst_for_rate(rate))
+            else:
+                limiter = OutboundRateLimiter(self.default_rate, self.default_burst)
+            self.limiters[number] = limiter
+        return limiter
+    
+    def stats(self) -> dict:
+        """Per-number limiter stats."""
+        return {number: limiter.stats() for number, limiter in self.limiters.items()}
+
+
+def create_rate_limiter_registry() -> RateLimiterRegistry:
+    """Build the per-number registry from settings."""
+    return RateLimiterRegistry(
+        default_rate=settings.twilio_rate_limit_per_second,
+        default_burst=settings.twilio_rate_limit_burst,
+        overrides=settings.twilio_rate_limits,
+    )
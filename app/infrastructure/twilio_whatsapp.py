@@ -1,69 +1,55 @@
 """
-Twilio WhatsApp messaging integration with retry logic.
+Twilio WhatsApp messaging integration.
+Messages go through the shared async Twilio transport (pooled, with async retries).
 """
 
 import logging
-from twilio.rest import Client
-from twilio.base.exceptions import TwilioRestException
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
+
+import httpx
 
 from app.config.settings import get_settings
+from app.infrastructure.twilio_http import get_twilio_http_client, TwilioApiError
+from app.infrastructure.twilio_rate_limit import SendPriority
+from app.infrastructure.metrics import record_error
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
-# Initialize Twilio client
-twilio_client = Client(settings.twilio_account_sid, settings.twilio_auth_token)
-
 
-@retry(
-    stop=stop_after_attempt(3),
-    wait=wait_exponential(multiplier=1, min=1, max=5),
-    retry=retry_if_exception_type(TwilioRestException),
-    reraise=True
-)
-def _send_message_sync(message: str, from_number: str, to_number: str):
-    """
-    Synchronous Twilio message send with retry logic.
-    
-    Args:
-        message: Text message to send
-        from_number: Sender's WhatsApp number
-        to_number: Recipient's WhatsApp number
-    
-    Returns:
-        Twilio message object
-    """
-    return twilio_client.messages.create(
-        body=message,
-        from_=from_number,
-        to=to_number
-    )
-
-
-async def send_whatsapp_message(message: str, to_number: str = None) -> bool:
+async def send_whatsapp_message(
+    message: str,
+    to_number: str = None,
+    priority: SendPriority = SendPriority.CHAT
+) -> bool:
     """
     Send a WhatsApp text message.
     
     Args:
         message: Text message to send
         to_number: Recipient WhatsApp number (defaults to configured user)
+        priority: Queue priority when the sender number is rate limited
     
     Returns:
-        True if message sent successfully, False otherwise
+        True if message sent successfully, False otherwise (including when
+        there is no recipient)
     """
     if to_number is None:
         to_number = settings.user_whatsapp_number
+    if not to_number:
+        logger.warning("No recipient for WhatsApp message (no owner and USER_WHATSAPP_NUMBER unset), not sending")
+        return False
     
     try:
-        msg = _send_message_sync(
-            message=message,
-            from_number=settings.twilio_whatsapp_number,
-            to_number=to_number
+        msg = await get_twilio_http_client().create_message(
+            body=message,
+            from_=settings.twilio_whatsapp_number,
+            to=to_number,
+            priority=priority
         )
-        logger.info(f"WhatsApp message sent successfully. SID: {msg.sid}")
+        logger.info(f"WhatsApp message sent successfully. SID: {msg.get('sid')}")
         return True
-    except TwilioRestException as e:
+    except (TwilioApiError, httpx.HTTPError) as e:
+        record_error("send", e)
         logger.error(f"Failed to send WhatsApp message after retries: {e}")
         return False
 
@@ -91,7 +77,7 @@ async def send_reminder_notification(
     
     message += "\n\n_Reply to acknowledge this reminder._"
     
-    return await send_whatsapp_message(message, to_number)
+    return await send_whatsapp_message(message, to_number, priority=SendPriority.REMINDER)
 
 
 async def send_confirmation(action: str, details: str, to_number: str = None) -> bool:
@@ -122,4 +108,4 @@ async def send_error_message(error: str, to_number: str = None) -> bool:
         True if message sent successfully
     """
     message = f"❌ Sorry, something went wrong:\n\n{error}\n\nPlease try again."
-    return await send_whatsapp_message(message, to_number)
+    return await send_whatsapp_message(message, to_number, priority=SendPriority.ERROR)
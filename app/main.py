@@ -2,18 +2,28 @@
 WhatsApp Personal Assistant - Main Application Entry Point
 
 A production-ready WhatsApp reminder assistant using FastAPI, Twilio,
-OpenAI, SQLite, and APScheduler.
+and OpenAI, with reminders scheduled from SQLite.
 """
 
 import logging
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.api.whatsapp_webhook import router as whatsapp_router
-from app.infrastructure.database import init_database
+from app.api.call_status_webhook import router as call_status_router
+from app.infrastructure.database import close_database, init_database
 from app.infrastructure.scheduler import start_scheduler, stop_scheduler, get_scheduler
+from app.infrastructure.ingest_queue import start_ingest_queue, stop_ingest_queue, get_ingest_queue
+from app.infrastructure.dedupe_cache import get_dedupe_cache
+from app.ai.fast_path import get_routing_stats
+from app.infrastructure.response_cache import get_response_cache, close_response_cache
+from app.infrastructure.twilio_http import close_twilio_http_client, get_twilio_http_client
+from app.infrastructure.audio_handler import close_audio_pool, close_media_client
+from app.infrastructure.twilio_calls import start_call_dispatcher, stop_call_dispatcher, get_call_dispatcher
+from app.infrastructure.metrics import SEND_PRIORITIES, register_collector, render_metrics
 from app.config.settings import get_settings
 
 # Configure logging
@@ -46,6 +56,14 @@ async def lifespan(app: FastAPI):
     await start_scheduler()
     logger.info("Scheduler started")
     
+    # Start ingest workers (also re-queues messages left pending by a restart)
+    logger.info("Starting ingest queue...")
+    await start_ingest_queue()
+    logger.info("Ingest queue started")
+    
+    # Start voice call dispatcher
+    await start_call_dispatcher()
+    
     logger.info("Application startup complete!")
     logger.info(f"Timezone: Asia/Karachi (PKT)")
     logger.info(f"Twilio signature validation: {settings.validate_twilio_signature}")
@@ -54,7 +72,14 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info("Shutting down...")
+    await stop_ingest_queue()
     await stop_scheduler()
+    await stop_call_dispatcher()
+    await close_twilio_http_client()
+    await close_media_client()
+    close_audio_pool()
+    await close_response_cache()
+    await close_database()
     logger.info("Application shutdown complete")
 
 
@@ -77,6 +102,7 @@ app.add_middleware(
 
 # Register routers
 app.include_router(whatsapp_router, tags=["WhatsApp"])
+app.include_router(call_status_router, tags=["Voice"])
 
 
 @app.get("/")
@@ -88,29 +114,105 @@ async def root():
         "status": "running",
         "endpoints": {
             "webhook": "/webhook/whatsapp",
-            "health": "/health"
+            "health": "/health",
+            "ingest": "/ingest/status",
+            "calls": "/calls/status",
+            "parser": "/parser/status",
+            "twilio": "/twilio/status",
+            "metrics": "/metrics"
         }
     }
 
 
 @app.get("/scheduler/status")
 async def scheduler_status():
-    """Get scheduler status and pending jobs."""
-    scheduler = get_scheduler()
-    
-    jobs = []
-    for job in scheduler.get_jobs():
-        jobs.append({
-            "id": job.id,
-            "name": job.name,
-            "next_run": str(job.next_run_time) if job.next_run_time else None
-        })
-    
-    return {
-        "running": scheduler.running,
-        "jobs_count": len(jobs),
-        "jobs": jobs
-    }
+    """Get dispatcher status and the next due reminders."""
+    return await get_scheduler().status()
+
+
+@app.get("/ingest/status")
+async def ingest_status():
+    """Get ingest queue depth, worker concurrency, per-stage latency and dedupe cache counters."""
+    stats = get_ingest_queue().stats()
+    stats["dedupe"] = get_dedupe_cache().stats()
+    return stats
+
+
+@app.get("/calls/status")
+async def calls_status():
+    """Get call dispatcher queue, concurrency and per-call latency."""
+    return get_call_dispatcher().stats()
+
+
+@app.get("/parser/status")
+async def parser_status():
+    """Get per-intent routing counts and latency for the local fast path vs OpenAI, and LLM cache hit rate."""
+    stats = get_routing_stats()
+    stats["cache"] = get_response_cache().stats()
+    return stats
+
+
+@app.get("/twilio/status")
+async def twilio_status():
+    """Get per-number send rate limits, queue depth by priority and wait times."""
+    return get_twilio_http_client().rate_limits.stats()
+
+
+def _queued_sends_by_priority() -> dict:
+    """Queued sends per priority, summed over every From number."""
+    totals = {priority: 0 for priority in SEND_PRIORITIES}
+    for limiter in get_twilio_http_client().rate_limits.limiters.values():
+        for priority, depth in limiter.depth().items():
+            totals[priority] = totals.get(priority, 0) + depth
+    return totals
+
+
+# Gauges and totals owned by the long-running components, read on each scrape
+register_collector(
+    "ingest_queue_depth", "gauge", "Inbound messages waiting for an ingest worker.",
+    lambda: get_ingest_queue().depth()
+)
+register_collector(
+    "ingest_in_flight", "gauge", "Inbound messages being processed.",
+    lambda: get_ingest_queue().in_flight
+)
+register_collector(
+    "ingest_messages_total", "counter", "Inbound messages by ingest outcome.",
+    lambda: {
+        "processed": get_ingest_queue().processed,
+        "failed": get_ingest_queue().failed,
+        "rejected": get_ingest_queue().rejected,
+    },
+    label="outcome"
+)
+register_collector(
+    "reminder_notifications_total", "counter", "Reminder notifications by delivery outcome.",
+    lambda: {"delivered": get_scheduler().delivery.delivered, "failed": get_scheduler().delivery.failed},
+    label="outcome"
+)
+register_collector(
+    "reminder_follow_ups_total", "counter", "Follow-up checks fired by the dispatcher.",
+    lambda: get_scheduler().follow_ups_fired
+)
+register_collector(
+    "call_queue_depth", "gauge", "Reminder calls waiting for a dispatcher slot.",
+    lambda: get_call_dispatcher().queue.qsize()
+)
+register_collector(
+    "twilio_outbound_queued", "gauge", "Sends currently queued on the rate limiters, by priority.",
+    _queued_sends_by_priority,
+    label="priority"
+)
+register_collector(
+    "twilio_throttled_total", "counter", "Times Twilio answered 429 and a number's sends were paused.",
+    lambda: sum(limiter.throttled for limiter in get_twilio_http_client().rate_limits.limiters.values())
+)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus metrics: pipeline stage latency, reminder lateness, queue depths, intents and errors."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
 
 
 if __name__ == "__main__":
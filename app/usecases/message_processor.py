@@ -0,0 +1,133 @@
+"""
+Message processing pipeline run by the ingest queue workers.
+Transcribes audio, parses intent with conversation context, applies it
+and replies to the user.
+
+All database writes for a message (intent handling, history write) share
+the worker's UnitOfWork and are committed once by the worker; the reply is
+sent after that commit. The writes only start once the message is parsed,
+so the transaction never spans the GPT call. The history read goes to the read-only pool and is
+fitted to the prompt's token budget; older exchanges are folded into the
+user's rolling summary after the commit. Each sender is a separate user: their
+reminders and history are scoped to the user keyed by the `From` number,
+and replies go back to that number.
+"""
+
+import logging
+from datetime import datetime
+from typing import List
+
+from app.domain.inbound_message import InboundMessage
+from app.domain.conversation_history import save_conversation
+from app.domain.user import get_or_create_user, user_id_from_number
+from app.infrastructure.database import UnitOfWork
+from app.infrastructure.metrics import MESSAGE_SECONDS, record_error, track_stage
+from app.infrastructure.twilio_whatsapp import send_whatsapp_message, send_error_message
+from app.infrastructure.audio_handler import download_and_transcribe_audio
+from app.ai.history_budget import load_prompt_history, refresh_summary
+from app.ai.nlp_parser import parse_user_message
+from app.usecases.reminder_service import ReminderService
+
+logger = logging.getLogger(__name__)
+
+
+async def process_inbound_message(message: InboundMessage, uow: UnitOfWork) -> None:
+    """
+    Process a persisted inbound WhatsApp message.
+    
+    Errors are reported to the user rather than raised, matching the
+    behaviour of the original synchronous webhook; the unit of work is
+    rolled back so none of the message's writes are kept.
+    
+    Args:
+        message: InboundMessage row picked up by an ingest worker
+        uow: Unit of work the worker commits once this returns
+    """
+    logger.info(f"Processing message from {message.from_number}, SID: {message.message_sid}")
+    
+    reply_to = message.from_number
+    
+    try:
+        message_text = (message.body or "").strip()
+        
+        # Check if this is an audio message
+        content_type = message.media_content_type
+        if (message.num_media or 0) > 0 and content_type and "audio" in content_type.lower():
+            logger.info(f"Processing audio message: {content_type}")
+            with track_stage("transcribe"):
+                message_text = await download_and_transcribe_audio(
+                    media_url=message.media_url,
+                    content_type=content_type
+                )
+            
+            if not message_text:
+                await send_error_message(
+                    "I couldn't understand your voice message. Please try again or send a text message.",
+                    to_number=reply_to
+                )
+                return
+            
+            logger.info(f"Transcribed audio: {message_text}")
+        
+        # Skip empty messages
+        if not message_text:
+            logger.info("Empty message received, skipping")
+            return
+        
+        # Nothing is written before the parse, so the writer connection is not held across the GPT call
+        user_id = user_id_from_number(message.from_number)
+        
+        # Get conversation history for context, within the token budget
+        conversation_history: List[dict] = []
+        with track_stage("history"):
+            async with uow.read_session() as read_session:
+                conversation_history, needs_summary = await load_prompt_history(read_session, user_id)
+        
+        # Log quoted message if present (for debugging)
+        if message.quoted_body:
+            logger.info(f"User replied to message: {message.quoted_body[:100]}...")
+        
+        # Parse the message using NLP with context
+        with track_stage("parse"):
+            parsed_intent = await parse_user_message(
+                message=message_text,
+                conversation_history=conversation_history,
+                quoted_message=message.quoted_body
+            )
+        
+        # Process the intent
+        with track_stage("service"):
+            # First write; user_id stays usable if a failing handler rolls back
+            await get_or_create_user(uow.session, message.from_number)
+            service = ReminderService(uow.session, uow, user_id=user_id)
+            response = await service.handle_intent(parsed_intent)
+        
+        # Save conversation to history for future context
+        with track_stage("save"):
+            await save_conversation(
+                session=uow.session,
+                user_id=user_id,
+                user_message=message_text,
+                bot_response=response,
+                commit=False
+            )
+            await uow.session.flush()
+        
+        # Send response back to user once everything above is committed
+        uow.after_commit(_send_reply, response, reply_to, message.received_at)
+        if needs_summary:
+            uow.after_commit(refresh_summary, user_id)
+    
+    except Exception as e:
+        record_error("pipeline", e)
+        logger.exception(f"Error processing message: {e}")
+        await uow.rollback()
+        await send_error_message(str(e), to_number=reply_to)
+
+
+async def _send_reply(response: str, to_number: str, received_at: datetime) -> None:
+    """Send the reply to the user (runs after the unit of work commits)."""
+    with track_stage("send"):
+        sent = await send_whatsapp_message(response, to_number=to_number)
+    if sent and received_at is not None:
+        MESSAGE_SECONDS.observe((datetime.utcnow() - received_at).total_seconds())
@@ -3,11 +3,13 @@ Reminder service for handling all reminder-related operations.
 """
 
 import logging
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
-from typing import List, Optional
+from typing import AsyncIterator, List, Optional, Tuple
 from uuid import uuid4
 
 from sqlalchemy import select, update, or_, func
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.domain.reminder import (
@@ -17,22 +19,108 @@ from app.domain.reminder import (
     ReminderUpdate,
     ParsedIntent
 )
+from app.domain.recurrence import Recurrence
 from app.utils.time import (
     get_current_time_pkt, 
     to_pkt, 
     format_time_pkt, 
     get_relative_time_description
 )
-from app.infrastructure.scheduler import schedule_reminder, cancel_reminder_jobs
+from app.domain.user import User, get_default_user_id
+from app.infrastructure.scheduler import set_due, clear_due, wake_dispatcher
+from app.infrastructure.database import UnitOfWork
+from app.infrastructure import title_search
 
 logger = logging.getLogger(__name__)
 
 
+def _recurrence_of(reminder: Reminder) -> Optional[Recurrence]:
+    """Decode a reminder's recurrence rule (None for one-off reminders)."""
+    if not reminder.recurrence:
+        return None
+    try:
+        return Recurrence.from_rule(reminder.recurrence)
+    except ValueError:
+        logger.error(f"Invalid recurrence {reminder.recurrence!r} on reminder {reminder.id}")
+        return None
+
+
+def _first_occurrence(recurrence: Recurrence, scheduled_time: datetime) -> Tuple[Recurrence, datetime]:
+    """
+    Anchor a recurrence rule and find its first occurrence from now.
+    
+    Args:
+        recurrence: Rule from the parsed intent
+        scheduled_time: Requested time; its time of day is kept
+    
+    Returns:
+        (anchored rule, first occurrence in PKT)
+    
+    Raises:
+        ValueError: If the rule has no occurrences
+    """
+    now = get_current_time_pkt().replace(tzinfo=None)
+    anchor = to_pkt(scheduled_time).replace(tzinfo=None)
+    if recurrence.weekdays or recurrence.month_day:
+        # The rule's days pick the first occurrence, not the first day named in the message
+        anchor = datetime.combine(now.date(), anchor.time())
+    recurrence = recurrence.anchored(anchor)
+    return recurrence, to_pkt(recurrence.next_occurrence(anchor, now))
+
+
 class ReminderService:
-    """Service class for reminder operations."""
+    """
+    Service class for reminder operations.
+    
+    When given a UnitOfWork, the service only flushes its changes and defers
+    side effects until the unit of work commits; otherwise every operation
+    commits on its own. A reminder's schedule (next_fire_at, follow_up_at)
+    is written on its row by the same flush, so the two cannot diverge;
+    only waking the dispatcher waits for the commit.
+    
+    A service acts for one user: every query is scoped to user_id (the
+    configured default user when omitted).
+    """
     
-    def __init__(self, session: AsyncSession):
+    def __init__(
+        self,
+        session: AsyncSession,
+        unit_of_work: Optional[UnitOfWork] = None,
+        user_id: Optional[str] = None
+    ):
         self.session = session
+        self.unit_of_work = unit_of_work
+        self.user_id = user_id or get_default_user_id()
+    
+    async def _commit(self) -> None:
+        """Commit, or just flush when running inside a unit of work."""
+        if self.unit_of_work is None:
+            await self.session.commit()
+        else:
+            await self.session.flush()
+    
+    async def _rollback(self) -> None:
+        """Discard uncommitted changes (and deferred side effects)."""
+        if self.unit_of_work is None:
+            await self.session.rollback()
+        else:
+            await self.unit_of_work.rollback()
+    
+    async def _after_commit(self, callback, *args) -> None:
+        """Run a side effect now, or once the unit of work commits."""
+        if self.unit_of_work is None:
+            await callback(*args)
+        else:
+            self.unit_of_work.after_commit(callback, *args)
+    
+    @asynccontextmanager
+    async def _read_session(self) -> AsyncIterator[AsyncSession]:
+        """Session for read-only queries: the unit of work's read pool, else our own session."""
+        if self.unit_of_work is None:
+            yield self.session
+        else:
+            async with self.unit_of_work.read_session() as session:
+                yield session
     
     async def handle_intent(self, intent: ParsedIntent) -> str:
         """
@@ -66,6 +154,7 @@ class ReminderService:
                 return await handler(intent)
             except Exception as e:
                 logger.exception(f"Error handling intent {intent.intent}: {e}")
+                await self._rollback()
                 return f"Sorry, I encountered an error: {str(e)}"
         else:
             return intent.response_message or "I'm not sure what you'd like me to do. Try saying something like 'Remind me to...' or 'List my reminders'."
@@ -78,28 +167,39 @@ class ReminderService:
         if not intent.scheduled_time:
             return "When would you like to be reminded? Please include a time, like 'tomorrow at 9am'."
         
+        scheduled_time = to_pkt(intent.scheduled_time)
+        recurrence = None
+        if intent.recurrence:
+            # One row per recurring reminder: store the rule and its first occurrence
+            try:
+                recurrence, scheduled_time = _first_occurrence(intent.recurrence, scheduled_time)
+            except ValueError:
+                return "I couldn't work out when that repeats. Try something like 'every Monday at 9am'."
+        
         # Check for duplicate reminders (same title within 5 minutes)
-        existing = await self._find_similar_reminder(intent.title, intent.scheduled_time)
+        existing = await self._find_similar_reminder(intent.title, scheduled_time)
         if existing:
             return f"You already have a similar reminder: *{existing.title}* scheduled for {format_time_pkt(existing.scheduled_time)}."
         
         # Create the reminder
         reminder = Reminder(
             id=str(uuid4()),
+            user_id=self.user_id,
             title=intent.title,
             description=intent.description,
-            scheduled_time=to_pkt(intent.scheduled_time),
+            scheduled_time=scheduled_time,
+            recurrence=recurrence.to_rule() if recurrence else None,
             follow_up_minutes=intent.follow_up_minutes,
             call_if_no_response=intent.call_if_no_response or False,
             call_opt_out=not (intent.call_if_no_response or False),  # Opt-out by default unless explicitly requested
             status=ReminderStatus.ACTIVE,
         )
         
+        # Schedule it on the row, so both are committed together
+        set_due(reminder)
         self.session.add(reminder)
-        await self.session.commit()
-        
-        # Schedule the reminder
-        await schedule_reminder(reminder)
+        await self._commit()
+        await self._after_commit(wake_dispatcher)
         
         logger.info(f"Created reminder: {reminder.id} - {reminder.title}")
         
@@ -109,6 +209,9 @@ class ReminderService:
         response += f"⏰ {format_time_pkt(reminder.scheduled_time)}\n"
         response += f"📅 ({get_relative_time_description(reminder.scheduled_time)})"
         
+        if recurrence:
+            response += f"\n🔁 Repeats {recurrence.describe()}"
+        
         if reminder.follow_up_minutes:
             response += f"\n⏳ Follow-up: {reminder.follow_up_minutes} minutes after"
         
@@ -126,6 +229,16 @@ class ReminderService:
         if not reminder:
             return f"I couldn't find a reminder matching '{intent.target_reminder}'. Try 'list my reminders' to see your active reminders."
         
+        recurrence = None
+        if intent.recurrence:
+            # Validated before anything changes, like a new recurring reminder
+            try:
+                recurrence, first = _first_occurrence(
+                    intent.recurrence, intent.scheduled_time or reminder.scheduled_time
+                )
+            except ValueError:
+                return "I couldn't work out when that repeats. Try something like 'every Monday at 9am'."
+        
         # Apply updates
         updated_fields = []
         
@@ -141,8 +254,7 @@ class ReminderService:
             reminder.scheduled_time = to_pkt(intent.scheduled_time)
             updated_fields.append("time")
             # Reschedule
-            await cancel_reminder_jobs(reminder.id)
-            await schedule_reminder(reminder)
+            set_due(reminder)
         
         if intent.follow_up_minutes is not None:
             reminder.follow_up_minutes = intent.follow_up_minutes
@@ -153,8 +265,16 @@ class ReminderService:
             reminder.call_opt_out = not intent.call_if_no_response
             updated_fields.append("call settings")
         
+        if recurrence:
+            reminder.recurrence = recurrence.to_rule()
+            reminder.scheduled_time = first
+            set_due(reminder)
+            updated_fields.append("repeat")
+        
         reminder.updated_at = datetime.utcnow()
-        await self.session.commit()
+        await self._commit()
+        if intent.scheduled_time or recurrence:
+            await self._after_commit(wake_dispatcher)
         
         if updated_fields:
             return f"✅ Updated *{reminder.title}*\n\nChanged: {', '.join(updated_fields)}"
@@ -172,12 +292,9 @@ class ReminderService:
         
         title = reminder.title
         
-        # Cancel scheduled jobs
-        await cancel_reminder_jobs(reminder.id)
-        
-        # Delete the reminder
+        # Delete the reminder (its schedule lives on the row)
         await self.session.delete(reminder)
-        await self.session.commit()
+        await self._commit()
         
         logger.info(f"Deleted reminder: {title}")
         
@@ -197,10 +314,10 @@ class ReminderService:
         
         reminder.status = ReminderStatus.PAUSED
         reminder.updated_at = datetime.utcnow()
-        await self.session.commit()
         
         # Cancel scheduled jobs
-        await cancel_reminder_jobs(reminder.id)
+        clear_due(reminder)
+        await self._commit()
         
         return f"⏸️ Paused: *{reminder.title}*\n\nSay 'resume {intent.target_reminder} reminder' to reactivate it."
     
@@ -219,25 +336,36 @@ class ReminderService:
         # Check if the scheduled time has passed
         now = get_current_time_pkt()
         if to_pkt(reminder.scheduled_time) < now:
-            return f"*{reminder.title}* was scheduled for the past. Please update the time first."
+            recurrence = _recurrence_of(reminder)
+            if not recurrence:
+                return f"*{reminder.title}* was scheduled for the past. Please update the time first."
+            # Occurrences missed while paused are skipped
+            reminder.scheduled_time = to_pkt(recurrence.next_occurrence(
+                reminder.scheduled_time.replace(tzinfo=None), now.replace(tzinfo=None)
+            ))
         
         reminder.status = ReminderStatus.ACTIVE
         reminder.updated_at = datetime.utcnow()
-        await self.session.commit()
         
         # Reschedule
-        await schedule_reminder(reminder)
+        set_due(reminder)
+        await self._commit()
+        await self._after_commit(wake_dispatcher)
         
         return f"▶️ Resumed: *{reminder.title}*\n\nScheduled for {format_time_pkt(reminder.scheduled_time)}"
     
     async def _handle_list(self, intent: ParsedIntent) -> str:
         """Handle list reminders intent."""
-        result = await self.session.execute(
-            select(Reminder)
-            .where(Reminder.status.in_([ReminderStatus.ACTIVE, ReminderStatus.PAUSED]))
-            .order_by(Reminder.scheduled_time)
-        )
-        reminders = result.scalars().all()
+        async with self._read_session() as session:
+            result = await session.execute(
+                select(Reminder)
+                .where(
+                    Reminder.user_id == self.user_id,
+                    Reminder.status.in_([ReminderStatus.ACTIVE, ReminderStatus.PAUSED])
+                )
+                .order_by(Reminder.scheduled_time)
+            )
+            reminders = result.scalars().all()
         
         if not reminders:
             return "📭 You don't have any active reminders.\n\nSay 'Remind me to...' to create one!"
@@ -251,6 +379,10 @@ class ReminderService:
             response += f"{i}. {status_icon} *{r.title}* {call_icon}\n"
             response += f"    ⏰ {format_time_pkt(r.scheduled_time, include_date=True)}\n"
             
+            recurrence = _recurrence_of(r)
+            if recurrence:
+                response += f"    🔁 {recurrence.describe()}\n"
+            
             if r.status == ReminderStatus.ACTIVE:
                 response += f"    📅 {get_relative_time_description(r.scheduled_time)}\n"
             
@@ -263,10 +395,16 @@ class ReminderService:
         # Update all active reminders to opt-out from calls
         result = await self.session.execute(
             update(Reminder)
-            .where(Reminder.status == ReminderStatus.ACTIVE)
+            .where(
+                Reminder.user_id == self.user_id,
+                Reminder.status == ReminderStatus.ACTIVE
+            )
             .values(call_opt_out=True, call_if_no_response=False)
         )
-        await self.session.commit()
+        await self.session.execute(
+            update(User).where(User.id == self.user_id).values(call_opt_out=True)
+        )
+        await self._commit()
         
         return "🔕 *Phone calls disabled*\n\nI won't call you for any reminders. You'll only receive WhatsApp messages."
     
@@ -275,10 +413,16 @@ class ReminderService:
         # Note: This doesn't automatically enable calls, just removes the opt-out
         result = await self.session.execute(
             update(Reminder)
-            .where(Reminder.status == ReminderStatus.ACTIVE)
+            .where(
+                Reminder.user_id == self.user_id,
+                Reminder.status == ReminderStatus.ACTIVE
+            )
             .values(call_opt_out=False)
         )
-        await self.session.commit()
+        await self.session.execute(
+            update(User).where(User.id == self.user_id).values(call_opt_out=False)
+        )
+        await self._commit()
         
         return "🔔 *Phone calls enabled*\n\nI can now call you for reminders that have call notifications enabled."
     
@@ -288,6 +432,7 @@ class ReminderService:
         result = await self.session.execute(
             select(Reminder)
             .where(
+                Reminder.user_id == self.user_id,
                 Reminder.status == ReminderStatus.ACTIVE,
                 Reminder.last_notified_at.isnot(None),
                 Reminder.user_responded == False
@@ -297,27 +442,78 @@ class ReminderService:
         )
         reminder = result.scalar_one_or_none()
         
-        if reminder:
+        if reminder and reminder.recurrence:
+            # A recurring reminder stays active for its next occurrence
+            reminder.user_responded = True
+            reminder.updated_at = datetime.utcnow()
+            clear_due(reminder, follow_up_only=True)
+            await self._commit()
+            
+            return f"👍 Got it! Next *{reminder.title}*: {format_time_pkt(reminder.scheduled_time)}."
+        elif reminder:
             reminder.user_responded = True
             reminder.status = ReminderStatus.COMPLETED
             reminder.updated_at = datetime.utcnow()
-            await self.session.commit()
             
             # Cancel any follow-up jobs
-            await cancel_reminder_jobs(reminder.id)
+            clear_due(reminder)
+            await self._commit()
             
             return f"👍 Got it! Marked *{reminder.title}* as completed."
         else:
             return "👍 Thanks for your response!"
     
     async def _find_reminder_by_keyword(self, keyword: str) -> Optional[Reminder]:
-        """Find a reminder by fuzzy matching on title."""
+        """
+        Find one of the user's reminders by fuzzy matching on title.
+        
+        A substring match wins (newest first); otherwise the closest title
+        by word or trigram similarity, which tolerates typos. Titles of a
+        typical user are read through the user_id index and matched in
+        memory; users with very many reminders go through the reminders_fts
+        trigram index instead (see app.infrastructure.title_search).
+        """
+        keyword = keyword.strip()
+        
+        # Unordered so the probe stops after SMALL_USER_LIMIT + 1 index entries
+        result = await self.session.execute(
+            select(Reminder.id, Reminder.title, Reminder.created_at)
+            .where(
+                Reminder.user_id == self.user_id,
+                Reminder.status.in_([ReminderStatus.ACTIVE, ReminderStatus.PAUSED])
+            )
+            .limit(title_search.SMALL_USER_LIMIT + 1)
+        )
+        rows = result.all()
+        
+        if len(rows) <= title_search.SMALL_USER_LIMIT:
+            rows.sort(key=lambda row: row.created_at or datetime.min, reverse=True)
+            reminder_id = title_search.best_match(keyword, [(row.id, row.title) for row in rows])
+        elif len(keyword) < title_search.MIN_TERM_LENGTH:
+            return await self._scan_reminders_by_keyword(keyword)
+        else:
+            try:
+                reminder_id = await title_search.find_by_substring(self.session, self.user_id, keyword)
+                if reminder_id is None:
+                    ranked = await title_search.find_ranked(self.session, self.user_id, keyword)
+                    reminder_id = ranked[0] if ranked else None
+            except OperationalError as e:
+                logger.warning(f"Title index unavailable, scanning reminders: {e}")
+                return await self._scan_reminders_by_keyword(keyword)
+        
+        if reminder_id is None:
+            return None
+        return await self.session.get(Reminder, reminder_id)
+    
+    async def _scan_reminders_by_keyword(self, keyword: str) -> Optional[Reminder]:
+        """Find a reminder by title without the search index."""
         keyword_lower = keyword.lower()
         
         # First try exact match
         result = await self.session.execute(
             select(Reminder)
             .where(
+                Reminder.user_id == self.user_id,
                 Reminder.status.in_([ReminderStatus.ACTIVE, ReminderStatus.PAUSED]),
                 func.lower(Reminder.title).contains(keyword_lower)
             )
@@ -332,13 +528,15 @@ class ReminderService:
         # Try word-by-word matching
         result = await self.session.execute(
             select(Reminder)
-            .where(Reminder.status.in_([ReminderStatus.ACTIVE, ReminderStatus.PAUSED]))
+            .where(
+                Reminder.user_id == self.user_id,
+                Reminder.status.in_([ReminderStatus.ACTIVE, ReminderStatus.PAUSED])
+            )
         )
         reminders = result.scalars().all()
         
         for r in reminders:
-            title_words = r.title.lower().split()
-            if any(keyword_lower in word or word in keyword_lower for word in title_words):
+            if title_search.words_match(keyword_lower, r.title):
                 return r
         
         return None
@@ -356,6 +554,7 @@ class ReminderService:
         result = await self.session.execute(
             select(Reminder)
             .where(
+                Reminder.user_id == self.user_id,
                 Reminder.status == ReminderStatus.ACTIVE,
                 func.lower(Reminder.title) == title.lower(),
                 Reminder.scheduled_time.between(time_min, time_max)
@@ -365,18 +564,6 @@ class ReminderService:
         
         return result.scalar_one_or_none()
     
-    async def mark_reminder_notified(self, reminder_id: str) -> None:
-        """Mark a reminder as having sent a notification."""
-        result = await self.session.execute(
-            select(Reminder).where(Reminder.id == reminder_id)
-        )
-        reminder = result.scalar_one_or_none()
-        
-        if reminder:
-            reminder.last_notified_at = datetime.utcnow()
-            reminder.user_responded = False
-            await self.session.commit()
-    
     async def check_user_responded(self, reminder_id: str) -> bool:
         """Check if the user has responded to a reminder."""
         result = await self.session.execute(
@@ -393,7 +580,10 @@ class ReminderService:
         # Get all active/paused reminders ordered by scheduled_time
         result = await self.session.execute(
             select(Reminder)
-            .where(Reminder.status.in_([ReminderStatus.ACTIVE, ReminderStatus.PAUSED]))
+            .where(
+                Reminder.user_id == self.user_id,
+                Reminder.status.in_([ReminderStatus.ACTIVE, ReminderStatus.PAUSED])
+            )
             .order_by(Reminder.scheduled_time)
         )
         reminders = result.scalars().all()
@@ -410,15 +600,12 @@ class ReminderService:
                 reminder = reminders[idx - 1]
                 deleted_titles.append(reminder.title)
                 
-                # Cancel scheduled jobs
-                await cancel_reminder_jobs(reminder.id)
-                
-                # Delete the reminder
+                # Delete the reminder (its schedule lives on the row)
                 await self.session.delete(reminder)
             else:
                 invalid_indices.append(idx)
         
-        await self.session.commit()
+        await self._commit()
         
         response = ""
         if deleted_titles:
@@ -449,6 +636,10 @@ class ReminderService:
         if reminder.description:
             response += f"📝 Description: {reminder.description}\n"
         
+        recurrence = _recurrence_of(reminder)
+        if recurrence:
+            response += f"🔁 Repeats {recurrence.describe()}\n"
+        
         status_text = "Active" if reminder.status == ReminderStatus.ACTIVE else "Paused"
         response += f"📊 Status: {status_text}\n"
         
@@ -472,7 +663,10 @@ class ReminderService:
         if not reminder and intent.target_indices and len(intent.target_indices) > 0:
             result = await self.session.execute(
                 select(Reminder)
-                .where(Reminder.status.in_([ReminderStatus.ACTIVE, ReminderStatus.PAUSED]))
+                .where(
+                    Reminder.user_id == self.user_id,
+                    Reminder.status.in_([ReminderStatus.ACTIVE, ReminderStatus.PAUSED])
+                )
                 .order_by(Reminder.scheduled_time)
             )
             reminders = result.scalars().all()
@@ -485,6 +679,7 @@ class ReminderService:
             result = await self.session.execute(
                 select(Reminder)
                 .where(
+                    Reminder.user_id == self.user_id,
                     Reminder.status == ReminderStatus.ACTIVE,
                     Reminder.last_notified_at.isnot(None),
                     Reminder.user_responded == False
@@ -505,23 +700,30 @@ class ReminderService:
         
         # Update the reminder
         old_time = reminder.scheduled_time
-        reminder.scheduled_time = to_pkt(new_time)
         reminder.user_responded = True  # Mark as responded
         reminder.updated_at = datetime.utcnow()
         
         # Reschedule
-        await cancel_reminder_jobs(reminder.id)
         reminder.status = ReminderStatus.ACTIVE
-        await self.session.commit()
-        await schedule_reminder(reminder)
+        if reminder.recurrence:
+            # Only this occurrence moves; the series keeps its schedule
+            set_due(reminder, to_pkt(new_time))
+        else:
+            reminder.scheduled_time = to_pkt(new_time)
+            set_due(reminder)
+        await self._commit()
+        await self._after_commit(wake_dispatcher)
         
-        return f"⏰ Snoozed *{reminder.title}*\n\nNew time: {format_time_pkt(reminder.scheduled_time, include_date=True)}\n📅 ({get_relative_time_description(reminder.scheduled_time)})"
+        return f"⏰ Snoozed *{reminder.title}*\n\nNew time: {format_time_pkt(new_time, include_date=True)}\n📅 ({get_relative_time_description(new_time)})"
     
     async def get_reminders_list(self) -> List[Reminder]:
         """Get list of active/paused reminders ordered by scheduled time."""
         result = await self.session.execute(
             select(Reminder)
-            .where(Reminder.status.in_([ReminderStatus.ACTIVE, ReminderStatus.PAUSED]))
+            .where(
+                Reminder.user_id == self.user_id,
+                Reminder.status.in_([ReminderStatus.ACTIVE, ReminderStatus.PAUSED])
+            )
             .order_by(Reminder.scheduled_time)
         )
         return result.scalars().all()
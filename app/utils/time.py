@@ -2,13 +2,14 @@
 Time utilities for Pakistan Standard Time (PKT) handling.
 """
 
-from datetime import datetime, timedelta
+from datetime import date, datetime, time, timedelta
 from zoneinfo import ZoneInfo
-from typing import Optional
+from typing import Dict, Optional, Tuple
 import re
 
 from dateutil import parser as dateutil_parser
-from dateutil.relativedelta import relativedelta
+
+from app.domain.recurrence import Recurrence, RecurrenceFrequency
 
 # Pakistan Standard Time
 PKT = ZoneInfo("Asia/Karachi")
@@ -50,150 +51,308 @@ def from_pkt_to_utc(dt: datetime) -> datetime:
     return dt.astimezone(ZoneInfo("UTC"))
 
 
-def parse_natural_time(time_str: str, reference_time: datetime = None) -> Optional[datetime]:
+# Day names (Monday=0, Sunday=6)
+_WEEKDAY_NUMBERS = {
+    'monday': 0, 'mon': 0, 'tuesday': 1, 'tue': 1, 'tues': 1, 'wednesday': 2, 'wed': 2,
+    'thursday': 3, 'thu': 3, 'thur': 3, 'thurs': 3, 'friday': 4, 'fri': 4,
+    'saturday': 5, 'sat': 5, 'sunday': 6, 'sun': 6
+}
+_MONTH_NUMBERS = {
+    'january': 1, 'jan': 1, 'february': 2, 'feb': 2, 'march': 3, 'mar': 3, 'april': 4, 'apr': 4,
+    'may': 5, 'june': 6, 'jun': 6, 'july': 7, 'jul': 7, 'august': 8, 'aug': 8,
+    'september': 9, 'sept': 9, 'sep': 9, 'october': 10, 'oct': 10, 'november': 11, 'nov': 11,
+    'december': 12, 'dec': 12
+}
+_RELATIVE_DAYS = {"day after tomorrow": 2, "tomorrow": 1, "today": 0, "next week": 7}
+_IN_UNITS = {
+    "minute": timedelta(minutes=1), "min": timedelta(minutes=1),
+    "hour": timedelta(hours=1), "hr": timedelta(hours=1),
+    "day": timedelta(days=1),
+}
+
+
+def _alternatives(names) -> str:
+    return "|".join(sorted(names, key=len, reverse=True))
+
+
+_MONTH_PATTERN = r"(?:" + _alternatives(_MONTH_NUMBERS) + r")"
+_AMPM = r"\s*(?P<{0}>[ap])\.?m\b\.?"
+
+# First letters of the words a token can start with
+_TOKEN_LETTERS = "".join(sorted(
+    {word[0] for word in [*_WEEKDAY_NUMBERS, *_MONTH_NUMBERS, *_RELATIVE_DAYS, "in", "before", "at", "next"]}
+))
+
+# Every time expression the parser understands, as one alternation scanned
+# once over the message; the outer group of each alternative names it.
+# Tokens start a word, with a digit or one of _TOKEN_LETTERS; checking that
+# first lets the scan skip most positions without trying the alternatives.
+_TOKEN_RE = re.compile(r"\b(?:(?=\d)(?:" + "|".join([
+    # "2026-03-15"
+    r"(?P<iso>(?<![\w-])(?P<iso_year>\d{4})-(?P<iso_month>\d{1,2})-(?P<iso_day>\d{1,2})(?![\w-]))",
+    # "15/03" or "15/03/2026" (day first)
+    r"(?P<numeric>(?<![\w/])(?P<numeric_day>\d{1,2})/(?P<numeric_month>\d{1,2})(?:/(?P<numeric_year>\d{4}|\d{2}))?(?![\w/]))",
+    # "5 of march", "15th april 2026"
+    r"(?P<day_month>(?<![\w.:])(?P<dm_day>\d{1,2})(?:st|nd|rd|th)?\s+(?:of\s+)?(?P<dm_month>" + _MONTH_PATTERN + r")\b\.?"
+    r"(?:,?\s+(?P<dm_year>\d{4})\b)?)",
+    # "9am", "9:30 pm", "10.30 a.m."
+    r"(?P<clock>(?<![\w.:])(?P<hour>\d{1,2})(?:[:.](?P<minute>\d{2}))?" + _AMPM.format("ampm") + r")",
+    # "14:30"
+    r"(?P<clock24>(?<![\w.:])(?P<hour24>\d{1,2}):(?P<minute24>\d{2})(?::\d{2})?(?![\w:]))",
+]) + r")|(?=[" + _TOKEN_LETTERS + r"])(?:" + "|".join([
+    # "in 30 minutes", "in 2 hrs", "in 3 days"
+    r"(?P<in>in\s+(?P<in_amount>\d+)\s*(?P<in_unit>minute|min|hour|hr|day)s?\b)",
+    # "before 7pm"
+    r"(?P<before>before\s+(?P<before_hour>\d{1,2})" + _AMPM.format("before_ampm") + r")",
+    # "march 5th, 2026" (not "mar 5pm")
+    r"(?P<month_day>(?P<md_month>" + _MONTH_PATTERN + r")\.?\s+(?P<md_day>\d{1,2})(?:st|nd|rd|th)?"
+    r"(?![\d:.]|\s*[ap]\.?m\b)(?:,?\s+(?P<md_year>\d{4})\b)?)",
+    # "at 5": no am/pm and no minutes, so the hour is ambiguous
+    r"(?P<bare>at\s+\d{1,2}\b(?![:.]\d|\s*[ap]\.?m\b))",
+    r"(?P<relative>(?:" + _alternatives(_RELATIVE_DAYS) + r")\b)",
+    r"(?P<weekday>(?P<next>next\s+)?(?P<day>" + _alternatives(_WEEKDAY_NUMBERS) + r")\b)",
+]) + "))")
+
+
+# A digit, or a sign dateutil reads as a UTC offset
+_HINT_RE = re.compile(r"[\d+\-]")
+_DAY_NAME_RES = {name: re.compile(r"\b" + name + r"\b") for name in _WEEKDAY_NUMBERS}
+
+
+def _clock(hour: int, minute: int, ampm: Optional[str]) -> Optional[Tuple[int, int]]:
+    """24-hour (hour, minute), or None if the time is impossible ("13pm", "9:75")."""
+    if minute > 59 or hour > (12 if ampm else 23) or (ampm and hour == 0):
+        return None
+    if ampm == "p" and hour != 12:
+        hour += 12
+    elif ampm == "a" and hour == 12:
+        hour = 0
+    return hour, minute
+
+
+def _date(match: re.Match, reference_time: datetime) -> Optional[date]:
     """
-    Parse natural language time expressions into datetime.
-    
-    Args:
-        time_str: Natural language time string (e.g., "tomorrow at 9am")
-        reference_time: Reference time for relative expressions (defaults to now in PKT)
+    The calendar date of a date token.
     
-    Returns:
-        Parsed datetime in PKT, or None if parsing fails
+    Dates without a year mean the next time that day comes round.
     """
-    if reference_time is None:
-        reference_time = get_current_time_pkt()
-    
-    time_str_lower = time_str.lower().strip()
+    kind = match.lastgroup
+    if kind == "iso":
+        year, month, day = int(match["iso_year"]), int(match["iso_month"]), int(match["iso_day"])
+    elif kind == "numeric":
+        day, month, year = int(match["numeric_day"]), int(match["numeric_month"]), match["numeric_year"]
+    elif kind == "month_day":
+        day, month, year = int(match["md_day"]), _MONTH_NUMBERS[match["md_month"]], match["md_year"]
+    else:
+        day, month, year = int(match["dm_day"]), _MONTH_NUMBERS[match["dm_month"]], match["dm_year"]
     
-    # Day name mapping (Monday=0, Sunday=6)
-    day_names = {
-        'monday': 0, 'mon': 0,
-        'tuesday': 1, 'tue': 1, 'tues': 1,
-        'wednesday': 2, 'wed': 2,
-        'thursday': 3, 'thu': 3, 'thur': 3, 'thurs': 3,
-        'friday': 4, 'fri': 4,
-        'saturday': 5, 'sat': 5,
-        'sunday': 6, 'sun': 6
-    }
+    try:
+        if year is None:
+            result = date(reference_time.year, month, day)
+            return result if result >= reference_time.date() else result.replace(year=result.year + 1)
+        year = int(year)
+        return date(year + 2000 if year < 100 else year, month, day)
+    except ValueError:
+        return None
+
+
+def _parse_with_dateutil(text: str, reference_time: datetime) -> Optional[datetime]:
+    """
+    Read a phrase the grammar does not account for, with dateutil.
     
-    # Check for day names in the string
+    This is the parser's original reading: the first day name (or else
+    relative day) picks the day, dateutil reads the time from the rest of
+    the phrase, and a day without a time means 9:00 AM.
+    """
     day_offset = 0
-    time_part = time_str_lower
-    found_day = False
-    is_next_week = 'next ' in time_str_lower
-    
-    # Remove "next" for parsing
-    check_str = time_str_lower.replace('next ', '')
-    
-    for day_name, target_weekday in day_names.items():
-        # Check if day name is in the string (as a word boundary)
-        pattern = r'\b' + day_name + r'\b'
-        if re.search(pattern, check_str):
-            current_weekday = reference_time.weekday()
-            
-            # Calculate days until target day
-            days_ahead = (target_weekday - current_weekday) % 7
-            
-            # If it's today (days_ahead=0) and we want the UPCOMING one, go to next week
-            if days_ahead == 0:
-                days_ahead = 7
-            
-            # If "next" was specified, add another week
-            if is_next_week:
-                days_ahead += 7
-            
-            day_offset = days_ahead
-            # Remove the day name from time_part
-            time_part = re.sub(pattern, '', check_str)
-            time_part = time_part.replace('next', '').strip()
-            found_day = True
+    time_part = text
+    check_str = text.replace("next ", "")
+    for name, weekday in _WEEKDAY_NUMBERS.items():
+        if _DAY_NAME_RES[name].search(check_str):
+            # The upcoming day, a week out if it is today; "next" adds a week
+            day_offset = (weekday - reference_time.weekday()) % 7 or 7
+            if "next " in text:
+                day_offset += 7
+            time_part = _DAY_NAME_RES[name].sub("", check_str).replace("next", "")
             break
-    
-    # Handle relative day expressions (only if no day name found)
-    if not found_day:
-        time_part = time_str_lower
-        
-        if "tomorrow" in time_str_lower:
-            day_offset = 1
-            time_part = time_str_lower.replace("tomorrow", "").strip()
-        elif "day after tomorrow" in time_str_lower:
-            day_offset = 2
-            time_part = time_str_lower.replace("day after tomorrow", "").strip()
-        elif "today" in time_str_lower:
-            day_offset = 0
-            time_part = time_str_lower.replace("today", "").strip()
-        elif "next week" in time_str_lower:
-            day_offset = 7
-            time_part = time_str_lower.replace("next week", "").strip()
-    
-    # Clean up common words
+    else:
+        for phrase, offset in _RELATIVE_DAYS.items():
+            if phrase in text:
+                day_offset = offset
+                time_part = text.replace(phrase, "")
+                break
     time_part = time_part.replace("at", "").replace("on", "").strip()
     
-    # Handle "in X minutes/hours" patterns
-    in_pattern = r"in\s+(\d+)\s*(minute|min|hour|hr|day)s?"
-    in_match = re.search(in_pattern, time_str)
-    if in_match:
-        amount = int(in_match.group(1))
-        unit = in_match.group(2)
-        
-        if unit in ["minute", "min"]:
-            return reference_time + timedelta(minutes=amount)
-        elif unit in ["hour", "hr"]:
-            return reference_time + timedelta(hours=amount)
-        elif unit == "day":
-            return reference_time + timedelta(days=amount)
-    
-    # Handle "before Xpm/am" patterns
-    before_pattern = r"before\s+(\d{1,2})\s*(am|pm)"
-    before_match = re.search(before_pattern, time_str)
-    if before_match:
-        hour = int(before_match.group(1))
-        ampm = before_match.group(2)
-        
-        if ampm == "pm" and hour != 12:
-            hour += 12
-        elif ampm == "am" and hour == 12:
-            hour = 0
-        
-        target_date = reference_time.date() + timedelta(days=day_offset)
-        return datetime(target_date.year, target_date.month, target_date.day, hour, 0, tzinfo=PKT)
-    
-    # Try to parse the time part
+    target_date = reference_time.date() + timedelta(days=day_offset)
     if time_part:
         try:
-            # Handle simple time formats like "9am", "7pm", "14:30"
-            parsed_time = dateutil_parser.parse(time_part, fuzzy=True)
-            target_date = reference_time.date() + timedelta(days=day_offset)
-            
-            result = datetime(
-                target_date.year,
-                target_date.month,
-                target_date.day,
-                parsed_time.hour,
-                parsed_time.minute,
-                tzinfo=PKT
-            )
-            
+            parsed = dateutil_parser.parse(time_part, fuzzy=True)
+        except (ValueError, TypeError, OverflowError):
+            parsed = None
+        if parsed is not None:
+            result = datetime.combine(target_date, time(parsed.hour, parsed.minute), tzinfo=reference_time.tzinfo)
             # If the time has already passed today and no day offset, assume tomorrow
             if day_offset == 0 and result < reference_time:
                 result += timedelta(days=1)
-            
             return result
-        except (ValueError, TypeError):
-            pass
     
-    # If only day offset but no time, default to 9:00 AM
     if day_offset > 0:
+        return datetime.combine(target_date, time(9, 0), tzinfo=reference_time.tzinfo)
+    return None
+
+
+def parse_natural_time(time_str: str, reference_time: datetime = None) -> Optional[datetime]:
+    """
+    Parse natural language time expressions into datetime.
+    
+    The message is scanned once with a single precompiled pattern and read
+    with a fixed grammar:
+    
+    - "in N minutes/hours/days" is relative to the reference time;
+    - a date ("March 5", "5th of March", "2026-03-15", "15/03") or else a
+      day ("next Friday", "tomorrow", "day after tomorrow", "next week")
+      picks the day;
+    - "before 7pm" or the first clock time ("9am", "10.30 pm", "14:30")
+      picks the time; a clock time with no day that has already passed
+      today means tomorrow;
+    - a date or a future day without a time means 9:00 AM.
+    
+    Text with no token and no digit is not a time. Phrasings the grammar
+    does not account for fall back to dateutil: a digit or sign outside
+    the tokens ("delete 3", "9pm - call mom"), a second date, day or time
+    ("from 9am to 5pm"), an hour without am/pm or minutes ("at 5") and
+    values the grammar cannot read ("13pm").
+    
+    Args:
+        time_str: Natural language time string (e.g., "tomorrow at 9am")
+        reference_time: Reference time for relative expressions (defaults to now in PKT)
+    
+    Returns:
+        Parsed datetime in PKT, or None if the text names no time
+    """
+    text = time_str.lower()
+    tokens: Dict[str, re.Match] = {}
+    fallback = False
+    end = 0
+    for match in _TOKEN_RE.finditer(text):
+        fallback = fallback or match.lastgroup in tokens or _HINT_RE.search(text, end, match.start()) is not None
+        tokens.setdefault(match.lastgroup, match)
+        end = match.end()
+    fallback = fallback or "bare" in tokens or _HINT_RE.search(text, end) is not None
+    if not tokens and not fallback:
+        return None
+    
+    if reference_time is None:
+        reference_time = get_current_time_pkt()
+    
+    match = tokens.get("in")
+    if match:
+        return reference_time + _IN_UNITS[match["in_unit"]] * int(match["in_amount"])
+    if fallback:
+        return _parse_with_dateutil(text.strip(), reference_time)
+    
+    # The day: an explicit date, else a weekday, else a relative day
+    date_tokens = [tokens[kind] for kind in ("iso", "numeric", "month_day", "day_month") if kind in tokens]
+    day_offset = 0
+    if date_tokens:
+        target_date = _date(min(date_tokens, key=re.Match.start), reference_time)
+        if target_date is None:
+            return _parse_with_dateutil(text.strip(), reference_time)
+    else:
+        if "weekday" in tokens:
+            match = tokens["weekday"]
+            # The upcoming day, a week out if it is today; "next" adds a week
+            day_offset = (_WEEKDAY_NUMBERS[match["day"]] - reference_time.weekday()) % 7 or 7
+            if match["next"]:
+                day_offset += 7
+        elif "relative" in tokens:
+            day_offset = _RELATIVE_DAYS[tokens["relative"].group()]
         target_date = reference_time.date() + timedelta(days=day_offset)
-        return datetime(target_date.year, target_date.month, target_date.day, 9, 0, tzinfo=PKT)
     
-    # Try dateutil parser as fallback
-    try:
-        parsed = dateutil_parser.parse(time_str, fuzzy=True)
-        return to_pkt(parsed)
-    except (ValueError, TypeError):
+    # The time of day
+    if "before" in tokens:
+        match = tokens["before"]
+        time_of_day = _clock(int(match["before_hour"]), 0, match["before_ampm"])
+    elif "clock" in tokens or "clock24" in tokens:
+        clocks = [tokens[kind] for kind in ("clock", "clock24") if kind in tokens]
+        match = min(clocks, key=re.Match.start)
+        if match.lastgroup == "clock":
+            time_of_day = _clock(int(match["hour"]), int(match["minute"] or 0), match["ampm"])
+        else:
+            time_of_day = _clock(int(match["hour24"]), int(match["minute24"]), None)
+    elif date_tokens or day_offset > 0:
+        time_of_day = (9, 0)
+    else:
         return None
+    if time_of_day is None:
+        return _parse_with_dateutil(text.strip(), reference_time)
+    
+    # A clock time that has already passed today, with no day given, means tomorrow
+    if not date_tokens and day_offset == 0 and "before" not in tokens and time(*time_of_day) < reference_time.time():
+        target_date += timedelta(days=1)
+    return datetime.combine(target_date, time(*time_of_day), tzinfo=reference_time.tzinfo)
+
+
+# Recurrence phrases, checked in order
+_DAY_PATTERN = r"(?:" + "|".join(sorted(_WEEKDAY_NUMBERS, key=len, reverse=True)) + r")s?"
+_HOURLY_RE = re.compile(r"\bevery\s+(?:(\d{1,3})\s+)?(?:hours?|hrs?)\b|\bhourly\b")
+_WEEKDAYS_RE = re.compile(r"\b(?:every|each|on)\s+weekdays?\b|\bweekdays\b|\bevery\s+working\s+day\b")
+_PLURAL_DAY_PATTERN = r"(?:mondays|tuesdays|wednesdays|thursdays|fridays|saturdays|sundays)"
+# "every Monday and Thursday", or a plural "on Mondays" ("on Monday" is a one-off)
+_WEEKLY_DAYS_RE = re.compile(
+    r"\b(?:every|each)\s+(" + _DAY_PATTERN + r"(?:\s*(?:,|and|&)\s*" + _DAY_PATTERN + r")*)\b"
+    r"|\bon\s+(" + _PLURAL_DAY_PATTERN + r"(?:\s*(?:,|and|&)\s*" + _PLURAL_DAY_PATTERN + r")*)\b"
+)
+_WEEKLY_RE = re.compile(r"\b(?:every|each)\s+week\b|\bweekly\b")
+_MONTH_DAY_RE = re.compile(r"\b(\d{1,2})(?:st|nd|rd|th)\b")
+_MONTHLY_RE = re.compile(r"\b(?:every|each)\s+month\b|\bmonthly\b")
+_DAILY_RE = re.compile(r"\b(?:every|each)\s+(?:day|morning|evening|night)\b|\b(?:daily|everyday)\b")
+
+
+def parse_recurrence(text: str) -> Optional[Recurrence]:
+    """
+    Extract a recurrence rule from a message.
+    
+    Understands "every 3 hours", "hourly", "every weekday", "every Monday
+    and Thursday", "weekly", "every month on the 5th", "monthly", "every
+    day" and "daily". Weekly rules without named days and monthly rules
+    without a day repeat on the day of the first occurrence.
+    
+    Args:
+        text: Message text
+    
+    Returns:
+        The rule, or None if the message does not ask for a repeat
+    """
+    text = text.lower()
+    
+    match = _HOURLY_RE.search(text)
+    if match:
+        return Recurrence(frequency=RecurrenceFrequency.HOURLY, interval=int(match.group(1) or 1))
+    
+    if _WEEKDAYS_RE.search(text):
+        return Recurrence(frequency=RecurrenceFrequency.WEEKDAYS)
+    
+    match = _WEEKLY_DAYS_RE.search(text)
+    if match:
+        days = sorted({
+            _WEEKDAY_NUMBERS[name.rstrip("s") if name.rstrip("s") in _WEEKDAY_NUMBERS else name]
+            for name in re.findall(_DAY_PATTERN, match.group(1) or match.group(2))
+        })
+        return Recurrence(frequency=RecurrenceFrequency.WEEKLY, weekdays=days)
+    
+    if _WEEKLY_RE.search(text):
+        return Recurrence(frequency=RecurrenceFrequency.WEEKLY)
+    
+    if _MONTHLY_RE.search(text):
+        match = _MONTH_DAY_RE.search(text)
+        month_day = int(match.group(1)) if match and 1 <= int(match.group(1)) <= 31 else None
+        return Recurrence(frequency=RecurrenceFrequency.MONTHLY, month_day=month_day)
+    
+    if _DAILY_RE.search(text):
+        return Recurrence(frequency=RecurrenceFrequency.DAILY)
+    
+    return None
 
 
 def format_time_pkt(dt: datetime, include_date: bool = True) -> str:
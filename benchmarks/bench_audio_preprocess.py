@@ -0,0 +1,161 @@
+"""
+Benchmark: voice note preprocessing, bytes uploaded to Whisper and wall time.
+
+Runs every clip of a corpus through preprocess_audio (the process pool that
+trims silence, downmixes to mono and re-encodes 16 kHz Opus) and reports
+original vs uploaded bytes, the time spent preprocessing, and the upload
+time saved at --uplink-mbps. With --clips, the corpus is every audio file
+in that directory; otherwise a synthetic one is generated: tones framed
+by leading/trailing silence, encoded as the formats users send (stereo
+48 kHz Opus like forwarded audio, 128 kbps MP3, 44.1 kHz WAV).
+
+It also measures the worst event loop stall while the whole corpus is
+preprocessed at once, through the pool and inline on the loop, to show
+the work stays off the event loop.
+
+Needs ffmpeg and ffprobe on PATH.
+
+Usage:
+    python -m benchmarks.bench_audio_preprocess [--clips DIR] [--count 12]
+                                                [--uplink-mbps 10]
+"""
+
+import argparse
+import asyncio
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from unittest.mock import patch
+
+from pydub import AudioSegment
+from pydub.generators import Sine, WhiteNoise
+
+from app.infrastructure import audio_handler
+from app.infrastructure.audio_handler import close_audio_pool, get_audio_pool, preprocess_audio
+
+# (extension, export arguments) for the synthetic corpus
+FORMATS = [
+    ("ogg", {"format": "ogg", "codec": "libopus", "bitrate": "64k"}),
+    ("mp3", {"format": "mp3", "bitrate": "128k"}),
+    ("wav", {"format": "wav"}),
+]
+
+
+def synthetic_clip(seconds: int, index: int) -> AudioSegment:
+    """48 kHz stereo "speech" (tone bursts over noise) with silence at both ends."""
+    speech = AudioSegment.empty()
+    for burst in range(seconds * 2):
+        tone = Sine(180 + 40 * ((burst + index) % 5)).to_audio_segment(duration=350, volume=-12)
+        speech += tone.overlay(WhiteNoise().to_audio_segment(duration=350, volume=-35))
+        speech += AudioSegment.silent(duration=150)
+    leading = AudioSegment.silent(duration=800 + 300 * (index % 4))
+    trailing = AudioSegment.silent(duration=1500 + 500 * (index % 3))
+    return (leading + speech + trailing).set_frame_rate(48000).set_channels(2)
+
+
+def build_corpus(directory: str, count: int) -> list:
+    paths = []
+    for index in range(count):
+        extension, export_args = FORMATS[index % len(FORMATS)]
+        path = os.path.join(directory, f"clip{index:02d}.{extension}")
+        synthetic_clip(5 + 5 * (index % 6), index).export(path, **export_args)
+        paths.append(path)
+    return paths
+
+
+async def preprocess(path: str) -> tuple:
+    """Preprocess one clip; return (original bytes, uploaded bytes, seconds)."""
+    original = open(path, "rb")
+    original_size = os.path.getsize(path)
+    started = time.perf_counter()
+    audio_file, _ = await preprocess_audio(original, os.path.basename(path))
+    elapsed = time.perf_counter() - started
+    uploaded = audio_file.seek(0, os.SEEK_END)
+    audio_file.close()
+    return original_size, uploaded, elapsed
+
+
+async def max_loop_stall(work) -> float:
+    """Run `work` while a ticker measures the longest the event loop was blocked."""
+    stall = 0.0
+    done = False
+    
+    async def ticker():
+        nonlocal stall
+        while not done:
+            before = time.perf_counter()
+            await asyncio.sleep(0.005)
+            stall = max(stall, time.perf_counter() - before - 0.005)
+    
+    task = asyncio.create_task(ticker())
+    await work
+    done = True
+    await task
+    return stall
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clips", help="Directory of audio files (default: synthetic corpus)")
+    parser.add_argument("--count", type=int, default=12, help="Synthetic clips to generate")
+    parser.add_argument("--uplink-mbps", type=float, default=10.0)
+    args = parser.parse_args()
+    
+    if not (shutil.which("ffmpeg") and shutil.which("ffprobe")):
+        sys.exit("ffmpeg and ffprobe are required for this benchmark")
+    
+    with tempfile.TemporaryDirectory() as directory, \
+         patch.object(audio_handler.settings, "audio_preprocess_enabled", True), \
+         patch.object(audio_handler.settings, "audio_preprocess_min_bytes", 0):
+        if args.clips:
+            paths = sorted(
+                os.path.join(args.clips, name) for name in os.listdir(args.clips)
+                if os.path.isfile(os.path.join(args.clips, name))
+            )
+        else:
+            paths = build_corpus(directory, args.count)
+        
+        # Start the workers before timing
+        get_audio_pool().submit(int).result()
+        
+        print(f"{len(paths)} clips, uplink {args.uplink_mbps:.0f} Mbps\n")
+        results = []
+        for path in paths:
+            original, uploaded, seconds = await preprocess(path)
+            results.append((original, uploaded, seconds))
+            print(
+                f"  {os.path.basename(path):<14} {original / 1024:8.1f}KB -> {uploaded / 1024:7.1f}KB  "
+                f"({uploaded / original:6.1%})  {seconds * 1000:7.1f}ms"
+            )
+        
+        original_total = sum(r[0] for r in results)
+        uploaded_total = sum(r[1] for r in results)
+        preprocess_total = sum(r[2] for r in results)
+        upload_saved = (original_total - uploaded_total) * 8 / (args.uplink_mbps * 1_000_000)
+        print(
+            f"\n  uploaded {uploaded_total / 1024:.0f}KB of {original_total / 1024:.0f}KB "
+            f"({uploaded_total / original_total:.1%})"
+        )
+        print(
+            f"  preprocessing {preprocess_total:.2f}s total, {statistics.median(r[2] for r in results) * 1000:.0f}ms median; "
+            f"upload time saved {upload_saved:.2f}s"
+        )
+        
+        pooled = await max_loop_stall(asyncio.gather(*(preprocess(path) for path in paths)))
+        
+        async def inline():
+            for path in paths:
+                with tempfile.NamedTemporaryFile(suffix=".ogg") as output:
+                    audio_handler._preprocess_file(path, output.name, audio_handler.settings.audio_preprocess_bitrate)
+        
+        blocking = await max_loop_stall(inline())
+        print(f"\n  worst event loop stall: pool {pooled * 1000:.1f}ms, inline {blocking * 1000:.1f}ms")
+    
+    close_audio_pool()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,177 @@
+"""
+Benchmark: reminder dispatcher cost as the number of future reminders grows.
+
+Seeds a SQLite file per size with future reminders (next_fire_at spread
+over a year) plus one batch that is already due, then times the
+dispatcher's due query and next-due lookup, scheduling/cancelling one
+reminder, and a full dispatch pass over the due batch (WhatsApp sends are
+stubbed). Peak Python memory of the pass is reported as well: the
+dispatcher reads one batch at a time, so neither latency nor memory should
+grow with the number of stored reminders.
+
+The burst section makes --burst reminders due in the same second and
+delivers them with batched delivery (bounded send pool, one UPDATE per
+batch) at several pool sizes; a pool of 1 sends one message at a time.
+Sends are stubbed with --send-latency-ms of simulated Twilio latency.
+
+Usage:
+    python -m benchmarks.bench_dispatcher [--sizes 10000 100000 500000] [--repeats 50]
+                                          [--burst 1000] [--send-latency-ms 50]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from unittest.mock import AsyncMock, patch
+
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app.domain.reminder import Base, Reminder
+from app.domain.conversation_history import ConversationMessage  # noqa: F401 - needed for table creation
+from app.domain.job_lease import JobLease  # noqa: F401 - needed for table creation
+from app.domain.inbound_message import InboundMessage  # noqa: F401 - needed for table creation
+from app.domain.user import User  # noqa: F401 - needed for table creation
+from app.infrastructure.migrations import apply_migrations
+from app.infrastructure.scheduler import ReminderDispatcher, clear_due, set_due
+
+USER_ID = "+923001234567"
+NOW = datetime.utcnow().replace(microsecond=0)
+BATCH_SIZE = 100
+
+SEED_SQL = """
+INSERT INTO reminders (id, user_id, title, scheduled_time, call_if_no_response, call_opt_out,
+                       status, created_at, updated_at, user_responded, next_fire_at)
+WITH RECURSIVE seq(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < :count)
+SELECT
+    printf('r-%07d', n), :user_id, 'Reminder ' || n, '2026-01-01 17:00:00', 0, 1, 'ACTIVE',
+    '2025-01-01 00:00:00', '2025-01-01 00:00:00', 0,
+    CASE WHEN n <= :due THEN strftime('%Y-%m-%d %H:%M:%f000', :now)
+         ELSE strftime('%Y-%m-%d %H:%M:%f000', :now, '+' || (1 + n % 525600) || ' minutes') END
+FROM seq
+"""
+
+
+async def seed_database(path: str, count: int, due: int = BATCH_SIZE, now: datetime = NOW):
+    # Same engine setup as app.infrastructure.database
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{path}",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(apply_migrations)
+        await conn.execute(text(SEED_SQL), {"count": count, "user_id": USER_ID, "due": due, "now": now.isoformat(sep=" ")})
+        await conn.execute(
+            text("INSERT OR IGNORE INTO users (id, whatsapp_number, phone_number, call_opt_out) VALUES (:id, :wa, :id, 1)"),
+            {"id": USER_ID, "wa": f"whatsapp:{USER_ID}"}
+        )
+    return engine
+
+
+async def timed(repeats: int, operation) -> list:
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        await operation()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def ms(latencies: list) -> str:
+    return f"{statistics.median(latencies) * 1000:7.2f}ms"
+
+
+async def bench_size(engine, repeats: int) -> str:
+    factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    dispatcher = ReminderDispatcher(batch_size=BATCH_SIZE, poll_seconds=30, concurrency=10)
+    async with factory() as session:
+        reminder = await session.get(Reminder, f"r-{BATCH_SIZE + 1:07d}")
+    
+    async def reschedule():
+        async with factory() as session:
+            row = await session.get(Reminder, reminder.id)
+            clear_due(row)
+            set_due(row)
+            await session.commit()
+    
+    with patch("app.infrastructure.database.DatabaseSession", factory), \
+         patch("app.infrastructure.twilio_whatsapp.send_reminder_notification", new_callable=AsyncMock):
+        due = await timed(repeats, lambda: dispatcher._due(Reminder.next_fire_at, NOW))
+        next_due = await timed(repeats, dispatcher._seconds_until_next_due)
+        schedule = await timed(repeats, reschedule)
+        
+        tracemalloc.start()
+        start = time.perf_counter()
+        await dispatcher.dispatch_due(NOW)
+        dispatch = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    
+    assert dispatcher.delivery.delivered == BATCH_SIZE
+    return (
+        f"due query {ms(due)}  next due {ms(next_due)}  schedule+cancel {ms(schedule)}  "
+        f"dispatch {BATCH_SIZE} {dispatch * 1000:8.1f}ms  peak {peak / 1024:7.0f}KiB"
+    )
+
+
+async def bench_burst(engine, due_at: datetime, burst: int, send_latency: float, concurrency: int) -> str:
+    factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with factory() as session:
+        due = await session.scalar(select(func.count()).where(Reminder.next_fire_at <= due_at))
+    assert due == burst
+    
+    async def send(**kwargs):
+        await asyncio.sleep(send_latency)
+        return True
+    
+    with patch("app.infrastructure.database.DatabaseSession", factory), \
+         patch("app.infrastructure.twilio_whatsapp.send_reminder_notification", side_effect=send):
+        dispatcher = ReminderDispatcher(batch_size=BATCH_SIZE, poll_seconds=30, concurrency=concurrency)
+        # Lateness counts from the start of the burst, not from seeding
+        offset = (datetime.utcnow() - due_at).total_seconds()
+        start = time.perf_counter()
+        while await dispatcher.dispatch_due():
+            pass
+        elapsed = time.perf_counter() - start
+        lateness = [dispatcher.delivery.lateness_percentile(q) - offset for q in (0.5, 0.99)]
+    
+    return (
+        f"{burst / elapsed:8.1f} reminders/s  total {elapsed:6.2f}s  "
+        f"lateness p50 {lateness[0]:6.2f}s  p99 {lateness[1]:6.2f}s"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 500000])
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--burst", type=int, default=1000)
+    parser.add_argument("--send-latency-ms", type=float, default=50)
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            engine = await seed_database(os.path.join(tmp, f"reminders_{size}.db"), size)
+            print(f"{size:>8} reminders   {await bench_size(engine, args.repeats)}")
+            await engine.dispose()
+        
+        print(f"\n{args.burst} reminders due at once, {args.send_latency_ms:.0f}ms per send")
+        for concurrency in (1, 10, 50):
+            path = os.path.join(tmp, f"burst_{concurrency}.db")
+            due_at = datetime.utcnow().replace(microsecond=0)
+            engine = await seed_database(path, args.burst, due=args.burst, now=due_at)
+            result = await bench_burst(engine, due_at, args.burst, args.send_latency_ms / 1000, concurrency)
+            print(f"  {f'batched (pool {concurrency})':<20} {result}")
+            await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,89 @@
+"""
+Benchmark: parse_user_message latency with and without the local fast path.
+
+OpenAI is replaced by a stub that sleeps for --llm-latency seconds, so the
+numbers show what the fast path saves on a realistic traffic mix without
+spending tokens.
+
+Usage:
+    python -m benchmarks.bench_fast_path [--messages 200] [--llm-latency 0.8]
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+from unittest.mock import patch
+
+from app.ai import nlp_parser
+from app.ai.fast_path import get_routing_stats, reset_routing_stats
+
+# Roughly the observed mix: most traffic is formulaic
+TRAFFIC = [
+    ("ok", 12), ("done", 8), ("thanks", 6), ("List my reminders", 10),
+    ("delete 1 and 2", 5), ("delete 3", 3), ("stop calling me", 2),
+    ("snooze 15 min", 4), ("remind me later", 3), ("enable calls", 1),
+    ("Remind me to pay electricity bill tomorrow at 9am", 10),
+    ("What time is the Jds reminder?", 3),
+    ("Pause my wifi reminder", 2),
+    ("Move the dentist reminder to Friday 4pm", 2),
+]
+
+
+def build_messages(count: int, seed: int) -> list:
+    rng = random.Random(seed)
+    texts = [text for text, _ in TRAFFIC]
+    weights = [weight for _, weight in TRAFFIC]
+    return rng.choices(texts, weights=weights, k=count)
+
+
+async def run(messages: list, fast_path: bool, llm_latency: float) -> list:
+    async def fake_llm(messages, response_format):
+        await asyncio.sleep(llm_latency)
+        return json.dumps({"intent": "unknown", "response_message": "stub"})
+    
+    latencies = []
+    with patch.object(nlp_parser, "_call_openai_chat", fake_llm), \
+         patch.object(nlp_parser.settings, "nlp_fast_path_enabled", fast_path):
+        for text in messages:
+            start = time.perf_counter()
+            await nlp_parser.parse_user_message(text)
+            latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def summarize(label: str, latencies: list) -> None:
+    ordered = sorted(latencies)
+    p95 = ordered[int(len(ordered) * 0.95) - 1]
+    print(
+        f"{label:<14} total={sum(latencies):8.2f}s  mean={statistics.mean(latencies) * 1000:8.2f}ms  "
+        f"p50={statistics.median(latencies) * 1000:8.2f}ms  p95={p95 * 1000:8.2f}ms"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--llm-latency", type=float, default=0.8, help="Simulated OpenAI latency in seconds")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    
+    messages = build_messages(args.messages, args.seed)
+    print(f"{len(messages)} messages, simulated LLM latency {args.llm_latency * 1000:.0f}ms\n")
+    
+    reset_routing_stats()
+    summarize("llm only", await run(messages, fast_path=False, llm_latency=args.llm_latency))
+    
+    reset_routing_stats()
+    summarize("fast path", await run(messages, fast_path=True, llm_latency=args.llm_latency))
+    
+    stats = get_routing_stats()
+    print(f"\nlocal ratio: {stats['local_ratio']:.0%}")
+    print(f"local avg:   {stats['local']['avg_ms']}ms  {stats['local']['by_intent']}")
+    print(f"llm avg:     {stats['llm']['avg_ms']}ms  {stats['llm']['by_intent']}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,151 @@
+"""
+Benchmark: GPT prompt size and latency with and without the history budget.
+
+Replays a synthetic conversation through parse_user_message twice: once
+with the previous behaviour (the last 10 exchanges verbatim) and once with
+the history fitted by app.ai.history_budget, folding aged-out exchanges
+into the rolling summary as refresh_summary() would. "List my reminders"
+replies are full reminder lists, which is what made prompts grow.
+
+OpenAI is replaced by a stub that records the prompt; its latency is
+modelled as --llm-base-latency plus --llm-ms-per-1k-tokens per thousand
+prompt tokens instead of being slept, so the run is instant. The fast
+path and the response cache are off so every message reaches the stub.
+
+Usage:
+    python -m benchmarks.bench_history_budget [--messages 200] [--reminders 25] [--llm-ms-per-1k-tokens 150]
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+from unittest.mock import patch
+
+from app.ai import history_budget, nlp_parser
+from app.ai.history_budget import SUMMARY_BATCH_TURNS, count_tokens, fit_history, message_tokens, roll_summary
+
+# (message, reply kind, weight)
+TRAFFIC = [
+    ("List my reminders", "list", 10),
+    ("Remind me to pay electricity bill tomorrow at 9am", "created", 10),
+    ("What time is the Jds reminder?", "answer", 3),
+    ("delete 1 and 2", "deleted", 5),
+    ("Move the dentist reminder to Friday 4pm", "updated", 2),
+    ("ok", "ack", 12),
+    ("thanks", "ack", 6),
+]
+
+
+def reply_for(kind: str, reminders: int) -> str:
+    if kind == "list":
+        return "📋 Your reminders:\n\n" + "\n\n".join(
+            f"{i}. Pay the bill for account {1000 + i} before the office closes\n"
+            f"   ⏰ Tue, 14 Oct at 09:00 AM 🔁 weekly 📞"
+            for i in range(1, reminders + 1)
+        ) + "\n\nReply 'delete 1' or 'pause 2' to manage them."
+    return {
+        "created": "✅ Reminder set!\n\n📌 Pay electricity bill\n⏰ Tomorrow at 09:00 AM\n📞 I'll call if you don't respond",
+        "answer": "⏰ Your Jds reminder is at 04:00 PM today.",
+        "deleted": "🗑️ Deleted 2 reminders:\n• Pay electricity bill\n• Call mom",
+        "updated": "✏️ Updated: Dentist\n⏰ Fri, 17 Oct at 04:00 PM",
+        "ack": "👍",
+    }[kind]
+
+
+def build_conversation(count: int, reminders: int, seed: int) -> list:
+    rng = random.Random(seed)
+    picks = rng.choices(TRAFFIC, weights=[weight for _, _, weight in TRAFFIC], k=count)
+    return [(text, reply_for(kind, reminders)) for text, kind, _ in picks]
+
+
+def verbatim(exchanges: list) -> list:
+    return [
+        message
+        for user_message, bot_response in exchanges
+        for message in ({"role": "user", "content": user_message}, {"role": "assistant", "content": bot_response})
+    ]
+
+
+async def run(conversation: list, budgeted: bool, turns: int) -> dict:
+    """Replay the conversation; returns per-message prompt tokens, history tokens and budget overhead."""
+    prompt_tokens, history_tokens, overhead = [], [], []
+    
+    async def fake_llm(messages, response_format):
+        prompt_tokens.append(sum(message_tokens(message) for message in messages))
+        return json.dumps({"intent": "unknown", "response_message": "stub"})
+    
+    summary, covered = "", 0
+    with patch.object(nlp_parser, "_call_openai_chat", fake_llm), \
+         patch.object(nlp_parser.settings, "nlp_fast_path_enabled", False), \
+         patch.object(nlp_parser.settings, "llm_cache_enabled", False):
+        for position, (text, _) in enumerate(conversation):
+            if budgeted:
+                start = time.perf_counter()
+                history = fit_history(verbatim(conversation[covered:position][-(turns + SUMMARY_BATCH_TURNS):]), summary)
+                overhead.append(time.perf_counter() - start)
+            else:
+                history = verbatim(conversation[max(0, position - 10):position])
+            history_tokens.append(sum(message_tokens(message) for message in history))
+            await nlp_parser.parse_user_message(text, conversation_history=history)
+            
+            # What refresh_summary() does once this exchange is committed and the window was full
+            if budgeted and position - covered >= turns + SUMMARY_BATCH_TURNS:
+                end = position + 1 - turns
+                summary = roll_summary(
+                    summary, conversation[covered:end], history_budget.settings.llm_history_summary_max_tokens
+                )
+                covered = end
+    
+    return {"prompt": prompt_tokens, "history": history_tokens, "overhead": overhead}
+
+
+def p95(values: list) -> float:
+    ordered = sorted(values)
+    return ordered[int(len(ordered) * 0.95) - 1]
+
+
+def summarize(label: str, result: dict, base_latency: float, ms_per_1k: float) -> float:
+    latencies = [base_latency + ms_per_1k / 1000 * tokens / 1000 for tokens in result["prompt"]]
+    print(
+        f"{label:<10} prompt mean={statistics.mean(result['prompt']):7.0f} p95={p95(result['prompt']):7.0f} tokens  "
+        f"history mean={statistics.mean(result['history']):7.0f}  "
+        f"llm mean={statistics.mean(latencies) * 1000:7.1f}ms p95={p95(latencies) * 1000:7.1f}ms"
+    )
+    return statistics.mean(latencies)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--reminders", type=int, default=25, help="Reminders in each listed reply")
+    parser.add_argument("--llm-base-latency", type=float, default=0.4, help="Modelled OpenAI latency in seconds")
+    parser.add_argument("--llm-ms-per-1k-tokens", type=float, default=150, help="Modelled latency per 1k prompt tokens")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    
+    conversation = build_conversation(args.messages, args.reminders, args.seed)
+    settings = history_budget.settings
+    counter = "tiktoken" if history_budget._encoding() is not None else f"{history_budget.CHARS_PER_TOKEN} chars/token"
+    print(
+        f"{len(conversation)} messages, a {count_tokens(reply_for('list', args.reminders))}-token reminder list, "
+        f"budget {settings.llm_history_max_tokens} tokens, tokens counted with {counter}\n"
+    )
+    
+    before = summarize(
+        "verbatim", await run(conversation, budgeted=False, turns=settings.llm_history_turns),
+        args.llm_base_latency, args.llm_ms_per_1k_tokens
+    )
+    budgeted = await run(conversation, budgeted=True, turns=settings.llm_history_turns)
+    after = summarize("budgeted", budgeted, args.llm_base_latency, args.llm_ms_per_1k_tokens)
+    
+    print(
+        f"\nllm latency saved: {(before - after) * 1000:.1f}ms per message ({1 - after / before:.0%}), "
+        f"budgeting costs {statistics.mean(budgeted['overhead']) * 1000:.3f}ms"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,164 @@
+"""
+Benchmark: voice note downloads with a new client per note vs the pooled media client.
+
+Runs a local HTTPS stand-in for Twilio media: a "Twilio" server answers
+/Media/<sid> with a 307 to a separate "CDN" server, like api.twilio.com
+redirecting to its media CDN, and the CDN serves --size-kb of audio. Both
+use a throwaway self-signed certificate made with the openssl CLI.
+Localhost has no network round trips, so --rtt-ms is added to every new
+connection (TCP plus TLS setup) to approximate a real link.
+
+Each mode downloads --downloads notes through _download_media_with_retry:
+"new client" opens an httpx.AsyncClient per note as download_twilio_media
+used to; "pooled" shares one client from create_media_client. Notes are
+fetched --concurrency at a time.
+
+Usage:
+    python -m benchmarks.bench_media_download [--downloads 200] [--size-kb 64]
+                                              [--concurrency 1] [--rtt-ms 20]
+"""
+
+import argparse
+import asyncio
+import os
+import ssl
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+from app.infrastructure.audio_handler import _download_media_with_retry, create_media_client
+
+
+class StandInServer:
+    """HTTPS server that counts connections and delays each new one by `setup_delay`."""
+    
+    def __init__(self, context: ssl.SSLContext, body: bytes, redirect_to: str = None, setup_delay: float = 0.0):
+        self.connections = 0
+        server = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+            
+            def log_message(self, format, *args):
+                pass
+            
+            def setup(self):
+                server.connections += 1
+                time.sleep(setup_delay)
+                super().setup()
+            
+            def do_GET(self):
+                if redirect_to:
+                    self.send_response(307)
+                    self.send_header("Location", redirect_to + "/" + self.path.rsplit("/", 1)[-1])
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "audio/ogg")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+        
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        # Handshake in the handler thread, not the accept loop
+        self.httpd.socket = context.wrap_socket(self.httpd.socket, server_side=True, do_handshake_on_connect=False)
+        self.base_url = f"https://localhost:{self.httpd.server_address[1]}"
+        threading.Thread(target=self.httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+    
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def make_certificate(directory: str) -> tuple:
+    cert = os.path.join(directory, "cert.pem")
+    key = os.path.join(directory, "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-subj", "/CN=localhost", "-addext", "subjectAltName=DNS:localhost",
+         "-keyout", key, "-out", cert],
+        check=True,
+        capture_output=True,
+    )
+    return cert, key
+
+
+async def run(download, urls, concurrency: int) -> list:
+    """Download every URL, `concurrency` at a time; return per-download seconds."""
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def one(url: str) -> float:
+        async with semaphore:
+            started = time.perf_counter()
+            await download(url)
+            return time.perf_counter() - started
+    
+    return await asyncio.gather(*(one(url) for url in urls))
+
+
+def summarize(name: str, seconds: list, wall: float, connections: int) -> None:
+    ordered = sorted(seconds)
+    p95 = ordered[int(len(ordered) * 0.95) - 1]
+    print(
+        f"  {name:<12} mean {statistics.mean(seconds) * 1000:7.2f}ms  p95 {p95 * 1000:7.2f}ms  "
+        f"wall {wall:6.2f}s  connections {connections}"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--downloads", type=int, default=200)
+    parser.add_argument("--size-kb", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--rtt-ms", type=float, default=20.0)
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as directory:
+        cert, key = make_certificate(directory)
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(cert, key)
+        
+        # TCP handshake plus one TLS 1.3 round trip per new connection
+        setup_delay = 2 * args.rtt_ms / 1000
+        cdn = StandInServer(context, os.urandom(args.size_kb * 1024), setup_delay=setup_delay)
+        twilio = StandInServer(context, b"", redirect_to=cdn.base_url + "/cdn", setup_delay=setup_delay)
+        urls = [f"{twilio.base_url}/Media/ME{i:06d}" for i in range(args.downloads)]
+        print(
+            f"{args.downloads} downloads of {args.size_kb}KB, concurrency {args.concurrency}, "
+            f"{args.rtt_ms:.0f}ms simulated RTT\n"
+        )
+        
+        async def download(client: httpx.AsyncClient, url: str) -> None:
+            audio_file = await _download_media_with_retry(client, url, max_bytes=1 << 30, spool_bytes=1 << 20)
+            audio_file.close()
+        
+        async def new_client_download(url: str) -> None:
+            async with httpx.AsyncClient(verify=cert) as client:
+                await download(client, url)
+        
+        started = time.perf_counter()
+        seconds = await run(new_client_download, urls, args.concurrency)
+        summarize("new client", seconds, time.perf_counter() - started, twilio.connections + cdn.connections)
+        
+        twilio.connections = cdn.connections = 0
+        # One connection per concurrent download to each of the two hosts
+        client = create_media_client(max_connections=2 * args.concurrency, timeout=30.0, verify=cert)
+        started = time.perf_counter()
+        seconds = await run(lambda url: download(client, url), urls, args.concurrency)
+        summarize("pooled", seconds, time.perf_counter() - started, twilio.connections + cdn.connections)
+        await client.aclose()
+        
+        twilio.stop()
+        cdn.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,131 @@
+"""
+Benchmark: startup reconciliation of the reminder schedule.
+
+Seeds a SQLite file per size with a mix of reminders: 80% active and
+correctly scheduled, 10% active with their due time lost, 5% missed while
+down, 3% paused with a stale due time and 2% completed. Then times
+reconcile_schedule() over it for each page size, plus a second pass over
+the repaired schedule (the cost of every later restart). Peak Python
+memory of the first pass is measured on a separate, traced run: active
+rows are read in keyset pages, so memory should follow the page size,
+not the number of reminders.
+
+Usage:
+    python -m benchmarks.bench_reconcile [--sizes 10000 100000 500000] [--page-sizes 500 2000 10000]
+"""
+
+import argparse
+import asyncio
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from unittest.mock import patch
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app.domain.reminder import Base
+from app.domain.conversation_history import ConversationMessage  # noqa: F401 - needed for table creation
+from app.domain.job_lease import JobLease  # noqa: F401 - needed for table creation
+from app.domain.user import User  # noqa: F401 - needed for table creation
+from app.infrastructure import reconciliation
+from app.infrastructure.migrations import apply_migrations
+from app.infrastructure.reconciliation import reconcile_schedule
+
+USER_ID = "+923001234567"
+NOW = datetime.utcnow().replace(microsecond=0)
+
+# n % 100 picks the row's kind; PKT is UTC+5
+SEED_SQL = """
+INSERT INTO reminders (id, user_id, title, scheduled_time, call_if_no_response, call_opt_out,
+                       status, created_at, updated_at, user_responded, last_notified_at, next_fire_at)
+WITH RECURSIVE seq(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < :count),
+kinds AS (
+    SELECT n, n % 100 AS k,
+           CASE WHEN n % 100 BETWEEN 90 AND 94 THEN '-' || (1 + n % 300) ELSE '+' || (1 + n % 525600) END
+               || ' minutes' AS offset
+    FROM seq
+)
+SELECT
+    printf('r-%07d', n), :user_id, 'Reminder ' || n,
+    strftime('%Y-%m-%d %H:%M:%f000', :now, offset, '+5 hours'), 0, 1,
+    CASE WHEN k < 95 THEN 'ACTIVE' WHEN k < 98 THEN 'PAUSED' ELSE 'COMPLETED' END,
+    '2025-01-01 00:00:00', '2025-01-01 00:00:00', 0,
+    CASE WHEN k >= 98 THEN strftime('%Y-%m-%d %H:%M:%f000', :now, offset) END,
+    CASE WHEN k < 80 OR k BETWEEN 90 AND 97 THEN strftime('%Y-%m-%d %H:%M:%f000', :now, offset) END
+FROM kinds
+"""
+
+
+async def seed_database(path: str, count: int) -> None:
+    # Same engine setup as app.infrastructure.database
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{path}",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(apply_migrations)
+        await conn.execute(text(SEED_SQL), {"count": count, "user_id": USER_ID, "now": NOW.isoformat(sep=" ")})
+    await engine.dispose()
+
+
+async def reconcile(path: str, page_size: int, trace: bool = False):
+    """One reconciliation pass; returns (stats, seconds, peak bytes or 0)."""
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{path}",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    peak = 0
+    with patch("app.infrastructure.database.DatabaseSession", factory), \
+         patch.object(reconciliation.settings, "scheduler_reconcile_page_size", page_size):
+        if trace:
+            tracemalloc.start()
+        start = time.perf_counter()
+        stats = await reconcile_schedule(now=NOW, claim=False)
+        elapsed = time.perf_counter() - start
+        if trace:
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+    await engine.dispose()
+    return stats, elapsed, peak
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 500000])
+    parser.add_argument("--page-sizes", type=int, nargs="+", default=[500, 2000, 10000])
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            seeded = os.path.join(tmp, f"seed_{size}.db")
+            await seed_database(seeded, size)
+            print(f"{size} reminders")
+            for page_size in args.page_sizes:
+                path = os.path.join(tmp, f"reminders_{size}_{page_size}.db")
+                shutil.copyfile(seeded, path)
+                stats, first, _ = await reconcile(path, page_size)
+                _, again, _ = await reconcile(path, page_size)
+                # Memory is traced on a separate pass, tracing slows it down
+                shutil.copyfile(seeded, path)
+                _, _, peak = await reconcile(path, page_size, trace=True)
+                os.remove(path)
+                print(
+                    f"  page {page_size:>6}  startup {first:6.2f}s  restart {again:6.2f}s  "
+                    f"peak {peak / 1024 / 1024:6.1f}MiB  "
+                    f"restored {stats.restored}  caught up {stats.caught_up}  "
+                    f"skipped {stats.skipped}  cleared {stats.cleared}"
+                )
+            os.remove(seeded)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
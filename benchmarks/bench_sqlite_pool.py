@@ -0,0 +1,185 @@
+"""
+Benchmark: read throughput under write load, shared connection vs WAL with a read pool.
+
+Seeds a SQLite file with --users users, each with --history conversation
+exchanges and --reminders active reminders, then runs --readers
+concurrent readers for --seconds while one writer commits message-sized
+transactions (a conversation row plus a reminder update) back to back.
+Each read is what a message costs before GPT: the user's last 10
+exchanges (get_conversation_history) followed by their reminder list
+(the _handle_list query).
+
+"shared" is the previous setup: one StaticPool connection for everything
+in the default rollback journal with synchronous=FULL. "pool N" is
+create_sqlite_engine: the WAL writer connection plus N read-only
+connections. Reports reads/s, read latency and writes/s for each.
+
+Usage:
+    python -m benchmarks.bench_sqlite_pool [--readers 16] [--pool-sizes 1 2 4 8]
+                                           [--seconds 5] [--users 200]
+"""
+
+import argparse
+import asyncio
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from itertools import count
+
+from sqlalchemy import select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app.domain.conversation_history import ConversationMessage, get_conversation_history
+from app.domain.reminder import Base, Reminder, ReminderStatus
+from app.domain.job_lease import JobLease  # noqa: F401 - needed for table creation
+from app.domain.user import User  # noqa: F401 - needed for table creation
+from app.infrastructure.database import create_sqlite_engine
+from app.infrastructure.migrations import apply_migrations
+
+SEED_SQL = [
+    """
+    INSERT INTO conversation_history (user_id, user_message, bot_response, timestamp)
+    WITH RECURSIVE seq(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < :rows)
+    SELECT printf('+92300%07d', n % :users), 'Remind me to call mom at ' || n,
+           'Reminder set for ' || n, datetime('2026-01-01', '+' || n || ' minutes')
+    FROM seq
+    """,
+    """
+    INSERT INTO reminders (id, user_id, title, scheduled_time, call_if_no_response, call_opt_out,
+                           status, created_at, updated_at, user_responded)
+    WITH RECURSIVE seq(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < :rows)
+    SELECT printf('r-%07d', n), printf('+92300%07d', n % :users), 'Reminder ' || n,
+           datetime('2026-06-01', '+' || n || ' hours'), 0, 1, 'ACTIVE',
+           '2026-01-01 00:00:00', '2026-01-01 00:00:00', 0
+    FROM seq
+    """,
+]
+
+
+def user_id(index: int) -> str:
+    return f"+92300{index:07d}"
+
+
+async def seed(path: str, users: int, history: int, reminders: int) -> None:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(apply_migrations)
+        await conn.execute(text(SEED_SQL[0]), {"rows": users * history, "users": users})
+        await conn.execute(text(SEED_SQL[1]), {"rows": users * reminders, "users": users})
+    await engine.dispose()
+
+
+async def read_user(session: AsyncSession, user: str) -> None:
+    """The reads a message makes: recent history, then the reminder list."""
+    await get_conversation_history(session, user, limit=10)
+    result = await session.execute(
+        select(Reminder)
+        .where(
+            Reminder.user_id == user,
+            Reminder.status.in_([ReminderStatus.ACTIVE, ReminderStatus.PAUSED])
+        )
+        .order_by(Reminder.scheduled_time)
+    )
+    result.scalars().all()
+
+
+async def run(write_factory, read_factory, readers: int, write_rate: float, seconds: float, users: int) -> tuple:
+    """Run readers and one writer for `seconds`; return (read latencies, writes)."""
+    deadline = time.perf_counter() + seconds
+    latencies = []
+    writes = 0
+    
+    async def reader(index: int) -> None:
+        for n in count(index):
+            if time.perf_counter() >= deadline:
+                return
+            started = time.perf_counter()
+            async with read_factory() as session:
+                await read_user(session, user_id(n * 7919 % users))
+            latencies.append(time.perf_counter() - started)
+    
+    async def writer() -> None:
+        nonlocal writes
+        started = time.perf_counter()
+        for n in count():
+            if time.perf_counter() >= deadline:
+                return
+            user = user_id(n % users)
+            # Pace the writer at `write_rate` commits per second
+            await asyncio.sleep(max(0.0, started + n / write_rate - time.perf_counter()))
+            async with write_factory() as session:
+                session.add(ConversationMessage(user_id=user, user_message="snooze it", bot_response="Snoozed"))
+                await session.execute(
+                    update(Reminder)
+                    .where(Reminder.id == f"r-{n % users + 1:07d}")
+                    .values(updated_at=datetime.utcnow(), next_fire_at=datetime.utcnow() + timedelta(minutes=10))
+                )
+                await session.commit()
+            writes += 1
+    
+    await asyncio.gather(writer(), *(reader(i) for i in range(readers)))
+    return latencies, writes
+
+
+def summarize(name: str, latencies: list, writes: int, seconds: float) -> None:
+    ordered = sorted(latencies)
+    p95 = ordered[int(len(ordered) * 0.95) - 1]
+    print(
+        f"  {name:<10} {len(latencies) / seconds:8.0f} reads/s  "
+        f"p50 {statistics.median(latencies) * 1000:6.2f}ms  p95 {p95 * 1000:6.2f}ms  "
+        f"{writes / seconds:6.0f} writes/s"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--readers", type=int, default=16, help="Concurrent readers")
+    parser.add_argument("--pool-sizes", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--write-rate", type=float, default=50.0, help="Writer commits per second")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--history", type=int, default=50, help="Conversation exchanges per user")
+    parser.add_argument("--reminders", type=int, default=20, help="Active reminders per user")
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as directory:
+        template = os.path.join(directory, "template.db")
+        await seed(template, args.users, args.history, args.reminders)
+        print(
+            f"{args.users} users x {args.history} exchanges / {args.reminders} reminders, "
+            f"{args.readers} readers + 1 writer, {os.cpu_count()} CPU(s)\n"
+        )
+        
+        modes = [("shared", None)] + [(f"pool {size}", size) for size in args.pool_sizes]
+        for name, pool_size in modes:
+            path = os.path.join(directory, f"{name.replace(' ', '_')}.db")
+            shutil.copy(template, path)
+            url = f"sqlite+aiosqlite:///{path}"
+            
+            if pool_size is None:
+                writer = reader = create_async_engine(
+                    url, connect_args={"check_same_thread": False}, poolclass=StaticPool
+                )
+            else:
+                writer = create_sqlite_engine(url)
+                reader = create_sqlite_engine(url, read_only=True, pool_size=pool_size)
+            
+            write_factory = async_sessionmaker(writer, class_=AsyncSession, expire_on_commit=False)
+            read_factory = async_sessionmaker(reader, class_=AsyncSession, expire_on_commit=False)
+            latencies, writes = await run(
+                write_factory, read_factory, args.readers, args.write_rate, args.seconds, args.users
+            )
+            summarize(name, latencies, writes, args.seconds)
+            
+            if reader is not writer:
+                await reader.dispose()
+            await writer.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
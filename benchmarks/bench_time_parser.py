@@ -0,0 +1,246 @@
+"""
+Benchmark: parse_natural_time against the previous implementation.
+
+The previous parser (kept below, verbatim) searched for twenty day names
+one pattern at a time and called dateutil up to twice per message; the
+current one scans the message once with a single token pattern and only
+calls dateutil for phrasings its grammar does not account for. Both run
+over a realistic message mix and over the golden corpus in tests/data at
+a fixed reference time. The corpus is the number to quote: it is mostly
+phrases that contain a time, while the mix is mostly messages that
+don't. The report shows per-call latency and every corpus phrase where
+the two disagree, which should be exactly the entries marked "Changed".
+
+Usage:
+    python -m benchmarks.bench_time_parser [--rounds 50] [--messages 1000]
+"""
+
+import argparse
+import json
+import random
+import re
+import statistics
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional
+
+from dateutil import parser as dateutil_parser
+
+from app.utils.time import PKT, get_current_time_pkt, parse_natural_time, to_pkt
+
+GOLDEN_FILE = Path(__file__).resolve().parent.parent / "tests" / "data" / "natural_time_golden.json"
+
+
+# Previous implementation, for comparison
+def legacy_parse_natural_time(time_str: str, reference_time: datetime = None) -> Optional[datetime]:
+    """
+    Parse natural language time expressions into datetime.
+    
+    Args:
+        time_str: Natural language time string (e.g., "tomorrow at 9am")
+        reference_time: Reference time for relative expressions (defaults to now in PKT)
+    
+    Returns:
+        Parsed datetime in PKT, or None if parsing fails
+    """
+    if reference_time is None:
+        reference_time = get_current_time_pkt()
+    
+    time_str_lower = time_str.lower().strip()
+    
+    # Day name mapping (Monday=0, Sunday=6)
+    day_names = {
+        'monday': 0, 'mon': 0,
+        'tuesday': 1, 'tue': 1, 'tues': 1,
+        'wednesday': 2, 'wed': 2,
+        'thursday': 3, 'thu': 3, 'thur': 3, 'thurs': 3,
+        'friday': 4, 'fri': 4,
+        'saturday': 5, 'sat': 5,
+        'sunday': 6, 'sun': 6
+    }
+    
+    # Check for day names in the string
+    day_offset = 0
+    time_part = time_str_lower
+    found_day = False
+    is_next_week = 'next ' in time_str_lower
+    
+    # Remove "next" for parsing
+    check_str = time_str_lower.replace('next ', '')
+    
+    for day_name, target_weekday in day_names.items():
+        # Check if day name is in the string (as a word boundary)
+        pattern = r'\b' + day_name + r'\b'
+        if re.search(pattern, check_str):
+            current_weekday = reference_time.weekday()
+            
+            # Calculate days until target day
+            days_ahead = (target_weekday - current_weekday) % 7
+            
+            # If it's today (days_ahead=0) and we want the UPCOMING one, go to next week
+            if days_ahead == 0:
+                days_ahead = 7
+            
+            # If "next" was specified, add another week
+            if is_next_week:
+                days_ahead += 7
+            
+            day_offset = days_ahead
+            # Remove the day name from time_part
+            time_part = re.sub(pattern, '', check_str)
+            time_part = time_part.replace('next', '').strip()
+            found_day = True
+            break
+    
+    # Handle relative day expressions (only if no day name found)
+    if not found_day:
+        time_part = time_str_lower
+        
+        if "tomorrow" in time_str_lower:
+            day_offset = 1
+            time_part = time_str_lower.replace("tomorrow", "").strip()
+        elif "day after tomorrow" in time_str_lower:
+            day_offset = 2
+            time_part = time_str_lower.replace("day after tomorrow", "").strip()
+        elif "today" in time_str_lower:
+            day_offset = 0
+            time_part = time_str_lower.replace("today", "").strip()
+        elif "next week" in time_str_lower:
+            day_offset = 7
+            time_part = time_str_lower.replace("next week", "").strip()
+    
+    # Clean up common words
+    time_part = time_part.replace("at", "").replace("on", "").strip()
+    
+    # Handle "in X minutes/hours" patterns
+    in_pattern = r"in\s+(\d+)\s*(minute|min|hour|hr|day)s?"
+    in_match = re.search(in_pattern, time_str)
+    if in_match:
+        amount = int(in_match.group(1))
+        unit = in_match.group(2)
+        
+        if unit in ["minute", "min"]:
+            return reference_time + timedelta(minutes=amount)
+        elif unit in ["hour", "hr"]:
+            return reference_time + timedelta(hours=amount)
+        elif unit == "day":
+            return reference_time + timedelta(days=amount)
+    
+    # Handle "before Xpm/am" patterns
+    before_pattern = r"before\s+(\d{1,2})\s*(am|pm)"
+    before_match = re.search(before_pattern, time_str)
+    if before_match:
+        hour = int(before_match.group(1))
+        ampm = before_match.group(2)
+        
+        if ampm == "pm" and hour != 12:
+            hour += 12
+        elif ampm == "am" and hour == 12:
+            hour = 0
+        
+        target_date = reference_time.date() + timedelta(days=day_offset)
+        return datetime(target_date.year, target_date.month, target_date.day, hour, 0, tzinfo=PKT)
+    
+    # Try to parse the time part
+    if time_part:
+        try:
+            # Handle simple time formats like "9am", "7pm", "14:30"
+            parsed_time = dateutil_parser.parse(time_part, fuzzy=True)
+            target_date = reference_time.date() + timedelta(days=day_offset)
+            
+            result = datetime(
+                target_date.year,
+                target_date.month,
+                target_date.day,
+                parsed_time.hour,
+                parsed_time.minute,
+                tzinfo=PKT
+            )
+            
+            # If the time has already passed today and no day offset, assume tomorrow
+            if day_offset == 0 and result < reference_time:
+                result += timedelta(days=1)
+            
+            return result
+        except (ValueError, TypeError):
+            pass
+    
+    # If only day offset but no time, default to 9:00 AM
+    if day_offset > 0:
+        target_date = reference_time.date() + timedelta(days=day_offset)
+        return datetime(target_date.year, target_date.month, target_date.day, 9, 0, tzinfo=PKT)
+    
+    # Try dateutil parser as fallback
+    try:
+        parsed = dateutil_parser.parse(time_str, fuzzy=True)
+        return to_pkt(parsed)
+    except (ValueError, TypeError):
+        return None
+
+
+# Roughly the observed message mix (see bench_fast_path): every message is parsed
+TRAFFIC = [
+    ("ok", 12), ("done", 8), ("thanks", 6), ("List my reminders", 10),
+    ("delete 1 and 2", 5), ("delete 3", 3), ("stop calling me", 2),
+    ("snooze 15 min", 4), ("remind me later", 3), ("enable calls", 1),
+    ("Remind me to pay electricity bill tomorrow at 9am", 10),
+    ("What time is the Jds reminder?", 3),
+    ("Pause my wifi reminder", 2),
+    ("Move the dentist reminder to Friday 4pm", 2),
+    ("call mom on Sunday", 2), ("remind me in 30 minutes", 2), ("meeting at 14:30", 2),
+]
+
+
+def time_per_call(parse, texts: list, reference_time: datetime, rounds: int) -> list:
+    """Mean microseconds per call for each round."""
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for text in texts:
+            parse(text, reference_time)
+        samples.append((time.perf_counter() - start) / len(texts) * 1e6)
+    return samples
+
+
+def compare(label: str, texts: list, reference_time: datetime, rounds: int) -> None:
+    legacy = time_per_call(legacy_parse_natural_time, texts, reference_time, rounds)
+    current = time_per_call(parse_natural_time, texts, reference_time, rounds)
+    print(
+        f"{label:<8} previous={statistics.median(legacy):8.2f}us/call  "
+        f"current={statistics.median(current):8.2f}us/call  "
+        f"speedup={statistics.median(legacy) / statistics.median(current):5.1f}x"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--messages", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    
+    with open(GOLDEN_FILE) as f:
+        golden = json.load(f)
+    texts = [case["text"] for case in golden["cases"]]
+    reference_time = datetime.fromisoformat(golden["reference_times"]["wednesday"])
+    rng = random.Random(args.seed)
+    messages = rng.choices([text for text, _ in TRAFFIC], weights=[weight for _, weight in TRAFFIC], k=args.messages)
+    print(f"{len(messages)} messages, {len(texts)} corpus phrases, {args.rounds} rounds\n")
+    
+    compare("messages", messages, reference_time, args.rounds)
+    compare("corpus", texts, reference_time, args.rounds)
+    print()
+    
+    differences = 0
+    for case in golden["cases"]:
+        before = legacy_parse_natural_time(case["text"], reference_time)
+        after = parse_natural_time(case["text"], reference_time)
+        if before != after:
+            differences += 1
+            print(f"  {case['text']!r}: {before} -> {after}  [{case.get('note', 'UNEXPECTED')}]")
+    print(f"{len(texts) - differences}/{len(texts)} corpus phrases parse as before")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Benchmark: keyword lookup latency as the number of reminders grows.
+
+Seeds a SQLite file per size with active reminders, then times
+ReminderService._find_reminder_by_keyword (in-memory match for small users,
+the FTS index above SMALL_USER_LIMIT reminders) against the previous
+scan-based lookup on the same keywords (substring hits, typos and
+misses). The scan grows linearly with the table; the index grows only with
+the number of titles sharing the keyword's trigrams.
+
+Usage:
+    python -m benchmarks.bench_title_search [--sizes 1000 10000 100000] [--lookups 50]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import string
+import tempfile
+import time
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.domain.reminder import Base
+from app.infrastructure.migrations import apply_migrations
+from app.usecases.reminder_service import ReminderService
+
+WORDS = [
+    "pay", "electricity", "bill", "call", "mom", "dentist", "appointment", "water", "plants",
+    "renew", "passport", "gym", "session", "submit", "report", "buy", "groceries", "wifi",
+    "internet", "meeting", "team", "standup", "insurance", "car", "service", "library",
+]
+
+USER_ID = "+923001234567"
+
+KEYWORDS = ["electricity", "electrcity", "passport", "standup meeting", "groceris", "zebra crossing"]
+
+SEED_SQL = """
+INSERT INTO reminders (id, user_id, title, scheduled_time, call_if_no_response, call_opt_out,
+                       status, created_at, updated_at, user_responded)
+VALUES (:id, :user_id, :title, '2026-01-01 09:00:00', 0, 1, 'ACTIVE', :created_at, :created_at, 0)
+"""
+
+
+def build_titles(count: int, seed: int) -> list:
+    """Three-word titles drawn from WORDS plus a few thousand filler words."""
+    rng = random.Random(seed)
+    filler = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 9))) for _ in range(5000)]
+    vocabulary = WORDS + filler
+    return [" ".join(rng.sample(vocabulary, 3)) for _ in range(count)]
+
+
+async def seed_database(path: str, count: int, seed: int):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(apply_migrations)
+        rows = [
+            {
+                "id": f"r-{n:07d}",
+                "user_id": USER_ID,
+                "title": title,
+                "created_at": f"2025-01-01 00:00:{n % 60:02d}",
+            }
+            for n, title in enumerate(build_titles(count, seed))
+        ]
+        await conn.execute(text(SEED_SQL), rows)
+    return engine
+
+
+async def time_lookups(engine, method: str, lookups: int) -> list:
+    factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    latencies = []
+    async with factory() as session:
+        service = ReminderService(session, user_id=USER_ID)
+        for n in range(lookups):
+            keyword = KEYWORDS[n % len(KEYWORDS)]
+            start = time.perf_counter()
+            await getattr(service, method)(keyword)
+            latencies.append(time.perf_counter() - start)
+            session.expunge_all()
+    return latencies
+
+
+def summarize(label: str, latencies: list) -> str:
+    ordered = sorted(latencies)
+    p95 = ordered[max(int(len(ordered) * 0.95) - 1, 0)]
+    return f"{label:<6} p50={statistics.median(latencies) * 1000:8.2f}ms  p95={p95 * 1000:8.2f}ms"
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--lookups", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            engine = await seed_database(os.path.join(tmp, f"reminders_{size}.db"), size, args.seed)
+            index = await time_lookups(engine, "_find_reminder_by_keyword", args.lookups)
+            scan = await time_lookups(engine, "_scan_reminders_by_keyword", args.lookups)
+            await engine.dispose()
+            print(f"{size:>8} reminders   {summarize('index', index)}   {summarize('scan', scan)}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -2,40 +2,92 @@
 Pytest configuration and fixtures for WhatsApp Personal Assistant tests.
 """
 
+import json
+import os
+import threading
+import time
 from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from typing import AsyncGenerator
+from urllib.parse import parse_qs
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 import pytest_asyncio
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.pool import StaticPool
 
 from app.domain.reminder import Base, Reminder, ReminderStatus, ParsedIntent
 from app.domain.processed_message import ProcessedMessage
+from app.domain.conversation_history import ConversationMessage
+from app.domain.user import User
+from app.domain.job_lease import JobLease
+from app.infrastructure.database import create_postgres_engine, is_sqlite_url
+from app.infrastructure.migrations import apply_migrations
 
 
-# Use a separate in-memory SQLite database for testing
-TEST_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
+# In-memory SQLite by default; TEST_DATABASE_URL=postgresql+asyncpg://... runs the suite on Postgres
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+
+# USER_WHATSAPP_NUMBER during tests (owner of reminders created without a user)
+DEFAULT_USER_ID = "+923001234567"
+DEFAULT_USER_WHATSAPP_NUMBER = f"whatsapp:{DEFAULT_USER_ID}"
+
+
+def pytest_collection_modifyitems(config, items):
+    """Skip tests of SQLite-only features (FTS5, query plans) on other backends."""
+    if is_sqlite_url(TEST_DATABASE_URL):
+        return
+    skip = pytest.mark.skip(reason="SQLite-only feature")
+    for item in items:
+        if "sqlite_only" in item.keywords:
+            item.add_marker(skip)
+
+
+@pytest.fixture(autouse=True)
+def fresh_response_cache():
+    """Give every test an empty in-memory LLM response cache."""
+    from app.infrastructure.response_cache import MemoryCacheBackend, ResponseCache
+    
+    cache = ResponseCache(MemoryCacheBackend(max_bytes=1_000_000, ttl_seconds=3600), bucket_seconds=300)
+    with patch("app.infrastructure.response_cache.response_cache", cache):
+        yield cache
+
+
+@pytest.fixture(autouse=True)
+def default_user_settings():
+    """Configure the single-user-era owner the same way whatever the developer's environment holds."""
+    from app.config.settings import get_settings
+    
+    settings = get_settings()
+    with patch.object(settings, "user_whatsapp_number", DEFAULT_USER_WHATSAPP_NUMBER), \
+         patch.object(settings, "user_phone_number", DEFAULT_USER_ID):
+        yield settings
 
 
 @pytest_asyncio.fixture
 async def test_engine():
     """Create a test database engine."""
-    engine = create_async_engine(
-        TEST_DATABASE_URL,
-        echo=False,
-        connect_args={"check_same_thread": False},
-        poolclass=StaticPool,
-    )
+    if is_sqlite_url(TEST_DATABASE_URL):
+        engine = create_async_engine(
+            TEST_DATABASE_URL,
+            echo=False,
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool,
+        )
+    else:
+        engine = create_postgres_engine(TEST_DATABASE_URL)
     
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(apply_migrations)
     
     yield engine
     
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.drop_all)
+        await conn.execute(text("DROP TABLE IF EXISTS schema_migrations"))
     
     await engine.dispose()
 
@@ -54,11 +106,29 @@ async def test_session(test_engine) -> AsyncGenerator[AsyncSession, None]:
         await session.rollback()
 
 
+@pytest.fixture
+def database_session(test_engine):
+    """Point the application's DatabaseSession at the test database."""
+    factory = async_sessionmaker(test_engine, class_=AsyncSession, expire_on_commit=False)
+    
+    class FakeDatabaseSession:
+        async def __aenter__(self):
+            self.session = factory()
+            return self.session
+        
+        async def __aexit__(self, *exc):
+            await self.session.close()
+    
+    with patch("app.infrastructure.database.DatabaseSession", FakeDatabaseSession):
+        yield
+
+
 @pytest.fixture
 def sample_reminder() -> Reminder:
     """Create a sample reminder for testing."""
     return Reminder(
         id="test-reminder-123",
+        user_id="+923001234567",
         title="Pay electricity bill",
         description="Monthly electricity payment",
         scheduled_time=datetime.utcnow() + timedelta(hours=1),
@@ -125,3 +195,184 @@ def mock_settings():
     mock.validate_twilio_signature = False
     mock.timezone = "Asia/Karachi"
     return mock
+
+
+class FakeTwilioServer:
+    """
+    Minimal local stand-in for the Twilio REST API.
+    
+    Records every request and replies with queued responses (default 201
+    with a generated SID). Speaks HTTP/1.1 so keep-alive reuse is observable.
+    """
+    
+    def __init__(self):
+        self.requests = []
+        self.responses = []
+        self.delay = 0.0
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+        server = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            
+            def log_message(self, format, *args):
+                pass
+            
+            def _handle(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length).decode("utf-8") if length else ""
+                with server.lock:
+                    form = parse_qs(body)
+                    server.requests.append({
+                        "method": self.command,
+                        "path": self.path,
+                        "form": {k: v[0] if len(v) == 1 else v for k, v in form.items()},
+                        "headers": dict(self.headers),
+                        "client_port": self.client_address[1],
+                    })
+                    index = len(server.requests)
+                    status, payload, headers = (
+                        server.responses.pop(0) if server.responses
+                        else (201, {"sid": f"SM{index:032d}", "status": "queued"}, {})
+                    )
+                    server.active += 1
+                    server.max_active = max(server.max_active, server.active)
+                if server.delay:
+                    time.sleep(server.delay)
+                with server.lock:
+                    server.active -= 1
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+            
+            do_GET = _handle
+            do_POST = _handle
+        
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    
+    def queue_response(self, status: int, payload: dict, headers: dict = None) -> None:
+        """Reply to the next request with this status and JSON payload."""
+        self.responses.append((status, payload, headers or {}))
+    
+    def start(self) -> None:
+        self.thread.start()
+    
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def fake_twilio_server():
+    """Run a fake Twilio REST API on localhost for the duration of a test."""
+    server = FakeTwilioServer()
+    server.start()
+    yield server
+    server.stop()
+
+
+class FakeMediaServer:
+    """
+    Local stand-in for Twilio media downloads and the Whisper upload.
+    
+    /Media/<sid> answers 307 to /cdn/<sid> like api.twilio.com redirecting
+    to its media CDN; /cdn/<sid> serves `body` (without Content-Length,
+    closing the connection instead, when `send_length` is off). Records the
+    path, client port and Authorization header of every request. POSTs
+    (OpenAI's /audio/transcriptions) are read in chunks and discarded, and
+    answered with `transcript`.
+    """
+    
+    def __init__(self, body: bytes = b"OggS" + b"\x00" * 4096):
+        self.body = body
+        self.send_length = True
+        self.transcript = "remind me to call mom"
+        self.uploaded_bytes = 0
+        self.requests = []
+        self.lock = threading.Lock()
+        server = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            
+            def log_message(self, format, *args):
+                pass
+            
+            def _record(self):
+                with server.lock:
+                    server.requests.append({
+                        "path": self.path,
+                        "client_port": self.client_address[1],
+                        "authorization": self.headers.get("Authorization"),
+                    })
+            
+            def do_GET(self):
+                self._record()
+                if self.path.startswith("/Media/"):
+                    self.send_response(307)
+                    self.send_header("Location", "/cdn/" + self.path.rsplit("/", 1)[-1])
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "audio/ogg")
+                if server.send_length:
+                    self.send_header("Content-Length", str(len(server.body)))
+                else:
+                    self.send_header("Connection", "close")
+                    self.close_connection = True
+                self.end_headers()
+                try:
+                    self.wfile.write(server.body)
+                except (BrokenPipeError, ConnectionResetError):
+                    # Client stopped reading (size cap)
+                    pass
+            
+            def do_POST(self):
+                self._record()
+                remaining = int(self.headers["Content-Length"])
+                while remaining:
+                    chunk = self.rfile.read(min(remaining, 65536))
+                    remaining -= len(chunk)
+                    with server.lock:
+                        server.uploaded_bytes += len(chunk)
+                data = server.transcript.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+        
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    
+    def media_url(self, sid: str = "ME123") -> str:
+        return f"{self.base_url}/Media/{sid}"
+    
+    def start(self) -> None:
+        self.thread.start()
+    
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def fake_media_server():
+    """Run a fake Twilio media endpoint on localhost for the duration of a test."""
+    server = FakeMediaServer()
+    server.start()
+    yield server
+    server.stop()
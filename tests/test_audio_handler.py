@@ -0,0 +1,211 @@
+"""
+Tests for voice note downloads through the pooled media client.
+"""
+
+import io
+import os
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import pytest
+import pytest_asyncio
+from openai import AsyncOpenAI
+from pydub import AudioSegment
+from pydub.generators import Sine
+
+from app.infrastructure import audio_handler
+from app.infrastructure.audio_handler import (
+    close_media_client,
+    create_media_client,
+    download_and_transcribe_audio,
+    download_twilio_media,
+    get_media_client,
+    preprocess_audio,
+    shrink_segment,
+)
+
+MB = 1024 * 1024
+
+
+@pytest_asyncio.fixture
+async def media_client():
+    """Pooled media client patched in as the shared one."""
+    client = create_media_client(max_connections=5, timeout=5.0)
+    with patch.object(audio_handler, "media_client", client):
+        yield client
+    await client.aclose()
+
+
+@pytest.fixture
+def media_limits():
+    """16 MB cap, spooled to disk above 1 MB, uploaded without preprocessing."""
+    with patch.object(audio_handler.settings, "media_max_bytes", 16 * MB), \
+         patch.object(audio_handler.settings, "media_spool_max_memory_bytes", MB), \
+         patch.object(audio_handler.settings, "audio_preprocess_enabled", False):
+        yield
+
+
+class TestMediaDownload:
+    """Tests for download_twilio_media."""
+    
+    @pytest.mark.asyncio
+    async def test_follows_redirect_to_cdn(self, media_client, fake_media_server):
+        """Test that the media URL's redirect is followed and the audio returned."""
+        with await download_twilio_media(fake_media_server.media_url("ME1")) as audio_file:
+            assert audio_file.read() == fake_media_server.body
+        assert [r["path"] for r in fake_media_server.requests] == ["/Media/ME1", "/cdn/ME1"]
+        assert fake_media_server.requests[0]["authorization"].startswith("Basic ")
+    
+    @pytest.mark.asyncio
+    async def test_downloads_reuse_connection(self, media_client, fake_media_server):
+        """Test that consecutive voice notes share one keep-alive connection."""
+        for i in range(5):
+            (await download_twilio_media(fake_media_server.media_url(f"ME{i}"))).close()
+        
+        assert len(fake_media_server.requests) == 10
+        assert len({r["client_port"] for r in fake_media_server.requests}) == 1
+    
+    
+    @pytest.mark.asyncio
+    async def test_rejects_oversized_content_length(self, media_client, fake_media_server, media_limits):
+        """Test that a note whose Content-Length is over the cap is refused before its body is read."""
+        fake_media_server.body = b"\x00" * (16 * MB + 1)
+        
+        with patch.object(audio_handler.tempfile, "SpooledTemporaryFile") as spool:
+            assert await download_twilio_media(fake_media_server.media_url()) is None
+        
+        spool.assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_stops_streaming_at_cap(self, media_client, fake_media_server):
+        """Test that a note without Content-Length is cut off once it passes the cap."""
+        fake_media_server.body = b"\x00" * (2 * MB)
+        fake_media_server.send_length = False
+        
+        with patch.object(audio_handler.settings, "media_max_bytes", MB):
+            assert await download_twilio_media(fake_media_server.media_url()) is None
+    
+    @pytest.mark.asyncio
+    async def test_peak_memory_per_voice_note(self, media_client, fake_media_server, media_limits):
+        """Test that downloading and uploading an 8 MB note holds only a fraction of it in memory."""
+        fake_media_server.body = b"\x00" * (8 * MB)
+        openai_client = AsyncOpenAI(api_key="sk-test", base_url=fake_media_server.base_url)
+        
+        with patch("app.ai.speech_to_text.openai_client", openai_client):
+            tracemalloc.start()
+            try:
+                text = await download_and_transcribe_audio(fake_media_server.media_url(), "audio/ogg")
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+        await openai_client.close()
+        
+        assert text == fake_media_server.transcript
+        assert fake_media_server.uploaded_bytes > 8 * MB
+        # The 1 MB spool limit plus chunk buffers; buffering would need 8-16 MB
+        assert peak < 3 * MB
+
+
+class TestMediaClient:
+    """Tests for the shared media client's lifecycle."""
+    
+    @pytest.mark.asyncio
+    async def test_shared_until_closed(self):
+        """Test that one client is shared and a new one is built after shutdown."""
+        with patch.object(audio_handler, "media_client", None):
+            client = get_media_client()
+            assert get_media_client() is client
+            
+            await close_media_client()
+            
+            assert client.is_closed
+            assert audio_handler.media_client is None
+    
+    @pytest.mark.asyncio
+    async def test_http2_falls_back_without_h2(self):
+        """Test that HTTP/2 is only requested when h2 is installed."""
+        with patch.object(audio_handler, "http2_available", return_value=False):
+            client = create_media_client(max_connections=1, timeout=1.0, http2=True)
+        
+        # httpx raises ImportError at construction if http2=True without h2
+        assert not client.is_closed
+        await client.aclose()
+
+
+def stereo_clip(leading_ms: int, speech_ms: int, trailing_ms: int) -> AudioSegment:
+    """44.1 kHz stereo tone framed by silence."""
+    tone = Sine(440).to_audio_segment(duration=speech_ms, volume=-10).set_channels(2)
+    silence = AudioSegment.silent(duration=leading_ms, frame_rate=44100).set_channels(2)
+    tail = AudioSegment.silent(duration=trailing_ms, frame_rate=44100).set_channels(2)
+    return silence + tone + tail
+
+
+class TestPreprocessing:
+    """Tests for shrinking voice notes before upload."""
+    
+    @pytest.fixture
+    def thread_pool(self):
+        """Run the worker in a thread so it can be patched."""
+        with ThreadPoolExecutor(max_workers=1) as pool, \
+             patch.object(audio_handler, "get_audio_pool", return_value=pool), \
+             patch.object(audio_handler, "ffmpeg_available", return_value=True), \
+             patch.object(audio_handler.settings, "audio_preprocess_enabled", True), \
+             patch.object(audio_handler.settings, "audio_preprocess_min_bytes", 0):
+            yield pool
+    
+    def test_shrink_trims_silence_and_downmixes(self):
+        """Test that silence is cut to the padding and the audio becomes 16 kHz mono."""
+        shrunk = shrink_segment(stereo_clip(1500, 2000, 3000))
+        
+        assert shrunk.channels == 1
+        assert shrunk.frame_rate == 16000
+        # 2s of speech plus 200ms of padding at each end (10ms detection steps)
+        assert 2380 <= len(shrunk) <= 2420
+    
+    def test_shrink_keeps_silent_note(self):
+        """Test that a note with nothing above the threshold is not cut to nothing."""
+        shrunk = shrink_segment(AudioSegment.silent(duration=1000, frame_rate=44100))
+        
+        assert len(shrunk) == 1000
+    
+    @pytest.mark.asyncio
+    async def test_smaller_result_is_uploaded(self, thread_pool):
+        """Test that the preprocessed note replaces the original when it is smaller."""
+        def shrink(source_path, output_path, bitrate):
+            with open(source_path, "rb") as source, open(output_path, "wb") as output:
+                output.write(source.read()[:10])
+            return 10
+        original = io.BytesIO(b"x" * 1000)
+        
+        with patch.object(audio_handler, "_preprocess_file", side_effect=shrink):
+            audio_file, filename = await preprocess_audio(original, "audio.m4a")
+        
+        with audio_file:
+            assert audio_file.read() == b"x" * 10
+        assert filename == "audio.ogg"
+        assert original.closed
+    
+    @pytest.mark.asyncio
+    async def test_failure_uploads_original(self, thread_pool):
+        """Test that a note ffmpeg cannot process is uploaded unchanged."""
+        original = io.BytesIO(b"not audio" * 100)
+        
+        with patch.object(audio_handler, "_preprocess_file", side_effect=RuntimeError("ffmpeg failed")):
+            audio_file, filename = await preprocess_audio(original, "audio.ogg")
+        
+        assert audio_file is original
+        assert audio_file.tell() == 0
+        assert filename == "audio.ogg"
+    
+    @pytest.mark.asyncio
+    async def test_skipped_without_ffmpeg(self):
+        """Test that notes are uploaded as they are when ffmpeg is not installed."""
+        original = io.BytesIO(os.urandom(128 * 1024))
+        
+        with patch.object(audio_handler, "ffmpeg_available", return_value=False), \
+             patch.object(audio_handler, "get_audio_pool") as pool:
+            audio_file, filename = await preprocess_audio(original, "audio.ogg")
+        
+        assert audio_file is original
+        pool.assert_not_called()
@@ -0,0 +1,242 @@
+"""
+Tests for the database backends: SQLite's WAL writer connection and
+read-only pool, and the SQL shared with Postgres.
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock
+from zoneinfo import ZoneInfo
+
+import pytest
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.domain.conversation_history import ConversationMessage, get_conversation_history
+from app.config.settings import get_settings
+from app.domain.processed_message import ProcessedMessage
+from app.domain.reminder import Base, ParsedIntent, Reminder, ReminderStatus
+from app.infrastructure.database import UnitOfWork, create_sqlite_engine, is_memory_database, is_sqlite_url
+from app.infrastructure.dialects import dialect_insert
+from app.infrastructure.migrations import apply_migrations, only_on
+from app.usecases.reminder_service import ReminderService
+
+USER_ID = "+923001234567"
+
+
+@pytest.fixture
+async def engines(tmp_path):
+    """Writer engine and a two-connection read pool over one database file."""
+    url = f"sqlite+aiosqlite:///{tmp_path}/reminders.db"
+    writer = create_sqlite_engine(url)
+    async with writer.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(apply_migrations)
+    reader = create_sqlite_engine(url, read_only=True, pool_size=2)
+    
+    yield writer, reader
+    
+    await reader.dispose()
+    await writer.dispose()
+
+
+def factories(engines) -> tuple:
+    writer, reader = engines
+    return (
+        async_sessionmaker(writer, class_=AsyncSession, expire_on_commit=False),
+        async_sessionmaker(reader, class_=AsyncSession, expire_on_commit=False),
+    )
+
+
+class TestEngines:
+    """Tests for create_sqlite_engine."""
+    
+    @pytest.mark.asyncio
+    async def test_writer_uses_wal(self, engines):
+        """Test that the writer switches the file to WAL with relaxed syncing."""
+        writer, _ = engines
+        async with writer.connect() as conn:
+            assert (await conn.execute(text("PRAGMA journal_mode"))).scalar() == "wal"
+            assert (await conn.execute(text("PRAGMA synchronous"))).scalar() == 1  # NORMAL
+            assert (await conn.execute(text("PRAGMA cache_size"))).scalar() < 0
+    
+    @pytest.mark.asyncio
+    async def test_read_pool_rejects_writes(self, engines):
+        """Test that connections from the read pool are read-only."""
+        _, reader = engines
+        async with reader.connect() as conn:
+            with pytest.raises(OperationalError, match="readonly"):
+                await conn.execute(text("DELETE FROM reminders"))
+    
+    @pytest.mark.asyncio
+    async def test_read_pool_has_separate_connections(self, engines):
+        """Test that concurrent reads check out their own connections."""
+        _, reader = engines
+        async with reader.connect() as first, reader.connect() as second:
+            raw_first = await first.get_raw_connection()
+            raw_second = await second.get_raw_connection()
+            assert raw_first.driver_connection is not raw_second.driver_connection
+    
+    def test_memory_urls(self):
+        """Test that in-memory databases are recognised (they get no read pool)."""
+        assert is_memory_database("sqlite+aiosqlite:///:memory:")
+        assert is_memory_database("sqlite+aiosqlite://")
+        assert not is_memory_database("sqlite+aiosqlite:///./reminders.db")
+
+
+class TestWriterConnection:
+    """Concurrent units of work on the single writer connection."""
+    
+    @pytest.mark.asyncio
+    async def test_rollback_does_not_discard_another_transaction(self, engines):
+        """Test that one unit of work rolling back leaves another's flushed writes to commit."""
+        write_factory, read_factory = factories(engines)
+        first_flushed = asyncio.Event()
+        second_done = asyncio.Event()
+        order = []
+        
+        async def first():
+            async with UnitOfWork(write_factory, read_factory) as uow:
+                uow.session.add(ConversationMessage(user_id=USER_ID, user_message="kept", bot_response="ok"))
+                await uow.session.flush()
+                first_flushed.set()
+                # Give the second unit of work the chance to roll back first; it
+                # cannot, as it is still waiting for the writer connection
+                await asyncio.wait([asyncio.ensure_future(second_done.wait())], timeout=0.5)
+                await uow.commit()
+                order.append("first committed")
+        
+        async def second():
+            await first_flushed.wait()
+            async with UnitOfWork(write_factory, read_factory) as uow:
+                uow.session.add(ConversationMessage(user_id=USER_ID, user_message="dropped", bot_response="no"))
+                await uow.session.flush()
+                order.append("second flushed")
+                await uow.rollback()
+            second_done.set()
+        
+        await asyncio.wait_for(asyncio.gather(first(), second()), timeout=5)
+        
+        # The second transaction only got the connection once the first had committed
+        assert order == ["first committed", "second flushed"]
+        async with read_factory() as session:
+            saved = (await session.execute(select(ConversationMessage.user_message))).scalars().all()
+        assert saved == ["kept"]
+
+
+class TestReadSessions:
+    """Tests for reads routed to the read pool."""
+    
+    @pytest.mark.asyncio
+    async def test_reads_do_not_wait_for_open_write(self, engines):
+        """Test that a read completes while the writer holds an uncommitted transaction."""
+        write_factory, read_factory = factories(engines)
+        async with write_factory() as session:
+            session.add(ConversationMessage(user_id=USER_ID, user_message="hi", bot_response="hello"))
+            await session.commit()
+        
+        async with UnitOfWork(write_factory, read_factory) as uow:
+            uow.session.add(ConversationMessage(user_id=USER_ID, user_message="later", bot_response="pending"))
+            await uow.session.flush()
+            
+            async with uow.read_session() as read_session:
+                history = await asyncio.wait_for(get_conversation_history(read_session, USER_ID), timeout=2)
+            
+            await uow.commit()
+        
+        # Only the committed exchange is visible
+        assert [m["content"] for m in history] == ["hi", "hello"]
+    
+    @pytest.mark.asyncio
+    async def test_list_reads_through_read_pool(self, engines):
+        """Test that listing reminders inside a unit of work uses the read pool."""
+        write_factory, read_factory = factories(engines)
+        async with write_factory() as session:
+            session.add(Reminder(
+                id="r-1",
+                user_id=USER_ID,
+                title="Pay bills",
+                scheduled_time=datetime.utcnow() + timedelta(days=1),
+                status=ReminderStatus.ACTIVE,
+            ))
+            await session.commit()
+        
+        async with UnitOfWork(write_factory, read_factory) as uow:
+            # Hold a write transaction open on the writer connection
+            await uow.session.execute(text("UPDATE reminders SET title = 'Pay all bills'"))
+            service = ReminderService(uow.session, uow, user_id=USER_ID)
+            
+            response = await asyncio.wait_for(service.handle_intent(ParsedIntent(intent="list_reminders")), timeout=2)
+            await uow.rollback()
+        
+        assert "*Pay bills*" in response
+    
+    def test_custom_factory_reads_from_same_database(self):
+        """Test that a unit of work on another database reads from that database."""
+        factory = async_sessionmaker()
+        
+        assert UnitOfWork(factory).read_session_factory is factory
+
+
+class TestBackends:
+    """Tests for choosing and sharing SQL between SQLite and Postgres."""
+    
+    @pytest.mark.parametrize("configured, expected", [
+        (None, "sqlite+aiosqlite:///"),
+        ("postgres://app:secret@db:5432/reminders", "postgresql+asyncpg://app:secret@db:5432/reminders"),
+        ("postgresql://app@db/reminders", "postgresql+asyncpg://app@db/reminders"),
+        ("postgresql+asyncpg://app@db/reminders", "postgresql+asyncpg://app@db/reminders"),
+    ])
+    def test_database_url(self, configured, expected):
+        """Test that DATABASE_URL selects Postgres through asyncpg, else SQLite under DATA_DIR."""
+        settings = get_settings().model_copy(update={"database_url_setting": configured})
+        
+        assert settings.database_url.startswith(expected)
+        assert is_sqlite_url(settings.database_url) == (configured is None)
+    
+    def test_sqlite_url_outside_data_dir_is_ignored(self, tmp_path):
+        """Test that a SQLite DATABASE_URL only counts when its file is on the DATA_DIR volume."""
+        settings = get_settings().model_copy(update={"data_dir": str(tmp_path)})
+        
+        outside = settings.model_copy(update={"database_url_setting": "sqlite+aiosqlite:///./reminders.db"})
+        inside = settings.model_copy(update={"database_url_setting": f"sqlite+aiosqlite:///{tmp_path}/app.db"})
+        
+        assert outside.database_url == f"sqlite+aiosqlite:///{tmp_path}/reminders.db"
+        assert inside.database_url == f"sqlite+aiosqlite:///{tmp_path}/app.db"
+    
+    def test_insert_or_ignore_on_postgres(self):
+        """Test that dialect_insert builds Postgres' ON CONFLICT DO NOTHING for a Postgres session."""
+        session = MagicMock()
+        session.get_bind.return_value.dialect.name = "postgresql"
+        
+        statement = (
+            dialect_insert(session, ProcessedMessage)
+            .values(message_sid="SM1", processed_at=datetime.utcnow())
+            .on_conflict_do_nothing(index_elements=["message_sid"])
+        )
+        
+        sql = str(statement.compile(dialect=postgresql.dialect()))
+        assert "ON CONFLICT (message_sid) DO NOTHING" in sql
+    
+    def test_only_on_skips_other_backends(self):
+        """Test that backend-specific migration steps only run on their backend."""
+        engine = create_engine("sqlite://")
+        with engine.begin() as conn:
+            only_on("postgresql", "CREATE EXTENSION pg_trgm")(conn)
+            only_on("sqlite", "CREATE TABLE marker (id INTEGER)")(conn)
+            
+            assert conn.execute(text("SELECT COUNT(*) FROM marker")).scalar() == 0
+    
+    @pytest.mark.asyncio
+    async def test_aware_datetimes_are_stored_as_wall_time(self, test_session):
+        """Test that timezone-aware values are stored naive on every backend."""
+        scheduled = datetime(2026, 3, 1, 9, 0, tzinfo=ZoneInfo("Asia/Karachi"))
+        test_session.add(Reminder(id="r-1", user_id=USER_ID, title="Pay bills", scheduled_time=scheduled))
+        await test_session.flush()
+        test_session.expire_all()
+        
+        stored = (await test_session.execute(select(Reminder.scheduled_time))).scalar_one()
+        
+        assert stored == datetime(2026, 3, 1, 9, 0)
@@ -0,0 +1,57 @@
+"""
+Unit tests for the in-memory message dedupe cache.
+"""
+
+from app.infrastructure.dedupe_cache import DedupeCache
+
+
+class FakeClock:
+    """Manually advanced monotonic clock."""
+    
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestDedupeCache:
+    """Tests for DedupeCache."""
+    
+    def test_hit_and_miss_counters(self):
+        """Test that lookups are counted as hits or misses."""
+        cache = DedupeCache(max_size=10, ttl_seconds=60)
+        
+        assert cache.contains("SM1") is False
+        cache.add("SM1")
+        assert cache.contains("SM1") is True
+        
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["hit_ratio"] == 0.5
+    
+    def test_entries_expire(self):
+        """Test that entries are forgotten after the TTL."""
+        clock = FakeClock()
+        cache = DedupeCache(max_size=10, ttl_seconds=60, clock=clock)
+        cache.add("SM1")
+        
+        clock.now = 59
+        assert cache.contains("SM1") is True
+        clock.now = 61
+        assert cache.contains("SM1") is False
+        assert len(cache) == 0
+    
+    def test_evicts_least_recently_used(self):
+        """Test that the cache stays bounded and keeps recently used SIDs."""
+        cache = DedupeCache(max_size=2, ttl_seconds=60)
+        cache.add("SM1")
+        cache.add("SM2")
+        cache.contains("SM1")  # SM2 is now least recently used
+        cache.add("SM3")
+        
+        assert len(cache) == 2
+        assert cache.contains("SM1") is True
+        assert cache.contains("SM2") is False
+        assert cache.stats()["evictions"] == 1
@@ -0,0 +1,516 @@
+"""
+Tests for the due-index reminder dispatcher.
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from sqlalchemy import create_engine, event, select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.domain.job_lease import JobLease
+from app.domain.reminder import Base, ParsedIntent, Reminder, ReminderStatus
+from app.infrastructure import scheduler
+from app.infrastructure.database import UnitOfWork
+from app.infrastructure.migrations import MIGRATIONS, apply_migrations
+from app.infrastructure.scheduler import ReminderDispatcher, clear_due, set_due
+from app.infrastructure.twilio_calls import CallDropped
+from app.usecases.reminder_service import ReminderService
+from app.utils.time import from_pkt_to_utc
+
+USER_ID = "+923001234567"
+
+
+def make_reminder(reminder_id: str, **overrides) -> Reminder:
+    fields = {
+        "id": reminder_id,
+        "user_id": USER_ID,
+        "title": f"Reminder {reminder_id}",
+        "scheduled_time": datetime(2026, 3, 1, 14, 0),
+        "status": ReminderStatus.ACTIVE,
+        "call_opt_out": True,
+    }
+    fields.update(overrides)
+    return Reminder(**fields)
+
+
+@pytest.fixture
+def sent():
+    """Patch WhatsApp notifications and calls; yields the mocks."""
+    with patch("app.infrastructure.twilio_whatsapp.send_reminder_notification", new_callable=AsyncMock) as notify, \
+         patch("app.infrastructure.twilio_calls.make_reminder_call", new_callable=AsyncMock) as call:
+        yield notify, call
+
+
+@pytest.fixture
+def dispatcher():
+    return ReminderDispatcher(batch_size=100, poll_seconds=30, concurrency=10)
+
+
+class TestScheduling:
+    """Tests for scheduling and cancelling through the reminder row."""
+    
+    @pytest.mark.asyncio
+    async def test_schedule_sets_utc_due_time(self, test_session):
+        """Test that a PKT scheduled time is stored as a UTC due time."""
+        reminder = make_reminder("r1")
+        test_session.add(reminder)
+        
+        set_due(reminder)
+        await test_session.commit()
+        
+        await test_session.refresh(reminder)
+        assert reminder.next_fire_at == datetime(2026, 3, 1, 9, 0)
+    
+    @pytest.mark.asyncio
+    async def test_paused_reminder_is_not_scheduled(self, test_session):
+        """Test that only active reminders get a due time."""
+        reminder = make_reminder("r1", status=ReminderStatus.PAUSED)
+        test_session.add(reminder)
+        
+        set_due(reminder)
+        await test_session.commit()
+        
+        await test_session.refresh(reminder)
+        assert reminder.next_fire_at is None
+    
+    @pytest.mark.asyncio
+    async def test_cancel_clears_due_times(self, test_session):
+        """Test that cancelling clears the notification and follow-up."""
+        reminder = make_reminder("r1", next_fire_at=datetime(2026, 3, 1, 9), follow_up_at=datetime(2026, 3, 1, 9, 10))
+        test_session.add(reminder)
+        await test_session.commit()
+        
+        clear_due(reminder)
+        await test_session.commit()
+        
+        await test_session.refresh(reminder)
+        assert reminder.next_fire_at is None
+        assert reminder.follow_up_at is None
+
+
+class TestTransactionalScheduling:
+    """A reminder and its schedule are committed by the same transaction."""
+    
+    @pytest.fixture
+    def factory(self, test_engine):
+        return async_sessionmaker(test_engine, class_=AsyncSession, expire_on_commit=False)
+    
+    @pytest.fixture
+    def wake(self):
+        with patch("app.usecases.reminder_service.wake_dispatcher", new_callable=AsyncMock) as wake:
+            yield wake
+    
+    def create_intent(self) -> ParsedIntent:
+        return ParsedIntent(
+            intent="create_reminder",
+            title="Pay bills",
+            scheduled_time=datetime.utcnow() + timedelta(hours=2),
+        )
+    
+    @pytest.mark.asyncio
+    async def test_create_commits_row_with_due_time(self, factory, wake):
+        """Test that a created reminder is committed already scheduled, then the dispatcher is woken."""
+        async with UnitOfWork(factory) as uow:
+            await ReminderService(uow.session, uow, user_id=USER_ID).handle_intent(self.create_intent())
+            wake.assert_not_called()
+            await uow.commit()
+        
+        wake.assert_called_once()
+        async with factory() as session:
+            reminder = (await session.execute(select(Reminder))).scalar_one()
+        assert reminder.next_fire_at == from_pkt_to_utc(reminder.scheduled_time).replace(tzinfo=None)
+    
+    @pytest.mark.asyncio
+    async def test_failed_unit_of_work_leaves_nothing_scheduled(self, factory, wake):
+        """Test that a crash before commit discards the reminder and its schedule together."""
+        with pytest.raises(RuntimeError):
+            async with UnitOfWork(factory) as uow:
+                await ReminderService(uow.session, uow, user_id=USER_ID).handle_intent(self.create_intent())
+                raise RuntimeError("worker died")
+        
+        wake.assert_not_called()
+        async with factory() as session:
+            assert (await session.execute(select(Reminder))).scalars().all() == []
+    
+    @pytest.mark.asyncio
+    async def test_pause_clears_due_times_with_status(self, factory, test_session, wake):
+        """Test that pausing clears the notification and follow-up in the same commit."""
+        test_session.add(make_reminder(
+            "r1", title="Pay bills", next_fire_at=datetime(2026, 3, 1, 9), follow_up_at=datetime(2026, 3, 1, 9, 10)
+        ))
+        await test_session.commit()
+        
+        async with UnitOfWork(factory) as uow:
+            await ReminderService(uow.session, uow, user_id=USER_ID).handle_intent(
+                ParsedIntent(intent="pause_reminder", target_reminder="bills")
+            )
+            await uow.commit()
+        
+        async with factory() as session:
+            reminder = await session.get(Reminder, "r1")
+        assert reminder.status == ReminderStatus.PAUSED
+        assert reminder.next_fire_at is None
+        assert reminder.follow_up_at is None
+    
+    @pytest.mark.asyncio
+    async def test_notification_and_follow_up_share_a_commit(self, database_session, test_session, dispatcher, sent):
+        """Test that a sent notification is marked and its follow-up scheduled by one write."""
+        now = datetime(2026, 3, 1, 9, 0)
+        test_session.add(make_reminder(
+            "r1", next_fire_at=now, call_opt_out=False, call_if_no_response=True, follow_up_minutes=10
+        ))
+        await test_session.commit()
+        
+        await dispatcher.dispatch_due(now)
+        
+        reminder = await test_session.get(Reminder, "r1")
+        await test_session.refresh(reminder)
+        assert reminder.follow_up_at == reminder.last_notified_at + timedelta(minutes=10)
+
+
+class TestDispatch:
+    """Tests for firing due rows."""
+    
+    @pytest.mark.asyncio
+    async def test_fires_due_reminders_once(self, database_session, test_session, dispatcher, sent):
+        """Test that due reminders fire once and future ones wait."""
+        now = datetime(2026, 3, 1, 9, 0)
+        test_session.add_all([
+            make_reminder("due", next_fire_at=now - timedelta(seconds=5)),
+            make_reminder("later", next_fire_at=now + timedelta(minutes=1)),
+        ])
+        await test_session.commit()
+        notify, _ = sent
+        
+        await dispatcher.dispatch_due(now)
+        await dispatcher.dispatch_due(now)
+        
+        notify.assert_called_once()
+        assert notify.call_args.kwargs["reminder_title"] == "Reminder due"
+        due = await test_session.get(Reminder, "due")
+        await test_session.refresh(due)
+        assert due.next_fire_at is None
+        assert due.last_notified_at is not None
+        assert dispatcher.delivery.delivered == 1
+    
+    @pytest.mark.asyncio
+    async def test_follow_up_is_fired_from_its_due_time(self, database_session, test_session, dispatcher, sent):
+        """Test that a notification schedules a follow-up the dispatcher fires later."""
+        now = datetime.utcnow()
+        test_session.add(make_reminder(
+            "r1",
+            next_fire_at=now,
+            follow_up_minutes=10,
+            call_if_no_response=True,
+            call_opt_out=False
+        ))
+        await test_session.commit()
+        _, call = sent
+        
+        await dispatcher.dispatch_due(now)
+        call.assert_not_called()
+        
+        await dispatcher.dispatch_due(now + timedelta(minutes=11))
+        call.assert_called_once_with("Reminder r1", to_number=USER_ID)
+        assert dispatcher.follow_ups_fired == 1
+        
+        reminder = await test_session.get(Reminder, "r1")
+        await test_session.refresh(reminder)
+        assert reminder.follow_up_at is None
+        leases = (await test_session.execute(
+            select(JobLease.completed_at).where(JobLease.job_key.like("followup:r1:%"))
+        )).scalars().all()
+        assert len(leases) == 1 and leases[0] is not None
+    
+    @pytest.mark.asyncio
+    async def test_dropped_call_is_retried(self, database_session, test_session, dispatcher, sent):
+        """Test that a follow-up whose call was never placed stays due and is retried."""
+        now = datetime(2026, 3, 1, 9, 0)
+        test_session.add(make_reminder("r1", follow_up_at=now, call_opt_out=False))
+        await test_session.commit()
+        _, call = sent
+        call.side_effect = [CallDropped("Call dispatcher stopped"), True]
+        
+        await dispatcher.dispatch_due(now)
+        reminder = await test_session.get(Reminder, "r1")
+        await test_session.refresh(reminder)
+        assert reminder.follow_up_at == now
+        assert dispatcher.follow_ups_fired == 0
+        
+        await test_session.execute(
+            update(JobLease).values(leased_until=datetime.utcnow() - timedelta(seconds=1))
+        )
+        await test_session.commit()
+        await dispatcher.dispatch_due(now)
+        
+        await test_session.refresh(reminder)
+        assert reminder.follow_up_at is None
+        assert call.call_count == 2
+        assert dispatcher.follow_ups_fired == 1
+    
+    @pytest.mark.asyncio
+    async def test_inactive_rows_are_cleared_without_firing(self, database_session, test_session, dispatcher, sent):
+        """Test that a paused reminder with a stale due time is not sent."""
+        now = datetime(2026, 3, 1, 9, 0)
+        test_session.add(make_reminder("r1", status=ReminderStatus.PAUSED, next_fire_at=now))
+        await test_session.commit()
+        notify, _ = sent
+        
+        await dispatcher.dispatch_due(now)
+        
+        notify.assert_not_called()
+        reminder = await test_session.get(Reminder, "r1")
+        await test_session.refresh(reminder)
+        assert reminder.next_fire_at is None
+    
+    @pytest.mark.asyncio
+    async def test_fires_in_bounded_batches(self, database_session, test_session, sent):
+        """Test that one pass reads at most a batch and reports more work."""
+        now = datetime(2026, 3, 1, 9, 0)
+        test_session.add_all([make_reminder(f"r{i}", next_fire_at=now) for i in range(25)])
+        await test_session.commit()
+        notify, _ = sent
+        dispatcher = ReminderDispatcher(batch_size=10, poll_seconds=30, concurrency=10)
+        
+        assert await dispatcher.dispatch_due(now) is True
+        assert notify.call_count == 10
+        
+        while await dispatcher.dispatch_due(now):
+            pass
+        assert notify.call_count == 25
+    
+    @pytest.mark.asyncio
+    async def test_sleeps_until_next_due(self, database_session, test_session, dispatcher):
+        """Test that the dispatcher sleeps until the earliest due row, capped by the poll interval."""
+        test_session.add(make_reminder("r1", next_fire_at=datetime.utcnow() + timedelta(seconds=5)))
+        await test_session.commit()
+        
+        delay = await dispatcher._seconds_until_next_due()
+        
+        assert 4 < delay <= 5
+        dispatcher.poll_seconds = 2
+        assert await dispatcher._seconds_until_next_due() == 2
+    
+    @pytest.mark.asyncio
+    async def test_scheduling_wakes_the_running_dispatcher(self, database_session, test_session, dispatcher, sent):
+        """Test that a reminder scheduled while the dispatcher sleeps fires on time."""
+        reminder = make_reminder("r1")
+        test_session.add(reminder)
+        await test_session.commit()
+        notify, _ = sent
+        
+        with patch("app.infrastructure.scheduler.scheduler", dispatcher):
+            dispatcher.start()
+            try:
+                await asyncio.sleep(0.1)
+                # Due in half a second (PKT is UTC+5), well inside the 30s poll interval
+                reminder.scheduled_time = datetime.utcnow() + timedelta(hours=5, seconds=0.5)
+                set_due(reminder)
+                await test_session.commit()
+                await scheduler.wake_dispatcher()
+                for _ in range(40):
+                    if notify.called:
+                        break
+                    await asyncio.sleep(0.05)
+            finally:
+                await dispatcher.stop()
+        
+        notify.assert_called_once()
+        assert dispatcher.delivery.lateness_percentile(1.0) < 1.0
+
+
+class TestBatchedDelivery:
+    """A due batch is delivered with a bounded pool and a constant number of writes."""
+    
+    @pytest.mark.asyncio
+    async def test_batch_is_written_with_one_update(self, database_session, test_engine, test_session, dispatcher, sent):
+        """Test that a batch claims, records and completes with one statement each."""
+        now = datetime.utcnow()
+        test_session.add_all([
+            make_reminder(f"r{i}", next_fire_at=now, follow_up_minutes=10, call_if_no_response=True, call_opt_out=False)
+            for i in range(25)
+        ])
+        await test_session.commit()
+        statements = []
+        
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement.split()[0:3])
+        
+        event.listen(test_engine.sync_engine, "before_cursor_execute", capture)
+        try:
+            await dispatcher.dispatch_due(now)
+        finally:
+            event.remove(test_engine.sync_engine, "before_cursor_execute", capture)
+        
+        assert statements.count(["UPDATE", "reminders", "SET"]) == 1
+        assert statements.count(["INSERT", "INTO", "job_leases"]) == 1
+        assert statements.count(["UPDATE", "job_leases", "SET"]) == 1
+        
+        result = await test_session.execute(text(
+            "SELECT COUNT(*) FROM reminders WHERE next_fire_at IS NULL "
+            "AND last_notified_at IS NOT NULL AND follow_up_at IS NOT NULL"
+        ))
+        assert result.scalar() == 25
+    
+    @pytest.mark.asyncio
+    async def test_sends_are_bounded_by_concurrency(self, database_session, test_session):
+        """Test that no more than `concurrency` notifications are in flight."""
+        now = datetime(2026, 3, 1, 9, 0)
+        test_session.add_all([make_reminder(f"r{i}", next_fire_at=now) for i in range(12)])
+        await test_session.commit()
+        in_flight = peak = 0
+        
+        async def slow_send(**kwargs):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return True
+        
+        dispatcher = ReminderDispatcher(batch_size=100, poll_seconds=30, concurrency=3)
+        with patch("app.infrastructure.twilio_whatsapp.send_reminder_notification", side_effect=slow_send):
+            await dispatcher.dispatch_due(now)
+        
+        assert peak == 3
+        assert dispatcher.delivery.delivered == 12
+    
+    @pytest.mark.asyncio
+    async def test_failed_send_is_not_marked_notified(self, database_session, test_session, dispatcher):
+        """Test that a send that raises is cleared but not marked notified."""
+        now = datetime(2026, 3, 1, 9, 0)
+        test_session.add_all([make_reminder("ok", next_fire_at=now), make_reminder("broken", next_fire_at=now)])
+        await test_session.commit()
+        
+        async def send(reminder_title, **kwargs):
+            if reminder_title == "Reminder broken":
+                raise RuntimeError("boom")
+            return True
+        
+        with patch("app.infrastructure.twilio_whatsapp.send_reminder_notification", side_effect=send):
+            await dispatcher.dispatch_due(now)
+        
+        rows = dict((await test_session.execute(text(
+            "SELECT id, last_notified_at IS NOT NULL FROM reminders WHERE next_fire_at IS NULL"
+        ))).all())
+        assert rows == {"ok": 1, "broken": 0}
+        assert dispatcher.delivery.failed == 1
+    
+    @pytest.mark.asyncio
+    async def test_rejected_send_is_not_marked_notified(self, database_session, test_session, dispatcher):
+        """Test that a send Twilio rejected counts as failed and schedules no follow-up call."""
+        now = datetime(2026, 3, 1, 9, 0)
+        test_session.add(make_reminder(
+            "r1", next_fire_at=now, follow_up_minutes=10, call_if_no_response=True, call_opt_out=False
+        ))
+        await test_session.commit()
+        
+        with patch("app.infrastructure.twilio_whatsapp.send_reminder_notification", new_callable=AsyncMock) as notify:
+            notify.return_value = False
+            await dispatcher.dispatch_due(now)
+        
+        reminder = await test_session.get(Reminder, "r1")
+        await test_session.refresh(reminder)
+        assert reminder.last_notified_at is None
+        assert reminder.follow_up_at is None
+        assert dispatcher.delivery.delivered == 0
+        assert dispatcher.delivery.failed == 1
+    
+    @pytest.mark.asyncio
+    async def test_failed_batch_write_is_recorded_row_by_row(self, database_session, test_session, dispatcher, sent):
+        """Test that a failed batch write falls back to one transaction per row."""
+        now = datetime(2026, 3, 1, 9, 0)
+        test_session.add_all([make_reminder(f"r{i}", next_fire_at=now) for i in range(3)])
+        await test_session.commit()
+        record = scheduler._record_deliveries
+        calls = 0
+        
+        async def flaky_record(*args, **kwargs):
+            nonlocal calls
+            calls += 1
+            if calls == 1:
+                raise RuntimeError("database is locked")
+            await record(*args, **kwargs)
+        
+        with patch.object(scheduler, "_record_deliveries", side_effect=flaky_record):
+            await dispatcher.dispatch_due(now)
+        
+        result = await test_session.execute(text(
+            "SELECT COUNT(*) FROM reminders WHERE next_fire_at IS NULL AND last_notified_at IS NOT NULL"
+        ))
+        assert result.scalar() == 3
+        assert calls == 4
+    
+    @pytest.mark.asyncio
+    async def test_unrecorded_send_is_not_sent_again(self, database_session, test_session, dispatcher, sent):
+        """Test that a sent reminder whose row cannot be written keeps its lease completed."""
+        now = datetime(2026, 3, 1, 9, 0)
+        test_session.add(make_reminder("r1", next_fire_at=now))
+        await test_session.commit()
+        notify, _ = sent
+        
+        with patch.object(scheduler, "_record_deliveries", side_effect=RuntimeError("disk I/O error")):
+            await dispatcher.dispatch_due(now)
+        await test_session.execute(
+            update(JobLease).values(leased_until=datetime.utcnow() - timedelta(seconds=1))
+        )
+        await test_session.commit()
+        await dispatcher.dispatch_due(now)
+        
+        notify.assert_called_once()
+    
+    @pytest.mark.asyncio
+    async def test_status_reports_throughput_and_lateness(self, database_session, test_session, dispatcher, sent):
+        """Test that delivery metrics are exported on the status endpoint."""
+        now = datetime.utcnow()
+        test_session.add_all([make_reminder(f"r{i}", next_fire_at=now - timedelta(seconds=i)) for i in range(5)])
+        await test_session.commit()
+        
+        await dispatcher.dispatch_due(now)
+        delivery = (await dispatcher.status())["delivery"]
+        
+        assert delivery["delivered"] == 5
+        assert delivery["throughput_per_second"] > 0
+        assert 4000 <= delivery["lateness_p99_ms"] < 5000
+        assert delivery["lateness_p50_ms"] <= delivery["lateness_p99_ms"]
+
+
+class TestDueTimeMigration:
+    """Existing reminders are moved onto the due index."""
+    
+    def test_future_unnotified_reminders_are_backfilled(self, tmp_path):
+        """Test that migration 4 queues only pending active reminders, in UTC."""
+        engine = create_engine(f"sqlite:///{tmp_path / 'reminders.db'}")
+        with engine.begin() as conn:
+            Base.metadata.create_all(conn)
+            conn.execute(text("DROP INDEX ix_reminders_next_fire_at"))
+            rows = [
+                ("pending", "ACTIVE", "2099-01-01 14:00:00.000000", None),
+                ("notified", "ACTIVE", "2099-01-01 14:00:00.000000", "2098-12-31 09:00:00.000000"),
+                ("paused", "PAUSED", "2099-01-01 14:00:00.000000", None),
+                ("past", "ACTIVE", "2020-01-01 14:00:00.000000", None),
+            ]
+            for reminder_id, status, scheduled_time, notified in rows:
+                conn.execute(
+                    text(
+                        "INSERT INTO reminders (id, user_id, title, scheduled_time, status, last_notified_at) "
+                        "VALUES (:id, :user_id, 'Title', :scheduled_time, :status, :notified)"
+                    ),
+                    {"id": reminder_id, "user_id": USER_ID, "scheduled_time": scheduled_time,
+                     "status": status, "notified": notified}
+                )
+            
+            assert apply_migrations(conn) == [m.version for m in MIGRATIONS]
+            
+            due = dict(conn.execute(text("SELECT id, next_fire_at FROM reminders")).all())
+        engine.dispose()
+        
+        assert due == {
+            "pending": "2099-01-01 09:00:00.000000",
+            "notified": None,
+            "paused": None,
+            "past": None,
+        }
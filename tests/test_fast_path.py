@@ -0,0 +1,118 @@
+"""
+Unit tests for the local fast-path intent classifier.
+"""
+
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from app.ai.fast_path import classify_locally, get_routing_stats, reset_routing_stats
+from app.ai.nlp_parser import parse_user_message
+from app.utils.time import get_current_time_pkt
+
+
+class TestClassifyLocally:
+    """Tests for classify_locally."""
+    
+    @pytest.mark.parametrize("message,intent", [
+        ("ok", "acknowledge"),
+        ("Done!", "acknowledge"),
+        ("thank you", "acknowledge"),
+        ("List my reminders", "list_reminders"),
+        ("what are my reminders?", "list_reminders"),
+        ("stop calling me", "opt_out_calls"),
+        ("Do not call me if I don't respond", "opt_out_calls"),
+        ("enable calls", "opt_in_calls"),
+        ("snooze", "snooze_reminder"),
+        ("remind me later", "snooze_reminder"),
+    ])
+    def test_classifies_formulaic_messages(self, message, intent):
+        """Test that common short messages are handled locally."""
+        result = classify_locally(message)
+        
+        assert result is not None
+        assert result.intent.intent == intent
+        assert result.confidence >= 0.9
+    
+    @pytest.mark.parametrize("message,indices", [
+        ("delete 1 and 2", [1, 2]),
+        ("Delete 1 & 2", [1, 2]),
+        ("remove 3, 4 and 5", [3, 4, 5]),
+        ("delete #2", [2]),
+    ])
+    def test_batch_delete_extracts_indices(self, message, indices):
+        """Test that numbered deletes carry their list positions."""
+        result = classify_locally(message)
+        
+        assert result.intent.intent == "delete_reminders"
+        assert result.intent.target_indices == indices
+    
+    def test_snooze_with_duration(self):
+        """Test that a snooze duration becomes the new scheduled time."""
+        before = get_current_time_pkt()
+        result = classify_locally("snooze 2 for 1 hour")
+        
+        assert result.intent.intent == "snooze_reminder"
+        assert result.intent.target_indices == [2]
+        delta = result.intent.scheduled_time - before
+        assert 59 * 60 <= delta.total_seconds() <= 61 * 60
+    
+    @pytest.mark.parametrize("message", [
+        "Remind me to pay bills tomorrow at 9am",
+        "Delete electricity reminder",
+        "call me at 5",
+        "ok remind me tomorrow",
+        "",
+    ])
+    def test_leaves_other_messages_to_llm(self, message):
+        """Test that anything that isn't an exact rule match is not classified."""
+        assert classify_locally(message) is None
+    
+    def test_quoted_snooze_has_low_confidence(self):
+        """Test that a snooze replying to a specific message defers to the LLM."""
+        result = classify_locally("snooze", quoted_message="⏰ Reminder: Pay bills")
+        
+        assert result.confidence < 0.9
+
+
+class TestFastPathRouting:
+    """Tests for fast-path routing in parse_user_message."""
+    
+    @pytest.fixture(autouse=True)
+    def clean_stats(self):
+        reset_routing_stats()
+        yield
+        reset_routing_stats()
+    
+    @pytest.mark.asyncio
+    async def test_local_match_skips_openai(self):
+        """Test that a confident local match never calls OpenAI."""
+        with patch("app.ai.nlp_parser._call_openai_chat", new_callable=AsyncMock) as mock_call:
+            result = await parse_user_message("delete 1 and 2")
+        
+        mock_call.assert_not_called()
+        assert result.intent == "delete_reminders"
+        stats = get_routing_stats()
+        assert stats["local"]["by_intent"] == {"delete_reminders": 1}
+        assert stats["llm"]["count"] == 0
+    
+    @pytest.mark.asyncio
+    async def test_low_confidence_falls_back_to_openai(self):
+        """Test that a quoted snooze is sent to OpenAI and counted as an LLM route."""
+        with patch("app.ai.nlp_parser._call_openai_chat", new_callable=AsyncMock) as mock_call:
+            mock_call.return_value = '{"intent": "snooze_reminder", "target_reminder": "bills"}'
+            result = await parse_user_message("snooze", quoted_message="⏰ Reminder: Pay bills")
+        
+        mock_call.assert_called_once()
+        assert result.target_reminder == "bills"
+        assert get_routing_stats()["llm"]["by_intent"] == {"snooze_reminder": 1}
+    
+    @pytest.mark.asyncio
+    async def test_fast_path_can_be_disabled(self):
+        """Test that disabling the fast path sends everything to OpenAI."""
+        with patch("app.ai.nlp_parser.settings.nlp_fast_path_enabled", False), \
+             patch("app.ai.nlp_parser._call_openai_chat", new_callable=AsyncMock) as mock_call:
+            mock_call.return_value = '{"intent": "acknowledge"}'
+            await parse_user_message("ok")
+        
+        mock_call.assert_called_once()
+        assert get_routing_stats()["local_ratio"] == 0.0
@@ -0,0 +1,197 @@
+"""
+Tests for the conversation history token budget and rolling summary.
+"""
+
+from unittest.mock import patch
+
+import pytest
+
+from app.ai import history_budget
+from app.ai.history_budget import (
+    SUMMARY_PREFIX,
+    clip,
+    count_tokens,
+    fit_history,
+    load_prompt_history,
+    refresh_summary,
+    roll_summary,
+)
+from app.domain.conversation_history import get_conversation_summary, save_conversation, save_conversation_summary
+
+USER_ID = "+923001234567"
+
+REMINDER_LIST = "📋 Your reminders:\n\n" + "\n".join(
+    f"{i}. Pay bill number {i}\n   ⏰ Tomorrow at 9:00 AM" for i in range(1, 40)
+)
+
+
+def exchange(i: int, reply: str = None) -> list:
+    return [
+        {"role": "user", "content": f"message {i}"},
+        {"role": "assistant", "content": reply or f"reply {i}"},
+    ]
+
+
+@pytest.fixture(autouse=True)
+def estimated_tokens():
+    """Count tokens with the character estimate whether or not tiktoken is installed."""
+    with patch.object(history_budget, "_encoding", lambda: None):
+        yield
+
+
+@pytest.fixture
+def budget():
+    """Set the history budget settings for a test."""
+    patchers = []
+    
+    def configure(**values):
+        for name, value in values.items():
+            patcher = patch.object(history_budget.settings, name, value)
+            patcher.start()
+            patchers.append(patcher)
+    
+    configure(
+        llm_history_max_tokens=1000,
+        llm_history_message_max_tokens=150,
+        llm_history_turns=2,
+        llm_history_summary_max_tokens=250,
+    )
+    yield configure
+    for patcher in reversed(patchers):
+        patcher.stop()
+
+
+class TestFitHistory:
+    """History is fitted to the budget newest first."""
+    
+    def test_counts_estimated_tokens(self):
+        """Test that the fallback estimate rounds characters up to whole tokens."""
+        assert count_tokens("") == 0
+        assert count_tokens("abcd") == 1
+        assert count_tokens("abcde") == 2
+    
+    def test_long_messages_are_clipped(self):
+        """Test that a long reminder list is cut to the per-message cap."""
+        clipped = clip(REMINDER_LIST, 50)
+        
+        assert count_tokens(clipped) <= 50
+        assert clipped.endswith("…")
+        assert clip("short", 50) == "short"
+    
+    def test_short_history_is_unchanged(self):
+        """Test that history within the budget is sent as it is."""
+        history = exchange(1) + exchange(2)
+        
+        assert fit_history(history, max_tokens=1000, message_max_tokens=150) == history
+    
+    def test_newest_exchanges_are_kept(self):
+        """Test that the oldest whole exchanges are dropped to fit the budget."""
+        history = [message for i in range(10) for message in exchange(i)]
+        
+        fitted = fit_history(history, max_tokens=30, message_max_tokens=150)
+        
+        # Each exchange costs 2 * (2 + 4) = 12 tokens
+        assert fitted == exchange(8) + exchange(9)
+    
+    def test_clipped_list_leaves_room_for_older_turns(self):
+        """Test that a long reply is clipped instead of pushing the exchanges before it out."""
+        history = exchange(1) + exchange(2, reply=REMINDER_LIST)
+        
+        fitted = fit_history(history, max_tokens=200, message_max_tokens=100)
+        
+        assert fitted[:2] == exchange(1)
+        assert count_tokens(fitted[3]["content"]) <= 100
+    
+    def test_summary_leads_the_history(self):
+        """Test that the rolling summary comes first as a system message."""
+        fitted = fit_history(exchange(5), summary="- earlier", max_tokens=1000, message_max_tokens=150)
+        
+        assert fitted[0] == {"role": "system", "content": SUMMARY_PREFIX + "- earlier"}
+        assert fitted[1:] == exchange(5)
+    
+    def test_summary_over_budget_is_left_out(self):
+        """Test that a summary larger than the whole budget is not sent."""
+        fitted = fit_history(exchange(5), summary="x" * 400, max_tokens=50, message_max_tokens=150)
+        
+        assert fitted == exchange(5)
+
+
+class TestRollSummary:
+    """Older exchanges are folded into a capped summary."""
+    
+    def test_one_line_per_exchange(self):
+        """Test that each exchange becomes a line with the start of the reply."""
+        summary = roll_summary("", [("list my reminders", REMINDER_LIST)], max_tokens=250)
+        
+        assert summary.startswith('- User: "list my reminders" -> 📋 Your reminders: 1. Pay bill number 1')
+        assert "\n" not in summary
+    
+    def test_oldest_lines_are_dropped(self):
+        """Test that the summary stays within its budget by forgetting its oldest lines."""
+        summary = roll_summary("", [(f"message {i}", f"reply {i}") for i in range(20)], max_tokens=40)
+        
+        assert count_tokens(summary) <= 40
+        assert summary.splitlines()[-1] == '- User: "message 19" -> reply 19'
+        assert "message 0" not in summary
+
+
+class TestRollingSummary:
+    """Summaries are stored per user and read with the history."""
+    
+    async def add_exchanges(self, test_session, count: int) -> None:
+        for i in range(count):
+            await save_conversation(test_session, USER_ID, f"message {i}", f"reply {i}", commit=False)
+        await test_session.commit()
+    
+    @pytest.mark.asyncio
+    async def test_recent_history_needs_no_summary(self, test_session, budget):
+        """Test that history within the window is read verbatim."""
+        await self.add_exchanges(test_session, 3)
+        
+        messages, needs_summary = await load_prompt_history(test_session, USER_ID)
+        
+        assert [message["content"] for message in messages[::2]] == ["message 0", "message 1", "message 2"]
+        assert not needs_summary
+    
+    @pytest.mark.asyncio
+    async def test_aged_out_exchanges_are_summarized(self, database_session, test_session, budget):
+        """Test that a full window is folded into the summary, keeping the latest turns verbatim."""
+        await self.add_exchanges(test_session, 8)
+        _, needs_summary = await load_prompt_history(test_session, USER_ID)
+        assert needs_summary
+        
+        await refresh_summary(USER_ID)
+        
+        messages, needs_summary = await load_prompt_history(test_session, USER_ID)
+        assert messages[0]["role"] == "system"
+        assert '"message 5" -> reply 5' in messages[0]["content"]
+        assert [message["content"] for message in messages[1::2]] == ["message 6", "message 7"]
+        assert not needs_summary
+    
+    @pytest.mark.asyncio
+    async def test_summary_keeps_rolling(self, database_session, test_session, budget):
+        """Test that a second refresh appends to the summary within its cap."""
+        budget(llm_history_summary_max_tokens=40)
+        await self.add_exchanges(test_session, 8)
+        await refresh_summary(USER_ID)
+        await self.add_exchanges(test_session, 3)
+        
+        await refresh_summary(USER_ID)
+        
+        test_session.expire_all()
+        summary = await get_conversation_summary(test_session, USER_ID)
+        assert count_tokens(summary.summary) <= 40
+        assert summary.summary.splitlines()[-1] == '- User: "message 0" -> reply 0'
+    
+    @pytest.mark.asyncio
+    async def test_concurrent_refresh_keeps_one_summary(self, test_session):
+        """Test that a summary built from an outdated one is not stored."""
+        assert await save_conversation_summary(test_session, USER_ID, "- first", 5, None)
+        assert not await save_conversation_summary(test_session, USER_ID, "- racing", 5, None)
+        assert await save_conversation_summary(test_session, USER_ID, "- second", 9, 5)
+        assert not await save_conversation_summary(test_session, USER_ID, "- stale", 7, 5)
+        await test_session.commit()
+        
+        test_session.expire_all()
+        summary = await get_conversation_summary(test_session, USER_ID)
+        assert (summary.summary, summary.covered_until_id) == ("- second", 9)
@@ -0,0 +1,223 @@
+"""
+Tests for the durable ingest queue and its worker pool.
+"""
+
+import asyncio
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, patch
+
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.domain.inbound_message import InboundMessage, InboundMessageStatus
+from app.domain.reminder import Reminder
+from app.domain.conversation_history import ConversationMessage
+from app.infrastructure.ingest_queue import IngestQueue, get_stage_stats
+from app.usecases.message_processor import process_inbound_message
+
+
+@pytest.fixture
+def session_factory(test_engine):
+    """Session factory bound to the test database, patched into the queue."""
+    factory = async_sessionmaker(test_engine, class_=AsyncSession, expire_on_commit=False)
+    with patch("app.infrastructure.ingest_queue.async_session_factory", factory), \
+         patch("app.infrastructure.ingest_queue.async_read_session_factory", factory):
+        yield factory
+
+
+async def add_message(factory, sid: str, **overrides) -> None:
+    """Persist an inbound message row."""
+    fields = {
+        "message_sid": sid,
+        "from_number": "whatsapp:+923001234567",
+        "body": f"message {sid}",
+        "status": InboundMessageStatus.PENDING,
+        "received_at": datetime.utcnow(),
+    }
+    fields.update(overrides)
+    async with factory() as session:
+        session.add(InboundMessage(**fields))
+        await session.commit()
+
+
+async def get_status(factory, sid: str) -> InboundMessageStatus:
+    async with factory() as session:
+        result = await session.execute(
+            select(InboundMessage.status).where(InboundMessage.message_sid == sid)
+        )
+        return result.scalar_one()
+
+
+class TestIngestQueue:
+    """Tests for IngestQueue."""
+    
+    @pytest.mark.asyncio
+    async def test_workers_drain_queue(self, session_factory):
+        """Test that queued messages are handled and marked done."""
+        handled = []
+        
+        async def handler(message, uow):
+            handled.append(message.body)
+        
+        queue = IngestQueue(handler=handler, max_depth=10, workers=2)
+        for sid in ("SM1", "SM2", "SM3"):
+            await add_message(session_factory, sid)
+            assert queue.enqueue(sid)
+        
+        await queue.start()
+        try:
+            await asyncio.wait_for(queue.queue.join(), timeout=5)
+        finally:
+            await queue.stop()
+        
+        assert sorted(handled) == ["message SM1", "message SM2", "message SM3"]
+        assert await get_status(session_factory, "SM2") == InboundMessageStatus.DONE
+        assert queue.stats()["processed"] == 3
+        assert "total" in get_stage_stats()
+    
+    @pytest.mark.asyncio
+    async def test_failed_handler_marks_message_failed(self, session_factory):
+        """Test that handler exceptions are recorded on the row."""
+        async def handler(message, uow):
+            raise RuntimeError("pipeline exploded")
+        
+        queue = IngestQueue(handler=handler, max_depth=10, workers=1)
+        await add_message(session_factory, "SMFAIL")
+        queue.enqueue("SMFAIL")
+        
+        await queue.start()
+        try:
+            await asyncio.wait_for(queue.queue.join(), timeout=5)
+        finally:
+            await queue.stop()
+        
+        assert await get_status(session_factory, "SMFAIL") == InboundMessageStatus.FAILED
+        assert queue.stats()["failed"] == 1
+    
+    @pytest.mark.asyncio
+    async def test_message_is_processed_once(self, session_factory):
+        """Test that a SID queued twice is only handled once."""
+        handled = []
+        
+        async def handler(message, uow):
+            handled.append(message.message_sid)
+        
+        queue = IngestQueue(handler=handler, max_depth=10, workers=2)
+        await add_message(session_factory, "SMDUP")
+        queue.enqueue("SMDUP")
+        queue.enqueue("SMDUP")
+        
+        await queue.start()
+        try:
+            await asyncio.wait_for(queue.queue.join(), timeout=5)
+        finally:
+            await queue.stop()
+        
+        assert handled == ["SMDUP"]
+    
+    @pytest.mark.asyncio
+    async def test_start_recovers_unfinished_messages(self, session_factory):
+        """Test that pending rows are re-queued on startup."""
+        handled = []
+        
+        async def handler(message, uow):
+            handled.append(message.message_sid)
+        
+        await add_message(session_factory, "SMPENDING")
+        await add_message(session_factory, "SMDONE", status=InboundMessageStatus.DONE)
+        await add_message(session_factory, "SMFAILED", status=InboundMessageStatus.FAILED)
+        
+        queue = IngestQueue(handler=handler, max_depth=10, workers=1)
+        await queue.start()
+        try:
+            await asyncio.wait_for(queue.queue.join(), timeout=5)
+        finally:
+            await queue.stop()
+        
+        assert handled == ["SMPENDING"]
+    
+    @pytest.mark.asyncio
+    async def test_rescan_picks_up_rejected_message(self, session_factory):
+        """Test that a message rejected by a full queue is queued by the re-scan once there is room."""
+        handled = []
+        
+        async def handler(message, uow):
+            handled.append(message.message_sid)
+        
+        queue = IngestQueue(handler=handler, max_depth=1, workers=1)
+        await add_message(session_factory, "SMFIRST", received_at=datetime.utcnow() - timedelta(minutes=2))
+        await add_message(session_factory, "SMLATE", received_at=datetime.utcnow() - timedelta(minutes=1))
+        assert queue.enqueue("SMFIRST")
+        assert not queue.enqueue("SMLATE")
+        
+        assert await queue.enqueue_pending() == 0  # Still full
+        
+        await queue.start()
+        try:
+            await asyncio.wait_for(queue.queue.join(), timeout=5)
+            assert await queue.enqueue_pending(datetime.utcnow()) == 1
+            await asyncio.wait_for(queue.queue.join(), timeout=5)
+        finally:
+            await queue.stop()
+        
+        assert handled == ["SMFIRST", "SMLATE"]
+    
+    @pytest.mark.asyncio
+    async def test_rescan_skips_recent_and_queued_messages(self, session_factory):
+        """Test that the re-scan leaves rows the webhook is still enqueueing and rows already queued."""
+        async def handler(message, uow):
+            pass
+        
+        queue = IngestQueue(handler=handler, max_depth=10, workers=1)
+        await add_message(session_factory, "SMQUEUED", received_at=datetime.utcnow() - timedelta(minutes=2))
+        await add_message(session_factory, "SMORPHAN", received_at=datetime.utcnow() - timedelta(minutes=2))
+        await add_message(session_factory, "SMRECENT")
+        queue.enqueue("SMQUEUED")
+        
+        assert await queue.enqueue_pending(datetime.utcnow() - timedelta(minutes=1)) == 1
+        assert list(queue.queue._queue) == ["SMQUEUED", "SMORPHAN"]
+    
+    def test_enqueue_rejects_when_full(self):
+        """Test that enqueue reports a full queue instead of blocking."""
+        async def handler(message, uow):
+            pass
+        
+        queue = IngestQueue(handler=handler, max_depth=1, workers=1)
+        
+        assert queue.enqueue("SM1") is True
+        assert queue.is_full()
+        assert queue.enqueue("SM2") is False
+        assert queue.stats()["rejected"] == 1
+    
+    @pytest.mark.asyncio
+    async def test_pipeline_commits_once_per_message(self, session_factory, test_engine, sample_parsed_intent):
+        """Test that reminder, history and DONE status are written by a single commit."""
+        commits = []
+        event.listen(test_engine.sync_engine, "commit", lambda conn: commits.append(1))
+        
+        queue = IngestQueue(handler=process_inbound_message, max_depth=10, workers=1)
+        await add_message(session_factory, "SMONE", body="Remind me to pay bills tomorrow at 9am")
+        commits.clear()
+        
+        with patch("app.usecases.message_processor.parse_user_message", new_callable=AsyncMock) as mock_parse, \
+             patch("app.usecases.message_processor.send_whatsapp_message", new_callable=AsyncMock) as mock_send, \
+             patch("app.usecases.reminder_service.wake_dispatcher", new_callable=AsyncMock) as mock_wake:
+            mock_parse.return_value = sample_parsed_intent
+            
+            queue.enqueue("SMONE")
+            await queue.start()
+            try:
+                await asyncio.wait_for(queue.queue.join(), timeout=5)
+            finally:
+                await queue.stop()
+        
+        assert len(commits) == 1
+        mock_wake.assert_called_once()
+        mock_send.assert_called_once()
+        assert await get_status(session_factory, "SMONE") == InboundMessageStatus.DONE
+        async with session_factory() as session:
+            reminders = (await session.execute(select(Reminder))).scalars().all()
+            assert len(reminders) == 1
+            assert reminders[0].next_fire_at is not None
+            assert len((await session.execute(select(ConversationMessage))).scalars().all()) == 1
@@ -0,0 +1,192 @@
+"""
+Tests for lease-based job claiming across scheduler workers.
+"""
+
+import os
+import sqlite3
+import subprocess
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from sqlalchemy import update
+
+from app.domain.job_lease import JobLease
+from app.domain.reminder import Reminder, ReminderStatus
+from app.infrastructure import scheduler
+from app.infrastructure.job_leases import claim_job, complete_job, get_worker_id, purge_completed_leases
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+WORKERS = 4
+REMINDERS = 20
+
+# Run by each worker process: report ready, wait for the test to release every
+# worker at once (a barrier over stdin/stdout), then dispatch everything due.
+# The test has already created the schema, so workers don't migrate concurrently.
+WORKER_SCRIPT = """
+import asyncio, sys
+from unittest.mock import AsyncMock, patch
+
+from app.infrastructure.scheduler import ReminderDispatcher
+
+log_path = sys.argv[1]
+
+
+def record(kind):
+    def send(*args, **kwargs):
+        title = kwargs.get("reminder_title") or args[0]
+        with open(log_path, "a") as log:
+            log.write(f"{kind} {title}\\n")
+        return True
+    return send
+
+
+async def main():
+    dispatcher = ReminderDispatcher(batch_size=5, poll_seconds=30, concurrency=4)
+    print("ready", flush=True)
+    sys.stdin.readline()
+    with patch("app.infrastructure.twilio_whatsapp.send_reminder_notification", AsyncMock(side_effect=record("notify"))), \\
+            patch("app.infrastructure.twilio_calls.make_reminder_call", AsyncMock(side_effect=record("call"))):
+        while await dispatcher.dispatch_due():
+            pass
+
+asyncio.run(main())
+"""
+
+
+class TestClaimJob:
+    """Tests for claiming a single firing."""
+    
+    @pytest.mark.asyncio
+    async def test_second_claim_loses(self, database_session):
+        """Test that a firing can only be claimed once."""
+        assert await claim_job("reminder:r1:t1") is True
+        assert await claim_job("reminder:r1:t1") is False
+    
+    @pytest.mark.asyncio
+    async def test_other_firings_are_independent(self, database_session):
+        """Test that each scheduled time of a reminder is its own claim."""
+        assert await claim_job("reminder:r1:t1") is True
+        assert await claim_job("reminder:r1:t2") is True
+    
+    @pytest.mark.asyncio
+    async def test_expired_lease_is_taken_over(self, database_session, test_session):
+        """Test that a lease whose owner never completed it can be reclaimed."""
+        await test_session.execute(
+            JobLease.__table__.insert().values(
+                job_key="reminder:r1:t1",
+                owner="dead-worker",
+                leased_until=datetime.utcnow() - timedelta(seconds=1)
+            )
+        )
+        await test_session.commit()
+        
+        assert await claim_job("reminder:r1:t1") is True
+        lease = await test_session.get(JobLease, "reminder:r1:t1")
+        await test_session.refresh(lease)
+        assert lease.owner == get_worker_id()
+    
+    @pytest.mark.asyncio
+    async def test_completed_lease_is_never_taken_over(self, database_session, test_session):
+        """Test that a completed firing is not run again after its lease expires."""
+        assert await claim_job("reminder:r1:t1") is True
+        await complete_job("reminder:r1:t1")
+        await test_session.execute(
+            update(JobLease).values(leased_until=datetime.utcnow() - timedelta(seconds=1))
+        )
+        await test_session.commit()
+        
+        assert await claim_job("reminder:r1:t1") is False
+    
+    @pytest.mark.asyncio
+    async def test_purge_keeps_recent_leases(self, database_session, test_session):
+        """Test that only old completed leases are purged."""
+        await claim_job("reminder:old:t1")
+        await complete_job("reminder:old:t1")
+        await claim_job("reminder:new:t1")
+        await complete_job("reminder:new:t1")
+        await claim_job("reminder:running:t1")
+        await test_session.execute(
+            update(JobLease)
+            .where(JobLease.job_key == "reminder:old:t1")
+            .values(completed_at=datetime.utcnow() - timedelta(days=8))
+        )
+        await test_session.commit()
+        
+        assert await purge_completed_leases(days=7) == 1
+    
+    @pytest.mark.asyncio
+    async def test_losing_job_sends_nothing(self, database_session, test_session):
+        """Test that a firing already claimed by another worker is not sent again."""
+        due = datetime(2026, 3, 1, 9, 0)
+        test_session.add(Reminder(
+            id="r1", user_id="+923001234567", title="Pay bills",
+            scheduled_time=datetime(2026, 3, 1, 14, 0), next_fire_at=due, status=ReminderStatus.ACTIVE
+        ))
+        await test_session.commit()
+        await claim_job(f"reminder:r1:{due.isoformat()}")
+        dispatcher = scheduler.ReminderDispatcher(batch_size=10, poll_seconds=30, concurrency=1)
+        
+        with patch("app.infrastructure.twilio_whatsapp.send_reminder_notification", new_callable=AsyncMock) as mock_send:
+            await dispatcher.dispatch_due(due)
+        
+        mock_send.assert_not_called()
+
+
+class TestMultipleWorkers:
+    """Several processes firing the same jobs send each one exactly once."""
+    
+    def _run(self, args, env):
+        return subprocess.run(
+            [sys.executable, *args], cwd=REPO_ROOT, env=env, capture_output=True, text=True, timeout=120
+        )
+    
+    def test_no_duplicate_sends(self, tmp_path):
+        """Test that concurrent workers deliver each reminder and call once."""
+        env = {**os.environ, "DATA_DIR": str(tmp_path)}
+        setup = self._run(
+            ["-c", "import asyncio; from app.infrastructure.database import init_database; asyncio.run(init_database())"],
+            env
+        )
+        assert setup.returncode == 0, setup.stderr
+        
+        user = "+923001234567"
+        with sqlite3.connect(tmp_path / "reminders.db") as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO users (id, whatsapp_number, phone_number, call_opt_out) VALUES (?, ?, ?, 0)",
+                (user, f"whatsapp:{user}", user)
+            )
+            conn.executemany(
+                "INSERT INTO reminders (id, user_id, title, scheduled_time, status, user_responded, "
+                "next_fire_at, follow_up_at) VALUES (?, ?, ?, '2020-01-01 09:00:00', 'ACTIVE', 0, "
+                "'2020-01-01 04:00:00.000000', '2020-01-01 04:10:00.000000')",
+                [(f"r{i}", user, f"Reminder {i}") for i in range(REMINDERS)]
+            )
+        
+        log_path = tmp_path / "sent.log"
+        workers = [
+            subprocess.Popen(
+                [sys.executable, "-c", WORKER_SCRIPT, str(log_path)],
+                cwd=REPO_ROOT, env=env, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                text=True
+            )
+            for _ in range(WORKERS)
+        ]
+        # Barrier: start dispatching only once every worker is up
+        for worker in workers:
+            if worker.stdout.readline().strip() != "ready":
+                worker.wait(timeout=120)
+                pytest.fail(worker.stderr.read())
+        for worker in workers:
+            worker.stdin.write("go\n")
+            worker.stdin.flush()
+        for worker in workers:
+            _, stderr = worker.communicate(timeout=120)
+            assert worker.returncode == 0, stderr
+        
+        sent = log_path.read_text().splitlines()
+        expected = [f"{kind} Reminder {i}" for kind in ("notify", "call") for i in range(REMINDERS)]
+        assert sorted(sent) == sorted(expected)
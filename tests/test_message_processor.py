@@ -0,0 +1,220 @@
+"""
+Unit tests for the inbound message processing pipeline.
+"""
+
+import pytest
+from datetime import datetime
+from unittest.mock import AsyncMock, patch, MagicMock
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.domain.conversation_history import ConversationMessage
+from app.domain.inbound_message import InboundMessage, InboundMessageStatus
+from app.domain.user import User
+from app.infrastructure.database import UnitOfWork
+from app.usecases.message_processor import process_inbound_message
+from app.usecases.reminder_service import ReminderService
+
+
+def make_message(**overrides) -> InboundMessage:
+    """Build an InboundMessage as an ingest worker would see it."""
+    fields = {
+        "message_sid": "SM123456789abcdef",
+        "from_number": "whatsapp:+923001234567",
+        "body": "Remind me to pay bills tomorrow at 9am",
+        "num_media": 0,
+        "status": InboundMessageStatus.PENDING,
+        "received_at": datetime.utcnow(),
+    }
+    fields.update(overrides)
+    return InboundMessage(**fields)
+
+
+async def run_pipeline(message: InboundMessage) -> UnitOfWork:
+    """Run the pipeline in a unit of work over a mock session and commit it."""
+    async with UnitOfWork(MagicMock(return_value=AsyncMock())) as uow:
+        await process_inbound_message(message, uow)
+        await uow.commit()
+    return uow
+
+
+class TestProcessInboundMessage:
+    """Tests for process_inbound_message."""
+    
+    @pytest.fixture
+    def mock_pipeline(self, sample_parsed_intent):
+        """Patch out the external services used by the pipeline."""
+        with patch("app.usecases.message_processor.parse_user_message", new_callable=AsyncMock) as mock_parse, \
+             patch("app.usecases.message_processor.send_whatsapp_message", new_callable=AsyncMock) as mock_send, \
+             patch("app.usecases.message_processor.send_error_message", new_callable=AsyncMock) as mock_error, \
+             patch("app.usecases.message_processor.load_prompt_history", new_callable=AsyncMock) as mock_history, \
+             patch("app.usecases.message_processor.refresh_summary", new_callable=AsyncMock) as mock_summary, \
+             patch("app.usecases.message_processor.save_conversation", new_callable=AsyncMock) as mock_save, \
+             patch("app.usecases.message_processor.get_or_create_user", new_callable=AsyncMock) as mock_user, \
+             patch("app.usecases.message_processor.ReminderService") as mock_service:
+            mock_parse.return_value = sample_parsed_intent
+            mock_user.side_effect = lambda session, number: User(id=number.replace("whatsapp:", ""))
+            mock_history.return_value = ([], False)
+            service_instance = MagicMock()
+            service_instance.handle_intent = AsyncMock(return_value="Reminder created!")
+            mock_service.return_value = service_instance
+            
+            yield {
+                "parse": mock_parse,
+                "send": mock_send,
+                "error": mock_error,
+                "save": mock_save,
+                "history": mock_history,
+                "user": mock_user,
+                "summary": mock_summary,
+                "service": service_instance,
+                "service_class": mock_service,
+            }
+    
+    @pytest.mark.asyncio
+    async def test_processes_text_message(self, mock_pipeline):
+        """Test that a text message is parsed, handled and answered."""
+        await run_pipeline(make_message())
+        
+        mock_pipeline["parse"].assert_called_once()
+        assert mock_pipeline["parse"].call_args.kwargs["message"] == "Remind me to pay bills tomorrow at 9am"
+        mock_pipeline["service"].handle_intent.assert_called_once()
+        mock_pipeline["save"].assert_called_once()
+        mock_pipeline["send"].assert_called_once_with("Reminder created!", to_number="whatsapp:+923001234567")
+    
+    @pytest.mark.asyncio
+    async def test_reply_is_sent_after_commit(self, mock_pipeline):
+        """Test that the reply waits for the unit of work to commit."""
+        async with UnitOfWork(MagicMock(return_value=AsyncMock())) as uow:
+            await process_inbound_message(make_message(), uow)
+            mock_pipeline["send"].assert_not_called()
+            uow.session.commit.assert_not_called()
+            
+            await uow.commit()
+        
+        mock_pipeline["send"].assert_called_once_with("Reminder created!", to_number="whatsapp:+923001234567")
+        assert mock_pipeline["save"].call_args.kwargs["commit"] is False
+    
+    @pytest.mark.asyncio
+    async def test_summary_is_refreshed_after_commit(self, mock_pipeline):
+        """Test that aged-out exchanges are summarized only once the message is committed."""
+        mock_pipeline["history"].return_value = ([], True)
+        
+        async with UnitOfWork(MagicMock(return_value=AsyncMock())) as uow:
+            await process_inbound_message(make_message(), uow)
+            mock_pipeline["summary"].assert_not_called()
+            
+            await uow.commit()
+        
+        mock_pipeline["summary"].assert_called_once_with("+923001234567")
+    
+    @pytest.mark.asyncio
+    async def test_summary_is_left_alone_until_needed(self, mock_pipeline):
+        """Test that no summary refresh runs while the history fits the window."""
+        await run_pipeline(make_message())
+        
+        mock_pipeline["summary"].assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_nothing_is_written_before_the_parse(self, mock_pipeline, sample_parsed_intent):
+        """Test that the writer session is first used after GPT has answered."""
+        async with UnitOfWork(MagicMock(return_value=AsyncMock())) as uow:
+            async def parse(**kwargs):
+                uow.session.execute.assert_not_called()
+                uow.session.flush.assert_not_called()
+                mock_pipeline["user"].assert_not_called()
+                return sample_parsed_intent
+            
+            mock_pipeline["parse"].side_effect = parse
+            await process_inbound_message(make_message(), uow)
+            await uow.commit()
+        
+        mock_pipeline["parse"].assert_called_once()
+        mock_pipeline["user"].assert_called_once()
+    
+    @pytest.mark.asyncio
+    async def test_skips_empty_message(self, mock_pipeline):
+        """Test that empty messages are skipped."""
+        await run_pipeline(make_message(body=""))
+        
+        mock_pipeline["parse"].assert_not_called()
+        mock_pipeline["send"].assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_processes_audio_message(self, mock_pipeline):
+        """Test that audio messages are transcribed before parsing."""
+        message = make_message(
+            body="",
+            num_media=1,
+            media_url="https://api.twilio.com/media/123",
+            media_content_type="audio/ogg"
+        )
+        
+        with patch("app.usecases.message_processor.download_and_transcribe_audio", new_callable=AsyncMock) as mock_transcribe:
+            mock_transcribe.return_value = "Remind me to call mom"
+            await run_pipeline(message)
+        
+        mock_transcribe.assert_called_once()
+        assert mock_pipeline["parse"].call_args.kwargs["message"] == "Remind me to call mom"
+    
+    @pytest.mark.asyncio
+    async def test_handles_failed_transcription(self, mock_pipeline):
+        """Test that transcription failure is reported to the user."""
+        message = make_message(
+            body="",
+            num_media=1,
+            media_url="https://api.twilio.com/media/123",
+            media_content_type="audio/ogg"
+        )
+        
+        with patch("app.usecases.message_processor.download_and_transcribe_audio", new_callable=AsyncMock) as mock_transcribe:
+            mock_transcribe.return_value = None
+            await run_pipeline(message)
+        
+        mock_pipeline["error"].assert_called_once()
+        mock_pipeline["parse"].assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_reports_unexpected_errors(self, mock_pipeline):
+        """Test that pipeline errors are sent to the user instead of raised."""
+        mock_pipeline["service"].handle_intent.side_effect = RuntimeError("boom")
+        
+        uow = await run_pipeline(make_message())
+        
+        mock_pipeline["error"].assert_called_once_with("boom", to_number="whatsapp:+923001234567")
+        mock_pipeline["send"].assert_not_called()
+        uow.session.rollback.assert_called()
+    
+    @pytest.mark.asyncio
+    async def test_each_sender_is_a_separate_user(self, mock_pipeline):
+        """Test that the service, history and reply are scoped to the sender."""
+        await run_pipeline(make_message(from_number="whatsapp:+447700900123"))
+        
+        assert mock_pipeline["service_class"].call_args.kwargs["user_id"] == "+447700900123"
+        assert mock_pipeline["save"].call_args.kwargs["user_id"] == "+447700900123"
+        mock_pipeline["send"].assert_called_once_with("Reminder created!", to_number="whatsapp:+447700900123")
+
+
+class TestHandlerFailure:
+    """A failing intent handler rolls back the unit of work mid-pipeline."""
+    
+    @pytest.mark.asyncio
+    async def test_service_error_reply_is_sent(self, test_engine, sample_parsed_intent):
+        """Test that the sender gets the service's error reply and the exchange is still saved."""
+        factory = async_sessionmaker(test_engine, class_=AsyncSession, expire_on_commit=False)
+        
+        with patch("app.usecases.message_processor.parse_user_message", new_callable=AsyncMock) as mock_parse, \
+             patch("app.usecases.message_processor.send_whatsapp_message", new_callable=AsyncMock) as mock_send, \
+             patch("app.usecases.message_processor.send_error_message", new_callable=AsyncMock) as mock_error, \
+             patch.object(ReminderService, "_handle_create", side_effect=RuntimeError("boom")):
+            mock_parse.return_value = sample_parsed_intent
+            async with UnitOfWork(factory) as uow:
+                await process_inbound_message(make_message(), uow)
+                await uow.commit()
+        
+        mock_error.assert_not_called()
+        mock_send.assert_called_once_with("Sorry, I encountered an error: boom", to_number="whatsapp:+923001234567")
+        async with factory() as session:
+            saved = (await session.execute(select(ConversationMessage))).scalars().all()
+            assert [message.user_id for message in saved] == ["+923001234567"]
@@ -0,0 +1,133 @@
+"""
+Tests for the Prometheus metrics registry and the /metrics endpoint.
+"""
+
+import asyncio
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from app.ai.fast_path import record_route
+from app.infrastructure.metrics import (
+    Counter,
+    Histogram,
+    ERRORS_TOTAL,
+    INTENTS_TOTAL,
+    OUTBOUND_QUEUE_DEPTH,
+    STAGE_SECONDS,
+    error_type,
+    observe_stage,
+    reset_metrics,
+)
+from app.infrastructure.twilio_http import TwilioApiError
+from app.infrastructure.twilio_rate_limit import OutboundRateLimiter, SendPriority
+from app.main import app
+
+
+@pytest.fixture(autouse=True)
+def clean_metrics():
+    """Start each test from zeroed metrics."""
+    reset_metrics()
+    yield
+    reset_metrics()
+
+
+class TestRegistry:
+    """Tests for counters and histograms."""
+    
+    def test_histogram_buckets_are_cumulative(self):
+        """Test that rendered buckets count every observation at or below their bound."""
+        histogram = Histogram("test_seconds", "Test.", buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(value)
+        
+        lines = histogram.render()
+        
+        assert 'test_seconds_bucket{le="0.1"} 2' in lines
+        assert 'test_seconds_bucket{le="1"} 3' in lines
+        assert 'test_seconds_bucket{le="+Inf"} 4' in lines
+        assert "test_seconds_count 4" in lines
+        assert "test_seconds_sum 3.65" in lines
+    
+    def test_label_sets_are_pre_registered(self):
+        """Test that every label combination renders before any observation."""
+        counter = Counter("test_total", "Test.", labels={"route": ("local", "llm"), "intent": ("list_reminders",)})
+        
+        lines = counter.render()
+        
+        # Two routes and one intent, each plus "other"
+        assert len(lines) == 6
+        assert 'test_total{route="local",intent="list_reminders"} 0' in lines
+    
+    def test_unknown_label_values_go_to_other(self):
+        """Test that unregistered label values cannot add series."""
+        counter = Counter("test_total", "Test.", labels={"intent": ("list_reminders",)})
+        
+        counter.inc("made_up_intent")
+        counter.inc("another_one")
+        
+        assert counter.value("other") == 2
+        assert len(counter.render()) == 2
+    
+    def test_error_types(self):
+        """Test that exceptions are classified by the library they come from."""
+        request = httpx.Request("POST", "https://api.twilio.com")
+        
+        assert error_type(asyncio.TimeoutError()) == "timeout"
+        assert error_type(httpx.ReadTimeout("slow", request=request)) == "timeout"
+        assert error_type(httpx.ConnectError("refused", request=request)) == "http"
+        assert error_type(TwilioApiError(status=400, message="Invalid To")) == "twilio"
+        assert error_type(ValueError("bad")) == "other"
+
+
+class TestPipelineMetrics:
+    """Tests for the metrics recorded by the pipeline."""
+    
+    def test_stages_feed_histogram(self):
+        """Test that observed stages land in the stage histogram."""
+        observe_stage("dedupe", 0.002)
+        observe_stage("gpt", 0.8)
+        
+        assert STAGE_SECONDS.count("dedupe") == 1
+        assert STAGE_SECONDS.count("gpt") == 1
+    
+    def test_routes_count_intents(self):
+        """Test that classified messages are counted per route and intent."""
+        record_route("local", "list_reminders", 0.001)
+        record_route("llm", "create_reminder", 0.9)
+        
+        assert INTENTS_TOTAL.value("local", "list_reminders") == 1
+        assert INTENTS_TOTAL.value("llm", "create_reminder") == 1
+    
+    @pytest.mark.asyncio
+    async def test_send_observes_queue_depth(self):
+        """Test that each send records how many sends were queued ahead of it."""
+        limiter = OutboundRateLimiter(rate=1000, burst=1)
+        
+        await limiter.acquire(SendPriority.REMINDER)
+        await asyncio.gather(limiter.acquire(SendPriority.CHAT), limiter.acquire(SendPriority.CHAT))
+        
+        assert OUTBOUND_QUEUE_DEPTH.count("reminder") == 1
+        assert OUTBOUND_QUEUE_DEPTH.count("chat") == 2
+
+
+class TestMetricsEndpoint:
+    """Tests for GET /metrics."""
+    
+    def test_exposition_format(self):
+        """Test that /metrics serves every metric in the Prometheus text format."""
+        observe_stage("whisper", 1.2)
+        ERRORS_TOTAL.inc("whisper", "openai")
+        
+        response = TestClient(app).get("/metrics")
+        
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        body = response.text
+        assert "# TYPE pipeline_stage_seconds histogram" in body
+        assert 'pipeline_stage_seconds_bucket{stage="whisper",le="2.5"} 1' in body
+        assert 'errors_total{stage="whisper",type="openai"} 1' in body
+        assert "# TYPE reminder_fire_lateness_seconds histogram" in body
+        assert "# TYPE ingest_queue_depth gauge" in body
+        assert 'twilio_outbound_queued{priority="reminder"} 0' in body
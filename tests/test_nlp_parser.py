@@ -115,6 +115,47 @@ class TestParseUserMessage:
             assert result.call_if_no_response is True
             assert result.follow_up_minutes == 10
     
+    @pytest.mark.asyncio
+    async def test_parse_recurring_reminder(self):
+        """Test that a repeat phrase in the message becomes a recurrence rule."""
+        mock_response = {
+            "intent": "create_reminder",
+            "title": "Gym",
+            "scheduled_time": (datetime.utcnow() + timedelta(days=1)).isoformat(),
+            "recurrence": None,
+            "response_message": "Done"
+        }
+        
+        with patch("app.ai.nlp_parser._call_openai_chat", new_callable=AsyncMock) as mock_call:
+            mock_call.return_value = json.dumps(mock_response)
+            
+            result = await parse_user_message("Remind me every Monday and Thursday at 6pm to go to the gym")
+        
+        assert result.recurrence.to_rule() == "weekly:0,3"
+        assert result.scheduled_time.hour == 18
+    
+    @pytest.mark.asyncio
+    async def test_parse_recurrence_from_gpt(self):
+        """Test that GPT's recurrence is used when the local rules find none, and invalid ones are dropped."""
+        mock_response = {
+            "intent": "create_reminder",
+            "title": "Water plants",
+            "scheduled_time": (datetime.utcnow() + timedelta(days=1)).isoformat(),
+            "recurrence": {"frequency": "weekly", "weekdays": [5]},
+            "response_message": "Done"
+        }
+        
+        with patch("app.ai.nlp_parser._call_openai_chat", new_callable=AsyncMock) as mock_call:
+            mock_call.return_value = json.dumps(mock_response)
+            result = await parse_user_message("Water the plants on Saturday, and keep reminding me after that")
+            
+            mock_response["recurrence"] = {"frequency": "fortnightly"}
+            mock_call.return_value = json.dumps(mock_response)
+            invalid = await parse_user_message("Water the plants on Saturday, and keep reminding me")
+        
+        assert result.recurrence.to_rule() == "weekly:5"
+        assert invalid.recurrence is None
+    
     @pytest.mark.asyncio
     async def test_parse_invalid_json_response(self):
         """Test handling of invalid JSON response from OpenAI."""
@@ -0,0 +1,176 @@
+"""
+Query-plan regression tests for ReminderService at 1M rows.
+
+The database is built the way an existing deployment looks: reminders are
+bulk-loaded into a table without the query indexes, then the migrations are
+applied. Each service path is run for real, every statement it sends to
+SQLite is captured, and its EXPLAIN QUERY PLAN must not contain a full scan
+of the reminders table.
+"""
+
+import re
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.domain.reminder import Base, ParsedIntent, Reminder
+from app.infrastructure.database import UnitOfWork
+from app.infrastructure.migrations import apply_migrations
+from app.infrastructure.scheduler import ReminderDispatcher
+from app.usecases.reminder_service import ReminderService
+
+ROW_COUNT = 1_000_000
+USER_COUNT = 1_000
+USER_ID = "+923000000042"
+
+# Reminders are spread over USER_COUNT users. One in a thousand is active and
+# one is paused; the rest are completed.
+SEED_SQL = f"""
+INSERT INTO reminders (
+    id, user_id, title, description, scheduled_time, follow_up_minutes, call_if_no_response,
+    call_opt_out, status, created_at, updated_at, last_notified_at, user_responded
+)
+WITH RECURSIVE seq(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < {ROW_COUNT})
+SELECT
+    printf('r-%07d', n),
+    printf('+92300%07d', (n / 7) % {USER_COUNT}),
+    'Reminder ' || (n % 5000),
+    NULL,
+    datetime('2026-01-01', '+' || (n % 525600) || ' minutes'),
+    NULL,
+    0,
+    1,
+    CASE n % 1000 WHEN 0 THEN 'ACTIVE' WHEN 1 THEN 'PAUSED' ELSE 'COMPLETED' END,
+    datetime('2025-01-01', '+' || (n % 525600) || ' minutes'),
+    datetime('2025-01-01', '+' || (n % 525600) || ' minutes'),
+    CASE WHEN n % 3 = 0 THEN datetime('2025-06-01', '+' || (n % 100000) || ' minutes') END,
+    n % 2
+FROM seq
+"""
+
+FULL_SCAN_RE = re.compile(r"^SCAN reminders\b")
+
+
+@pytest.fixture(scope="module")
+def large_database(tmp_path_factory):
+    """A reminders.db with 1M rows that received its indexes via migration."""
+    path = tmp_path_factory.mktemp("plans") / "reminders.db"
+    engine = create_engine(f"sqlite:///{path}")
+    
+    with engine.begin() as conn:
+        Base.metadata.create_all(conn)
+        # Simulate a database created before the indexes existed
+        for index in ("ix_reminders_user_status_scheduled_time",
+                      "ix_reminders_user_status_responded_notified",
+                      "ix_reminders_user_status_title_scheduled_time",
+                      "ix_reminders_next_fire_at",
+                      "ix_reminders_follow_up_at"):
+            conn.execute(text(f"DROP INDEX {index}"))
+        conn.execute(text(SEED_SQL))
+    
+    with engine.begin() as conn:
+        assert apply_migrations(conn) == [1, 2, 3, 4, 5]
+    
+    engine.dispose()
+    return path
+
+
+@pytest_asyncio.fixture
+async def plan_engine(large_database):
+    """Async engine on the large database plus the statements it executed."""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{large_database}")
+    captured = []
+    
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if "reminders" in statement and not statement.startswith("EXPLAIN"):
+            # Plan an executemany batch using its first parameter set
+            captured.append((statement, parameters[0] if executemany else parameters))
+    
+    yield SimpleNamespace(engine=engine, captured=captured)
+    await engine.dispose()
+
+
+async def run_service(engine, method: str, *args):
+    """Run a ReminderService method in a unit of work that is rolled back."""
+    factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    with patch("app.usecases.reminder_service.wake_dispatcher", new_callable=AsyncMock):
+        async with UnitOfWork(factory) as uow:
+            service = ReminderService(uow.session, uow, user_id=USER_ID)
+            await getattr(service, method)(*args)
+            await uow.rollback()
+
+
+async def full_scans(plan) -> list:
+    """EXPLAIN every captured statement and return plans that scan reminders."""
+    offenders = []
+    async with plan.engine.connect() as conn:
+        for statement, parameters in plan.captured:
+            rows = (await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)).all()
+            details = [row[-1] for row in rows]
+            if any(FULL_SCAN_RE.match(detail) for detail in details):
+                offenders.append((statement, details))
+    return offenders
+
+
+class TestReminderQueryPlans:
+    """No ReminderService path may full-scan reminders at 1M rows."""
+    
+    @pytest.mark.parametrize("method,args", [
+        ("_handle_list", (ParsedIntent(intent="list_reminders"),)),
+        ("_handle_acknowledge", (ParsedIntent(intent="acknowledge"),)),
+        ("_handle_batch_delete", (ParsedIntent(intent="delete_reminders", target_indices=[1, 2]),)),
+        ("_handle_snooze", (ParsedIntent(intent="snooze_reminder", target_indices=[3]),)),
+        ("_handle_snooze", (ParsedIntent(intent="snooze_reminder"),)),
+        ("_handle_opt_out", (ParsedIntent(intent="opt_out_calls"),)),
+        ("_find_similar_reminder", ("Reminder 1000", datetime(2026, 1, 1, 16, 40))),
+        ("_find_reminder_by_keyword", ("Reminder 1000",)),
+        ("_find_reminder_by_keyword", ("Remindr 4242",)),
+    ])
+    @pytest.mark.asyncio
+    async def test_no_full_table_scan(self, plan_engine, method, args):
+        """Test that the statements issued by a service path are index-driven."""
+        await run_service(plan_engine.engine, method, *args)
+        
+        assert plan_engine.captured, f"{method} issued no reminders queries"
+        assert await full_scans(plan_engine) == []
+    
+    @pytest.mark.asyncio
+    async def test_duplicate_check_uses_title_index(self, plan_engine):
+        """Test that the create-time duplicate check seeks on the lower(title) index."""
+        await run_service(plan_engine.engine, "_find_similar_reminder", "Reminder 1000", datetime(2026, 1, 1, 16, 40))
+        
+        statement, parameters = plan_engine.captured[0]
+        async with plan_engine.engine.connect() as conn:
+            rows = (await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)).all()
+        
+        assert "ix_reminders_user_status_title_scheduled_time" in rows[0][-1]
+    
+    @pytest.mark.asyncio
+    async def test_migrations_are_recorded_once(self, plan_engine):
+        """Test that re-running migrations on a migrated database is a no-op."""
+        async with plan_engine.engine.begin() as conn:
+            assert await conn.run_sync(apply_migrations) == []
+
+
+class TestDispatcherQueryPlans:
+    """The dispatcher reads due rows through the schedule indexes."""
+    
+    @pytest.mark.asyncio
+    async def test_due_queries_use_indexes(self, plan_engine):
+        """Test that finding due and next-due rows never scans reminders."""
+        factory = async_sessionmaker(plan_engine.engine, class_=AsyncSession, expire_on_commit=False)
+        dispatcher = ReminderDispatcher(batch_size=100, poll_seconds=30, concurrency=10)
+        
+        with patch("app.infrastructure.database.DatabaseSession", factory):
+            await dispatcher._due(Reminder.next_fire_at, datetime(2026, 6, 1))
+            await dispatcher._due(Reminder.follow_up_at, datetime(2026, 6, 1))
+            await dispatcher._seconds_until_next_due()
+        
+        assert len(plan_engine.captured) == 4
+        assert await full_scans(plan_engine) == []
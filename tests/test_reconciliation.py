@@ -0,0 +1,246 @@
+"""
+Tests for the startup reconciliation of the reminder schedule.
+"""
+
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+
+from app.domain.reminder import Reminder, ReminderStatus
+from app.infrastructure import reconciliation, scheduler
+from app.infrastructure.reconciliation import reconcile_schedule
+
+USER_ID = "+923001234567"
+
+# 09:00 UTC is 14:00 PKT
+NOW = datetime(2026, 3, 1, 9, 0)
+NOW_PKT = datetime(2026, 3, 1, 14, 0)
+
+
+def make_reminder(reminder_id: str, **overrides) -> Reminder:
+    fields = {
+        "id": reminder_id,
+        "user_id": USER_ID,
+        "title": f"Reminder {reminder_id}",
+        "scheduled_time": NOW_PKT + timedelta(hours=1),
+        "status": ReminderStatus.ACTIVE,
+        "call_opt_out": True,
+    }
+    fields.update(overrides)
+    return Reminder(**fields)
+
+
+@pytest.fixture
+def catch_up():
+    """Set the catch-up policy settings for a test."""
+    patchers = []
+    
+    def configure(**values):
+        for name, value in values.items():
+            patcher = patch.object(reconciliation.settings, name, value)
+            patcher.start()
+            patchers.append(patcher)
+    
+    configure(
+        scheduler_catch_up_policy="fire",
+        scheduler_catch_up_rate=5.0,
+        scheduler_catch_up_max_age_seconds=6 * 3600,
+        scheduler_catch_up_grace_seconds=60,
+    )
+    yield configure
+    for patcher in reversed(patchers):
+        patcher.stop()
+
+
+async def reconcile(test_session):
+    """Reconcile without the lease; rows read afterwards are reloaded."""
+    stats = await reconcile_schedule(now=NOW, claim=False)
+    test_session.expire_all()
+    return stats
+
+
+class TestDiff:
+    """Rows are compared with the due times they should have."""
+    
+    @pytest.mark.asyncio
+    async def test_lost_due_time_is_restored(self, database_session, test_session, catch_up):
+        """Test that an active, unsent reminder without a due time is scheduled again."""
+        test_session.add(make_reminder("r1"))
+        await test_session.commit()
+        
+        stats = await reconcile(test_session)
+        
+        reminder = await test_session.get(Reminder, "r1")
+        assert reminder.next_fire_at == NOW + timedelta(hours=1)
+        assert stats.restored == 1
+    
+    @pytest.mark.asyncio
+    async def test_sent_reminder_is_not_rescheduled(self, database_session, test_session, catch_up):
+        """Test that a one-off reminder already notified keeps no due time."""
+        test_session.add(make_reminder(
+            "r1", scheduled_time=NOW_PKT - timedelta(minutes=5), last_notified_at=NOW - timedelta(minutes=5)
+        ))
+        await test_session.commit()
+        
+        stats = await reconcile(test_session)
+        
+        reminder = await test_session.get(Reminder, "r1")
+        assert reminder.next_fire_at is None
+        assert stats.restored == stats.caught_up == stats.skipped == 0
+    
+    @pytest.mark.asyncio
+    async def test_inactive_reminders_lose_their_due_times(self, database_session, test_session, catch_up):
+        """Test that paused and completed reminders are left with nothing scheduled."""
+        test_session.add_all([
+            make_reminder("paused", status=ReminderStatus.PAUSED, next_fire_at=NOW + timedelta(hours=1)),
+            make_reminder("done", status=ReminderStatus.COMPLETED, follow_up_at=NOW + timedelta(minutes=5)),
+        ])
+        await test_session.commit()
+        
+        stats = await reconcile(test_session)
+        
+        for reminder_id in ("paused", "done"):
+            reminder = await test_session.get(Reminder, reminder_id)
+            assert reminder.next_fire_at is None
+            assert reminder.follow_up_at is None
+        assert stats.cleared == 2
+    
+    @pytest.mark.asyncio
+    async def test_second_pass_changes_nothing(self, database_session, test_session, catch_up):
+        """Test that reconciling a reconciled schedule is a no-op."""
+        test_session.add_all([
+            make_reminder("lost"),
+            make_reminder("missed", next_fire_at=NOW - timedelta(hours=1)),
+            make_reminder("paused", status=ReminderStatus.PAUSED, next_fire_at=NOW),
+        ])
+        await test_session.commit()
+        await reconcile(test_session)
+        
+        stats = await reconcile(test_session)
+        
+        # Both active rows now have future due times and are not even read
+        assert stats.scanned == 0
+        assert (stats.cleared, stats.restored, stats.caught_up, stats.skipped) == (0, 0, 0, 0)
+    
+    @pytest.mark.asyncio
+    async def test_reads_active_reminders_in_pages(self, database_session, test_session, catch_up):
+        """Test that every active reminder is reached through keyset pages."""
+        test_session.add_all([make_reminder(f"r{i}") for i in range(5)])
+        test_session.add(make_reminder("x-paused", status=ReminderStatus.PAUSED))
+        await test_session.commit()
+        
+        with patch.object(reconciliation.settings, "scheduler_reconcile_page_size", 2):
+            stats = await reconcile(test_session)
+        
+        assert (stats.scanned, stats.pages, stats.restored) == (5, 3, 5)
+    
+    @pytest.mark.asyncio
+    async def test_only_one_worker_reconciles(self, database_session, test_session, catch_up):
+        """Test that a worker starting while the lease is held skips reconciliation."""
+        assert await reconcile_schedule(now=NOW) is not None
+        assert await reconcile_schedule(now=NOW) is None
+
+
+class TestCatchUp:
+    """Notifications missed while no worker was running."""
+    
+    @pytest.mark.asyncio
+    async def test_missed_reminders_are_spaced_out(self, database_session, test_session, catch_up):
+        """Test that the "fire" policy sends missed reminders at the catch-up rate from now."""
+        test_session.add_all([
+            make_reminder(f"r{i}", next_fire_at=NOW - timedelta(minutes=30 + i)) for i in range(3)
+        ])
+        await test_session.commit()
+        
+        stats = await reconcile(test_session)
+        
+        due = sorted([(await test_session.get(Reminder, f"r{i}")).next_fire_at for i in range(3)])
+        assert due == [NOW, NOW + timedelta(seconds=0.2), NOW + timedelta(seconds=0.4)]
+        assert stats.caught_up == 3
+    
+    @pytest.mark.asyncio
+    async def test_recently_due_reminders_are_untouched(self, database_session, test_session, catch_up):
+        """Test that rows overdue by less than the grace period are sent as usual."""
+        due = NOW - timedelta(seconds=10)
+        test_session.add(make_reminder("r1", next_fire_at=due))
+        await test_session.commit()
+        
+        await reconcile(test_session)
+        
+        assert (await test_session.get(Reminder, "r1")).next_fire_at == due
+    
+    @pytest.mark.asyncio
+    async def test_skip_policy_drops_missed_reminders(self, database_session, test_session, catch_up):
+        """Test that "skip" clears a missed one-off and moves a recurring reminder on."""
+        catch_up(scheduler_catch_up_policy="skip")
+        test_session.add_all([
+            make_reminder("once", scheduled_time=NOW_PKT - timedelta(hours=1), next_fire_at=NOW - timedelta(hours=1)),
+            make_reminder(
+                "daily", scheduled_time=NOW_PKT - timedelta(hours=1), recurrence="daily",
+                next_fire_at=NOW - timedelta(hours=1)
+            ),
+        ])
+        await test_session.commit()
+        
+        stats = await reconcile(test_session)
+        
+        assert (await test_session.get(Reminder, "once")).next_fire_at is None
+        daily = await test_session.get(Reminder, "daily")
+        assert daily.scheduled_time == NOW_PKT + timedelta(hours=23)
+        assert daily.next_fire_at == NOW + timedelta(hours=23)
+        assert stats.skipped == 2
+    
+    @pytest.mark.asyncio
+    async def test_old_misses_are_skipped_when_firing(self, database_session, test_session, catch_up):
+        """Test that reminders missed by more than the maximum age are not sent late."""
+        test_session.add_all([
+            make_reminder("stale", next_fire_at=NOW - timedelta(hours=7)),
+            make_reminder("recent", next_fire_at=NOW - timedelta(hours=5)),
+        ])
+        await test_session.commit()
+        
+        stats = await reconcile(test_session)
+        
+        assert (await test_session.get(Reminder, "stale")).next_fire_at is None
+        assert (await test_session.get(Reminder, "recent")).next_fire_at == NOW
+        assert (stats.caught_up, stats.skipped) == (1, 1)
+    
+    @pytest.mark.asyncio
+    async def test_late_follow_up_calls_are_dropped(self, database_session, test_session, catch_up):
+        """Test that a follow-up call missed by more than the maximum age is not placed."""
+        test_session.add_all([
+            make_reminder("stale", follow_up_at=NOW - timedelta(hours=7)),
+            make_reminder("recent", follow_up_at=NOW - timedelta(minutes=5)),
+        ])
+        await test_session.commit()
+        
+        stats = await reconcile(test_session)
+        
+        assert (await test_session.get(Reminder, "stale")).follow_up_at is None
+        assert (await test_session.get(Reminder, "recent")).follow_up_at == NOW - timedelta(minutes=5)
+        assert stats.follow_ups_dropped == 1
+    
+    def test_unknown_policy_is_rejected(self):
+        """Test that a misspelt policy fails instead of silently firing everything."""
+        with pytest.raises(ValueError):
+            reconciliation.CatchUpPlan(NOW, "replay", rate=1.0, max_age_seconds=60, grace_seconds=0)
+
+
+class TestStartup:
+    """The dispatcher starts after the schedule is reconciled."""
+    
+    @pytest.mark.asyncio
+    async def test_start_scheduler_reconciles_first(self, database_session, test_session, catch_up):
+        """Test that startup repairs the rows and reports it in the dispatcher status."""
+        test_session.add(make_reminder("r1", scheduled_time=datetime.utcnow() + timedelta(days=1)))
+        await test_session.commit()
+        dispatcher = scheduler.ReminderDispatcher(batch_size=100, poll_seconds=30, concurrency=10)
+        
+        with patch("app.infrastructure.scheduler.get_scheduler", return_value=dispatcher):
+            await scheduler.start_scheduler()
+        try:
+            assert dispatcher.running
+            assert (await dispatcher.status())["reconciliation"]["restored"] == 1
+        finally:
+            await dispatcher.stop()
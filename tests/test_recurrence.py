@@ -0,0 +1,289 @@
+"""
+Tests for recurring reminders: rules, parsing and firing.
+"""
+
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from sqlalchemy import func, select
+
+from app.domain.job_lease import JobLease
+from app.domain.recurrence import Recurrence, RecurrenceFrequency
+from app.domain.reminder import ParsedIntent, Reminder, ReminderStatus
+from app.infrastructure.job_leases import purge_completed_leases
+from app.infrastructure.scheduler import ReminderDispatcher
+from app.usecases.reminder_service import ReminderService
+from app.utils.time import parse_recurrence
+
+USER_ID = "+923001234567"
+
+
+def rule(text: str) -> Recurrence:
+    return Recurrence.from_rule(text)
+
+
+class TestNextOccurrence:
+    """Tests for computing the next occurrence of a rule."""
+    
+    def test_daily_keeps_time_of_day(self):
+        """Test that a daily rule fires at the same time the next day."""
+        anchor = datetime(2026, 3, 2, 9, 0)
+        
+        assert rule("daily").next_occurrence(anchor, anchor) == datetime(2026, 3, 3, 9, 0)
+    
+    def test_weekdays_skip_weekend(self):
+        """Test that a weekday rule fired on Friday next fires on Monday."""
+        friday = datetime(2026, 3, 6, 9, 0)
+        
+        assert rule("weekdays").next_occurrence(friday, friday) == datetime(2026, 3, 9, 9, 0)
+    
+    def test_weekly_on_several_days(self):
+        """Test that a weekly rule steps through its days in order."""
+        monday = datetime(2026, 3, 2, 18, 0)
+        gym = rule("weekly:0,3")
+        
+        thursday = gym.next_occurrence(monday, monday)
+        assert thursday == datetime(2026, 3, 5, 18, 0)
+        assert gym.next_occurrence(thursday, thursday) == datetime(2026, 3, 9, 18, 0)
+    
+    def test_monthly_clamps_to_month_end(self):
+        """Test that day 31 falls on the last day of short months and returns after."""
+        rent = rule("monthly:31")
+        
+        february = rent.next_occurrence(datetime(2026, 1, 31, 9, 0), datetime(2026, 1, 31, 9, 0))
+        assert february == datetime(2026, 2, 28, 9, 0)
+        assert rent.next_occurrence(february, february) == datetime(2026, 3, 31, 9, 0)
+    
+    def test_hourly_steps_from_anchor(self):
+        """Test that an hourly rule keeps its phase."""
+        anchor = datetime(2026, 3, 2, 8, 15)
+        
+        assert rule("hourly:3").next_occurrence(anchor, anchor) == datetime(2026, 3, 2, 11, 15)
+    
+    def test_missed_occurrences_are_skipped_directly(self):
+        """Test that after long downtime the next occurrence is after now, not the next missed one."""
+        anchor = datetime(2020, 1, 1, 8, 0)
+        now = datetime(2026, 3, 2, 12, 30)
+        
+        assert rule("hourly:1").next_occurrence(anchor, now) == datetime(2026, 3, 2, 13, 0)
+        assert rule("daily").next_occurrence(anchor, now) == datetime(2026, 3, 3, 8, 0)
+        assert rule("weekly:2").next_occurrence(anchor, now) == datetime(2026, 3, 4, 8, 0)
+    
+    def test_future_anchor_on_rule_day_is_first_occurrence(self):
+        """Test that a future occurrence the rule allows is kept."""
+        anchor = datetime(2026, 3, 5, 18, 0)
+        
+        assert rule("weekly:0,3").next_occurrence(anchor, datetime(2026, 3, 2, 12, 0)) == anchor
+    
+    def test_rule_round_trip(self):
+        """Test that rules survive the database encoding."""
+        for text in ("daily", "weekdays", "weekly:0,3", "monthly:15", "hourly:8"):
+            assert rule(text).to_rule() == text
+    
+    def test_anchored_fills_rule_day(self):
+        """Test that weekly and monthly rules without days repeat on the first occurrence's day."""
+        first = datetime(2026, 3, 5, 9, 0)
+        
+        assert Recurrence(frequency=RecurrenceFrequency.WEEKLY).anchored(first).to_rule() == "weekly:3"
+        assert Recurrence(frequency=RecurrenceFrequency.MONTHLY).anchored(first).to_rule() == "monthly:5"
+    
+    
+    def test_weekdays_are_validated(self):
+        """Test that out-of-range days and weekly rules without days are rejected."""
+        with pytest.raises(ValueError):
+            Recurrence(frequency=RecurrenceFrequency.WEEKLY, weekdays=[7])
+        with pytest.raises(ValueError):
+            Recurrence(frequency=RecurrenceFrequency.WEEKLY, weekdays=[-1, 2])
+        with pytest.raises(ValueError):
+            rule("weekly:")
+
+
+class TestParseRecurrence:
+    """Tests for extracting rules from messages."""
+    
+    def test_phrases(self):
+        """Test the supported repeat phrases."""
+        cases = {
+            "remind me every day at 9am to take medicine": "daily",
+            "standup every weekday at 10": "weekdays",
+            "gym every Monday and Thursday at 6pm": "weekly:0,3",
+            "call mom on Sundays": "weekly:6",
+            "pay rent on the 1st of every month": "monthly:1",
+            "drink water every 2 hours": "hourly:2",
+        }
+        for text, expected in cases.items():
+            assert parse_recurrence(text).to_rule() == expected, text
+    
+    def test_one_off_messages(self):
+        """Test that a single named day or date is not a repeat."""
+        for text in ("call mom on Sunday", "meeting next Monday at 3", "pay bills tomorrow at 9am"):
+            assert parse_recurrence(text) is None, text
+
+
+class TestRecurringDispatch:
+    """Tests for firing recurring reminders."""
+    
+    @pytest.mark.asyncio
+    async def test_storage_is_constant(self, database_session, test_session):
+        """Test that a daily reminder fired for two months is still one row pointing at its next occurrence."""
+        test_session.add(Reminder(
+            id="daily",
+            user_id=USER_ID,
+            title="Take medicine",
+            scheduled_time=datetime(2026, 3, 1, 9, 0),
+            next_fire_at=datetime(2026, 3, 1, 4, 0),
+            recurrence="daily",
+            status=ReminderStatus.ACTIVE,
+        ))
+        await test_session.commit()
+        dispatcher = ReminderDispatcher(batch_size=100, poll_seconds=30, concurrency=10)
+        
+        with patch("app.infrastructure.twilio_whatsapp.send_reminder_notification", new_callable=AsyncMock) as notify:
+            for day in range(60):
+                await dispatcher.dispatch_due(datetime(2026, 3, 1, 4, 0, 30) + timedelta(days=day))
+        
+        assert notify.call_count == 60
+        assert await test_session.scalar(select(func.count()).select_from(Reminder)) == 1
+        reminder = await test_session.get(Reminder, "daily")
+        await test_session.refresh(reminder)
+        assert reminder.scheduled_time == datetime(2026, 4, 30, 9, 0)
+        assert reminder.next_fire_at == datetime(2026, 4, 30, 4, 0)
+        assert reminder.status == ReminderStatus.ACTIVE
+        
+        # Each firing's lease is completed and purged like any other
+        await purge_completed_leases(days=0)
+        assert await test_session.scalar(select(func.count()).select_from(JobLease)) == 0
+    
+    @pytest.mark.asyncio
+    async def test_one_off_reminder_is_not_advanced(self, database_session, test_session):
+        """Test that a reminder without a rule fires once."""
+        test_session.add(Reminder(
+            id="once",
+            user_id=USER_ID,
+            title="Pay bills",
+            scheduled_time=datetime(2026, 3, 1, 9, 0),
+            next_fire_at=datetime(2026, 3, 1, 4, 0),
+            status=ReminderStatus.ACTIVE,
+        ))
+        await test_session.commit()
+        dispatcher = ReminderDispatcher(batch_size=100, poll_seconds=30, concurrency=10)
+        
+        with patch("app.infrastructure.twilio_whatsapp.send_reminder_notification", new_callable=AsyncMock):
+            await dispatcher.dispatch_due(datetime(2026, 3, 1, 4, 0, 30))
+        
+        reminder = await test_session.get(Reminder, "once")
+        await test_session.refresh(reminder)
+        assert reminder.next_fire_at is None
+        assert reminder.scheduled_time == datetime(2026, 3, 1, 9, 0)
+    
+    @pytest.mark.asyncio
+    async def test_invalid_rule_does_not_block_batch(self, database_session, test_session):
+        """Test that a reminder with a broken rule fires once and its batch is still recorded."""
+        for reminder_id, recurrence in (("broken", "weekly:"), ("daily", "daily")):
+            test_session.add(Reminder(
+                id=reminder_id,
+                user_id=USER_ID,
+                title=f"Reminder {reminder_id}",
+                scheduled_time=datetime(2026, 3, 1, 9, 0),
+                next_fire_at=datetime(2026, 3, 1, 4, 0),
+                recurrence=recurrence,
+                status=ReminderStatus.ACTIVE,
+            ))
+        await test_session.commit()
+        dispatcher = ReminderDispatcher(batch_size=100, poll_seconds=30, concurrency=10)
+        
+        with patch("app.infrastructure.twilio_whatsapp.send_reminder_notification", new_callable=AsyncMock) as notify:
+            await dispatcher.dispatch_due(datetime(2026, 3, 1, 4, 0, 30))
+        
+        assert notify.call_count == 2
+        broken = await test_session.get(Reminder, "broken")
+        daily = await test_session.get(Reminder, "daily")
+        await test_session.refresh(broken)
+        await test_session.refresh(daily)
+        assert broken.next_fire_at is None
+        assert broken.last_notified_at is not None
+        assert daily.scheduled_time == datetime(2026, 3, 2, 9, 0)
+
+
+class TestRecurringService:
+    """Tests for recurring reminders in the reminder service."""
+    
+    @pytest.mark.asyncio
+    async def test_create_stores_one_row_with_rule(self, test_session):
+        """Test that creating a weekly reminder stores its rule and first occurrence."""
+        service = ReminderService(test_session, user_id=USER_ID)
+        intent = ParsedIntent(
+            intent="create_reminder",
+            title="Gym",
+            scheduled_time=datetime.utcnow() + timedelta(days=1),
+            recurrence=Recurrence(frequency=RecurrenceFrequency.WEEKLY, weekdays=[0, 3]),
+        )
+        
+        with patch("app.usecases.reminder_service.wake_dispatcher", new_callable=AsyncMock):
+            response = await service.handle_intent(intent)
+        
+        reminders = (await test_session.execute(select(Reminder))).scalars().all()
+        assert len(reminders) == 1
+        assert reminders[0].recurrence == "weekly:0,3"
+        assert reminders[0].scheduled_time.weekday() in (0, 3)
+        assert "Repeats every Monday and Thursday" in response
+    
+    @pytest.mark.asyncio
+    async def test_update_moves_reminder_to_rule_day(self, test_session):
+        """Test that making a reminder repeat reschedules it to the rule's first occurrence."""
+        test_session.add(Reminder(
+            id="gym",
+            user_id=USER_ID,
+            title="Gym",
+            scheduled_time=datetime(2099, 3, 4, 18, 0),  # A Wednesday
+            next_fire_at=datetime(2099, 3, 4, 13, 0),
+            status=ReminderStatus.ACTIVE,
+        ))
+        await test_session.commit()
+        service = ReminderService(test_session, user_id=USER_ID)
+        intent = ParsedIntent(
+            intent="update_reminder",
+            target_reminder="gym",
+            recurrence=Recurrence(frequency=RecurrenceFrequency.WEEKLY, weekdays=[0]),
+        )
+        
+        with patch("app.usecases.reminder_service.wake_dispatcher", new_callable=AsyncMock) as mock_wake:
+            response = await service.handle_intent(intent)
+        
+        reminder = await test_session.get(Reminder, "gym")
+        await test_session.refresh(reminder)
+        assert "repeat" in response
+        assert reminder.recurrence == "weekly:0"
+        assert reminder.scheduled_time.weekday() == 0
+        assert reminder.scheduled_time.time() == datetime(2099, 3, 4, 18, 0).time()
+        assert reminder.scheduled_time - datetime.utcnow() < timedelta(days=8)
+        assert reminder.next_fire_at == reminder.scheduled_time - timedelta(hours=5)
+        mock_wake.assert_called_once()
+    
+    @pytest.mark.asyncio
+    async def test_acknowledge_keeps_series_active(self, test_session):
+        """Test that acknowledging a recurring reminder cancels only its follow-up."""
+        test_session.add(Reminder(
+            id="daily",
+            user_id=USER_ID,
+            title="Take medicine",
+            scheduled_time=datetime.utcnow() + timedelta(days=1),
+            recurrence="daily",
+            status=ReminderStatus.ACTIVE,
+            last_notified_at=datetime.utcnow(),
+            user_responded=False,
+            next_fire_at=datetime.utcnow() + timedelta(days=1),
+            follow_up_at=datetime.utcnow() + timedelta(minutes=5),
+        ))
+        await test_session.commit()
+        service = ReminderService(test_session, user_id=USER_ID)
+        
+        await service.handle_intent(ParsedIntent(intent="acknowledge"))
+        
+        reminder = await test_session.get(Reminder, "daily")
+        await test_session.refresh(reminder)
+        assert reminder.status == ReminderStatus.ACTIVE
+        assert reminder.user_responded is True
+        assert reminder.follow_up_at is None
+        assert reminder.next_fire_at is not None
@@ -30,7 +30,7 @@ class TestReminderServiceHandleIntent:
             response_message="Reminder created!"
         )
         
-        with patch("app.usecases.reminder_service.schedule_reminder", new_callable=AsyncMock):
+        with patch("app.usecases.reminder_service.wake_dispatcher", new_callable=AsyncMock):
             response = await service.handle_intent(intent)
         
         assert "✅" in response
@@ -108,7 +108,7 @@ class TestReminderServiceHandleIntent:
             response_message=""
         )
         
-        with patch("app.usecases.reminder_service.cancel_reminder_jobs", new_callable=AsyncMock):
+        with patch("app.usecases.reminder_service.wake_dispatcher", new_callable=AsyncMock):
             response = await service.handle_intent(intent)
         
         assert "👍" in response
@@ -150,7 +150,7 @@ class TestReminderServiceHandleIntent:
             response_message=""
         )
         
-        with patch("app.usecases.reminder_service.cancel_reminder_jobs", new_callable=AsyncMock):
+        with patch("app.usecases.reminder_service.wake_dispatcher", new_callable=AsyncMock):
             response = await service.handle_intent(intent)
         
         assert "⏸️" in response or "Paused" in response
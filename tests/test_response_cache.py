@@ -0,0 +1,184 @@
+"""
+Tests for the LLM response cache and its backends.
+"""
+
+import json
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, patch
+
+from app.ai.nlp_parser import parse_user_message
+from app.infrastructure.response_cache import (
+    MemoryCacheBackend,
+    SQLiteCacheBackend,
+    ResponseCache,
+    is_cacheable,
+)
+from app.utils.time import PKT
+
+
+class FakeClock:
+    """Manually advanced wall clock."""
+    
+    def __init__(self):
+        self.now = 1_000_000.0
+    
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestMemoryCacheBackend:
+    """Tests for MemoryCacheBackend."""
+    
+    @pytest.mark.asyncio
+    async def test_entries_expire(self):
+        """Test that entries are dropped after the TTL."""
+        clock = FakeClock()
+        backend = MemoryCacheBackend(max_bytes=1000, ttl_seconds=60, clock=clock)
+        await backend.set("k", "v")
+        
+        assert await backend.get("k") == "v"
+        clock.now += 61
+        assert await backend.get("k") is None
+        assert backend.size_bytes == 0
+    
+    @pytest.mark.asyncio
+    async def test_byte_cap_evicts_least_recently_used(self):
+        """Test that total size stays under the cap by evicting LRU entries."""
+        backend = MemoryCacheBackend(max_bytes=30, ttl_seconds=60)
+        await backend.set("a", "x" * 9)  # 10 bytes each
+        await backend.set("b", "x" * 9)
+        await backend.set("c", "x" * 9)
+        await backend.get("a")  # b is now least recently used
+        await backend.set("d", "x" * 9)
+        
+        assert backend.size_bytes <= 30
+        assert await backend.get("a") is not None
+        assert await backend.get("b") is None
+        assert backend.stats()["evictions"] == 1
+
+
+class TestSQLiteCacheBackend:
+    """Tests for SQLiteCacheBackend."""
+    
+    @pytest.mark.asyncio
+    async def test_entries_survive_reopen(self, tmp_path):
+        """Test that cached results persist across backend instances."""
+        path = str(tmp_path / "cache.db")
+        backend = SQLiteCacheBackend(path, max_bytes=1000, ttl_seconds=60)
+        await backend.set("k", '{"intent": "list_reminders"}')
+        await backend.close()
+        
+        reopened = SQLiteCacheBackend(path, max_bytes=1000, ttl_seconds=60)
+        assert await reopened.get("k") == '{"intent": "list_reminders"}'
+        await reopened.close()
+    
+    @pytest.mark.asyncio
+    async def test_byte_cap_and_ttl(self, tmp_path):
+        """Test LRU eviction by size and expiry by TTL."""
+        clock = FakeClock()
+        backend = SQLiteCacheBackend(str(tmp_path / "cache.db"), max_bytes=30, ttl_seconds=60, clock=clock)
+        for key in ("a", "b", "c"):
+            await backend.set(key, "x" * 9)
+            clock.now += 1
+        await backend.set("d", "x" * 9)
+        
+        assert await backend.get("a") is None
+        assert backend.stats()["size_bytes"] <= 30
+        
+        clock.now += 120
+        assert await backend.get("d") is None
+        await backend.close()
+
+
+class TestResponseCache:
+    """Tests for ResponseCache keying."""
+    
+    def test_key_normalizes_message(self):
+        """Test that case, spacing and trailing punctuation don't change the key."""
+        cache = ResponseCache(MemoryCacheBackend(1000, 60), bucket_seconds=300)
+        now = datetime(2026, 1, 5, 10, 0, tzinfo=PKT)
+        
+        assert cache.make_key("Remind me to drink water in 1 hour!", None, now) == \
+            cache.make_key("remind me to  drink water in 1 hour", None, now)
+    
+    def test_key_depends_on_quote_and_bucket(self):
+        """Test that quoted context and the time bucket are part of the key."""
+        cache = ResponseCache(MemoryCacheBackend(1000, 60), bucket_seconds=300)
+        now = datetime(2026, 1, 5, 10, 0, tzinfo=PKT)
+        key = cache.make_key("snooze", None, now)
+        
+        assert key != cache.make_key("snooze", "Reminder: pay bills", now)
+        assert key != cache.make_key("snooze", None, now + timedelta(minutes=5))
+    
+    def test_context_dependent_messages_are_not_cacheable(self):
+        """Test that messages referring to earlier context bypass the cache."""
+        assert is_cacheable("Remind me to drink water in 1 hour")
+        assert not is_cacheable("delete it")
+        assert not is_cacheable("move that to 5pm")
+
+
+class TestParserCaching:
+    """Tests for the cache in front of the OpenAI call."""
+    
+    @pytest.mark.asyncio
+    async def test_identical_message_hits_cache(self, fresh_response_cache):
+        """Test that a repeated phrasing skips OpenAI and recomputes the time."""
+        gpt_result = {
+            "intent": "create_reminder",
+            "title": "Drink water",
+            "scheduled_time": "2000-01-01T00:00:00+05:00",
+            "response_message": "Reminder set"
+        }
+        
+        with patch("app.ai.nlp_parser._call_openai_chat", new_callable=AsyncMock) as mock_call:
+            mock_call.return_value = json.dumps(gpt_result)
+            first = await parse_user_message("Remind me to drink water in 1 hour")
+            second = await parse_user_message("remind me to drink water in 1 hour")
+        
+        mock_call.assert_called_once()
+        assert second.title == "Drink water"
+        # scheduled_time comes from parse_natural_time, not the cached JSON
+        assert second.scheduled_time.year != 2000
+        assert second.scheduled_time >= first.scheduled_time
+        assert fresh_response_cache.stats()["hits"] == 1
+    
+    @pytest.mark.asyncio
+    async def test_unknown_results_are_not_cached(self, fresh_response_cache):
+        """Test that failed parses are retried instead of replayed."""
+        with patch("app.ai.nlp_parser._call_openai_chat", new_callable=AsyncMock) as mock_call:
+            mock_call.return_value = '{"intent": "unknown"}'
+            await parse_user_message("Some odd message")
+            await parse_user_message("Some odd message")
+        
+        assert mock_call.call_count == 2
+    
+    @pytest.mark.asyncio
+    async def test_gpt_times_are_not_cached(self, fresh_response_cache):
+        """Test that a parse whose time only GPT could read is never replayed."""
+        gpt_result = {
+            "intent": "create_reminder",
+            "title": "Call dad",
+            "scheduled_time": "2000-01-01T17:00:00+05:00",
+            "response_message": "Reminder set"
+        }
+        
+        with patch("app.ai.nlp_parser._call_openai_chat", new_callable=AsyncMock) as mock_call:
+            mock_call.return_value = json.dumps(gpt_result)
+            await parse_user_message("Remind me to call dad this evening")
+            await parse_user_message("Remind me to call dad this evening")
+        
+        assert mock_call.call_count == 2
+        assert fresh_response_cache.stats()["stores"] == 0
+    
+    @pytest.mark.asyncio
+    async def test_results_without_a_time_are_cached(self, fresh_response_cache):
+        """Test that a parse with no time at all is still cached."""
+        gpt_result = {"intent": "pause_reminder", "target_reminder": "wifi", "scheduled_time": None}
+        
+        with patch("app.ai.nlp_parser._call_openai_chat", new_callable=AsyncMock) as mock_call:
+            mock_call.return_value = json.dumps(gpt_result)
+            await parse_user_message("Please pause my wifi reminder for now")
+            await parse_user_message("Please pause my wifi reminder for now")
+        
+        mock_call.assert_called_once()
@@ -0,0 +1,72 @@
+"""
+Tests for parse_natural_time against the golden corpus.
+"""
+
+import json
+from datetime import datetime
+from pathlib import Path
+from unittest.mock import patch
+
+from app.utils.time import PKT, parse_natural_time
+
+GOLDEN_FILE = Path(__file__).parent / "data" / "natural_time_golden.json"
+
+
+def load_golden() -> dict:
+    with open(GOLDEN_FILE) as f:
+        return json.load(f)
+
+
+class TestParseNaturalTime:
+    """Tests for the natural time parser."""
+    
+    def test_golden_corpus(self):
+        """Test that every phrase in the golden corpus parses to its recorded time."""
+        golden = load_golden()
+        mismatches = []
+        
+        for label, reference in golden["reference_times"].items():
+            reference_time = datetime.fromisoformat(reference)
+            for case in golden["cases"]:
+                parsed = parse_natural_time(case["text"], reference_time)
+                actual = parsed.isoformat() if parsed else None
+                if actual != case[label]:
+                    mismatches.append((case["text"], label, case[label], actual))
+        
+        assert not mismatches
+    
+    def test_common_phrases_skip_dateutil(self):
+        """Test that everyday messages are parsed without calling dateutil."""
+        reference_time = datetime(2026, 3, 4, 10, 30, tzinfo=PKT)
+        messages = [
+            "ok", "List my reminders", "stop calling me", "remind me to call mom tomorrow",
+            "Remind me to pay electricity bill tomorrow at 9am", "Move the dentist reminder to Friday 4pm",
+            "in 10 mins", "submit the report before 5pm", "meeting at 14:30", "next friday at 11am",
+            "dentist on March 15 at 3pm", "renew passport on 05/04 at 11am",
+        ]
+        
+        with patch("app.utils.time.dateutil_parser.parse", side_effect=AssertionError("dateutil called")):
+            for message in messages:
+                parse_natural_time(message, reference_time)
+    
+    def test_ambiguous_phrases_fall_back_to_dateutil(self):
+        """Test that phrases outside the grammar are still read by dateutil."""
+        reference_time = datetime(2026, 3, 4, 10, 30, tzinfo=PKT)
+        
+        # Two times: dateutil keeps the last one
+        assert parse_natural_time("from 9am to 5pm", reference_time) == datetime(2026, 3, 4, 17, 0, tzinfo=PKT)
+        # A bare number: dateutil reads it as a day of the month, at midnight
+        assert parse_natural_time("call dad at 5", reference_time) == datetime(2026, 3, 5, 0, 0, tzinfo=PKT)
+    
+    def test_numeric_dates_are_day_first(self):
+        """Test that slash dates are read as day/month."""
+        reference_time = datetime(2026, 3, 4, 10, 30, tzinfo=PKT)
+        
+        assert parse_natural_time("renew passport on 05/04 at 11am", reference_time) == datetime(2026, 4, 5, 11, 0, tzinfo=PKT)
+        assert parse_natural_time("due 31/02/2026", reference_time) is None
+    
+    def test_invalid_before_hour_does_not_raise(self):
+        """Test that an impossible "before" hour is ignored rather than raising."""
+        reference_time = datetime(2026, 3, 4, 10, 30, tzinfo=PKT)
+        
+        assert parse_natural_time("before 13pm", reference_time) == datetime(2026, 3, 4, 13, 0, tzinfo=PKT)
@@ -0,0 +1,200 @@
+"""
+Tests for the reminders_fts title index and keyword lookup.
+"""
+
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import text
+
+from app.domain.reminder import Reminder, ReminderStatus
+from app.infrastructure import title_search
+from app.usecases.reminder_service import ReminderService
+
+
+USER_ID = "+923001234567"
+
+
+def make_reminder(
+    reminder_id: str,
+    title: str,
+    status=ReminderStatus.ACTIVE,
+    age_minutes: int = 0,
+    user_id: str = USER_ID
+) -> Reminder:
+    now = datetime.utcnow()
+    return Reminder(
+        id=reminder_id,
+        user_id=user_id,
+        title=title,
+        scheduled_time=now + timedelta(hours=1),
+        status=status,
+        created_at=now - timedelta(minutes=age_minutes),
+        updated_at=now,
+    )
+
+
+async def indexed_titles(session) -> list:
+    """Titles currently in the FTS index."""
+    result = await session.execute(text("SELECT title FROM reminders_fts ORDER BY title"))
+    return [row[0] for row in result.all()]
+
+
+@pytest.mark.sqlite_only
+class TestTitleIndexSync:
+    """Triggers keep reminders_fts in step with the reminders table."""
+    
+    @pytest.mark.asyncio
+    async def test_insert_indexes_active_reminders(self, test_session):
+        """Test that active and paused reminders are indexed, completed ones are not."""
+        test_session.add_all([
+            make_reminder("r1", "Pay electricity bill"),
+            make_reminder("r2", "Call mom", status=ReminderStatus.PAUSED),
+            make_reminder("r3", "Old task", status=ReminderStatus.COMPLETED),
+        ])
+        await test_session.flush()
+        
+        assert await indexed_titles(test_session) == ["Call mom", "Pay electricity bill"]
+    
+    @pytest.mark.asyncio
+    async def test_title_update_reindexes(self, test_session):
+        """Test that renaming a reminder replaces its indexed title."""
+        reminder = make_reminder("r1", "Pay electricity bill")
+        test_session.add(reminder)
+        await test_session.flush()
+        
+        reminder.title = "Pay gas bill"
+        await test_session.flush()
+        
+        assert await indexed_titles(test_session) == ["Pay gas bill"]
+    
+    @pytest.mark.asyncio
+    async def test_status_change_removes_and_restores(self, test_session):
+        """Test that completing a reminder drops it and reactivating restores it."""
+        reminder = make_reminder("r1", "Pay electricity bill")
+        test_session.add(reminder)
+        await test_session.flush()
+        
+        reminder.status = ReminderStatus.COMPLETED
+        await test_session.flush()
+        assert await indexed_titles(test_session) == []
+        
+        reminder.status = ReminderStatus.ACTIVE
+        await test_session.flush()
+        assert await indexed_titles(test_session) == ["Pay electricity bill"]
+    
+    @pytest.mark.asyncio
+    async def test_delete_removes_from_index(self, test_session):
+        """Test that deleting a reminder removes it from the index."""
+        reminder = make_reminder("r1", "Pay electricity bill")
+        test_session.add(reminder)
+        await test_session.flush()
+        
+        await test_session.delete(reminder)
+        await test_session.flush()
+        
+        assert await indexed_titles(test_session) == []
+
+
+class TestFindReminderByKeyword:
+    """Tests for ReminderService._find_reminder_by_keyword."""
+    
+    @pytest_asyncio.fixture(params=["memory", "fts"])
+    async def service(self, request, test_session):
+        """Service over a few reminders, matched in memory or through the FTS index."""
+        if request.param == "fts":
+            patcher = patch("app.infrastructure.title_search.SMALL_USER_LIMIT", 0)
+            patcher.start()
+            request.addfinalizer(patcher.stop)
+        
+        test_session.add_all([
+            make_reminder("r1", "Pay electricity bill", age_minutes=30),
+            make_reminder("r2", "Electricity meter reading", age_minutes=10),
+            make_reminder("r3", "Call mom"),
+            make_reminder("r4", "Water plants", status=ReminderStatus.COMPLETED),
+        ])
+        await test_session.flush()
+        return ReminderService(test_session, user_id=USER_ID)
+    
+    @pytest.mark.asyncio
+    async def test_substring_match_prefers_newest(self, service):
+        """Test that a substring match returns the most recently created reminder."""
+        reminder = await service._find_reminder_by_keyword("electric")
+        
+        assert reminder.id == "r2"
+    
+    @pytest.mark.asyncio
+    async def test_match_is_case_insensitive(self, service):
+        """Test that keyword case does not matter."""
+        reminder = await service._find_reminder_by_keyword("CALL MOM")
+        
+        assert reminder.id == "r3"
+    
+    @pytest.mark.asyncio
+    async def test_word_contained_in_keyword(self, service):
+        """Test that a title word inside a longer keyword still matches."""
+        reminder = await service._find_reminder_by_keyword("mom's birthday")
+        
+        assert reminder.id == "r3"
+    
+    @pytest.mark.asyncio
+    async def test_typo_tolerance(self, service):
+        """Test that a misspelled keyword finds the closest title."""
+        reminder = await service._find_reminder_by_keyword("electrcity bill")
+        
+        assert reminder.id == "r1"
+    
+    @pytest.mark.asyncio
+    async def test_completed_reminders_are_ignored(self, service):
+        """Test that completed reminders are not returned."""
+        assert await service._find_reminder_by_keyword("plants") is None
+    
+    @pytest.mark.asyncio
+    async def test_unrelated_keyword_returns_none(self, service):
+        """Test that a keyword with no similar title returns None."""
+        assert await service._find_reminder_by_keyword("dentist") is None
+    
+    @pytest.mark.asyncio
+    async def test_short_keyword_falls_back_to_scan(self, service):
+        """Test that keywords shorter than a trigram still match."""
+        reminder = await service._find_reminder_by_keyword("mo")
+        
+        assert reminder.id == "r3"
+    
+    @pytest.mark.asyncio
+    async def test_quotes_in_keyword_are_escaped(self, service):
+        """Test that FTS query syntax in the keyword is treated literally."""
+        assert await service._find_reminder_by_keyword('"dentist" OR "') is None
+    
+    @pytest.mark.asyncio
+    async def test_other_users_reminders_are_ignored(self, service, test_session):
+        """Test that a keyword only matches the service user's reminders."""
+        test_session.add(make_reminder("r5", "Renew passport", user_id="+447700900123"))
+        await test_session.flush()
+        
+        assert await service._find_reminder_by_keyword("passport") is None
+        assert await service._find_reminder_by_keyword("pasport") is None
+    
+    @pytest.mark.asyncio
+    async def test_sees_unflushed_reminders(self, service, test_session):
+        """Test that a reminder added in the same session is searchable."""
+        test_session.add(make_reminder("r5", "Renew passport"))
+        
+        reminder = await service._find_reminder_by_keyword("passport")
+        
+        assert reminder.id == "r5"
+
+
+class TestSimilarity:
+    """Tests for the trigram similarity helper."""
+    
+    def test_identical_strings(self):
+        assert title_search.similarity("electricity", "Electricity") == 1.0
+    
+    def test_typo_is_similar(self):
+        assert title_search.similarity("electrcity", "electricity") >= title_search.FUZZY_THRESHOLD
+    
+    def test_unrelated_is_not_similar(self):
+        assert title_search.similarity("dentist", "electricity") < title_search.FUZZY_THRESHOLD
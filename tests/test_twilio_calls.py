@@ -0,0 +1,180 @@
+"""
+Tests for the async voice call dispatcher against a local fake Twilio server.
+"""
+
+import asyncio
+import time
+import pytest
+import pytest_asyncio
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+
+from app.infrastructure.twilio_http import TwilioHttpClient
+from app.infrastructure.twilio_calls import CallDispatcher, CallDropped, make_reminder_call
+
+
+@pytest_asyncio.fixture
+async def twilio_client(fake_twilio_server):
+    """TwilioHttpClient pointed at the fake server, patched in for calls."""
+    client = TwilioHttpClient(
+        account_sid="ACtest123",
+        auth_token="test_token",
+        base_url=fake_twilio_server.base_url,
+    )
+    with patch("app.infrastructure.twilio_calls.get_twilio_http_client", return_value=client):
+        yield client
+    await client.aclose()
+
+
+@pytest_asyncio.fixture
+async def dispatcher(twilio_client):
+    """Dispatcher with two workers, patched in as the global instance."""
+    dispatcher = CallDispatcher(concurrency=2, max_pending=10)
+    with patch("app.infrastructure.twilio_calls.get_call_dispatcher", return_value=dispatcher):
+        yield dispatcher
+    await dispatcher.stop()
+
+
+class TestCallDispatcher:
+    """Tests for CallDispatcher."""
+
+    @pytest.mark.asyncio
+    async def test_make_reminder_call_places_call(self, dispatcher, fake_twilio_server):
+        """Test that a queued call is posted to the Calls resource."""
+        assert await make_reminder_call("Call Mark", to_number="+923001234567") is True
+        await asyncio.wait_for(dispatcher.queue.join(), timeout=5)
+
+        request = fake_twilio_server.requests[0]
+        assert request["path"] == "/2010-04-01/Accounts/ACtest123/Calls.json"
+        assert request["form"]["To"] == "+923001234567"
+        assert "Call Mark" in request["form"]["Twiml"]
+
+        stats = dispatcher.stats()
+        assert stats["dispatched"] == 1
+        assert stats["recent_calls"][0]["dispatch_latency_ms"] is not None
+
+    @pytest.mark.asyncio
+    async def test_make_reminder_call_waits_until_placed(self, dispatcher, fake_twilio_server):
+        """Test that a call only counts as made once Twilio has accepted it."""
+        fake_twilio_server.delay = 0.3
+
+        start = time.perf_counter()
+        assert await make_reminder_call("Slow call", to_number="+923001234567") is True
+        assert time.perf_counter() - start >= 0.25
+        assert len(fake_twilio_server.requests) == 1
+
+    @pytest.mark.asyncio
+    async def test_rejected_call_is_not_placed(self, dispatcher, fake_twilio_server):
+        """Test that a call Twilio rejects returns False."""
+        fake_twilio_server.queue_response(400, {"message": "Invalid number", "code": 21211})
+
+        assert await make_reminder_call("Bad number", to_number="+000") is False
+
+    @pytest.mark.asyncio
+    async def test_pending_call_is_dropped_on_stop(self, twilio_client, fake_twilio_server):
+        """Test that a call still queued at shutdown raises CallDropped instead of hanging."""
+        dispatcher = CallDispatcher(concurrency=1, max_pending=10)
+        fake_twilio_server.delay = 0.3
+        with patch("app.infrastructure.twilio_calls.get_call_dispatcher", return_value=dispatcher):
+            first = asyncio.create_task(make_reminder_call("First", to_number="+923001234567"))
+            second = asyncio.create_task(make_reminder_call("Second", to_number="+923001234567"))
+            await asyncio.sleep(0.05)
+            await dispatcher.stop()
+
+            for call in (first, second):
+                with pytest.raises(CallDropped):
+                    await asyncio.wait_for(call, timeout=5)
+
+    @pytest.mark.asyncio
+    async def test_full_queue_raises_call_dropped(self, twilio_client):
+        """Test that a call that cannot be queued raises CallDropped."""
+        dispatcher = CallDispatcher(concurrency=1, max_pending=1)
+        dispatcher.start = lambda: None  # Keep the first call pending
+        dispatcher.dispatch("First", "+1")
+        with patch("app.infrastructure.twilio_calls.get_call_dispatcher", return_value=dispatcher):
+            with pytest.raises(CallDropped):
+                await make_reminder_call("Second", to_number="+1")
+
+    @pytest.mark.asyncio
+    async def test_make_reminder_call_without_number_is_not_queued(self, dispatcher, fake_twilio_server):
+        """Test that a call with no number and no configured user is never queued."""
+        from app.infrastructure.twilio_calls import settings
+
+        with patch.object(settings, "user_phone_number", None):
+            assert await make_reminder_call("Nobody", to_number=None) is False
+
+        assert dispatcher.queue.qsize() == 0
+        assert fake_twilio_server.requests == []
+
+    @pytest.mark.asyncio
+    async def test_concurrency_is_bounded(self, dispatcher, fake_twilio_server):
+        """Test that no more than `concurrency` calls are in flight at once."""
+        fake_twilio_server.delay = 0.1
+
+        for i in range(6):
+            dispatcher.dispatch(f"Reminder {i}", "+923001234567")
+        await asyncio.wait_for(dispatcher.queue.join(), timeout=5)
+
+        assert len(fake_twilio_server.requests) == 6
+        assert fake_twilio_server.max_active == 2
+
+    @pytest.mark.asyncio
+    async def test_calls_reuse_connections(self, dispatcher, fake_twilio_server):
+        """Test that sequential calls share pooled connections."""
+        for i in range(4):
+            dispatcher.dispatch(f"Reminder {i}", "+923001234567")
+            await asyncio.wait_for(dispatcher.queue.join(), timeout=5)
+
+        ports = {r["client_port"] for r in fake_twilio_server.requests}
+        assert len(ports) == 1
+
+    @pytest.mark.asyncio
+    async def test_failed_call_is_recorded(self, dispatcher, fake_twilio_server):
+        """Test that API errors mark the call failed instead of crashing the worker."""
+        fake_twilio_server.queue_response(400, {"message": "Invalid number", "code": 21211})
+
+        record = dispatcher.dispatch("Bad number", "+000")
+        await asyncio.wait_for(dispatcher.queue.join(), timeout=5)
+
+        assert record.status == "failed"
+        assert dispatcher.stats()["failed"] == 1
+
+    @pytest.mark.asyncio
+    async def test_status_callback_reports_ring_latency(self, dispatcher, fake_twilio_server):
+        """Test that a ringing callback produces a ring latency for the call."""
+        record = dispatcher.dispatch("Ring me", "+923001234567")
+        await asyncio.wait_for(dispatcher.queue.join(), timeout=5)
+
+        dispatcher.record_status(record.call_sid, "ringing")
+        dispatcher.record_status(record.call_sid, "completed")
+
+        assert record.ring_latency is not None
+        assert record.status == "completed"
+        assert dispatcher.stats()["avg_ring_latency_ms"] >= 0
+
+    def test_dispatch_rejects_when_queue_full(self):
+        """Test that a full pending queue drops the call instead of blocking."""
+        dispatcher = CallDispatcher(concurrency=1, max_pending=1)
+        dispatcher.start = lambda: None  # Keep the call pending
+
+        assert dispatcher.dispatch("First", "+1") is not None
+        assert dispatcher.dispatch("Second", "+1") is None
+
+
+class TestCallStatusWebhook:
+    """Tests for the call status callback endpoint."""
+
+    def test_status_callback_updates_dispatcher(self):
+        """Test that the endpoint forwards status events to the dispatcher."""
+        from app.main import app
+
+        dispatcher = CallDispatcher(concurrency=1, max_pending=1)
+        with patch("app.api.call_status_webhook.get_call_dispatcher", return_value=dispatcher), \
+             patch.object(dispatcher, "record_status") as mock_record:
+            response = TestClient(app).post(
+                "/webhook/call-status",
+                data={"CallSid": "CA123", "CallStatus": "ringing"}
+            )
+
+        assert response.status_code == 200
+        mock_record.assert_called_once_with("CA123", "ringing")
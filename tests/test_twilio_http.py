@@ -0,0 +1,142 @@
+"""
+Tests for the async Twilio transport against a local fake Twilio server.
+"""
+
+import asyncio
+import time
+import pytest
+import pytest_asyncio
+from unittest.mock import patch
+
+from app.infrastructure.twilio_http import TwilioHttpClient, TwilioApiError
+from app.infrastructure.twilio_whatsapp import send_whatsapp_message, send_reminder_notification
+
+
+@pytest_asyncio.fixture
+async def twilio_client(fake_twilio_server):
+    """TwilioHttpClient pointed at the fake server, patched in as the shared client."""
+    client = TwilioHttpClient(
+        account_sid="ACtest123",
+        auth_token="test_token",
+        base_url=fake_twilio_server.base_url,
+        max_connections=5,
+    )
+    with patch("app.infrastructure.twilio_whatsapp.get_twilio_http_client", return_value=client):
+        yield client
+    await client.aclose()
+
+
+@pytest.fixture
+def no_retry_wait():
+    """Skip the exponential backoff sleeps between retries."""
+    with patch.object(TwilioHttpClient.request.retry, "sleep", new=lambda *_: asyncio.sleep(0)):
+        yield
+
+
+class TestTwilioHttpClient:
+    """Tests for TwilioHttpClient."""
+    
+    @pytest.mark.asyncio
+    async def test_create_message_posts_form(self, twilio_client, fake_twilio_server):
+        """Test that messages are posted to the account's Messages resource."""
+        result = await twilio_client.create_message(
+            body="Hello", from_="whatsapp:+14155238886", to="whatsapp:+923001234567"
+        )
+        
+        assert result["sid"].startswith("SM")
+        request = fake_twilio_server.requests[0]
+        assert request["method"] == "POST"
+        assert request["path"] == "/2010-04-01/Accounts/ACtest123/Messages.json"
+        assert request["form"] == {
+            "Body": "Hello",
+            "From": "whatsapp:+14155238886",
+            "To": "whatsapp:+923001234567",
+        }
+        assert request["headers"]["Authorization"].startswith("Basic ")
+    
+    @pytest.mark.asyncio
+    async def test_reuses_connection(self, twilio_client, fake_twilio_server):
+        """Test that sequential requests share one keep-alive connection."""
+        for i in range(5):
+            await twilio_client.create_message(body=f"msg {i}", from_="a", to="b")
+        
+        ports = {r["client_port"] for r in fake_twilio_server.requests}
+        assert len(ports) == 1
+    
+    @pytest.mark.asyncio
+    async def test_retries_server_errors(self, twilio_client, fake_twilio_server, no_retry_wait):
+        """Test that 5xx and 429 responses are retried."""
+        fake_twilio_server.queue_response(500, {"message": "Internal error"})
+        fake_twilio_server.queue_response(429, {"message": "Too many requests", "code": 20429})
+        
+        result = await twilio_client.create_message(body="retry me", from_="a", to="b")
+        
+        assert result["sid"].startswith("SM")
+        assert len(fake_twilio_server.requests) == 3
+    
+    @pytest.mark.asyncio
+    async def test_does_not_retry_client_errors(self, twilio_client, fake_twilio_server, no_retry_wait):
+        """Test that 4xx errors are raised immediately."""
+        fake_twilio_server.queue_response(400, {"message": "Invalid 'To' number", "code": 21211})
+        
+        with pytest.raises(TwilioApiError) as exc_info:
+            await twilio_client.create_message(body="bad", from_="a", to="b")
+        
+        assert exc_info.value.status == 400
+        assert exc_info.value.code == 21211
+        assert len(fake_twilio_server.requests) == 1
+    
+    @pytest.mark.asyncio
+    async def test_slow_sends_do_not_block_event_loop(self, twilio_client, fake_twilio_server):
+        """Test that concurrent sends overlap instead of running one after another."""
+        fake_twilio_server.delay = 0.2
+        
+        start = time.perf_counter()
+        await asyncio.gather(*[
+            twilio_client.create_message(body=f"msg {i}", from_="a", to="b") for i in range(5)
+        ])
+        elapsed = time.perf_counter() - start
+        
+        assert len(fake_twilio_server.requests) == 5
+        assert elapsed < 0.2 * 5 * 0.6
+
+
+class TestSendWhatsAppMessage:
+    """Tests for the messaging helpers built on the transport."""
+    
+    @pytest.mark.asyncio
+    async def test_send_whatsapp_message(self, twilio_client, fake_twilio_server):
+        """Test that send_whatsapp_message defaults to the configured user."""
+        from app.infrastructure.twilio_whatsapp import settings
+        
+        assert await send_whatsapp_message("Hi there") is True
+        
+        form = fake_twilio_server.requests[0]["form"]
+        assert form["To"] == settings.user_whatsapp_number
+        assert form["From"] == settings.twilio_whatsapp_number
+    
+    @pytest.mark.asyncio
+    async def test_send_reminder_notification(self, twilio_client, fake_twilio_server):
+        """Test the reminder notification format."""
+        assert await send_reminder_notification("Pay bills", "Electricity") is True
+        
+        body = fake_twilio_server.requests[0]["form"]["Body"]
+        assert "Pay bills" in body
+        assert "Electricity" in body
+    
+    @pytest.mark.asyncio
+    async def test_send_failure_returns_false(self, twilio_client, fake_twilio_server, no_retry_wait):
+        """Test that API errors are reported as a failed send."""
+        fake_twilio_server.queue_response(403, {"message": "Forbidden", "code": 20003})
+        
+        assert await send_whatsapp_message("Hi") is False
+    
+    @pytest.mark.asyncio
+    async def test_send_without_recipient_returns_false(self, twilio_client, fake_twilio_server):
+        """Test that a message with no recipient and no configured user is not sent."""
+        from app.infrastructure.twilio_whatsapp import settings
+        
+        with patch.object(settings, "user_whatsapp_number", None):
+            assert await send_reminder_notification("Pay bills", to_number=None) is False
+        
+        assert fake_twilio_server.requests == []
@@ -0,0 +1,192 @@
+"""
+Tests for per-number Twilio send rate limiting.
+"""
+
+import asyncio
+import time
+import pytest
+from unittest.mock import patch
+from pydantic import ValidationError
+
+from app.config.settings import Settings
+from app.infrastructure.twilio_http import TwilioHttpClient
+from app.infrastructure.twilio_rate_limit import OutboundRateLimiter, RateLimiterRegistry, SendPriority, burst_for_rate
+
+
+class TestOutboundRateLimiter:
+    """Tests for the token bucket and its priority queue."""
+    
+    @pytest.mark.asyncio
+    async def test_burst_is_immediate(self):
+        """Test that sends within the burst do not wait."""
+        limiter = OutboundRateLimiter(rate=1, burst=3)
+        
+        waits = [await limiter.acquire() for _ in range(3)]
+        
+        assert waits == [0.0, 0.0, 0.0]
+    
+    @pytest.mark.asyncio
+    async def test_rate_is_enforced(self):
+        """Test that sends beyond the burst are spaced at the configured rate."""
+        limiter = OutboundRateLimiter(rate=50, burst=1)
+        
+        start = time.monotonic()
+        for _ in range(6):
+            await limiter.acquire()
+        
+        assert time.monotonic() - start >= 5 / 50 * 0.9
+    
+    @pytest.mark.asyncio
+    async def test_queued_sends_go_in_priority_order(self):
+        """Test that reminders get tokens before chat replies, and chat replies before errors."""
+        limiter = OutboundRateLimiter(rate=100, burst=1)
+        await limiter.acquire()
+        order = []
+        
+        async def send(name, priority):
+            await limiter.acquire(priority)
+            order.append(name)
+        
+        tasks = [
+            asyncio.create_task(send("error", SendPriority.ERROR)),
+            asyncio.create_task(send("chat 1", SendPriority.CHAT)),
+            asyncio.create_task(send("reminder", SendPriority.REMINDER)),
+            asyncio.create_task(send("chat 2", SendPriority.CHAT)),
+        ]
+        await asyncio.sleep(0)
+        assert limiter.stats()["queue_depth_by_priority"] == {"reminder": 1, "chat": 2, "error": 1}
+        await asyncio.gather(*tasks)
+        
+        assert order == ["reminder", "chat 1", "chat 2", "error"]
+        assert limiter.stats()["queue_depth"] == 0
+    
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_gives_up_its_turn(self):
+        """Test that a send cancelled while queued does not consume a token."""
+        limiter = OutboundRateLimiter(rate=20, burst=1)
+        await limiter.acquire()
+        
+        cancelled = asyncio.create_task(limiter.acquire(SendPriority.REMINDER))
+        waiting = asyncio.create_task(limiter.acquire(SendPriority.CHAT))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        
+        await asyncio.wait_for(waiting, timeout=1)
+        assert limiter.wait_stats[SendPriority.CHAT].count == 2
+        assert limiter.wait_stats[SendPriority.REMINDER].count == 0
+        assert limiter.tokens < 1
+    
+    @pytest.mark.asyncio
+    async def test_throttle_pauses_sends(self):
+        """Test that a 429 Retry-After pauses the bucket."""
+        limiter = OutboundRateLimiter(rate=100, burst=5)
+        limiter.throttle(0.2)
+        
+        waited = await limiter.acquire()
+        
+        assert waited >= 0.18
+        assert limiter.stats()["throttled"] == 1
+    
+    @pytest.mark.asyncio
+    async def test_wait_metrics(self):
+        """Test that wait times are reported per priority."""
+        limiter = OutboundRateLimiter(rate=20, burst=1)
+        await limiter.acquire(SendPriority.CHAT)
+        await limiter.acquire(SendPriority.CHAT)
+        
+        wait = limiter.stats()["wait"]["chat"]
+        assert wait["granted"] == 2
+        assert wait["waited"] == 1
+        assert wait["max_wait_ms"] >= 40
+
+
+class TestRateLimiterRegistry:
+    """Tests for per-number limits."""
+    
+    def test_override_applies_to_one_number(self):
+        """Test that an override changes only the named number's limit."""
+        registry = RateLimiterRegistry(default_rate=10, default_burst=10, overrides={"+14155550100": 1})
+        
+        assert registry.limiter_for("+14155550100").rate == 1
+        assert registry.limiter_for("+14155550100").burst == 1
+        assert registry.limiter_for("whatsapp:+14155238886").rate == 10
+    
+    @pytest.mark.asyncio
+    async def test_override_below_one_per_second_is_not_exceeded(self):
+        """Test that a sub-second override gets one token and waits for it to fill."""
+        registry = RateLimiterRegistry(default_rate=10, default_burst=10, overrides={"+14155550100": 0.9})
+        limiter = registry.limiter_for("+14155550100")
+        
+        waited = await limiter.acquire()
+        
+        assert limiter.burst == burst_for_rate(0.9) == 1
+        assert waited >= (1 - 0.9) / 0.9 * 0.9
+    
+    def test_rates_must_be_positive(self):
+        """Test that a zero rate is rejected by the settings and by the limiter."""
+        with pytest.raises(ValidationError):
+            Settings(twilio_rate_limit_per_second=0)
+        with pytest.raises(ValidationError):
+            Settings(twilio_rate_limits={"+14155550100": 0})
+        with pytest.raises(ValueError):
+            OutboundRateLimiter(rate=0, burst=1)
+    
+    def test_numbers_are_independent(self):
+        """Test that each number keeps its own bucket."""
+        registry = RateLimiterRegistry(default_rate=10, default_burst=10)
+        
+        assert registry.limiter_for("whatsapp:+1") is registry.limiter_for("whatsapp:+1")
+        assert registry.limiter_for("whatsapp:+1") is not registry.limiter_for("+1")
+        assert set(registry.stats()) == {"whatsapp:+1", "+1"}
+
+
+class TestRateLimitedTransport:
+    """Tests for the limiter in the Twilio transport."""
+    
+    @pytest.mark.asyncio
+    async def test_sends_are_limited_per_from_number(self, fake_twilio_server):
+        """Test that messages wait for their sender's tokens and calls use the voice number's bucket."""
+        client = TwilioHttpClient(
+            account_sid="ACtest123",
+            auth_token="test_token",
+            base_url=fake_twilio_server.base_url,
+            rate_limits=RateLimiterRegistry(default_rate=20, default_burst=1),
+        )
+        try:
+            start = time.monotonic()
+            await asyncio.gather(*(
+                client.create_message(body=f"m{i}", from_="whatsapp:+14155238886", to="whatsapp:+923001234567")
+                for i in range(4)
+            ))
+            await client.create_call(twiml="<Response/>", to="+923001234567", from_="+14155550100")
+            elapsed = time.monotonic() - start
+        finally:
+            await client.aclose()
+        
+        stats = client.rate_limits.stats()
+        assert elapsed >= 3 / 20 * 0.9
+        assert stats["whatsapp:+14155238886"]["wait"]["chat"]["granted"] == 4
+        assert stats["+14155550100"]["wait"]["reminder"]["granted"] == 1
+        assert stats["+14155550100"]["wait"]["reminder"]["waited"] == 0
+    
+    @pytest.mark.asyncio
+    async def test_retry_after_throttles_sender(self, fake_twilio_server):
+        """Test that a 429 with Retry-After pauses the number before the retry."""
+        fake_twilio_server.queue_response(429, {"message": "Too many requests", "code": 20429}, {"Retry-After": "0.3"})
+        client = TwilioHttpClient(
+            account_sid="ACtest123",
+            auth_token="test_token",
+            base_url=fake_twilio_server.base_url,
+            rate_limits=RateLimiterRegistry(default_rate=100, default_burst=10),
+        )
+        try:
+            with patch.object(TwilioHttpClient.request.retry, "sleep", new=lambda *_: asyncio.sleep(0)):
+                start = time.monotonic()
+                await client.create_message(body="Hi", from_="whatsapp:+14155238886", to="whatsapp:+923001234567")
+                elapsed = time.monotonic() - start
+        finally:
+            await client.aclose()
+        
+        assert len(fake_twilio_server.requests) == 2
+        assert elapsed >= 0.28
+        assert client.rate_limits.stats()["whatsapp:+14155238886"]["throttled"] == 1
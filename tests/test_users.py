@@ -0,0 +1,230 @@
+"""
+Tests for per-user partitioning of reminders, history and call opt-outs.
+"""
+
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, patch
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import create_engine, text
+
+from app.domain.conversation_history import get_conversation_history, save_conversation
+from app.domain.reminder import Base, Reminder, ReminderStatus, ParsedIntent
+from app.domain.user import User, get_or_create_user, get_reminder_owner, user_id_from_number
+from app.infrastructure import scheduler
+from app.infrastructure.migrations import MIGRATIONS, apply_migrations
+from app.usecases.reminder_service import ReminderService
+
+ALICE = "+923001111111"
+BOB = "+447700900123"
+
+
+def make_reminder(reminder_id: str, user_id: str, title: str, **overrides) -> Reminder:
+    fields = {
+        "id": reminder_id,
+        "user_id": user_id,
+        "title": title,
+        "scheduled_time": datetime.utcnow() + timedelta(hours=1),
+        "status": ReminderStatus.ACTIVE,
+    }
+    fields.update(overrides)
+    return Reminder(**fields)
+
+
+@pytest_asyncio.fixture
+async def two_users(test_session):
+    """Alice and Bob with one reminder each."""
+    await get_or_create_user(test_session, f"whatsapp:{ALICE}")
+    await get_or_create_user(test_session, f"whatsapp:{BOB}")
+    test_session.add_all([
+        make_reminder("alice-1", ALICE, "Pay electricity bill"),
+        make_reminder("bob-1", BOB, "Renew passport"),
+    ])
+    await test_session.commit()
+    return test_session
+
+
+class TestUserRows:
+    """Tests for the users table helpers."""
+    
+    def test_user_id_strips_whatsapp_prefix(self):
+        """Test that user ids are the bare E.164 number."""
+        assert user_id_from_number("whatsapp:+923001111111") == ALICE
+        assert user_id_from_number(" +923001111111 ") == ALICE
+    
+    @pytest.mark.asyncio
+    async def test_get_or_create_user_is_idempotent(self, test_session):
+        """Test that a sender gets exactly one row with derived contact numbers."""
+        first = await get_or_create_user(test_session, f"whatsapp:{ALICE}")
+        second = await get_or_create_user(test_session, f"whatsapp:{ALICE}")
+        
+        assert first is second
+        assert first.whatsapp_number == f"whatsapp:{ALICE}"
+        assert first.phone_number == ALICE
+        count = await test_session.execute(text("SELECT COUNT(*) FROM users WHERE id = :id"), {"id": ALICE})
+        assert count.scalar() == 1
+    
+    @pytest.mark.asyncio
+    async def test_get_reminder_owner(self, two_users):
+        """Test that a reminder's owner is resolved through user_id."""
+        owner = await get_reminder_owner(two_users, "bob-1")
+        
+        assert owner.id == BOB
+
+
+class TestReminderIsolation:
+    """A user's service never sees or changes another user's reminders."""
+    
+    @pytest.mark.asyncio
+    async def test_list_shows_only_own_reminders(self, two_users):
+        """Test that listing shows only the user's reminders."""
+        response = await ReminderService(two_users, user_id=ALICE).handle_intent(ParsedIntent(intent="list_reminders"))
+        
+        assert "Pay electricity bill" in response
+        assert "Renew passport" not in response
+    
+    @pytest.mark.asyncio
+    async def test_cannot_delete_other_users_reminder(self, two_users):
+        """Test that a keyword cannot reach another user's reminder."""
+        intent = ParsedIntent(intent="delete_reminder", target_reminder="passport")
+        
+        with patch("app.usecases.reminder_service.wake_dispatcher", new_callable=AsyncMock):
+            response = await ReminderService(two_users, user_id=ALICE).handle_intent(intent)
+        
+        assert "couldn't find" in response
+        assert await two_users.get(Reminder, "bob-1") is not None
+    
+    @pytest.mark.asyncio
+    async def test_created_reminder_is_owned_by_user(self, two_users):
+        """Test that new reminders belong to the service user."""
+        intent = ParsedIntent(
+            intent="create_reminder",
+            title="Gym session",
+            scheduled_time=datetime.utcnow() + timedelta(hours=3)
+        )
+        
+        with patch("app.usecases.reminder_service.wake_dispatcher", new_callable=AsyncMock):
+            await ReminderService(two_users, user_id=BOB).handle_intent(intent)
+        
+        result = await two_users.execute(text("SELECT user_id FROM reminders WHERE title = 'Gym session'"))
+        assert result.scalar() == BOB
+    
+    @pytest.mark.asyncio
+    async def test_opt_out_is_per_user(self, two_users):
+        """Test that opting out of calls only affects the sender."""
+        await ReminderService(two_users, user_id=ALICE).handle_intent(ParsedIntent(intent="opt_out_calls"))
+        
+        alice = await two_users.get(User, ALICE)
+        bob = await two_users.get(User, BOB)
+        await two_users.refresh(alice)
+        await two_users.refresh(bob)
+        assert alice.call_opt_out is True
+        assert bob.call_opt_out is False
+    
+    @pytest.mark.asyncio
+    async def test_history_is_per_user(self, test_session):
+        """Test that conversation history is read per user."""
+        await save_conversation(test_session, ALICE, "hi from alice", "hello alice")
+        await save_conversation(test_session, BOB, "hi from bob", "hello bob")
+        
+        history = await get_conversation_history(test_session, BOB)
+        
+        assert [m["content"] for m in history] == ["hi from bob", "hello bob"]
+
+
+class TestOutboundRouting:
+    """Scheduled notifications and calls go to the reminder's owner."""
+    
+    @pytest.mark.asyncio
+    async def test_notification_goes_to_owner(self, two_users, database_session):
+        """Test that a reminder notification is sent to its owner."""
+        now = datetime.utcnow()
+        bob_reminder = await two_users.get(Reminder, "bob-1")
+        bob_reminder.next_fire_at = now
+        await two_users.commit()
+        dispatcher = scheduler.ReminderDispatcher(batch_size=10, poll_seconds=30, concurrency=1)
+        
+        with patch("app.infrastructure.twilio_whatsapp.send_reminder_notification", new_callable=AsyncMock) as mock_send:
+            await dispatcher.dispatch_due(now)
+        
+        assert mock_send.call_args.kwargs["to_number"] == f"whatsapp:{BOB}"
+    
+    @pytest.mark.asyncio
+    async def test_call_goes_to_owner(self, two_users, database_session):
+        """Test that a follow-up call goes to the owner's phone."""
+        with patch("app.infrastructure.twilio_calls.make_reminder_call", new_callable=AsyncMock) as mock_call:
+            await scheduler.check_response_and_call("alice-1", "Pay electricity bill")
+        
+        mock_call.assert_called_once_with("Pay electricity bill", to_number=ALICE)
+    
+    @pytest.mark.asyncio
+    async def test_opted_out_user_is_not_called(self, two_users, database_session):
+        """Test that a user-level opt-out suppresses calls."""
+        alice = await two_users.get(User, ALICE)
+        alice.call_opt_out = True
+        await two_users.commit()
+        
+        with patch("app.infrastructure.twilio_calls.make_reminder_call", new_callable=AsyncMock) as mock_call:
+            await scheduler.check_response_and_call("alice-1", "Pay electricity bill")
+        
+        mock_call.assert_not_called()
+
+
+def create_single_user_tables(conn) -> None:
+    """A database from before user ids: no user_id columns, one reminder and one exchange."""
+    conn.execute(text(
+        "CREATE TABLE reminders (id VARCHAR(36) PRIMARY KEY, title VARCHAR(255) NOT NULL, "
+        "description VARCHAR(1000), scheduled_time DATETIME NOT NULL, follow_up_minutes INTEGER, "
+        "call_if_no_response BOOLEAN, call_opt_out BOOLEAN, status VARCHAR(9), created_at DATETIME, "
+        "updated_at DATETIME, last_notified_at DATETIME, user_responded BOOLEAN)"
+    ))
+    conn.execute(text(
+        "CREATE TABLE conversation_history (id INTEGER PRIMARY KEY, user_message VARCHAR(1000) NOT NULL, "
+        "bot_response VARCHAR(2000) NOT NULL, timestamp DATETIME)"
+    ))
+    conn.execute(text(
+        "INSERT INTO reminders (id, title, scheduled_time, status) "
+        "VALUES ('old-1', 'Water plants', '2026-01-01 09:00:00', 'ACTIVE')"
+    ))
+    conn.execute(text(
+        "INSERT INTO conversation_history (user_message, bot_response) VALUES ('hi', 'hello')"
+    ))
+    Base.metadata.create_all(conn)
+
+
+class TestSingleUserMigration:
+    """Existing single-user data is assigned to the configured user."""
+    
+    def test_rows_are_assigned_to_default_user(self, tmp_path, default_user_settings):
+        """Test that migration 3 backfills user ids and the default user row."""
+        engine = create_engine(f"sqlite:///{tmp_path / 'reminders.db'}")
+        with engine.begin() as conn:
+            create_single_user_tables(conn)
+            
+            assert apply_migrations(conn) == [m.version for m in MIGRATIONS]
+            
+            owner = user_id_from_number(default_user_settings.user_whatsapp_number)
+            assert conn.execute(text("SELECT user_id FROM reminders")).scalar() == owner
+            assert conn.execute(text("SELECT user_id FROM conversation_history")).scalar() == owner
+            assert conn.execute(text("SELECT phone_number FROM users WHERE id = :id"), {"id": owner}).scalar() == owner
+        engine.dispose()
+    
+    def test_rows_without_a_default_user_stop_the_migration(self, tmp_path, default_user_settings):
+        """Test that migration 3 refuses to leave existing rows without an owner."""
+        engine = create_engine(f"sqlite:///{tmp_path / 'reminders.db'}")
+        with patch.object(default_user_settings, "user_whatsapp_number", None):
+            with pytest.raises(RuntimeError, match="USER_WHATSAPP_NUMBER"):
+                with engine.begin() as conn:
+                    create_single_user_tables(conn)
+                    apply_migrations(conn)
+        engine.dispose()
+    
+    def test_fresh_database_needs_no_default_user(self, tmp_path, default_user_settings):
+        """Test that a database without single-user rows migrates with USER_WHATSAPP_NUMBER unset."""
+        engine = create_engine(f"sqlite:///{tmp_path / 'reminders.db'}")
+        with patch.object(default_user_settings, "user_whatsapp_number", None):
+            with engine.begin() as conn:
+                Base.metadata.create_all(conn)
+                assert apply_migrations(conn) == [m.version for m in MIGRATIONS]
+        engine.dispose()
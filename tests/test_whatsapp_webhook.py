@@ -8,6 +8,7 @@ from unittest.mock import AsyncMock, patch, MagicMock
 from fastapi.testclient import TestClient
 
 from app.main import app
+from app.infrastructure.dedupe_cache import DedupeCache
 
 
 class TestWhatsAppWebhook:
@@ -42,51 +43,60 @@ class TestWhatsAppWebhook:
         assert response.status_code == 200
         assert "WhatsApp Personal Assistant" in response.json()["name"]
     
-    @patch("app.api.whatsapp_webhook.is_message_processed", new_callable=AsyncMock)
+    @pytest.fixture(autouse=True)
+    def dedupe_cache(self):
+        """Fresh dedupe cache for each test."""
+        cache = DedupeCache(max_size=100, ttl_seconds=60)
+        with patch("app.api.whatsapp_webhook.get_dedupe_cache", return_value=cache):
+            yield cache
+    
+    @pytest.fixture
+    def mock_queue(self):
+        """Ingest queue with room for more messages."""
+        queue = MagicMock()
+        queue.is_full.return_value = False
+        queue.enqueue.return_value = True
+        with patch("app.api.whatsapp_webhook.get_ingest_queue", return_value=queue):
+            yield queue
+    
     @patch("app.api.whatsapp_webhook.mark_message_processed", new_callable=AsyncMock)
-    @patch("app.api.whatsapp_webhook.parse_user_message", new_callable=AsyncMock)
-    @patch("app.api.whatsapp_webhook.send_whatsapp_message", new_callable=AsyncMock)
-    def test_webhook_processes_text_message(
+    @patch("app.api.whatsapp_webhook.persist_inbound_message", new_callable=AsyncMock)
+    def test_webhook_queues_text_message(
         self,
-        mock_send,
-        mock_parse,
+        mock_persist,
         mock_mark,
-        mock_is_processed,
         client,
         valid_webhook_data,
-        sample_parsed_intent
+        mock_queue
     ):
-        """Test that webhook processes a text message."""
-        mock_is_processed.return_value = False
-        mock_parse.return_value = sample_parsed_intent
-        mock_send.return_value = True
-        
-        with patch("app.api.whatsapp_webhook.DatabaseSession") as mock_db:
-            mock_session = AsyncMock()
-            mock_db.return_value.__aenter__.return_value = mock_session
-            
-            with patch("app.api.whatsapp_webhook.ReminderService") as mock_service:
-                mock_service_instance = MagicMock()
-                mock_service_instance.handle_intent = AsyncMock(return_value="Reminder created!")
-                mock_service.return_value = mock_service_instance
-                
-                response = client.post(
-                    "/webhook/whatsapp",
-                    data=valid_webhook_data
-                )
+        """Test that webhook persists and queues a text message."""
+        response = client.post(
+            "/webhook/whatsapp",
+            data=valid_webhook_data
+        )
         
         assert response.status_code == 200
-        mock_mark.assert_called_once_with("SM123456789abcdef")
+        mock_mark.assert_called_once()
+        assert mock_mark.call_args.args[0] == "SM123456789abcdef"
+        # Marker and inbound row are written through the same session
+        assert mock_persist.call_args.kwargs["session"] is mock_mark.call_args.args[1]
+        mock_persist.assert_called_once()
+        assert mock_persist.call_args.kwargs["body"] == valid_webhook_data["Body"]
+        mock_queue.enqueue.assert_called_once_with("SM123456789abcdef")
     
-    @patch("app.api.whatsapp_webhook.is_message_processed", new_callable=AsyncMock)
+    @patch("app.api.whatsapp_webhook.mark_message_processed", new_callable=AsyncMock)
+    @patch("app.api.whatsapp_webhook.persist_inbound_message", new_callable=AsyncMock)
     def test_webhook_skips_duplicate_message(
         self,
-        mock_is_processed,
+        mock_persist,
+        mock_mark,
         client,
-        valid_webhook_data
+        valid_webhook_data,
+        mock_queue,
+        dedupe_cache
     ):
-        """Test that webhook skips already processed messages."""
-        mock_is_processed.return_value = True
+        """Test that webhook skips messages already marked in the database."""
+        mock_mark.return_value = False
         
         response = client.post(
             "/webhook/whatsapp",
@@ -94,50 +104,42 @@ class TestWhatsAppWebhook:
         )
         
         assert response.status_code == 200
+        mock_persist.assert_not_called()
+        mock_queue.enqueue.assert_not_called()
+        assert dedupe_cache.contains("SM123456789abcdef")
     
-    @patch("app.api.whatsapp_webhook.is_message_processed", new_callable=AsyncMock)
     @patch("app.api.whatsapp_webhook.mark_message_processed", new_callable=AsyncMock)
-    def test_webhook_skips_empty_message(
+    @patch("app.api.whatsapp_webhook.persist_inbound_message", new_callable=AsyncMock)
+    def test_webhook_retry_answered_from_cache(
         self,
+        mock_persist,
         mock_mark,
-        mock_is_processed,
-        client
+        client,
+        valid_webhook_data,
+        mock_queue,
+        dedupe_cache
     ):
-        """Test that webhook skips empty messages."""
-        mock_is_processed.return_value = False
+        """Test that a Twilio retry is rejected without touching the database."""
+        mock_mark.return_value = True
         
-        data = {
-            "Body": "",
-            "From": "whatsapp:+923001234567",
-            "MessageSid": "SM123456789",
-            "NumMedia": "0",
-        }
-        
-        response = client.post("/webhook/whatsapp", data=data)
+        client.post("/webhook/whatsapp", data=valid_webhook_data)
+        response = client.post("/webhook/whatsapp", data=valid_webhook_data)
         
         assert response.status_code == 200
+        mock_mark.assert_called_once()
+        mock_queue.enqueue.assert_called_once_with("SM123456789abcdef")
+        assert dedupe_cache.stats()["hits"] == 1
     
-    @patch("app.api.whatsapp_webhook.is_message_processed", new_callable=AsyncMock)
     @patch("app.api.whatsapp_webhook.mark_message_processed", new_callable=AsyncMock)
-    @patch("app.api.whatsapp_webhook.download_and_transcribe_audio", new_callable=AsyncMock)
-    @patch("app.api.whatsapp_webhook.parse_user_message", new_callable=AsyncMock)
-    @patch("app.api.whatsapp_webhook.send_whatsapp_message", new_callable=AsyncMock)
-    def test_webhook_processes_audio_message(
+    @patch("app.api.whatsapp_webhook.persist_inbound_message", new_callable=AsyncMock)
+    def test_webhook_queues_audio_message(
         self,
-        mock_send,
-        mock_parse,
-        mock_transcribe,
+        mock_persist,
         mock_mark,
-        mock_is_processed,
         client,
-        sample_parsed_intent
+        mock_queue
     ):
-        """Test that webhook processes audio messages."""
-        mock_is_processed.return_value = False
-        mock_transcribe.return_value = "Remind me to call mom"
-        mock_parse.return_value = sample_parsed_intent
-        mock_send.return_value = True
-        
+        """Test that webhook defers audio messages to the workers."""
         data = {
             "Body": "",
             "From": "whatsapp:+923001234567",
@@ -147,84 +149,74 @@ class TestWhatsAppWebhook:
             "MediaContentType0": "audio/ogg",
         }
         
-        with patch("app.api.whatsapp_webhook.DatabaseSession") as mock_db:
-            mock_session = AsyncMock()
-            mock_db.return_value.__aenter__.return_value = mock_session
-            
-            with patch("app.api.whatsapp_webhook.ReminderService") as mock_service:
-                mock_service_instance = MagicMock()
-                mock_service_instance.handle_intent = AsyncMock(return_value="Done!")
-                mock_service.return_value = mock_service_instance
-                
-                response = client.post("/webhook/whatsapp", data=data)
+        with patch("app.usecases.message_processor.download_and_transcribe_audio", new_callable=AsyncMock) as mock_transcribe:
+            response = client.post("/webhook/whatsapp", data=data)
         
         assert response.status_code == 200
-        mock_transcribe.assert_called_once()
+        mock_transcribe.assert_not_called()
+        assert mock_persist.call_args.kwargs["num_media"] == 1
+        assert mock_persist.call_args.kwargs["media_content_type"] == "audio/ogg"
+        mock_queue.enqueue.assert_called_once_with("SM123456789audio")
     
-    @patch("app.api.whatsapp_webhook.is_message_processed", new_callable=AsyncMock)
     @patch("app.api.whatsapp_webhook.mark_message_processed", new_callable=AsyncMock)
-    @patch("app.api.whatsapp_webhook.download_and_transcribe_audio", new_callable=AsyncMock)
-    @patch("app.api.whatsapp_webhook.send_error_message", new_callable=AsyncMock)
-    def test_webhook_handles_failed_transcription(
+    def test_webhook_rejects_when_queue_full(
         self,
-        mock_send_error,
-        mock_transcribe,
         mock_mark,
-        mock_is_processed,
-        client
+        client,
+        valid_webhook_data,
+        mock_queue
     ):
-        """Test that webhook handles transcription failure gracefully."""
-        mock_is_processed.return_value = False
-        mock_transcribe.return_value = None  # Transcription failed
-        mock_send_error.return_value = True
-        
-        data = {
-            "Body": "",
-            "From": "whatsapp:+923001234567",
-            "MessageSid": "SM123456789fail",
-            "NumMedia": "1",
-            "MediaUrl0": "https://api.twilio.com/media/123",
-            "MediaContentType0": "audio/ogg",
-        }
+        """Test that a full queue returns 503 so Twilio retries later."""
+        mock_queue.is_full.return_value = True
         
-        response = client.post("/webhook/whatsapp", data=data)
+        response = client.post("/webhook/whatsapp", data=valid_webhook_data)
         
-        assert response.status_code == 200
-        mock_send_error.assert_called_once()
+        assert response.status_code == 503
+        mock_mark.assert_not_called()
 
 
 class TestProcessedMessageDeduplication:
     """Tests for message deduplication using SQLite."""
     
     @pytest.mark.asyncio
-    async def test_is_message_processed_returns_false_for_new(self, test_session):
-        """Test that new messages are not marked as processed."""
-        from app.api.whatsapp_webhook import is_message_processed
+    async def test_mark_rejects_processed_message(self, test_session):
+        """Test that a SID already in processed_messages is not marked again."""
+        from app.api.whatsapp_webhook import mark_message_processed
+        from app.domain.processed_message import ProcessedMessage
+        
+        test_session.add(ProcessedMessage(message_sid="TEST_SID_123", processed_at=datetime.utcnow()))
+        await test_session.commit()
         
         with patch("app.api.whatsapp_webhook.async_session_factory") as mock_factory:
             mock_factory.return_value.__aenter__.return_value = test_session
             
-            result = await is_message_processed("NEW_MESSAGE_SID")
-            
-            assert result is False
+            assert await mark_message_processed("TEST_SID_123") is False
+            assert await mark_message_processed("NEW_MESSAGE_SID") is True
     
     @pytest.mark.asyncio
-    async def test_mark_and_check_processed(self, test_session):
-        """Test marking a message as processed and checking it."""
-        from app.api.whatsapp_webhook import mark_message_processed, is_message_processed
+    async def test_helpers_share_caller_session(self, test_session):
+        """Test that with a session the helpers leave committing to the caller."""
+        from app.api.whatsapp_webhook import mark_message_processed, persist_inbound_message
+        from app.domain.inbound_message import InboundMessage
         from app.domain.processed_message import ProcessedMessage
         
-        # Manually add a processed message to the test session
-        processed = ProcessedMessage(
-            message_sid="TEST_SID_123",
-            processed_at=datetime.utcnow()
-        )
-        test_session.add(processed)
-        await test_session.commit()
-        
-        with patch("app.api.whatsapp_webhook.async_session_factory") as mock_factory:
-            mock_factory.return_value.__aenter__.return_value = test_session
-            
-            result = await is_message_processed("TEST_SID_123")
+        with patch.object(test_session, "commit", new_callable=AsyncMock) as mock_commit:
+            await mark_message_processed("SID_UOW", test_session)
+            await persist_inbound_message(
+                message_sid="SID_UOW",
+                from_number="whatsapp:+923001234567",
+                body="hello",
+                session=test_session
+            )
             
-            assert result is True
+            assert await test_session.get(ProcessedMessage, "SID_UOW") is not None
+            assert await test_session.get(InboundMessage, "SID_UOW") is not None
+            mock_commit.assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_mark_is_insert_or_ignore(self, test_session):
+        """Test that marking the same SID twice reports the second as a duplicate."""
+        from app.api.whatsapp_webhook import mark_message_processed
+        
+        assert await mark_message_processed("SID_RACE", test_session) is True
+        assert await mark_message_processed("SID_RACE", test_session) is False